@@ -36,6 +36,16 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
 
+# read switches in the background, see switches/tasks.py prewarm_switches_task()
+# this needs the beat scheduler, e.g. "celery -A openl2m worker --beat"
+if settings.TASKS_ENABLED and (settings.SWITCH_PREWARM_GROUPS or settings.SWITCH_PREWARM_RECENT):
+    app.conf.beat_schedule = {
+        'prewarm-switches': {
+            'task': 'switches.tasks.prewarm_switches_task',
+            'schedule': settings.SWITCH_PREWARM_POLL,
+        },
+    }
+
 
 def get_celery_info():
     """
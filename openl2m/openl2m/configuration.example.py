@@ -59,6 +59,16 @@ LOG_MAX_AGE = 180
 # Note that only change & error logs are shown, not 'view' log entries
 RECENT_SWITCH_LOG_COUNT = 25
 
+# Activity log entries are collected during a request or task, and written together at the end.
+# LOG_SINK sets where they are written:
+#   'database' - with a single insert into the database (default)
+#   'celery'   - sent to a Celery task that writes them (requires TASKS_ENABLED)
+#   'spool'    - added to LOG_SPOOL_FILE, move them to the database with "python3 manage.py load_log_spool",
+#                e.g. from cron every minute.
+# If 'celery' or 'spool' fails, the entries are written to the database.
+# LOG_SINK = 'database'
+# LOG_SPOOL_FILE = '/opt/openl2m/openl2m/log_spool.jsonl'
+
 # API Cross-Origin Resource Sharing (CORS) settings. If CORS_ORIGIN_ALLOW_ALL is set to True, all origins will be
 # allowed. Otherwise, define a list of allowed origins using either CORS_ORIGIN_WHITELIST or
 # CORS_ORIGIN_REGEX_WHITELIST. For more information, see https://github.com/ottoyiu/django-cors-headers
@@ -287,11 +297,11 @@ IP4_INFO_URLS = [
 # Ethernet Info Urls is a list of dictionaries that will be links shown on found ethernet addresses.
 # The idea is that you may want to provide a link to your device registration site, as well as your logging (eg Splunk)
 # you can use the following templates:
-# {{ ethernet.display_name }} - the formatted string xx:xx:xx:xx:xx:xx or xx-xx-xx-xx-xx-xx
+# {{ ethernet.display_address }} or {{ ethernet.display_name }} - the formatted string xx:xx:xx:xx:xx:xx or xx-xx-xx-xx-xx-xx
 ETHERNET_INFO_URLS = [
     {
         'name': 'IPAM',
-        'url': 'https://ipam.yoursite.com/something/search?ethernet={{ ethernet.address }}',
+        'url': 'https://ipam.yoursite.com/something/search?ethernet={{ ethernet.display_address }}',
         'hint': 'Click here to see IPAM data about this ethernet address',
         'target': '_ipam',
         'icon': '/static/img/ipam.png',
@@ -303,7 +313,7 @@ ETHERNET_INFO_URLS = [
     # note this is completely fictitious!
     {
         'name': 'ELK Stack',
-        'url': 'https://elkstack.yoursite.com/search?ethernet={{ ethernet.address }}',
+        'url': 'https://elkstack.yoursite.com/search?ethernet={{ ethernet.display_address }}',
         'hint': 'Click here to see ELK Stack log data about this eithernet address',
         'target': '_elk',
         'icon': '/static/img/general-info.png',
@@ -411,6 +421,107 @@ SNMP_RETRIES = 3
 # note that some devices cannot handle the default 25, and you may need to lower this e.g. 10
 # see the references in the documentation for more information.
 SNMP_MAX_REPETITIONS = 25
+# By default, the max_repetitions value above is the starting point, and OpenL2M learns a better value
+# for each switch and MIB branch. Large tables (e.g. ethernet address tables) get larger values,
+# up to the limit below, so they need fewer requests. If the reply is too large for the device ('tooBig'
+# or partial reply errors), the walk is retried once with half the value, and the lower value is remembered
+# as the limit for that switch and branch. Timeouts are not retried. After SNMP_MAX_REPETITIONS_LIMIT_AGE
+# seconds, larger values are tried again. Set to False to always use the value above.
+SNMP_ADAPTIVE_MAX_REPETITIONS = True
+SNMP_MAX_REPETITIONS_LIMIT = 100
+# SNMP_MAX_REPETITIONS_LIMIT_AGE = 86400
+# the number of bulk-walks that can run at the same time to a single switch, when reading the basic switch data.
+# This only works with SNMP_TRANSPORT = 'asyncio' below, EasySNMP always reads one branch at a time.
+# This can speed up the initial switch view significantly, but some devices do not handle multiple requests well.
+# The default of 1 reads one branch at a time.
+# SNMP_MAX_PARALLEL_WALKS = 4
+# the library used for snmp access. The default 'easysnmp' uses the net-snmp package of the OS.
+# 'asyncio' uses the pysnmp asyncio API, which can run parallel walks on an event loop.
+# SNMP_TRANSPORT = 'asyncio'
+# To profile or debug with the data of real devices, set a directory here. All snmp replies are then added
+# to a capture file per switch in that directory (with the IPv4 address as name). With SNMP_TRANSPORT = 'replay',
+# switch data is read from these files instead of the devices, and changes only go to the data in memory.
+# SNMP_REPLAY_LATENCY adds a delay per request, in seconds, to simulate the network.
+# SNMP_CAPTURE_DIR = '/opt/openl2m/captures'
+# SNMP_REPLAY_LATENCY = 0.005
+# Snmp sessions are kept for re-use by the next request to the same switch. This avoids the SNMP v3
+# discovery and key setup for every request. These are the number of idle sessions kept per process (0 = off),
+# and the number of seconds an idle session is kept:
+# SNMP_SESSION_POOL_SIZE = 50
+# SNMP_SESSION_POOL_IDLE = 300
+# With incremental refresh, every use of cached switch data first reads sysUpTime, ifTableLastChange and
+# the vlan change counters of the switch in a single request. If the switch rebooted or interfaces were added,
+# the switch is read again. If vlans were added or deleted, only the vlan tables are read again.
+# "Reload" then only reads the interface and PoE state again, instead of all data.
+# SNMP_INCREMENTAL_REFRESH = True
+# Bulk edits send the interface status, PoE and description changes together, with this many changes
+# per SET request. If a switch does not accept a request, its changes are sent one at a time.
+# SNMP_MAX_SET_VARBINDS = 10
+
+# The latency, errors, timeouts and size of all snmp requests are counted per switch, connector class and
+# MIB branch. The busiest are shown on the Statistics page. All counters are available in the Prometheus
+# text format at /switches/metrics, for staff users, and without login for the addresses listed in
+# METRICS_ALLOWED_IPS. Note that each OpenL2M process keeps its own counters.
+# The address checked is the one of the connection. Behind a proxy like Nginx, all requests come from the proxy,
+# so list that in METRICS_TRUSTED_PROXIES, and the X-Real-IP header it sets is used instead.
+# Do not list the proxy address in METRICS_ALLOWED_IPS, as that would allow everybody.
+# SNMP_METRICS = True
+# METRICS_ALLOWED_IPS = ['192.168.1.10']
+# METRICS_TRUSTED_PROXIES = ['127.0.0.1']
+
+# The switch data read via snmp is cached, so all users viewing the same switch share a single read.
+# The cached data is used for up to SWITCH_CACHE_TIMEOUT seconds after it was read. Any change made to
+# the switch clears the cache. Set to 0 to only cache in the session of each user.
+# NOTE: with the default memory cache, each OpenL2M process (e.g. each gunicorn worker, and Celery) has its
+# own cache, and a change only clears the cache of the process that made it. The other processes can then show
+# data that is up to SWITCH_CACHE_TIMEOUT seconds old. Use one of the shared caches below with multiple processes.
+SWITCH_CACHE_TIMEOUT = 300
+# The cache uses the Django cache framework. The default is a memory cache in each OpenL2M process.
+# If you run multiple processes (e.g. several gunicorn workers or Celery), use a cache they all share,
+# so changes made in one process clear the cache for all. E.g. for Redis, with the django-redis package
+# (see requirements.txt). This uses database 1, as Celery uses database 0 of the same server:
+# CACHES = {
+#     'default': {
+#         'BACKEND': 'django_redis.cache.RedisCache',
+#         'LOCATION': 'redis://127.0.0.1:6379/1',
+#     }
+# }
+# or for a file based cache:
+# CACHES = {
+#     'default': {
+#         'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+#         'LOCATION': '/var/tmp/openl2m_cache',
+#     }
+# }
+# Views that need fresher data can limit the age (in seconds) of the cached data they use.
+# The views are 'basics', 'hw_info' and 'arp_lldp'. E.g. to re-read the switch if the data is older than a minute:
+# SWITCH_CACHE_MAX_AGE = {
+#     'hw_info': 60,
+# }
+# The cached oid data is compressed. This makes the session and cache entries much smaller,
+# at a small cost in cpu time. Set to False to store it uncompressed:
+# SWITCH_CACHE_COMPRESS = False
+# Switches can be read in the background, so the data is already in the switch cache when users open them.
+# This needs TASKS_ENABLED, a cache shared by all processes (see CACHES above), and Celery running with the
+# beat scheduler (e.g. "celery -A openl2m worker --beat"). Read the switches in these groups (by name):
+# SWITCH_PREWARM_GROUPS = ['Core Switches', ]
+# and/or the switches viewed in the last this many seconds, e.g. the last 8 hours:
+# SWITCH_PREWARM_RECENT = 28800
+# Each switch is read every SWITCH_PREWARM_INTERVAL seconds. Keep this well below SWITCH_CACHE_TIMEOUT,
+# so the data does not expire before the next read. A switch is not read if its cached data is newer than this,
+# e.g. because a user just opened it.
+# SWITCH_PREWARM_INTERVAL = 120
+# Per-switch intervals, by switch name. 0 means the switch is not read in the background:
+# SWITCH_PREWARM_SCHEDULE = {
+#     'slow-switch-1': 240,
+#     'lab-switch': 0,
+# }
+# Each read is delayed by a random number of seconds, up to SWITCH_PREWARM_JITTER, to spread the load:
+# SWITCH_PREWARM_JITTER = 30
+# The number of switches read at the same time, by all Celery workers:
+# SWITCH_PREWARM_MAX_PARALLEL = 4
+# How often (in seconds) Celery beat checks for switches that are due to be read:
+# SWITCH_PREWARM_POLL = 60
 
 # task scheduling via Celery. If you want to use this, set this to True
 TASKS_ENABLED = False
@@ -85,6 +85,9 @@ if BASE_PATH:
     BASE_PATH = BASE_PATH.strip('/') + '/'  # Enforce trailing slash only
 LOG_MAX_AGE = getattr(configuration, 'LOG_MAX_AGE', 180)
 RECENT_SWITCH_LOG_COUNT = getattr(configuration, 'RECENT_SWITCH_LOG_COUNT', 25)
+LOG_SINK = getattr(configuration, 'LOG_SINK', 'database')     # 'database', 'celery' or 'spool'
+LOG_SPOOL_FILE = getattr(configuration, 'LOG_SPOOL_FILE', os.path.join(BASE_DIR, 'log_spool.jsonl'))
+LOG_BUFFER_SIZE = getattr(configuration, 'LOG_BUFFER_SIZE', 200)    # write buffered log entries after this many
 CORS_ORIGIN_ALLOW_ALL = getattr(configuration, 'CORS_ORIGIN_ALLOW_ALL', False)
 CORS_ORIGIN_REGEX_WHITELIST = getattr(configuration, 'CORS_ORIGIN_REGEX_WHITELIST', [])
 CORS_ORIGIN_WHITELIST = getattr(configuration, 'CORS_ORIGIN_WHITELIST', [])
@@ -150,6 +153,40 @@ SWITCH_SEARCH_FORM = getattr(configuration, 'SWITCH_SEARCH_FORM', True)
 SNMP_TIMEOUT = getattr(configuration, 'SNMP_TIMEOUT', 4)    # seconds before retry, see EasySNMP docs
 SNMP_RETRIES = getattr(configuration, 'SNMP_RETRIES', 3)    # retries before fail
 SNMP_MAX_REPETITIONS = getattr(configuration, 'SNMP_MAX_REPETITIONS', 10)   # SNMP get_bulk max_repetitions
+SNMP_ADAPTIVE_MAX_REPETITIONS = getattr(configuration, 'SNMP_ADAPTIVE_MAX_REPETITIONS', True)   # learn max_repetitions per switch and branch
+SNMP_MAX_REPETITIONS_LIMIT = getattr(configuration, 'SNMP_MAX_REPETITIONS_LIMIT', 100)   # upper limit for the learned values
+SNMP_MAX_REPETITIONS_LIMIT_AGE = getattr(configuration, 'SNMP_MAX_REPETITIONS_LIMIT_AGE', 86400)   # seconds a lower limit after a 'tooBig' error is kept
+SNMP_MAX_PARALLEL_WALKS = getattr(configuration, 'SNMP_MAX_PARALLEL_WALKS', 1)   # concurrent bulk-walks per switch, 1 = off, asyncio transport only
+SNMP_TRANSPORT = getattr(configuration, 'SNMP_TRANSPORT', 'easysnmp')   # 'easysnmp', 'asyncio' (pysnmp) or 'replay'
+SNMP_CAPTURE_DIR = getattr(configuration, 'SNMP_CAPTURE_DIR', '')   # write all snmp replies here, and replay from here
+SNMP_REPLAY_LATENCY = getattr(configuration, 'SNMP_REPLAY_LATENCY', 0)   # seconds per request with SNMP_TRANSPORT = 'replay'
+SNMP_SESSION_POOL_SIZE = getattr(configuration, 'SNMP_SESSION_POOL_SIZE', 50)   # idle sessions kept per process, 0 = off
+SNMP_SESSION_POOL_IDLE = getattr(configuration, 'SNMP_SESSION_POOL_IDLE', 300)   # seconds before an idle session is dropped
+SNMP_INCREMENTAL_REFRESH = getattr(configuration, 'SNMP_INCREMENTAL_REFRESH', False)   # check for changes before using cached data
+SNMP_MAX_SET_VARBINDS = getattr(configuration, 'SNMP_MAX_SET_VARBINDS', 10)   # changes per SET request in bulk edits, 1 = one at a time
+SNMP_METRICS = getattr(configuration, 'SNMP_METRICS', True)    # count the snmp requests, see switches/connect/metrics.py
+METRICS_ALLOWED_IPS = getattr(configuration, 'METRICS_ALLOWED_IPS', [])    # may read /switches/metrics without login
+METRICS_TRUSTED_PROXIES = getattr(configuration, 'METRICS_TRUSTED_PROXIES', [])    # proxies that set X-Real-IP for the check above
+
+# switch data cache shared by all users, see the Django cache framework.
+# The default memory cache is per process, use a shared cache with multiple gunicorn workers.
+CACHES = getattr(configuration, 'CACHES', {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'openl2m',
+    }
+})
+SWITCH_CACHE_TIMEOUT = getattr(configuration, 'SWITCH_CACHE_TIMEOUT', 300)   # seconds, 0 = off
+SWITCH_CACHE_MAX_AGE = getattr(configuration, 'SWITCH_CACHE_MAX_AGE', {})   # per view, in seconds
+SWITCH_CACHE_COMPRESS = getattr(configuration, 'SWITCH_CACHE_COMPRESS', True)   # zlib compress the cached oid data
+# read switches in the background into the switch cache, with Celery beat, see switches/tasks.py
+SWITCH_PREWARM_GROUPS = getattr(configuration, 'SWITCH_PREWARM_GROUPS', [])   # names of the switch groups to read
+SWITCH_PREWARM_RECENT = getattr(configuration, 'SWITCH_PREWARM_RECENT', 0)   # also read switches viewed in this many seconds
+SWITCH_PREWARM_INTERVAL = getattr(configuration, 'SWITCH_PREWARM_INTERVAL', 120)   # seconds between reads of a switch
+SWITCH_PREWARM_SCHEDULE = getattr(configuration, 'SWITCH_PREWARM_SCHEDULE', {})   # interval by switch name, 0 = not read
+SWITCH_PREWARM_JITTER = getattr(configuration, 'SWITCH_PREWARM_JITTER', 30)   # random delay in seconds before each read
+SWITCH_PREWARM_MAX_PARALLEL = getattr(configuration, 'SWITCH_PREWARM_MAX_PARALLEL', 4)   # switches read at the same time
+SWITCH_PREWARM_POLL = getattr(configuration, 'SWITCH_PREWARM_POLL', 60)   # seconds between checks for switches to read
 
 # Sessions
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
@@ -191,6 +228,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'switches.middleware.LogBufferMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -38,7 +38,7 @@ class SwitchAdmin(admin.ModelAdmin):
     save_on_top = True
     list_display = ('name', 'get_switchgroups')
     readonly_fields = ('snmp_hostname', 'snmp_bulk_read_count', 'snmp_read_count',
-                       'snmp_write_count', 'snmp_oid', 'snmp_capabilities',)
+                       'snmp_write_count', 'snmp_oid', 'snmp_capabilities', 'snmp_bulk_tuning',)
     search_fields = ['name']
     inlines = (SwitchInline,)
 
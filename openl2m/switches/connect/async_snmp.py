@@ -0,0 +1,668 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Asyncio SNMP transport, an alternative to the EasySNMP() class.
+This uses the pysnmp (version 7) asyncio API, so a single event loop can run the
+parallel walks of a switch at the same time, without a thread per walk.
+"""
+import asyncio
+import threading
+import time
+import traceback
+import weakref
+
+from django.conf import settings
+from pyasn1.type import univ
+from pysnmp.hlapi.asyncio import *
+from pysnmp.proto import rfc1902, rfc1905
+
+from switches.constants import *
+from switches.connect.classes import Error
+from switches.connect.constants import snmp_mib_variables
+from switches.connect.metrics import observe_retry, get_branch_name, get_branches_name
+from switches.utils import dprint
+
+# map the pysnmp value classes to the EasySNMP type names
+snmp_type_names = {
+    'Integer': 'INTEGER',
+    'Integer32': 'INTEGER',
+    'OctetString': 'OCTETSTR',
+    'Bits': 'BITS',
+    'Opaque': 'OPAQUE',
+    'ObjectIdentifier': 'OBJECTID',
+    'ObjectName': 'OBJECTID',
+    'IpAddress': 'IPADDR',
+    'TimeTicks': 'TICKS',
+    'Gauge32': 'GAUGE',
+    'Unsigned32': 'GAUGE',
+    'Counter32': 'COUNTER',
+    'Counter64': 'COUNTER64',
+    'NoSuchObject': 'NOSUCHOBJECT',
+    'NoSuchInstance': 'NOSUCHINSTANCE',
+    'EndOfMibView': 'ENDOFMIBVIEW',
+}
+
+# map the EasySNMP set() types to the pysnmp value classes
+snmp_set_types = {
+    'i': rfc1902.Integer32,
+    'INTEGER': rfc1902.Integer32,
+    'u': rfc1902.Unsigned32,
+    'GAUGE': rfc1902.Gauge32,
+    'UNSIGNED': rfc1902.Unsigned32,
+    's': rfc1902.OctetString,
+    'OCTETSTR': rfc1902.OctetString,
+    'OCTETSTRING': rfc1902.OctetString,
+    'o': rfc1902.ObjectName,
+    'OBJECTID': rfc1902.ObjectName,
+    'a': rfc1902.IpAddress,
+    'IPADDR': rfc1902.IpAddress,
+    't': rfc1902.TimeTicks,
+    'TICKS': rfc1902.TimeTicks,
+    'c': rfc1902.Counter32,
+    'COUNTER': rfc1902.Counter32,
+}
+
+# one SnmpEngine() per event loop, shared by all switches on that loop
+_snmp_engines = weakref.WeakKeyDictionary()
+# the event loop used by the blocking calls, one per thread
+_thread_data = threading.local()
+
+
+def get_snmp_engine():
+    """
+    Return the pysnmp SnmpEngine() for the current event loop.
+    """
+    loop = asyncio.get_event_loop()
+    engine = _snmp_engines.get(loop, False)
+    if not engine:
+        engine = SnmpEngine()
+        _snmp_engines[loop] = engine
+    return engine
+
+
+def get_thread_event_loop():
+    """
+    Return the event loop of this thread, used to run the blocking calls of AsyncioSNMP().
+    """
+    loop = getattr(_thread_data, 'loop', False)
+    if not loop or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _thread_data.loop = loop
+    return loop
+
+
+class AsyncSnmpVariable():
+    """
+    A variable returned by AsyncioSNMP(), with the same attributes as the EasySNMP SNMPVariable() class.
+    """
+    def __init__(self, oid, value):
+        (self.oid, self.oid_index) = oid.rsplit('.', 1)
+        type_name = value.__class__.__name__
+        self.snmp_type = snmp_type_names.get(type_name, type_name.upper())
+        if isinstance(value, (rfc1905.NoSuchObject, rfc1905.NoSuchInstance, rfc1905.EndOfMibView)):
+            self.value = ''
+        elif isinstance(value, rfc1902.IpAddress):
+            self.value = value.prettyPrint()
+        elif isinstance(value, univ.OctetString):
+            # one character per byte, like EasySNMP returns it. See PortList().from_unicode()
+            self.value = bytes(value).decode('latin-1')
+        elif isinstance(value, univ.ObjectIdentifier):
+            self.value = f".{value}"
+        else:
+            self.value = value.prettyPrint()
+
+
+class AsyncioSNMP():
+    """
+    This class implements the same interface as the EasySNMP() class, with the pysnmp asyncio API.
+    The blocking _get(), _get_branch_by_name(), _set() and _set_multiple() calls run their
+    coroutine on the event loop of the current thread, so cannot be called from a running loop.
+    The _async_*() coroutines do the network part only. They do not parse, cache or touch
+    the database, as Django does not allow that from a running event loop.
+    """
+    def __init__(self, switch):
+        """
+        Implements base functionality we need from the pysnmp asyncio API
+        """
+        self.switch = switch    # the Switch() object
+        self._snmp_session = False   # tuple of (auth data, transport target, context data)
+        self._snmp_session_context = ''     # the community or context of the session, see _set_snmp_session()
+        self._prefetched_branches = {}      # asyncio Task() objects of the parallel walks, key is (community or context, branch name)
+        self._walk_semaphore = False        # limits the parallel walks, see _prefetch_branches()
+        self.error = Error()
+
+    def _run(self, coroutine):
+        """
+        Run the coroutine until done on the event loop of this thread, and return the result.
+        Any prefetched walks also make progress while this runs.
+        """
+        return get_thread_event_loop().run_until_complete(coroutine)
+
+    async def _async_get(self, oid):
+        """
+        Get a single specific OID value.
+        Returns an AsyncSnmpVariable(). Errors are raised as exceptions.
+        """
+        (auth_data, target, context) = self._snmp_session
+        start = time.time()
+        (error_indication, error_status, error_index, var_binds) = await get_cmd(
+            get_snmp_engine(), auth_data, target, context,
+            ObjectType(ObjectIdentity(oid)),
+            lookupMib=False)
+        self._check_reply('get', get_branch_name(oid), start, error_indication, error_status, error_index, var_binds)
+        (name, value) = var_binds[0]
+        return AsyncSnmpVariable(f".{name}", value)
+
+    async def _async_get_multiple(self, oids):
+        """
+        Get several specific OID values in a single request.
+        Returns a list of AsyncSnmpVariable(). Errors are raised as exceptions.
+        """
+        (auth_data, target, context) = self._snmp_session
+        start = time.time()
+        (error_indication, error_status, error_index, var_binds) = await get_cmd(
+            get_snmp_engine(), auth_data, target, context,
+            *[ObjectType(ObjectIdentity(oid)) for oid in oids],
+            lookupMib=False)
+        self._check_reply('get', get_branches_name(oids), start, error_indication, error_status, error_index, var_binds)
+        return [AsyncSnmpVariable(f".{name}", value) for (name, value) in var_binds]
+
+    async def _async_walk_branch(self, branch_name, max_repetitions, session=False):
+        """
+        Bulk-walk a branch until we leave it.
+        session - if given, the (auth data, transport target, context data) to use instead of the current session.
+        Returns a tuple of (list of AsyncSnmpVariable(), duration). Errors are raised as exceptions.
+        """
+        (auth_data, target, context) = session or self._snmp_session
+        start_oid = snmp_mib_variables[branch_name]
+        branch = f"{start_oid}."
+        engine = get_snmp_engine()
+        items = []
+        next_oid = start_oid
+        start = time.time()
+        while True:
+            pdu_start = time.time()
+            (error_indication, error_status, error_index, var_binds) = await bulk_cmd(
+                engine, auth_data, target, context, 0, max_repetitions,
+                ObjectType(ObjectIdentity(next_oid)),
+                lookupMib=False)
+            self._check_reply('getbulk', branch_name, pdu_start, error_indication, error_status, error_index, var_binds)
+            last_oid = next_oid
+            for (name, value) in var_binds:
+                oid = f".{name}"
+                if not oid.startswith(branch) or isinstance(value, rfc1905.EndOfMibView):
+                    # we left the branch
+                    return (items, time.time() - start)
+                items.append(AsyncSnmpVariable(oid, value))
+                next_oid = oid
+            if next_oid == last_oid:
+                # nothing new returned
+                return (items, time.time() - start)
+
+    async def _async_walk_table(self, branch_names, max_repetitions, session=False):
+        """
+        Walk table columns in lockstep, see EasySNMP._walk_table()
+        session - see _async_walk_branch()
+        Returns a tuple of (dict with list of AsyncSnmpVariable() per column name, duration).
+        Errors are raised as exceptions.
+        """
+        (auth_data, target, context) = session or self._snmp_session
+        engine = get_snmp_engine()
+        start = time.time()
+        table_name = ','.join(branch_names)
+        columns = {}
+        next_oids = {}      # the OID to continue from, for each column that is not finished
+        for branch_name in branch_names:
+            columns[branch_name] = []
+            next_oids[branch_name] = snmp_mib_variables[branch_name]
+        while next_oids:
+            names = list(next_oids.keys())
+            pdu_start = time.time()
+            (error_indication, error_status, error_index, var_binds) = await bulk_cmd(
+                engine, auth_data, target, context, 0, max_repetitions,
+                *[ObjectType(ObjectIdentity(next_oids[name])) for name in names],
+                lookupMib=False)
+            self._check_reply('getbulk', table_name, pdu_start, error_indication, error_status, error_index, var_binds)
+            if not var_binds:
+                break
+            finished = set()
+            last_oids = dict(next_oids)
+            # the var binds are returned row by row, each row in the order of the requested OIDs
+            for (position, (name, value)) in enumerate(var_binds):
+                column = names[position % len(names)]
+                if column in finished:
+                    continue
+                oid = f".{name}"
+                if isinstance(value, rfc1905.EndOfMibView) or not oid.startswith(f"{snmp_mib_variables[column]}."):
+                    finished.add(column)
+                    continue
+                columns[column].append(AsyncSnmpVariable(oid, value))
+                next_oids[column] = oid
+            for column in names:
+                # also stop if a column does not move forward
+                if column in finished or next_oids[column] == last_oids[column]:
+                    del next_oids[column]
+        return (columns, time.time() - start)
+
+    async def _async_set_multiple(self, oid_values):
+        """
+        Set multiple OIDs at the same time, in a single snmp request
+        oid_values is a list of (oid, value, type), with the EasySNMP types.
+        Errors are raised as exceptions.
+        """
+        (auth_data, target, context) = self._snmp_session
+        var_binds = []
+        for (oid, value, snmp_type) in oid_values:
+            var_binds.append(ObjectType(ObjectIdentity(oid), self._get_typed_value(value, snmp_type)))
+        start = time.time()
+        (error_indication, error_status, error_index, var_binds) = await set_cmd(
+            get_snmp_engine(), auth_data, target, context,
+            *var_binds,
+            lookupMib=False)
+        self._check_reply('set', get_branches_name(oid for (oid, value, snmp_type) in oid_values), start,
+                          error_indication, error_status, error_index, var_binds)
+        return True
+
+    def _check_reply(self, operation, branch, start, error_indication, error_status, error_index, var_binds):
+        """
+        Count a request in the snmp metrics, see _add_pdu_metrics(), and raise an exception
+        if the reply has an error.
+        """
+        if error_indication:
+            exception = Exception(f"SNMP Engine error: {error_indication}")
+        elif error_status:
+            exception = Exception(f"SNMP PDU error: {error_status.prettyPrint()} at index {error_index}")
+        else:
+            self._add_pdu_metrics(operation, branch, start, var_binds)
+            return
+        self._add_pdu_metrics(operation, branch, start, exception=exception)
+        raise exception
+
+    def _get_typed_value(self, value, snmp_type):
+        """
+        Return the pysnmp object for this value and EasySNMP type.
+        """
+        if snmp_type == 'x':
+            return rfc1902.OctetString(hexValue=value)
+        value_class = snmp_set_types.get(snmp_type, rfc1902.OctetString)
+        if issubclass(value_class, rfc1902.OctetString) and isinstance(value, str):
+            return value_class(value.encode('utf-8'))
+        if issubclass(value_class, univ.Integer):
+            return value_class(int(value))
+        return value_class(value)
+
+    def _get(self, oid, update_oidcache=True, parser=False):
+        """
+        Get a single specific OID value via SNMP
+        Update the local OID cache by default.
+        Returns a tuple with (error_status, return_value)
+        if error, then return_value is not defined
+        """
+        self.error.clear()
+
+        try:
+            retval = self._run(self._async_get(oid))
+        except Exception as e:
+            self.error.status = True
+            self.error.description = "Access denied"
+            self.error.details = f"SNMP Error: {repr(e)} ({str(type(e))})\n{traceback.format_exc()}"
+            return (True, None)
+
+        self._capture_items([retval])
+        # we cache all values as strings, just like the original returns from get_branch()
+        self._parse_oid_and_cache(f"{retval.oid}.{retval.oid_index}",
+                                  str(retval.value), retval.snmp_type, update_oidcache, parser)
+        # update the local cache as needed by saving in the session:
+        if update_oidcache:
+            self._set_http_session_cache()
+
+        return (False, retval)
+
+    def _get_multiple(self, oids):
+        """
+        Get several specific OID values in a single SNMP request. The values are not parsed or cached.
+        Returns a tuple with (error_status, list of values), in the order of the oids.
+        Values the device does not have are returned as None.
+        """
+        self.error.clear()
+        try:
+            retvals = self._run(self._async_get_multiple(oids))
+        except Exception as e:
+            self.error.status = True
+            self.error.description = "Access denied"
+            self.error.details = f"SNMP Error: {repr(e)} ({str(type(e))})\n{traceback.format_exc()}"
+            return (True, None)
+
+        self._capture_items(retvals)
+        return (False, [None if 'NOSUCH' in retval.snmp_type else retval.value for retval in retvals])
+
+    def _get_branch_by_name(self, branch_name, cache_it=True, parser=False, max_repetitions=0, com_or_ctx=None):
+        """
+        Bulk-walk a branch of the snmp mib, fill the data in the oid store.
+        This finishes when we leave this branch.
+        branch_name = SNMP name
+        cache_it = True - we will save data in http session oid_cache
+        parser - if given, will be a function to call to parse the MIB data.
+        max_repetitions - if not given, the value learned for this switch and branch, see _get_max_repetitions()
+        com_or_ctx - if given, the community or context to read the branch in, see EasySNMP._get_branch_by_name()
+        Return count of objects returned from query, or -1 if error.
+        """
+        if branch_name not in snmp_mib_variables.keys():
+            warning = f"ERROR: invalid branch name '{branch_name}'"
+            self._add_warning(warning)
+            dprint(f"+++> INVALID BRANCH NAME: {branch_name}")
+            return -1
+        if not max_repetitions:
+            max_repetitions = self._get_max_repetitions(branch_name)
+
+        self.error.clear()
+        count = 0
+        failed_repetitions = 0
+        if com_or_ctx is None:
+            com_or_ctx = self._snmp_session_context
+        task = self._prefetched_branches.pop((com_or_ctx, branch_name), False)
+        if not task and com_or_ctx != self._snmp_session_context:
+            if not self._set_snmp_session(com_or_ctx):
+                self.error.status = True
+                self.error.description = "Cannot get SNMP session!"
+                self._add_warning(f"Cannot get SNMP session to read branch {branch_name}")
+                return -1
+        try:
+            try:
+                if task:
+                    dprint(f"_get_branch_by_name({branch_name}) from parallel walk")
+                    (items, duration) = self._run(task)
+                else:
+                    dprint(f"_get_branch_by_name({branch_name}) BulkWalk {snmp_mib_variables[branch_name]}")
+                    (items, duration) = self._run(self._async_walk_branch(branch_name, max_repetitions))
+            except Exception as e:
+                # 'tooBig' or partial replies are caused by replies that are too large for the device,
+                # so try once more with smaller replies.
+                retry_repetitions = self._get_backoff_max_repetitions(branch_name, max_repetitions, e)
+                if not retry_repetitions:
+                    raise
+                dprint(f"_get_branch_by_name({branch_name}) failed, retry with max_repetitions={retry_repetitions}")
+                observe_retry(self.switch, self.__class__.__name__, 'getbulk', branch_name)
+                failed_repetitions = max_repetitions
+                max_repetitions = retry_repetitions
+                (items, duration) = self._run(self._async_walk_branch(branch_name, max_repetitions))
+            self._capture_items(items, com_or_ctx)
+            for item in items:
+                count = count + 1
+                self._parse_oid_and_cache(f"{item.oid}.{item.oid_index}", item.value, item.snmp_type, cache_it, parser)
+
+        except Exception as e:
+            self.error.status = True
+            self.error.description = "A timeout or network error occured!"
+            self.error.details = f"SNMP Error: branch {branch_name}, {repr(e)} ({str(type(e))})\n{traceback.format_exc()}"
+            self._add_warning(self.error.details)
+            dprint(f"   _get_branch_by_name({branch_name}): Exception: {e.__class__.__name__}\n{self.error.details}\n")
+            return -1
+
+        # add to timing data, for admin use!
+        self._add_mib_timing(branch_name, count, duration)
+        self._tune_max_repetitions(branch_name, max_repetitions, count, duration, failed_repetitions)
+        self._count('snmp_bulk_read_count')
+        dprint(f"_get_branch_by_name returns {count}")
+        return count
+
+    def _prefetch_branches(self, branch_names, com_or_ctx=None):
+        """
+        Create walk tasks for the given branches on the event loop of this thread, with at most
+        settings.SNMP_MAX_PARALLEL_WALKS walks in progress. The tasks run while the loop runs,
+        i.e. during the next blocking calls. See EasySNMP._prefetch_branches()
+        A tuple of names is a table walk, see _get_table_by_names()
+        com_or_ctx - if given, walk in this community or context instead of the one of the current session.
+        Returns the number of walks started, 0 if parallel walks are disabled.
+        """
+        if settings.SNMP_MAX_PARALLEL_WALKS < 2:
+            return 0
+        if com_or_ctx is None or com_or_ctx == self._snmp_session_context:
+            com_or_ctx = self._snmp_session_context
+            session = self._snmp_session
+        else:
+            session = self._get_snmp_session(com_or_ctx)
+        if not session:
+            return 0
+        loop = get_thread_event_loop()
+        count = 0
+        for branch_name in branch_names:
+            if (com_or_ctx, branch_name) in self._prefetched_branches.keys():
+                continue
+            if isinstance(branch_name, tuple):
+                if all(name in snmp_mib_variables.keys() for name in branch_name):
+                    self._prefetched_branches[(com_or_ctx, branch_name)] = loop.create_task(
+                        self._async_prefetch_branch(branch_name, self._get_max_repetitions(','.join(branch_name)), session))
+                    count += 1
+            elif branch_name in snmp_mib_variables.keys():
+                self._prefetched_branches[(com_or_ctx, branch_name)] = loop.create_task(
+                    self._async_prefetch_branch(branch_name, self._get_max_repetitions(branch_name), session))
+                count += 1
+        dprint(f"_prefetch_branches() started {count} walks")
+        return count
+
+    async def _async_prefetch_branch(self, branch_name, max_repetitions, session):
+        """
+        Walk a branch, or a tuple of table columns, for _prefetch_branches(), limited by the walk semaphore.
+        """
+        if not self._walk_semaphore:
+            self._walk_semaphore = asyncio.Semaphore(settings.SNMP_MAX_PARALLEL_WALKS)
+        async with self._walk_semaphore:
+            if isinstance(branch_name, tuple):
+                return await self._async_walk_table(branch_name, max_repetitions, session)
+            return await self._async_walk_branch(branch_name, max_repetitions, session)
+
+    def _get_table_by_names(self, branch_names, cache_it=True, parser=False, max_repetitions=0):
+        """
+        Bulk-walk several columns of a table at the same time.
+        See EasySNMP._get_table_by_names() for details.
+        Returns a dict with the count of objects per column name, or -1 if error.
+        """
+        for branch_name in branch_names:
+            if branch_name not in snmp_mib_variables.keys():
+                warning = f"ERROR: invalid branch name '{branch_name}'"
+                self._add_warning(warning)
+                dprint(f"+++> INVALID BRANCH NAME: {branch_name}")
+                return -1
+        table_name = ','.join(branch_names)
+        if not max_repetitions:
+            max_repetitions = self._get_max_repetitions(table_name)
+
+        self.error.clear()
+        counts = {}
+        failed_repetitions = 0
+        task = self._prefetched_branches.pop((self._snmp_session_context, tuple(branch_names)), False)
+        try:
+            try:
+                if task:
+                    dprint(f"_get_table_by_names({table_name}) from parallel walk")
+                    (columns, duration) = self._run(task)
+                else:
+                    dprint(f"_get_table_by_names({table_name}) GetBulk")
+                    (columns, duration) = self._run(self._async_walk_table(branch_names, max_repetitions))
+            except Exception as e:
+                # same as _get_branch_by_name(), retry once with smaller replies.
+                retry_repetitions = self._get_backoff_max_repetitions(table_name, max_repetitions, e)
+                if not retry_repetitions:
+                    raise
+                dprint(f"_get_table_by_names({table_name}) failed, retry with max_repetitions={retry_repetitions}")
+                observe_retry(self.switch, self.__class__.__name__, 'getbulk', table_name)
+                failed_repetitions = max_repetitions
+                max_repetitions = retry_repetitions
+                (columns, duration) = self._run(self._async_walk_table(branch_names, max_repetitions))
+            for branch_name in branch_names:
+                counts[branch_name] = 0
+                self._capture_items(columns[branch_name])
+                for item in columns[branch_name]:
+                    counts[branch_name] += 1
+                    self._parse_oid_and_cache(f"{item.oid}.{item.oid_index}", item.value, item.snmp_type, cache_it, parser)
+
+        except Exception as e:
+            self.error.status = True
+            self.error.description = "A timeout or network error occured!"
+            self.error.details = f"SNMP Error: branches {table_name}, {repr(e)} ({str(type(e))})\n{traceback.format_exc()}"
+            self._add_warning(self.error.details)
+            dprint(f"   _get_table_by_names({table_name}): Exception: {e.__class__.__name__}\n{self.error.details}\n")
+            return -1
+
+        # add to timing data, for admin use! The columns share the time, by count.
+        total = sum(counts.values())
+        for branch_name in branch_names:
+            if total:
+                self._add_mib_timing(branch_name, counts[branch_name], duration * counts[branch_name] / total)
+            else:
+                self._add_mib_timing(branch_name, 0, duration / len(branch_names))
+        self._tune_max_repetitions(table_name, max_repetitions, max(counts.values()), duration, failed_repetitions)
+        self._count('snmp_bulk_read_count')
+        dprint(f"_get_table_by_names returns {counts}")
+        return counts
+
+    def _stop_prefetch(self):
+        """
+        Cancel the parallel walks that were not used.
+        """
+        tasks = list(self._prefetched_branches.values())
+        self._prefetched_branches = {}
+        if tasks:
+            for task in tasks:
+                task.cancel()
+            self._run(asyncio.gather(*tasks, return_exceptions=True))
+
+    def _set(self, oid, value, snmp_type, update_oidcache=True, parser=False):
+        """
+        Set a single OID value. Note that 'value' has to be properly typed!
+        Returns 1 if success, and if requested, then we also update the
+        local oid cache to track the change.
+        On failure, returns -1, and self.error.X will be set
+        """
+        self.error.clear()
+        try:
+            self._run(self._async_set_multiple([(oid, value, snmp_type)]))
+
+        except Exception as e:
+            self.error.status = True
+            self.error.description = "Access denied"
+            self.error.details = f"SNMP Error: oid {oid}, {repr(e)} ({str(type(e))})\n{traceback.format_exc()}"
+            return -1
+
+        self._switch_changed(update_oidcache)
+        # update the local cache:
+        if update_oidcache:
+            # we cache all values as strings, just like the original returns from get_branch()
+            self._parse_oid_and_cache(str(oid), str(value), snmp_type, True, parser)
+            self._set_http_session_cache()
+
+        self._count('snmp_write_count')
+        return 1
+
+    def _set_multiple(self, oid_values, update_oidcache=True, parser=False):
+        """
+        Set multiple OIDs at the same time, in a single snmp request
+        oid_values is a list of (oid, value, type)
+        Returns 1 if success, and if requested, then we also update the
+        local oid cache to track the change.
+        On failure, returns -1, and self.error.X will be set
+        """
+        self.error.clear()
+        try:
+            self._run(self._async_set_multiple(oid_values))
+
+        except Exception as e:
+            self.error.status = True
+            self.error.description = "Access denied"
+            self.error.details = f"SNMP Error: {repr(e)} ({str(type(e))})\n{traceback.format_exc()}"
+            return -1
+
+        self._switch_changed(update_oidcache)
+        # update the local cache:
+        if update_oidcache:
+            for (oid, value, snmp_type) in oid_values:
+                self._parse_oid_and_cache(str(oid), str(value), snmp_type, True, parser)
+            self._set_http_session_cache()
+
+        self._count('snmp_write_count')
+        return 1
+
+    def _set_snmp_session(self, com_or_ctx=''):
+        """
+        Set the pysnmp authentication, transport and context objects for this snmp connection
+        com_or_ctx - the community to override the snmp profile settings if v2,
+                      or the snmp v3 context to use.
+        Returns True on success, False if we cannot get a session.
+        """
+        self._snmp_session = self._get_snmp_session(com_or_ctx)
+        if self._snmp_session:
+            self._snmp_session_context = com_or_ctx
+            return True
+        return False
+
+    def _get_snmp_session(self, com_or_ctx=''):
+        """
+        Get the pysnmp objects for this snmp connection
+        com_or_ctx - the community to override the snmp profile settings if v2,
+                      or the snmp v3 context to use.
+        Returns a tuple of (auth data, transport target, context data), or False if not possible.
+        The transport target resolves the address on the event loop of this thread, so this
+        cannot be called from a running loop either.
+        """
+        snmp_profile = self.switch.snmp_profile
+        if not snmp_profile:
+            return False
+        target = self._run(UdpTransportTarget.create((self.switch.primary_ip4, snmp_profile.udp_port),
+                                                     timeout=settings.SNMP_TIMEOUT,
+                                                     retries=settings.SNMP_RETRIES))
+
+        if snmp_profile.version == SNMP_VERSION_2C:
+            # use specific given community, if set:
+            if com_or_ctx:
+                community = com_or_ctx
+            else:
+                # use profile setting
+                community = snmp_profile.community
+            return (CommunityData(community), target, ContextData())
+
+        if snmp_profile.version == SNMP_VERSION_3:
+            auth_protocols = {
+                SNMP_V3_AUTH_MD5: usmHMACMD5AuthProtocol,
+                SNMP_V3_AUTH_SHA: usmHMACSHAAuthProtocol,
+            }
+            priv_protocols = {
+                SNMP_V3_PRIV_DES: usmDESPrivProtocol,
+                SNMP_V3_PRIV_AES: usmAesCfb128Protocol,
+            }
+            context = ContextData(contextName=str(com_or_ctx))
+            # NoAuthNoPriv
+            if snmp_profile.sec_level == SNMP_V3_SECURITY_NOAUTH_NOPRIV:
+                return (UsmUserData(snmp_profile.username), target, context)
+
+            # AuthNoPriv
+            if snmp_profile.sec_level == SNMP_V3_SECURITY_AUTH_NOPRIV:
+                if snmp_profile.auth_protocol in auth_protocols.keys():
+                    auth_data = UsmUserData(snmp_profile.username,
+                                            authKey=snmp_profile.passphrase,
+                                            authProtocol=auth_protocols[snmp_profile.auth_protocol])
+                    return (auth_data, target, context)
+
+            # AuthPriv
+            elif snmp_profile.sec_level == SNMP_V3_SECURITY_AUTH_PRIV:
+                if snmp_profile.auth_protocol in auth_protocols.keys() and snmp_profile.priv_protocol in priv_protocols.keys():
+                    auth_data = UsmUserData(snmp_profile.username,
+                                            authKey=snmp_profile.passphrase,
+                                            privKey=snmp_profile.priv_passphrase,
+                                            authProtocol=auth_protocols[snmp_profile.auth_protocol],
+                                            privProtocol=priv_protocols[snmp_profile.priv_protocol])
+                    return (auth_data, target, context)
+
+        # snmp profile not set, or we cannot get session
+        return False
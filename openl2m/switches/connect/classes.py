@@ -13,12 +13,14 @@
 #
 import array
 import re
+import socket
 """
 All the generic classes we use to represent
 switch vlans, switch interfaces, switch neighbor devices, etc.
 """
+from pysnmp.proto.rfc1902 import OctetString
+
 from switches.connect.constants import *
-from switches.connect.oui.oui import get_vendor_from_oui
 from switches.utils import *
 
 
@@ -26,12 +28,14 @@ class Error():
     """
     Simple error information object, created with error status indicated!
     """
-    def __init__(self):
+    def __init__(self, status=True, description='', details=''):
         """
         Default state is error occured!
         """
         self.clear()
-        self.status = True
+        self.status = status
+        self.description = description
+        self.details = details
 
     def clear(self):
         """
@@ -73,15 +77,17 @@ class StackMember():
     Represents what we know about a single device entity that is part of the switch stack.
     This could be just one unit (single switch), or multiple if part of a stack
     """
-    def __init__(self, id, type):
+    __slots__ = ('id', 'type', 'serial', 'version', 'model')
+
+    def __init__(self, id, type, serial='', version='', model=''):
         """
         Initialize the object
         """
         self.id = id
         self.type = type        # see ENTITY_CLASS_NAME
-        self.serial = ''        # serial number
-        self.version = ''       # software revision of this device
-        self.model = ''         # vendor model number
+        self.serial = serial    # serial number
+        self.version = version  # software revision of this device
+        self.model = model      # vendor model number
 
 
 class VendorData():
@@ -89,6 +95,8 @@ class VendorData():
     Class to hold Vendor-specific data, represented by
     data name and value
     """
+    __slots__ = ('name', 'value')
+
     def __init__(self, name, value):
         self.name = name
         self.value = value
@@ -101,11 +109,22 @@ LACP_IF_TYPE_AGGREGATOR = 2  # this is an aggregator port (Port-Channel or Bridg
 
 class Interface():
     """
-    Class to represent all the switch interface attributes, SNMP or otherwize discovered
+    Class to represent all the switch interface attributes, SNMP or otherwize discovered.
+    The data model classes use __slots__, as large switches have many of these objects,
+    and they are recreated on every page view. New attributes need to be added to __slots__!
     """
-    def __init__(self, if_index):
+    __slots__ = ('visible', 'manageable', 'unmanage_reason', 'can_edit_alias', 'index', 'name', 'type',
+                 'is_routed', 'oper_status', 'admin_status', 'has_connector', 'mtu', 'hc_speed', 'phys_addr',
+                 'alias', 'addresses_ip4', 'addresses_ip6', 'port_id', 'untagged_vlan', 'untagged_vlan_name',
+                 'vlans', 'is_tagged', 'if_vlan_mode', 'voice_vlan', 'can_change_vlan', 'gvrp_enabled',
+                 'last_change', 'lacp_type', 'lacp_admin_key', 'lacp_members', 'lacp_master_index',
+                 'lacp_master_name', 'poe_entry', 'allow_poe_toggle', 'disabled', 'disabled_reason',
+                 'eth', 'lldp', 'arp4')
+
+    def __init__(self, if_index, name='', type=IF_TYPE_NONE, alias=''):
         """
         Initialize the object. We map the MIB-II entity names to similar class attributes.
+        Values that are already known, e.g. from the cache, can be passed in.
         """
         self.visible = True         # if True, this user can "see" this interface
         self.manageable = True      # if True, this interface is manageable by the current user
@@ -113,8 +132,8 @@ class Interface():
         self.can_edit_alias = False  # if True, can change alias, aka interface description
         self.index = if_index       # ifIndex, the key to all MIB-2 data!
         # self.ifDescr = ''           # the old name of the interface, NOT the "description" attribute which is the ifAlias !!!
-        self.name = ''              # the name from IFMIB ifName entry! Falls back to older MIB-2ifDescr is not found!
-        self.type = IF_TYPE_NONE    # ifType, the MIB-2 type of the interface
+        self.name = name            # the name from IFMIB ifName entry! Falls back to older MIB-2ifDescr is not found!
+        self.type = type            # ifType, the MIB-2 type of the interface
         self.is_routed = False      # if True interface is in routed mode (i.e. a layer 3 interface)
         self.oper_status = IF_OPER_STATUS_DOWN      # ifOperStatus, operation status of interface
         self.admin_status = IF_ADMIN_STATUS_DOWN    # ifAdminStatus, administrative status of the interface
@@ -123,12 +142,13 @@ class Interface():
         # self.speed = 0              # ifSpeed from the old Interfaces mib
         self.hc_speed = 0           # high speed counter, in 1 Mbps, from IF-MIB, not Interfaces MIB
         self.phys_addr = 0x0
-        self.alias = ''           # the interface description, as set by the switch configuration, from IF-MIB
+        self.alias = alias          # the interface description, as set by the switch configuration, from IF-MIB
         self.addresses_ip4 = {}     # dictionary of all my ipv4 addresses on this interface
         self.addresses_ip6 = {}     # dictionary of all my ipv6 addresses on this interface
         # vlan related
         self.port_id = -1            # Q-Bridge MIB port id
         self.untagged_vlan = -1      # the vlan id of the interface in untagged mode. This is invalid if tagged/trunked !
+        self.untagged_vlan_name = ''  # name of the untagged vlan, if set by the vendor class
         self.vlans = []              # array of vlanId's on this interface, from Q-Bridge. If size > 0 this is a tagged port!
         self.is_tagged = False       # if 802.1q tagging or trunking is enabled
         self.if_vlan_mode = -1       # some vendors (e.g. Comware) have a interface vlan mode, such as access, trunk, hybrid
@@ -147,8 +167,10 @@ class Interface():
         # Power related
         self.poe_entry = False
         self.allow_poe_toggle = False   # if set, any user can toggle PoE OFF-ON
+        self.disabled = False       # if True, the interface configuration is not valid, e.g. the untagged vlan does not exist
+        self.disabled_reason = ''
         # a variety of data about what is happening on this interface:
-        self.eth = {}               # heard ethernet address on this interface, dictionay of EthernetAddress()
+        self.eth = {}               # heard ethernet address on this interface, EthernetRows() of the switch EthernetTable()
         self.lldp = {}              # LLDP neighbors, dictionay of NeighborDevice() objects
         self.arp4 = {}              # ARP table entries for ipv4, dictionay of IP4Address()
 
@@ -166,16 +188,19 @@ class Vlan():
     """
     Class to represent a vlan found on the switch
     """
-    def __init__(self, id=0, index=0):
+    __slots__ = ('id', 'index', 'fdb_index', 'name', 'type', 'status', 'current_egress_portlist',
+                 'static_egress_portlist', 'untagged_ports_bitmap')
+
+    def __init__(self, id=0, index=0, name='', status=VLAN_STATUS_OTHER):
         """
         Vlan() requires passing in the vlan id
         """
         self.id = id            # the vlan ID as sent on the wire
         self.index = index      # the internal vlan index, used by some MIBs
         self.fdb_index = 0      # the Forward-DB index, from maps switch database to vlan index
-        self.name = ''
+        self.name = name
         self.type = VLAN_TYPE_NORMAL  # mostly used for Cisco vlans, to avoid the 1000-1003 range
-        self.status = VLAN_STATUS_OTHER     # 1-other-0, 2-permanent, 3-dynamic(gvrp)
+        self.status = status    # 1-other-0, 2-permanent, 3-dynamic(gvrp)
         # dot1qVlanCurrentEgressPorts OCTETSTRING stored as PortList() object with bitmap of egress ports in this vlan
         self.current_egress_portlist = PortList()
         # dot1qVlanStaticPorts OCTETSTRING stored as PortList() object with bitmap of egress ports in this vlan
@@ -195,41 +220,55 @@ class Vlan():
         return self.display_name()
 
 
+# lookup tables for PortList(), for each possible byte value:
+# the bits that are set, as port offsets 1-8 in that byte (high order bit is 1)
+PORTLIST_BYTE_PORTS = tuple(tuple(bit + 1 for bit in range(8) if value & (128 >> bit)) for value in range(256))
+# the byte with the bits in reverse order
+PORTLIST_BYTE_REVERSED = bytes(int(f"{value:08b}"[::-1], 2) for value in range(256))
+
+
 class PortList():
     """
     Object to handle the Q-BRIDGE PortList bitmap that exists per vlan.
     This is the back-and-forth mapping of switch port to bit
     in a stream of bits . This is snmp type OCTETSTRING
-    Mostly a copy of the BitVector() class from NAV
+    Originally a copy of the BitVector() class from NAV.
+    The bitmap is kept as a bytearray(), and decoded with the lookup tables above,
+    so a full bitmap is handled per byte instead of per bit.
 
     :param bitmap_string: a Unicode encoded string of bytes representing
                           the bitmap that represents switch ports on a vlan.
                           This is the PortList OCTETSTRING returned by the
                           snmp get() call
     """
+    __slots__ = ('portlist', )
+
     def __init__(self):
-        self.portlist = array.array('B')
+        self.portlist = bytearray()
 
     def from_unicode(self, bitmap_string):
         """
-        Initialize the bytes from this unicode bitmap string
+        Initialize the bytes from this unicode bitmap string, with one character per byte.
         """
-        for byte in bitmap_string:
-            self.portlist.append(ord(byte))
+        self.portlist = bytearray(bitmap_string.encode('latin-1'))
+
+    def from_bytes(self, bitmap_bytes):
+        """
+        Initialize from a bytes object, e.g. the value of a pysnmp OctetString()
+        """
+        self.portlist = bytearray(bitmap_bytes)
 
     def from_byte_count(self, bytecount):
         """
         Initialize by setting a number of bytes to 0
         """
-        dprint(f"PortList bytecount size={bytecount}")
-        for i in range(int(bytecount)):
-            self.portlist.append(0)
+        self.portlist = bytearray(int(bytecount))
 
     def tobytes(self):
         """
-        call the array.tobytes() function to return
+        Return the bitmap as bytes
         """
-        return self.portlist.tobytes()
+        return bytes(self.portlist)
 
     def to_unicode(self):
         """
@@ -240,7 +279,7 @@ class PortList():
         :return: the string of bytes, encoded as Unicode('utf-8'), as needed
                  by the snmp set() call for snmp type OCTETSTRING
         """
-        return self.portlist.tobytes().decode(encoding='UTF-8', errors='ignore')
+        return self.portlist.decode(encoding='UTF-8', errors='ignore')
 
     def to_hex_string(self):
         """
@@ -248,35 +287,30 @@ class PortList():
 
         :return: a hexadecimal string representing the bytes of this bitmap.
         """
-        digits = ["%02x" % octet for octet in self.portlist]
-        return ''.join(digits)
+        return self.portlist.hex()
+
+    def to_octet_string(self):
+        """
+        Return the bitmap as a pysnmp OctetString(), for the pysnmpHelper() set calls.
+        """
+        return OctetString(bytes(self.portlist))
 
     def reverse_bits_in_bytes(self):
         """
         Reverse all bits in each byte. I.e. bit 8 goes to 1, 7 to 2, etc.
-        There is probably a much more efficient way to do this!
-        """
-        offset = 0
-        for octet in self.portlist:
-            new_octet = 0
-            if octet & 128:
-                new_octet += 1
-            if octet & 64:
-                new_octet += 2
-            if octet & 32:
-                new_octet += 4
-            if octet & 16:
-                new_octet += 8
-            if octet & 8:
-                new_octet += 16
-            if octet & 4:
-                new_octet += 32
-            if octet & 2:
-                new_octet += 64
-            if octet & 1:
-                new_octet += 128
-            self.portlist[offset] = new_octet
-            offset += 1
+        """
+        self.portlist = self.portlist.translate(PORTLIST_BYTE_REVERSED)
+
+    def ports(self):
+        """
+        Iterate over the port id's that have their bit set, in order.
+        Port id 1 is the high order bit of the first byte.
+        """
+        for (offset, value) in enumerate(self.portlist):
+            if value:
+                base = offset * 8
+                for port in PORTLIST_BYTE_PORTS[value]:
+                    yield base + port
 
     def __len__(self):
         return len(self.portlist) * 8
@@ -289,45 +323,49 @@ class PortList():
 
     def __setitem__(self, position, value):
         """
-        Set the bit in position position to val.  NOTE: The most
-        significant bit is regarded as bit 0 in this context.
+        Set the bit for port id 'position' to value. NOTE: The most
+        significant bit of the first byte is port id 1.
         """
         # NOTE: bit 0 = port_id 1. First byte is ports 1-8, second 9-16, etc.
-        dprint(f"PortList __setitem__ pos={position}, val={value}")
         position -= 1
-        value = value and 1 or 0
-        block = position // 8
-        shift = position & 7
-        dprint(f"PortList position={position} value={value} block={block} shift={shift}")
-        block_value = self.portlist[block]
-        if (block_value << shift) & 128 and 1 or 0 != value:
-            if value:
-                self.portlist[block] = block_value | (128 >> shift)
-            else:
-                self.portlist[block] = block_value ^ (128 >> shift)
+        mask = 128 >> (position & 7)
+        if value:
+            self.portlist[position // 8] |= mask
+        else:
+            self.portlist[position // 8] &= ~mask & 0xff
 
     def __getitem__(self, position):
         """
-        Get the value of the bit in position.  NOTE: The most
-        significant bit is regarded as bit 0 in this context.
+        Get the value of the bit for port id 'position'. NOTE: The most
+        significant bit of the first byte is port id 1.
+        A slice returns a list of the values of those port id's.
         """
-        dprint(f"PortList __getitem__ pos={position}")
-        position -= 1
         if isinstance(position, slice):
-            result = []
-            for i in range(*position.indices(len(self))):
-                result.append(self[i])
-            return result
-        else:
-            block = position // 8
-            shift = position & 7
-            return (self.portlist[block] << shift) & 128 and 1 or 0
+            return [self[port] for port in range(*position.indices(len(self) + 1)) if port > 0]
+        position -= 1
+        return 1 if self.portlist[position // 8] & (128 >> (position & 7)) else 0
+
+
+class SnmpChange():
+    """
+    A single SET in a change set, see SnmpConnector.begin_changes()
+    """
+    __slots__ = ('oid', 'value', 'snmp_type', 'status', 'error')
+
+    def __init__(self, oid, value, snmp_type):
+        self.oid = oid
+        self.value = value
+        self.snmp_type = snmp_type
+        self.status = 0     # 0 = not sent yet, 1 = success, -1 = failed
+        self.error = ''     # the error description, if failed
 
 
 class IP4Address():
     """
     Class to represent an IPv4 address
     """
+    __slots__ = ('ip', 'netmask', 'cyder_bits', 'if_index')
+
     def __init__(self, ip, netmask='255.255.255.255'):
         """
         Initialize the object
@@ -352,27 +390,176 @@ class IP4Address():
         return self.display_name()
 
 
+class EthernetTable():
+    """
+    The known ethernet addresses (forwarding database) of a switch, stored in parallel arrays
+    instead of an object per address, as large switches can have 100k+ addresses.
+    Each row is an address heard on an interface: the 48-bit address, ifIndex, vlan id (0 if not known),
+    and IPv4 address from the arp table (0 if not known). EthernetAddress() objects are only created
+    to show the rows, see EthernetRows().
+    """
+    def __init__(self):
+        self.addresses = array.array('Q')
+        self.if_indexes = array.array('I')
+        self.vlan_ids = array.array('H')
+        self.ip4_addresses = array.array('I')
+        self._address_rows = {}     # row, or list of rows if on several interfaces, by address
+        self._if_index_rows = {}    # array of rows by ifIndex
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def add(self, address, if_index, vlan_id=0):
+        """
+        Add an address heard on an interface. If already known on that interface, only the vlan is updated.
+        Returns the row.
+        """
+        rows = self._address_rows.get(address, None)
+        if rows is not None:
+            for row in (rows if isinstance(rows, list) else (rows, )):
+                if self.if_indexes[row] == if_index:
+                    self.vlan_ids[row] = vlan_id
+                    return row
+        row = len(self.addresses)
+        self.addresses.append(address)
+        self.if_indexes.append(if_index)
+        self.vlan_ids.append(vlan_id)
+        self.ip4_addresses.append(0)
+        if rows is None:
+            self._address_rows[address] = row
+        elif isinstance(rows, list):
+            rows.append(row)
+        else:
+            self._address_rows[address] = [rows, row]
+        if_rows = self._if_index_rows.get(if_index, None)
+        if if_rows is None:
+            if_rows = array.array('I')
+            self._if_index_rows[if_index] = if_rows
+        if_rows.append(row)
+        return row
+
+    def find(self, address):
+        """
+        Return the list of rows of an address, empty if not known.
+        """
+        rows = self._address_rows.get(address, None)
+        if rows is None:
+            return []
+        if isinstance(rows, list):
+            return rows
+        return [rows]
+
+    def get_interface_rows(self, if_index):
+        """
+        Return the EthernetRows() of an interface.
+        """
+        return EthernetRows(self, self._if_index_rows.get(if_index, ()))
+
+    def set_ip4(self, row, ip):
+        """
+        Set the IPv4 address string from the arp table, for a row.
+        """
+        try:
+            self.ip4_addresses[row] = int.from_bytes(socket.inet_aton(ip), 'big')
+        except OSError:
+            pass
+
+    def get_ip4(self, row):
+        """
+        Return the IPv4 address string of a row, or '' if not known.
+        """
+        ip4 = self.ip4_addresses[row]
+        if not ip4:
+            return ''
+        return socket.inet_ntoa(ip4.to_bytes(4, 'big'))
+
+
+class EthernetRows():
+    """
+    The ethernet addresses of one interface in an EthernetTable(). This is used like the
+    dictionary of EthernetAddress() by address string that Interface().eth used to be.
+    """
+    __slots__ = ('table', 'rows')
+
+    def __init__(self, table, rows):
+        self.table = table
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return (eth.display_address for eth in self.values())
+
+    def items(self):
+        return ((eth.display_address, eth) for eth in self.values())
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        return (EthernetAddress(self.table, row) for row in self.rows)
+
+
 class EthernetAddress():
     """
     Class to represents an Ethernet address, and whatever we know about it.
+    This is a view of a row in an EthernetTable(), created when the data is shown.
     """
-    def __init__(self, decimal_string):
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    @property
+    def number(self):
+        """
+        The address as a 48-bit number
+        """
+        return self.table.addresses[self.row]
+
+    @property
+    def decimal_string(self):
+        """
+        The address in SNMP decimal format, e.g. "11.12.13.78.90.100"
+        """
+        return '.'.join(str(byte) for byte in self.number.to_bytes(6, 'big'))
+
+    @property
+    def display_address(self):
+        return get_ethernet_codec().format(self.number)
+
+    @property
+    def vendor(self):
+        return get_ethernet_codec().vendor(self.number)
+
+    @property
+    def vlan_id(self):
         """
-        EthernetAddress() requires passing in the SNMP decimal value of the 6 ethernet bytes.
+        the vlan id (number) this was heard on, 0 if not known
         """
-        self.decimal_string = decimal_string
-        self.display_address = decimal_to_hex_string_ethernet(decimal_string)
-        self.vendor = self.set_vendor()
-        self.vlan_id = 0        # the vlan id (number) this was heard on, if known
-        self.address_ip4 = ''   # ipv4 address from arp table, if known
-        self.address_ip6 = ''   # ipv6 address, if known
+        return self.table.vlan_ids[self.row]
+
+    @property
+    def address_ip4(self):
+        """
+        ipv4 address from arp table, if known
+        """
+        return self.table.get_ip4(self.row)
+
+    @property
+    def address_ip6(self):
+        """
+        ipv6 address, not known yet
+        """
+        return ''
 
     def set_vendor(self):
         """
-        Lookup the vendor OUI, first 3 bytes
+        Lookup the vendor OUI, first 3 bytes, or the MA-M or MA-S block of the address
         """
-        oui = decimal_ethernet_to_oui(self.decimal_string)
-        return get_vendor_from_oui(oui)
+        return self.vendor
 
     def display_name(self):
         return self.display_address
@@ -385,6 +572,9 @@ class NeighborDevice():
     """
     Class to represents an lldp neighbor, and whatever we know about it.
     """
+    __slots__ = ('index', 'if_index', 'chassis_type', 'chassis_string', 'capabilities', 'port_descr',
+                 'sys_name', 'sys_descr')
+
     def __init__(self, lldp_index, if_index):
         """
         Initialize the object, requires the lldp index and ifIndex
@@ -411,15 +601,17 @@ class PoePSE():
     This is the device that feeds PoE to ports. Typically, modular switches or
     stacks have multiple, e.g. one per line card or stack unit.
     """
-    def __init__(self, index):
+    __slots__ = ('index', 'max_power', 'status', 'power_consumed', 'threshold')
+
+    def __init__(self, index, max_power=0, status=POE_PSE_STATUS_OFF, power_consumed=0, threshold=0):
         """
         Initialize the object
         """
         self.index = int(index)
-        self.max_power = 0          # maximum power available on this power supply
-        self.status = POE_PSE_STATUS_OFF
-        self.power_consumed = 0     # total power consumed on this power supply
-        self.threshold = 0
+        self.max_power = max_power  # maximum power available on this power supply
+        self.status = status
+        self.power_consumed = power_consumed    # total power consumed on this power supply
+        self.threshold = threshold
 
     def display_name(self):
         return f"PSE #{self.index}"
@@ -436,6 +628,9 @@ class PoePort():
     Class to represent a "pethPsePortEntry" for an interface.
     I.e. this is the per-interface power information.
     """
+    __slots__ = ('index', 'admin_status', 'detect_status', 'priority', 'description', 'power_consumption_supported',
+                 'power_consumed', 'power_available', 'max_power_consumed')
+
     def __init__(self, index, admin_status):
         """
         Initialize the object
@@ -465,18 +660,20 @@ class SyslogMsg():
     Class to represent a Syslog Message, implemented in SYSLOG-MSG-MIB
     or vendorm-specific mibs like CISCO-SYSLOG-MIB
     """
-    def __init__(self, index):
+    __slots__ = ('index', 'facility', 'severity', 'name', 'message', 'datetime')
+
+    def __init__(self, index, facility="", severity=-1, name="", message="", datetime=0):
         """
         Initialize the object with the message index
         """
         self.index = index      # snmp table index
-        self.facility = ""      # some name
-        self.severity = -1      # valid are 0-7
-        self.name = ""          # type or name or app-name of message
-        self.message = ""       # the text of the message
+        self.facility = facility    # some name
+        self.severity = severity    # valid are 0-7
+        self.name = name        # type or name or app-name of message
+        self.message = message  # the text of the message
         # datetime() value of message. Generic SYSLOG-MSG-MIB has time "string" (DateAndTime)
         # some vendor mibs have sys-uptime timetick. Recalculate all to datetime() object
-        self.datetime = 0
+        self.datetime = datetime
 
     def __str__(self):
         return (self.message)   # for now.
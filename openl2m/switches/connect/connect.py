@@ -35,12 +35,13 @@ from switches.connect.vendors.procurve.constants import *
 from switches.connect.vendors.procurve.snmp import SnmpConnectorProcurve
 
 
-def get_connection_object(request, group, switch):
+def get_connection_object(request, group, switch, max_age=None):
     """
     Function to get the proper type of SNMP object for this switch.
     Either Generic (SNMP), HP-3COM (H3C) or Cisco specific objects will be returned.
     If switch objectID is not known yet, we will probe the switch first.
     If probing fails, we raise an exception!
+    max_age is the oldest cached switch data (in seconds) to use, None means any age.
     """
     dprint(f"get_connection_object() for {switch} at {datetime.datetime.now()}")
     if not switch.snmp_oid:
@@ -78,7 +79,7 @@ def get_connection_object(request, group, switch):
     # no system oid found, return a "generic" SNMP object
     else:
         connection = SnmpConnector(request, group, switch)
-    # load caches (http session, memory cache (future), whatever else for performance)
-    connection.load_caches()
+    # load caches (http session, shared switch cache, whatever else for performance)
+    connection.load_caches(max_age)
     # then return object
     return connection
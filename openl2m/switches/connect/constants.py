@@ -323,6 +323,10 @@ We WRITE changes to the port-on-vlan bitmap to
 dot1qVlanCurrentEgressPorts = '.1.3.6.1.2.1.17.7.1.4.2.1.4'     # followed by <time_index>.<vlanId>
 snmp_mib_variables['dot1qVlanCurrentEgressPorts'] = dot1qVlanCurrentEgressPorts
 
+# the number of times a vlan entry has been deleted
+dot1qVlanNumDeletes = '.1.3.6.1.2.1.17.7.1.4.1.0'
+snmp_mib_variables['dot1qVlanNumDeletes'] = dot1qVlanNumDeletes
+
 # The set of ports that are transmitting traffic for this VLAN as untagged frames.
 # dot1qVlanCurrentUntaggedPorts - READ-ONLY !!!
 dot1qVlanCurrentUntaggedPorts = '.1.3.6.1.2.1.17.7.1.4.2.1.5'     # followed by <someIndex>.<vlanId>
@@ -425,6 +429,10 @@ snmp_mib_variables['ifConnectorPresent'] = ifConnectorPresent
 ifAlias = '.1.3.6.1.2.1.31.1.1.1.18'  # From IF-MIB
 snmp_mib_variables['ifAlias'] = ifAlias
 
+# sysUpTime at the last creation or deletion of an interface
+ifTableLastChange = '.1.3.6.1.2.1.31.1.5.0'
+snmp_mib_variables['ifTableLastChange'] = ifTableLastChange
+
 # interface stack, ie brdige aggregation, etc.
 ifStackEntry = '.1.3.6.1.2.1.31.1.2.1'
 snmp_mib_variables['ifStackEntry'] = ifStackEntry
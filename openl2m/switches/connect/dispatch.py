@@ -0,0 +1,98 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+OID dispatching for the SNMP parsers.
+Instead of testing every returned OID against a long list of MIB branches,
+we map the branch OIDs to their parser once, and find the parser for an OID
+with a longest-prefix lookup in a dictionary.
+"""
+from switches.connect.constants import snmp_mib_variables
+
+
+class OidDispatcher():
+    """
+    Map MIB branch OIDs to the parser method that handles data in that branch.
+    A dispatcher is built for a SnmpConnector() class from its 'oid_handlers' list,
+    which contains (mib_name, method_name) tuples. The mib_name is resolved through
+    snmp_mib_variables{}, so vendor constants need to be registered there.
+    Sub-classes get a copy of the parent handlers, with their own handlers added.
+    """
+    def __init__(self, connector_class, parent=False):
+        """
+        Build the branch map for the given connector class.
+        connector_class: the SnmpConnector() (sub)class whose methods are called
+        parent: the OidDispatcher() of the parent class, if any
+        """
+        self.branch_names = {}      # branch oid to (mib_name, method_name), in registration order
+        if parent:
+            self.branch_names.update(parent.branch_names)
+        for (mib_name, method_name) in connector_class.__dict__.get('oid_handlers', []):
+            self.register(mib_name, method_name)
+        self.compile(connector_class)
+
+    def register(self, mib_name, method_name):
+        """
+        Add a handler method for the MIB branch with the given name.
+        """
+        if mib_name not in snmp_mib_variables.keys():
+            raise ValueError(f"OidDispatcher: unknown MIB branch '{mib_name}'")
+        self.branch_names[snmp_mib_variables[mib_name]] = (mib_name, method_name)
+
+    def compile(self, connector_class):
+        """
+        Resolve the method names against the class, so sub-class overrides are honored.
+        Branches that have other registered branches below them can never be
+        short-cut, as the longer branch needs to win.
+        """
+        self.handlers = {}
+        for (branch, (mib_name, method_name)) in self.branch_names.items():
+            self.handlers[branch] = getattr(connector_class, method_name)
+        self._nested = set()
+        for branch in self.handlers.keys():
+            parent = branch[:branch.rfind('.')]
+            while parent:
+                if parent in self.handlers:
+                    self._nested.add(parent)
+                parent = parent[:parent.rfind('.')]
+        # the last branch found, as (branch + '.', handler, length).
+        # Walks return many OIDs in the same branch, so this is usually a hit.
+        self._last = False
+
+    def lookup(self, oid):
+        """
+        Find the handler for the longest registered branch that contains this OID.
+        Returns a tuple of (handler, oid_end), where oid_end is the part after the branch,
+        i.e. the same as oid_in_branch() returns. Returns (False, False) if not found.
+        """
+        last = self._last
+        if last and oid.startswith(last[0]):
+            return (last[1], oid[last[2]:])
+        pos = len(oid)
+        while pos > 0:
+            pos = oid.rfind('.', 0, pos)
+            if pos <= 0:
+                break
+            branch = oid[:pos]
+            handler = self.handlers.get(branch, False)
+            if handler:
+                if branch not in self._nested:
+                    self._last = (branch + '.', handler, pos + 1)
+                return (handler, oid[pos + 1:])
+        return (False, False)
+
+    def get_branches(self):
+        """
+        Return the list of (branch oid, mib name, method name) in registration order.
+        """
+        return [(branch, mib_name, method_name) for (branch, (mib_name, method_name)) in self.branch_names.items()]
@@ -0,0 +1,251 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Process-wide metrics of the snmp requests (PDUs) sent by the transport classes.
+Each request is counted by switch, connector class, operation ('get', 'getbulk', 'walk', 'set')
+and MIB branch, with its latency, errors, timeouts, retries, number of varbinds and size.
+The data can be shown in the admin stats page, or read in the Prometheus text format.
+Note that each process (e.g. each web server worker or Celery worker) has its own metrics.
+"""
+import threading
+
+from django.conf import settings
+
+from switches.connect.constants import snmp_mib_variables
+
+# upper bounds of the latency histogram, in seconds
+PDU_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# MIB branch name by OID, to label get and set requests. Vendor modules add to snmp_mib_variables
+# after this is imported, so this is rebuilt when that changes, see get_branch_name()
+_branch_names = {}
+_branch_names_size = 0
+
+
+class PduMetric():
+    """
+    The counters for one set of labels.
+    """
+    def __init__(self):
+        self.pdus = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.varbinds = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.buckets = [0] * len(PDU_LATENCY_BUCKETS)   # not cumulative, see SnmpMetrics.prometheus_text()
+
+
+class SnmpMetrics():
+    """
+    The PduMetric() counters, by (switch, vendor, operation, branch) labels.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def observe(self, labels, duration, varbinds=0, size=0, pdus=1, status='ok'):
+        """
+        Count 'pdus' requests that took 'duration' seconds in total.
+        varbinds and size are the totals of the replies, status is 'ok', 'error' or 'timeout'.
+        """
+        latency = duration / pdus if pdus else duration
+        bucket = 0
+        while bucket < len(PDU_LATENCY_BUCKETS) and latency > PDU_LATENCY_BUCKETS[bucket]:
+            bucket += 1
+        with self._lock:
+            metric = self._metrics.get(labels, False)
+            if not metric:
+                metric = PduMetric()
+                self._metrics[labels] = metric
+            metric.pdus += pdus
+            metric.varbinds += varbinds
+            metric.bytes += size
+            metric.seconds += duration
+            if bucket < len(PDU_LATENCY_BUCKETS):
+                metric.buckets[bucket] += pdus
+            if status == 'timeout':
+                metric.timeouts += 1
+            elif status != 'ok':
+                metric.errors += 1
+
+    def add_retry(self, labels):
+        """
+        Count a request that is sent again after a failure.
+        """
+        with self._lock:
+            metric = self._metrics.get(labels, False)
+            if not metric:
+                metric = PduMetric()
+                self._metrics[labels] = metric
+            metric.retries += 1
+
+    def clear(self):
+        with self._lock:
+            self._metrics = {}
+
+    def get_rows(self, limit=0):
+        """
+        Return a list of dictionaries with the labels and counters, slowest total time first.
+        """
+        with self._lock:
+            items = list(self._metrics.items())
+        rows = []
+        for ((switch, vendor, operation, branch), metric) in items:
+            rows.append({
+                'switch': switch,
+                'vendor': vendor,
+                'operation': operation,
+                'branch': branch,
+                'pdus': metric.pdus,
+                'errors': metric.errors,
+                'timeouts': metric.timeouts,
+                'retries': metric.retries,
+                'varbinds': metric.varbinds,
+                'bytes': metric.bytes,
+                'seconds': round(metric.seconds, 3),
+                'average': round(metric.seconds / metric.pdus, 4) if metric.pdus else 0,
+            })
+        rows.sort(key=lambda row: row['seconds'], reverse=True)
+        if limit:
+            return rows[:limit]
+        return rows
+
+    def prometheus_text(self):
+        """
+        Return all metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            items = [(labels, metric, list(metric.buckets)) for (labels, metric) in self._metrics.items()]
+        lines = []
+        counters = (
+            ('openl2m_snmp_pdus_total', 'pdus', 'SNMP requests sent'),
+            ('openl2m_snmp_errors_total', 'errors', 'SNMP requests that failed, not counting timeouts'),
+            ('openl2m_snmp_timeouts_total', 'timeouts', 'SNMP requests that timed out'),
+            ('openl2m_snmp_retries_total', 'retries', 'SNMP requests sent again after a failure'),
+            ('openl2m_snmp_varbinds_total', 'varbinds', 'Varbinds received or sent'),
+            ('openl2m_snmp_varbind_bytes_total', 'bytes', 'Approximate size of the OIDs and values received or sent'),
+        )
+        for (name, attribute, help) in counters:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} counter")
+            for (labels, metric, buckets) in items:
+                lines.append(f"{name}{{{_format_labels(labels)}}} {getattr(metric, attribute)}")
+        name = 'openl2m_snmp_pdu_seconds'
+        lines.append(f"# HELP {name} Latency of the SNMP requests")
+        lines.append(f"# TYPE {name} histogram")
+        for (labels, metric, buckets) in items:
+            label_text = _format_labels(labels)
+            count = 0
+            for (bound, bucket_count) in zip(PDU_LATENCY_BUCKETS, buckets):
+                count += bucket_count
+                lines.append(f"{name}_bucket{{{label_text},le=\"{bound}\"}} {count}")
+            lines.append(f"{name}_bucket{{{label_text},le=\"+Inf\"}} {metric.pdus}")
+            lines.append(f"{name}_sum{{{label_text}}} {metric.seconds}")
+            lines.append(f"{name}_count{{{label_text}}} {metric.pdus}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    """
+    Return the labels tuple in Prometheus format.
+    """
+    values = []
+    for (name, value) in zip(('switch', 'vendor', 'operation', 'branch'), labels):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        values.append(f"{name}=\"{value}\"")
+    return ','.join(values)
+
+
+# the metrics of this process
+snmp_metrics = SnmpMetrics()
+
+
+def get_branch_name(oid):
+    """
+    Return the name of the MIB branch of an OID, e.g. 'ifAdminStatus', or 'unknown'.
+    """
+    global _branch_names, _branch_names_size
+    if _branch_names_size != len(snmp_mib_variables):
+        _branch_names = {value: name for (name, value) in snmp_mib_variables.items()}
+        _branch_names_size = len(snmp_mib_variables)
+    oid = str(oid)
+    if not oid.startswith('.'):
+        oid = f".{oid}"
+    branch = oid
+    while branch:
+        name = _branch_names.get(branch, False)
+        if name:
+            return name
+        branch = branch[:branch.rfind('.')]
+    return 'unknown'
+
+
+def get_branches_name(oids):
+    """
+    Return the names of the MIB branches of several OIDs, as one label.
+    """
+    return ','.join(sorted(set(get_branch_name(oid) for oid in oids)))
+
+
+def get_exception_status(exception):
+    """
+    Return 'timeout' or 'error' for an exception raised by the snmp library.
+    """
+    if 'timeout' in f"{exception.__class__.__name__} {exception}".lower():
+        return 'timeout'
+    return 'error'
+
+
+def observe_pdus(switch, vendor, operation, branch, duration, items=(), pdus=1, exception=None):
+    """
+    Count snmp requests to a switch in the process metrics, if SNMP_METRICS is enabled.
+    vendor - the name of the connector class.
+    items - the returned (or sent) variables, with 'oid' and 'value' attributes,
+            or (oid, value) pairs, e.g. pysnmp var binds.
+    exception - the exception raised, if the request failed.
+    """
+    if not settings.SNMP_METRICS:
+        return
+    size = 0
+    for item in items:
+        if hasattr(item, 'oid'):
+            size += _get_size(item.oid, item.value)
+        else:
+            size += _get_size(item[0], item[1])
+    status = get_exception_status(exception) if exception else 'ok'
+    name = switch.name if switch else ''
+    snmp_metrics.observe((name, vendor, operation, branch), duration, len(items), size, pdus, status)
+
+
+def _get_size(oid, value):
+    """
+    Return the approximate size of a varbind: the OID as string, and the value as string or bytes.
+    """
+    try:
+        size = len(value)
+    except TypeError:
+        # numbers
+        size = len(str(value))
+    return len(str(oid)) + size
+
+
+def observe_retry(switch, vendor, operation, branch):
+    """
+    Count a retry of a request after a failure, if SNMP_METRICS is enabled.
+    """
+    if not settings.SNMP_METRICS:
+        return
+    snmp_metrics.add_retry((switch.name if switch else '', vendor, operation, branch))
@@ -13,41 +13,60 @@
 #
 
 #
-# read the oui.txt file in this directory,
-# and create the file oui_dict.py, which defines dictionary
-# with vendor info for each know oui.
+# read the oui.txt file in this directory, and the MA-M (mam.txt) and MA-S (oui36.txt)
+# files from the IEEE, if present, and create the file oui.bin with the vendor info
+# for each known prefix. See oui.py for the file format.
+# Other files in the same format can be given on the command line instead.
 #
+import os
 import sys
 import re
 
-# quick hack :-)
+from oui import write_oui_database
 
 # match this format:
 # E0-43-DB   (hex)		Shenzhen ViewAt Technology Co. Ltd
-OUI_PATTERN = "^(\w\w-\w\w-\w\w)\s+\(\w+\)\s+(.*)$"
+OUI_PATTERN = r"^(\w\w-\w\w-\w\w)\s+\(hex\)\s+(.*)$"
+# and the next line, with the range of the block in the MA-M and MA-S files:
+# 5F0000-5FFFFF     (base 16)		Company Name
+RANGE_PATTERN = r"^(\w{6})-(\w{6})\s+\(base 16\)"
 
-# input data
-infile = open("oui.txt")
-if not infile:
-    print("ERROR: cannot open oui.txt")
-    sys.exit
+input_files = sys.argv[1:]
+if not input_files:
+    input_files = [name for name in ("oui.txt", "mam.txt", "oui36.txt") if os.path.exists(name)]
 
-# output file
-outfile = open("oui_dict.py", "w")
-if not outfile:
-    print("ERROR: cannot write oui.py")
-    sys.exit
+vendors = {}
+for input_file in input_files:
+    try:
+        infile = open(input_file)
+    except OSError:
+        print(f"ERROR: cannot open {input_file}")
+        sys.exit(1)
+    pending = False     # the (OUI, vendor) of the last "(hex)" line, until we see the next line
+    for line in infile:
+        match = re.match(OUI_PATTERN, line)
+        if match:
+            if pending:
+                vendors[(24, pending[0])] = pending[1]
+            pending = (int(match[1].replace('-', ''), 16), match[2].strip())
+            continue
+        if not pending:
+            continue
+        (oui, vendor) = pending
+        pending = False
+        match = re.match(RANGE_PATTERN, line)
+        if match:
+            start = int(match[1], 16)
+            size = int(match[2], 16) - start + 1
+            if size < 0x1000000:
+                # MA-M or MA-S block: the prefix is the OUI, plus the bits that are the same in the range
+                bits = 48 - size.bit_length() + 1
+                vendors[(bits, ((oui << 24) + start) >> (48 - bits))] = vendor
+                continue
+        vendors[(24, oui)] = vendor
+    if pending:
+        vendors[(24, pending[0])] = pending[1]
+    infile.close()
 
-outfile.write("# Auto-generated file, see readme\n\noui_to_vendor = {}\n")
-
-line = infile.readline()
-while line:
-    match = re.match(OUI_PATTERN, line)
-    if match:
-        # print("OUI = " + match[1])
-        # print("Vendor = " + match[2])
-        outfile.write(f"oui_to_vendor['{match[1]}'] = \"{match[2]}\"\n")
-    line = infile.readline()
-
-outfile.close()
-infile.close()
+write_oui_database("oui.bin", vendors)
+print(f"Wrote {len(vendors)} prefixes to oui.bin")
@@ -1,10 +1,180 @@
-from switches.connect.oui.oui_dict import *
-
-
-def get_vendor_from_oui(oui):
-    """
-    Return the ethernet vendor from the given OUI strings
-    """
-    if oui in oui_to_vendor.keys():
-        return oui_to_vendor[oui]
-    return ''
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Ethernet vendor lookup, from the binary file oui.bin created by make_oui_dict.py.
+The file is memory-mapped on first use, so all processes share the same pages, and nothing is
+parsed at import. It has a sorted table per prefix length: 24 bits for the OUI (MA-L),
+and 28 and 36 bits for the MA-M and MA-S blocks, if those were included.
+
+File layout, all numbers big-endian:
+    header: magic (8 bytes), number of tables (uint32), offset of the vendor names (uint32)
+    for each table: prefix length in bits (uint32), number of entries (uint32), offset of the entries (uint32)
+    entries: prefix (uint64), offset of the vendor name (uint32), sorted by prefix
+    vendor names: utf-8 strings, each ending in a zero byte
+"""
+import functools
+import mmap
+import os
+import struct
+import threading
+
+OUI_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'oui.bin')
+OUI_FILE_MAGIC = b'OL2M-OUI'
+
+_header = struct.Struct('>8sII')
+_table = struct.Struct('>III')
+_entry = struct.Struct('>QI')
+
+_oui_database = None    # the OuiDatabase(), False if the file cannot be read, see get_oui_database()
+_oui_lock = threading.Lock()
+
+
+class OuiDatabase():
+    """
+    Binary search in the memory-mapped oui.bin file.
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as oui_file:
+            self._map = mmap.mmap(oui_file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, table_count, self._names) = _header.unpack_from(self._map, 0)
+        if magic != OUI_FILE_MAGIC:
+            raise ValueError(f"{path} is not an OUI database")
+        self.tables = {}    # (entry count, entries offset) by prefix length in bits
+        for index in range(table_count):
+            (bits, count, offset) = _table.unpack_from(self._map, _header.size + index * _table.size)
+            self.tables[bits] = (count, offset)
+        # the longer prefixes, longest first, and the OUIs that are split into such blocks
+        self.block_lengths = sorted((bits for bits in self.tables.keys() if bits > 24), reverse=True)
+        self.block_ouis = set()
+        for bits in self.block_lengths:
+            (count, offset) = self.tables[bits]
+            for index in range(count):
+                (prefix, name) = _entry.unpack_from(self._map, offset + index * _entry.size)
+                self.block_ouis.add(prefix >> (bits - 24))
+
+    def find(self, bits, prefix):
+        """
+        Return the vendor of the prefix of 'bits' length, or '' if not found.
+        """
+        if bits not in self.tables:
+            return ''
+        (count, offset) = self.tables[bits]
+        low = 0
+        high = count
+        while low < high:
+            middle = (low + high) // 2
+            (value, name) = _entry.unpack_from(self._map, offset + middle * _entry.size)
+            if value < prefix:
+                low = middle + 1
+            elif value > prefix:
+                high = middle
+            else:
+                start = self._names + name
+                return self._map[start:self._map.find(b'\0', start)].decode('utf-8')
+        return ''
+
+
+def get_oui_database():
+    """
+    Return the OuiDatabase(), loaded on first use, or False if there is no valid oui.bin file.
+    """
+    global _oui_database
+    if _oui_database is None:
+        with _oui_lock:
+            if _oui_database is None:
+                try:
+                    _oui_database = OuiDatabase(OUI_FILE)
+                except (OSError, ValueError, struct.error):
+                    _oui_database = False
+    return _oui_database
+
+
+@functools.lru_cache(maxsize=4096)
+def _get_oui_vendor(oui):
+    """
+    Return the vendor of a 24-bit OUI number. Cached, as networks have few distinct vendors.
+    """
+    database = get_oui_database()
+    if not database:
+        return ''
+    return database.find(24, oui)
+
+
+def get_vendor_from_oui(oui):
+    """
+    Return the ethernet vendor from the given OUI string, e.g. "AA-BB-CC".
+    If a full ethernet address is given (in any format), the MA-M and MA-S blocks are also searched.
+    """
+    digits = oui.replace('-', '').replace(':', '').replace('.', '')
+    try:
+        value = int(digits, 16)
+    except ValueError:
+        return ''
+    if len(digits) == 12:
+        return get_vendor_from_address(value)
+    if len(digits) == 6:
+        return _get_oui_vendor(value)
+    return ''
+
+
+def get_vendor_from_address(address):
+    """
+    Return the ethernet vendor of an ethernet address, as a 48-bit number.
+    """
+    if address >> 24 in get_block_ouis():
+        database = get_oui_database()
+        for bits in database.block_lengths:
+            vendor = database.find(bits, address >> (48 - bits))
+            if vendor:
+                return vendor
+    return _get_oui_vendor(address >> 24)
+
+
+def get_block_ouis():
+    """
+    Return the set of OUIs that are split in MA-M or MA-S blocks.
+    """
+    database = get_oui_database()
+    if not database:
+        return ()
+    return database.block_ouis
+
+
+def write_oui_database(path, vendors):
+    """
+    Write an OUI database file, see the layout above.
+    vendors - dict of vendor name by (prefix length in bits, prefix)
+    """
+    names = {}
+    name_data = bytearray()
+    tables = {}
+    for ((bits, prefix), vendor) in vendors.items():
+        if vendor not in names:
+            names[vendor] = len(name_data)
+            name_data += vendor.encode('utf-8') + b'\0'
+        tables.setdefault(bits, []).append((prefix, names[vendor]))
+    offset = _header.size + len(tables) * _table.size
+    table_data = bytearray()
+    entry_data = bytearray()
+    for bits in sorted(tables.keys()):
+        entries = sorted(tables[bits])
+        table_data += _table.pack(bits, len(entries), offset + len(entry_data))
+        for (prefix, name) in entries:
+            entry_data += _entry.pack(prefix, name)
+    names_offset = offset + len(entry_data)
+    with open(path, 'wb') as oui_file:
+        oui_file.write(_header.pack(OUI_FILE_MAGIC, len(tables), names_offset))
+        oui_file.write(table_data)
+        oui_file.write(entry_data)
+        oui_file.write(name_data)
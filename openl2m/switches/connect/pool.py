@@ -0,0 +1,112 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Process-wide pool of snmp sessions.
+Creating a session is expensive for SNMP v3, as every new session needs to discover the
+engine id of the device, and localize the keys, before the first real request.
+Sessions are borrowed by a connection object, and given back when it is done with them.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from switches.utils import dprint
+
+
+class SnmpSessionPool():
+    """
+    Idle snmp session objects, by key. A session is only used by one connection at a time.
+    Sessions idle for more than 'max_idle' seconds are dropped, and at most 'max_size'
+    idle sessions are kept, the least recently used are dropped first.
+    """
+    def __init__(self, max_size, max_idle):
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle = OrderedDict()  # key to list of (time given back, session), least recently used key first
+        self._count = 0
+
+    def get(self, key, create):
+        """
+        Borrow an idle session for this key, or call create() to get a new one.
+        Returns the session, or whatever create() returned.
+        """
+        with self._lock:
+            self._expire(time.time())
+            sessions = self._idle.get(key, False)
+            if sessions:
+                (returned, session) = sessions.pop()
+                self._count -= 1
+                if not sessions:
+                    del self._idle[key]
+                dprint(f"SnmpSessionPool: reusing session for {key[0]}")
+                return session
+        return create()
+
+    def put(self, key, session):
+        """
+        Give back a borrowed session, so it can be used again.
+        """
+        if not session or self.max_size < 1:
+            return
+        with self._lock:
+            self._idle.setdefault(key, []).append((time.time(), session))
+            self._idle.move_to_end(key)
+            self._count += 1
+            while self._count > self.max_size:
+                (oldest_key, sessions) = next(iter(self._idle.items()))
+                sessions.pop(0)
+                self._count -= 1
+                if not sessions:
+                    del self._idle[oldest_key]
+
+    def clear(self):
+        """
+        Drop all idle sessions.
+        """
+        with self._lock:
+            self._idle = OrderedDict()
+            self._count = 0
+
+    def _expire(self, now):
+        """
+        Drop the sessions that were idle too long. Call with the lock held.
+        """
+        for key in list(self._idle.keys()):
+            sessions = self._idle[key]
+            fresh = [(returned, session) for (returned, session) in sessions if now - returned < self.max_idle]
+            self._count -= len(sessions) - len(fresh)
+            if fresh:
+                self._idle[key] = fresh
+            else:
+                del self._idle[key]
+
+
+# the session pool of this process
+snmp_session_pool = SnmpSessionPool(settings.SNMP_SESSION_POOL_SIZE, settings.SNMP_SESSION_POOL_IDLE)
+
+
+def get_session_key(switch, com_or_ctx=''):
+    """
+    Return the pool key for a session to this switch, with the given community or context.
+    Any change to the address or the snmp profile gives a different key, so old sessions are not used.
+    """
+    profile = switch.snmp_profile
+    if not profile:
+        return (switch.id, switch.primary_ip4, str(com_or_ctx))
+    return (switch.id, switch.primary_ip4, profile.id, profile.version, profile.udp_port, profile.community,
+            profile.sec_level, profile.username, profile.passphrase, profile.auth_protocol,
+            profile.priv_passphrase, profile.priv_protocol, str(com_or_ctx))
@@ -0,0 +1,462 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Capture and replay of snmp data.
+With SNMP_CAPTURE_DIR set, the connectors write every walk and get reply to capture files,
+one per switch and community or context, see SnmpConnector._capture_items() and save_capture().
+With SNMP_TRANSPORT = 'replay', the ReplaySNMP() class below serves the same interface as EasySNMP()
+from those files, without any network access. This allows profiling the parsing and views
+with the data of real devices.
+The files use the "snmprec" format of snmpsim, i.e. one "oid|tag|value" line per variable.
+"""
+import bisect
+import os
+import re
+import threading
+import time
+import traceback
+
+from django.conf import settings
+
+from switches.constants import *
+from switches.connect.classes import Error
+from switches.connect.constants import snmp_mib_variables
+from switches.connect.metrics import observe_pdus, get_branch_name, get_branches_name
+from switches.utils import dprint
+
+# the snmprec tags of the EasySNMP types. Octet strings are always written in hex, i.e. with "x" added.
+snmprec_tags = {
+    'INTEGER': '2',
+    'INTEGER32': '2',
+    'OCTETSTR': '4x',
+    'BITS': '4x',
+    'NULL': '5',
+    'OBJECTID': '6',
+    'IPADDR': '64',
+    'COUNTER': '65',
+    'GAUGE': '66',
+    'UNSIGNED32': '66',
+    'TICKS': '67',
+    'OPAQUE': '68x',
+    'COUNTER64': '70',
+}
+
+# and back, the EasySNMP types of the snmprec tags
+snmprec_types = {
+    '2': 'INTEGER',
+    '4': 'OCTETSTR',
+    '5': 'NULL',
+    '6': 'OBJECTID',
+    '64': 'IPADDR',
+    '65': 'COUNTER',
+    '66': 'GAUGE',
+    '67': 'TICKS',
+    '68': 'OPAQUE',
+    '70': 'COUNTER64',
+}
+
+# the EasySNMP types of the set() types, for variables not in the capture yet
+snmp_set_type_names = {
+    'i': 'INTEGER',
+    'u': 'GAUGE',
+    'UNSIGNED': 'GAUGE',
+    's': 'OCTETSTR',
+    'OCTETSTRING': 'OCTETSTR',
+    'o': 'OBJECTID',
+    'a': 'IPADDR',
+    't': 'TICKS',
+    'c': 'COUNTER',
+}
+
+# the loaded capture files, by path, see get_capture_data()
+_capture_data = {}
+_capture_lock = threading.Lock()
+
+
+class ReplayVariable():
+    """
+    A variable returned by ReplaySNMP(), with the same attributes as the EasySNMP SNMPVariable() class.
+    """
+    def __init__(self, oid, snmp_type, value):
+        (self.oid, self.oid_index) = oid.rsplit('.', 1)
+        self.snmp_type = snmp_type
+        self.value = value
+
+
+class CaptureData():
+    """
+    The variables of one capture file, in OID order.
+    """
+    def __init__(self, records):
+        """
+        records - dict of (snmp type, value) by OID
+        """
+        self._lock = threading.Lock()
+        self.values = records
+        self.oids = sorted(records.keys(), key=_oid_key)
+        self.keys = [_oid_key(oid) for oid in self.oids]
+
+    def get(self, oid):
+        """
+        Return the ReplayVariable() of an OID, with type NOSUCHINSTANCE if not found.
+        """
+        oid = _clean_oid(oid)
+        (snmp_type, value) = self.values.get(oid, ('NOSUCHINSTANCE', ''))
+        return ReplayVariable(oid, snmp_type, value)
+
+    def walk(self, branch):
+        """
+        Return the list of ReplayVariable() in a MIB branch, in OID order.
+        """
+        branch_key = _oid_key(branch)
+        size = len(branch_key)
+        items = []
+        with self._lock:
+            position = bisect.bisect_right(self.keys, branch_key)
+            while position < len(self.keys) and self.keys[position][:size] == branch_key:
+                oid = self.oids[position]
+                (snmp_type, value) = self.values[oid]
+                items.append(ReplayVariable(oid, snmp_type, value))
+                position += 1
+        return items
+
+    def set(self, oid, value, snmp_type):
+        """
+        Change a variable, as the device would. This is not written to the capture file.
+        """
+        oid = _clean_oid(oid)
+        with self._lock:
+            if oid in self.values:
+                snmp_type = self.values[oid][0]
+            else:
+                snmp_type = snmp_set_type_names.get(snmp_type, snmp_type)
+                key = _oid_key(oid)
+                position = bisect.bisect_left(self.keys, key)
+                self.keys.insert(position, key)
+                self.oids.insert(position, oid)
+            self.values[oid] = (snmp_type, str(value))
+
+
+def _clean_oid(oid):
+    """
+    Return the OID string with a leading dot, as EasySNMP returns them.
+    """
+    return f".{str(oid).strip('.')}"
+
+
+def _oid_key(oid):
+    """
+    Return the OID as a tuple of numbers, to sort in OID order.
+    """
+    return tuple(int(part) for part in str(oid).strip('.').split('.'))
+
+
+def get_capture_context(switch, com_or_ctx):
+    """
+    Return the part of the community or context that is used in the capture file name.
+    For v2, this is the part after '@' of the "community@vlan" Cisco format,
+    so the community is never written in file names.
+    """
+    if not com_or_ctx:
+        return ''
+    if switch.snmp_profile and switch.snmp_profile.version == SNMP_VERSION_2C:
+        return com_or_ctx.rpartition('@')[2] if '@' in com_or_ctx else ''
+    return str(com_or_ctx)
+
+
+def get_capture_file(switch, context=''):
+    """
+    Return the path of the capture file of a switch and capture context, see get_capture_context().
+    """
+    name = re.sub(r'[^\w.-]', '_', str(switch.primary_ip4))
+    if context:
+        context = re.sub(r'[^\w.-]', '_', context)
+        name = f"{name}@{context}"
+    return os.path.join(settings.SNMP_CAPTURE_DIR, f"{name}.snmprec")
+
+
+def read_capture(path):
+    """
+    Read a capture file. Returns a dict of (snmp type, value) by OID.
+    """
+    records = {}
+    with open(path) as capture:
+        for line in capture:
+            line = line.rstrip('\n')
+            if not line or line.startswith('#'):
+                continue
+            (oid, tag, value) = line.split('|', 2)
+            if tag.endswith('x'):
+                tag = tag[:-1]
+                # one character per byte, like EasySNMP returns octet strings
+                value = bytes.fromhex(value).decode('latin-1')
+            snmp_type = snmprec_types.get(tag, 'OCTETSTR')
+            if snmp_type == 'OBJECTID':
+                value = _clean_oid(value)
+            records[_clean_oid(oid)] = (snmp_type, value)
+    return records
+
+
+def write_capture(path, records):
+    """
+    Write a dict of (snmp type, value) by OID to a capture file, in OID order.
+    """
+    lines = []
+    for oid in sorted(records.keys(), key=_oid_key):
+        (snmp_type, value) = records[oid]
+        tag = snmprec_tags.get(snmp_type, '4x')
+        value = str(value)
+        if tag.endswith('x'):
+            try:
+                value = value.encode('latin-1').hex()
+            except UnicodeEncodeError:
+                value = value.encode('utf-8').hex()
+        elif snmp_type == 'OBJECTID':
+            value = value.strip('.')
+        lines.append(f"{oid.strip('.')}|{tag}|{value}\n")
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as capture:
+        capture.write("".join(lines))
+    os.replace(temp_path, path)
+
+
+def save_capture(switch, captures):
+    """
+    Add the captured variables to the capture files of the switch. Runs when the connector goes away.
+    captures - dict by capture context of dicts of (snmp type, value) by OID
+    """
+    for (context, records) in captures.items():
+        if not records:
+            continue
+        path = get_capture_file(switch, context)
+        try:
+            if os.path.exists(path):
+                merged = read_capture(path)
+                merged.update(records)
+                records = merged
+            write_capture(path, records)
+        except Exception:
+            dprint(f"save_capture(): cannot write {path}:\n{traceback.format_exc()}")
+    captures.clear()
+
+
+def get_capture_data(path):
+    """
+    Return the CaptureData() of a capture file, or False if there is no such file.
+    The files are read once per process, and again when they change.
+    """
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return False
+    with _capture_lock:
+        (loaded_mtime, data) = _capture_data.get(path, (0, False))
+        if not data or loaded_mtime != mtime:
+            data = CaptureData(read_capture(path))
+            _capture_data[path] = (mtime, data)
+    return data
+
+
+class ReplaySNMP():
+    """
+    This class implements the same interface as the EasySNMP() class, from capture files instead of a device.
+    Each request waits SNMP_REPLAY_LATENCY seconds, to simulate the network.
+    Sets only change the data in this process.
+    """
+    def __init__(self, switch):
+        self.switch = switch    # the Switch() object
+        self._snmp_session = False   # the CaptureData() of the current community or context
+        self._snmp_session_context = ''     # the community or context of the session, see _set_snmp_session()
+        self._prefetched_branches = {}      # nothing is prefetched, the data is local
+        self.error = Error()
+
+    def _delay(self, pdus=1):
+        """
+        Wait for the simulated network latency of 'pdus' requests.
+        """
+        if settings.SNMP_REPLAY_LATENCY:
+            time.sleep(settings.SNMP_REPLAY_LATENCY * pdus)
+
+    def _get(self, oid, update_oidcache=True, parser=False):
+        """
+        Get a single specific OID value from the capture.
+        Update the local OID cache by default.
+        Returns a tuple with (error_status, return_value)
+        if error, then return_value is not defined
+        """
+        self.error.clear()
+        start = time.time()
+        self._delay()
+        retval = self._snmp_session.get(oid)
+        self._add_pdu_metrics('get', get_branch_name(oid), start, [retval])
+        self._parse_oid_and_cache(f"{retval.oid}.{retval.oid_index}",
+                                  str(retval.value), retval.snmp_type, update_oidcache, parser)
+        if update_oidcache:
+            self._set_http_session_cache()
+        return (False, retval)
+
+    def _get_multiple(self, oids):
+        """
+        Get several specific OID values from the capture. The values are not parsed or cached.
+        Returns a tuple with (error_status, list of values), in the order of the oids.
+        Values not in the capture are returned as None.
+        """
+        self.error.clear()
+        start = time.time()
+        self._delay()
+        retvals = [self._snmp_session.get(oid) for oid in oids]
+        self._add_pdu_metrics('get', get_branches_name(oids), start, retvals)
+        return (False, [None if 'NOSUCH' in retval.snmp_type else retval.value for retval in retvals])
+
+    def _get_branch_by_name(self, branch_name, cache_it=True, parser=False, max_repetitions=0, com_or_ctx=None):
+        """
+        Walk a branch of the capture, fill the data in the oid store.
+        See EasySNMP._get_branch_by_name() for the arguments.
+        Return count of objects returned from query, or -1 if error.
+        """
+        if branch_name not in snmp_mib_variables.keys():
+            warning = f"ERROR: invalid branch name '{branch_name}'"
+            self._add_warning(warning)
+            dprint(f"+++> INVALID BRANCH NAME: {branch_name}")
+            return -1
+        if not max_repetitions:
+            max_repetitions = self._get_max_repetitions(branch_name)
+
+        self.error.clear()
+        if com_or_ctx is not None and com_or_ctx != self._snmp_session_context:
+            if not self._set_snmp_session(com_or_ctx):
+                self.error.status = True
+                self.error.description = "Cannot get SNMP session!"
+                self._add_warning(f"Cannot get SNMP session to read branch {branch_name}, no capture file")
+                return -1
+        dprint(f"_get_branch_by_name({branch_name}) from capture")
+        start = time.time()
+        items = self._snmp_session.walk(snmp_mib_variables[branch_name])
+        pdus = len(items) // max_repetitions + 1
+        self._delay(pdus)
+        count = 0
+        for item in items:
+            count += 1
+            self._parse_oid_and_cache(f"{item.oid}.{item.oid_index}", item.value, item.snmp_type, cache_it, parser)
+        duration = time.time() - start
+        observe_pdus(self.switch, self.__class__.__name__, 'walk', branch_name, duration, items, pdus=pdus)
+        self._add_mib_timing(branch_name, count, duration)
+        self._count('snmp_bulk_read_count')
+        dprint(f"_get_branch_by_name returns {count}")
+        return count
+
+    def _prefetch_branches(self, branch_names, com_or_ctx=None):
+        """
+        Nothing to start, the captured data is local. Returns 0, see EasySNMP._prefetch_branches()
+        """
+        return 0
+
+    def _get_table_by_names(self, branch_names, cache_it=True, parser=False, max_repetitions=0):
+        """
+        Walk several columns of a table in the capture, see EasySNMP._get_table_by_names().
+        Returns a dict with the count of objects per column name, or -1 if error.
+        """
+        for branch_name in branch_names:
+            if branch_name not in snmp_mib_variables.keys():
+                warning = f"ERROR: invalid branch name '{branch_name}'"
+                self._add_warning(warning)
+                dprint(f"+++> INVALID BRANCH NAME: {branch_name}")
+                return -1
+        table_name = ','.join(branch_names)
+        if not max_repetitions:
+            max_repetitions = self._get_max_repetitions(table_name)
+
+        self.error.clear()
+        start = time.time()
+        columns = {}
+        for branch_name in branch_names:
+            columns[branch_name] = self._snmp_session.walk(snmp_mib_variables[branch_name])
+        # the rows of all columns are returned in the same requests
+        pdus = max(len(items) for items in columns.values()) // max_repetitions + 1
+        self._delay(pdus)
+        counts = {}
+        for branch_name in branch_names:
+            counts[branch_name] = 0
+            for item in columns[branch_name]:
+                counts[branch_name] += 1
+                self._parse_oid_and_cache(f"{item.oid}.{item.oid_index}", item.value, item.snmp_type, cache_it, parser)
+        duration = time.time() - start
+        observe_pdus(self.switch, self.__class__.__name__, 'getbulk', table_name, duration,
+                     [item for items in columns.values() for item in items], pdus=pdus)
+
+        total = sum(counts.values())
+        for branch_name in branch_names:
+            if total:
+                self._add_mib_timing(branch_name, counts[branch_name], duration * counts[branch_name] / total)
+            else:
+                self._add_mib_timing(branch_name, 0, duration / len(branch_names))
+        self._count('snmp_bulk_read_count')
+        dprint(f"_get_table_by_names returns {counts}")
+        return counts
+
+    def _stop_prefetch(self):
+        """
+        Nothing was prefetched.
+        """
+        return
+
+    def _set(self, oid, value, snmp_type, update_oidcache=True, parser=False):
+        """
+        Set a single OID value in the captured data.
+        Returns 1, and if requested, then we also update the local oid cache to track the change.
+        """
+        return self._set_multiple([(oid, value, snmp_type)], update_oidcache, parser)
+
+    def _set_multiple(self, oid_values, update_oidcache=True, parser=False):
+        """
+        Set multiple OIDs in the captured data.
+        oid_values is a list of (oid, value, type)
+        Returns 1, and if requested, then we also update the local oid cache to track the change.
+        """
+        self.error.clear()
+        start = time.time()
+        self._delay()
+        for (oid, value, snmp_type) in oid_values:
+            self._snmp_session.set(oid, value, snmp_type)
+        self._add_pdu_metrics('set', get_branches_name(oid for (oid, value, snmp_type) in oid_values), start, oid_values)
+        self._switch_changed(update_oidcache)
+        if update_oidcache:
+            for (oid, value, snmp_type) in oid_values:
+                self._parse_oid_and_cache(str(oid), str(value), snmp_type, True, parser)
+            self._set_http_session_cache()
+
+        self._count('snmp_write_count')
+        return 1
+
+    def _set_snmp_session(self, com_or_ctx=''):
+        """
+        Use the capture file of the community or context 'com_or_ctx'.
+        Returns True on success, False if there is no capture file.
+        """
+        session = self._get_snmp_session(com_or_ctx)
+        if session:
+            self._snmp_session = session
+            self._snmp_session_context = com_or_ctx
+            return True
+        return False
+
+    def _get_snmp_session(self, com_or_ctx=''):
+        """
+        Returns the CaptureData() of the community or context 'com_or_ctx', or False if not captured.
+        """
+        path = get_capture_file(self.switch, get_capture_context(self.switch, com_or_ctx))
+        data = get_capture_data(path)
+        if not data:
+            dprint(f"ReplaySNMP: no capture file {path}")
+        return data
@@ -0,0 +1,90 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Compact snapshot format for the oid cache, as stored in the http session and the switch cache.
+Instead of a dictionary of full OID strings, the data is stored in 'runs' of consecutive
+OIDs in the same MIB branch (i.e. a table column), as [branch, [oid endings], [values]].
+The branch is only stored once per run, and oid endings that are plain row numbers are stored as int.
+The order of the oid cache is kept, so the data parses the same as when it was read from the switch.
+The snapshot is a dictionary with only lists, strings and numbers, so it can be stored as JSON.
+"""
+import base64
+import json
+import zlib
+
+SNAPSHOT_FORMAT = 1
+
+
+def oid_cache_to_snapshot(oid_cache, dispatcher, compress=False):
+    """
+    Convert an oid cache dictionary into a snapshot.
+    dispatcher: the OidDispatcher() of the connector class, to find the MIB branch of each OID.
+    OIDs without a parser in the dispatcher are stored with a branch of None, and the full OID.
+    compress: if True, the runs are stored as zlib compressed JSON.
+    """
+    runs = []
+    run_branch = False
+    for (oid, value) in oid_cache.items():
+        (handler, oid_end) = dispatcher.lookup(oid)
+        if handler:
+            branch = oid[:len(oid) - len(oid_end) - 1]
+        else:
+            branch = None
+            oid_end = oid
+        if branch != run_branch or not runs:
+            run = [branch, [], []]
+            runs.append(run)
+            run_branch = branch
+        run[1].append(oid_end)
+        run[2].append(value)
+    for run in runs:
+        if all(_is_row_number(oid_end) for oid_end in run[1]):
+            run[1] = [int(oid_end) for oid_end in run[1]]
+    if compress:
+        data = zlib.compress(json.dumps(runs, separators=(',', ':')).encode('utf-8'))
+        return {'format': SNAPSHOT_FORMAT, 'zlib': base64.b64encode(data).decode('ascii')}
+    return {'format': SNAPSHOT_FORMAT, 'runs': runs}
+
+
+def snapshot_to_runs(snapshot):
+    """
+    Return the list of [branch, [oid endings], [values]] runs from a snapshot.
+    An old-style oid cache dictionary is returned as a single run without branch.
+    """
+    if 'format' not in snapshot.keys():
+        return [[None, list(snapshot.keys()), list(snapshot.values())]]
+    if 'zlib' in snapshot.keys():
+        return json.loads(zlib.decompress(base64.b64decode(snapshot['zlib'])).decode('utf-8'))
+    return snapshot['runs']
+
+
+def runs_to_oid_cache(runs):
+    """
+    Rebuild the oid cache dictionary from snapshot runs.
+    """
+    oid_cache = {}
+    for (branch, oid_ends, values) in runs:
+        if branch:
+            for (oid_end, value) in zip(oid_ends, values):
+                oid_cache[f"{branch}.{oid_end}"] = value
+        else:
+            oid_cache.update(zip(oid_ends, values))
+    return oid_cache
+
+
+def _is_row_number(oid_end):
+    """
+    True if the oid ending is a single number that survives the round trip to int.
+    """
+    return oid_end.isdigit() and (oid_end == '0' or oid_end[0] != '0')
@@ -16,30 +16,46 @@ SNMP Library for OpenL2M, based on MIB-2 based RFC standards. Uses the pysnmp li
 Some of the code here is inspired by the NAV (Network Administration Visualized) tool
 Various vendor specific implementations that augment this class exist.
 """
+import json
 import sys
 import time
 import timeit
 import re
 import traceback
 import pprint
+import weakref
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import F
 import easysnmp
 from easysnmp.variables import SNMPVariable
-from pysnmp.hlapi import *
-from pysnmp.proto.rfc1902 import ObjectName, OctetString
+from pysnmp.hlapi.asyncio import *
+from pysnmp.proto.rfc1902 import ObjectName
 
 from switches.constants import *
 from switches.models import Switch, VLAN, SnmpProfile, Log
 from switches.connect.constants import *
 from switches.connect.classes import *
 from switches.connect.connect import *
+from switches.connect.async_snmp import AsyncioSNMP, get_snmp_engine, get_thread_event_loop
+from switches.connect.dispatch import OidDispatcher
+from switches.connect.metrics import observe_pdus, observe_retry, get_branch_name, get_branches_name
+from switches.connect.snapshot import *
 from switches.connect.netmiko.connector import *
+from switches.connect.pool import snmp_session_pool, get_session_key
+from switches.connect.replay import ReplaySNMP, save_capture, get_capture_context
 from switches.connect.vendors.constants import *
 from switches.connect.oui.oui import *
+from switches.log_buffer import save_log
 from switches.utils import *
 
 
+# parts of the error texts of net-snmp and pysnmp, when a reply is too large for the device.
+# Only these errors are retried with a smaller max_repetitions, see _get_backoff_max_repetitions()
+snmp_reply_size_errors = ('toobig', 'too big', 'too large', 'message size', 'partial')
+
+
 class pysnmpHelper():
     """
     Implement functionality we need to do a few simple things.
@@ -47,6 +63,8 @@ class pysnmpHelper():
     EasySNMP cannot handle this cleanly, especially for uneven byte counts, due to
     how it maps everything to a unicode string internally!
     Based on the pysnmp HPAPI at http://snmplabs.com/pysnmp/examples/contents.html#high-level-snmp
+    The pysnmp (v7) calls are coroutines, they run on the event loop of the current thread,
+    with the SnmpEngine() of that loop, see switches/connect/async_snmp.py
     """
     def __init__(self, switch=False):
         """
@@ -67,16 +85,15 @@ class pysnmpHelper():
             return (True, "Switch() NOT set!")
         if not self._auth_data:
             return (True, "Auth Data NOT set!")
+        if settings.SNMP_TRANSPORT == 'replay':
+            return (True, "Not available with captured switch data (SNMP_TRANSPORT = 'replay')")
 
         # Get a variable using an SNMP GET
-        errorIndication, errorStatus, errorIndex, varBinds = next(
-            getCmd(self._auth_data,
-                   UdpTransportTarget((self.switch.primary_ip4, self.switch.snmp_profile.udp_port)),
-                   ContextData(),
-                   ObjectType(ObjectName(oid)),
-                   lookupMib=False,
-                   )
+        start = time.time()
+        errorIndication, errorStatus, errorIndex, varBinds = get_thread_event_loop().run_until_complete(
+            self._async_command(get_cmd, ObjectType(ObjectIdentity(oid)))
         )
+        self._add_reply_metrics('get', get_branch_name(oid), start, errorIndication, errorStatus, varBinds)
 
         if errorIndication:
             details = f"ERROR with SNMP Engine: {pprint.pformat(errorStatus)} at {errorIndex and varBinds[int(errorIndex) - 1][0] or '?'}"
@@ -88,9 +105,23 @@ class pysnmpHelper():
 
         else:
             # store the returned data
-            (oid, retval) = varBinds
+            (oid, retval) = varBinds[0]
             return (False, retval)
 
+    async def _async_command(self, command, *vars):
+        """
+        Send a request with the pysnmp command coroutine, e.g. get_cmd() or set_cmd().
+        Returns the tuple of (errorIndication, errorStatus, errorIndex, varBinds)
+        """
+        target = await UdpTransportTarget.create((self.switch.primary_ip4, self.switch.snmp_profile.udp_port))
+        return await command(get_snmp_engine(),
+                             self._auth_data,
+                             target,
+                             ContextData(),
+                             *vars,
+                             lookupMib=False,
+                             )
+
     def _set(self, vars):
         """
         Set a single OID value. Note that 'value' has to be properly typed, see
@@ -98,16 +129,16 @@ class pysnmpHelper():
         """
         if not self._auth_data:
             return (True, "Auth Data NOT set!")
+        if settings.SNMP_TRANSPORT == 'replay':
+            # never send changes to the real device
+            return (True, "Not available with captured switch data (SNMP_TRANSPORT = 'replay')")
 
-        errorIndication, errorStatus, errorIndex, varBinds = next(
-            setCmd(SnmpEngine(),
-                   self._auth_data,
-                   UdpTransportTarget((self.switch.primary_ip4, self.switch.snmp_profile.udp_port)),
-                   ContextData(),
-                   *vars,
-                   lookupMib=False,
-                   )
+        start = time.time()
+        errorIndication, errorStatus, errorIndex, varBinds = get_thread_event_loop().run_until_complete(
+            self._async_command(set_cmd, *vars)
         )
+        self._add_reply_metrics('set', get_branches_name(name for (name, value) in varBinds), start,
+                                errorIndication, errorStatus, varBinds)
 
         if errorIndication:
             details = f"ERROR with SNMP Engine: {pprint.pformat(errorStatus)} at {errorIndex and varBinds[int(errorIndex) - 1][0] or '?'}"
@@ -118,7 +149,8 @@ class pysnmpHelper():
             return (True, details)
 
         else:
-            # no errors
+            # no errors, but cached data for this switch is now out of date
+            set_switch_cache_written(self.switch.id)
             return (False, None)
 
     def set(self, oid, value):
@@ -147,6 +179,18 @@ class pysnmpHelper():
         # now call _set() to do the work:
         return self._set(vars)
 
+    def _add_reply_metrics(self, operation, branch, start, error_indication, error_status, var_binds):
+        """
+        Count a request in the snmp metrics, see switches/connect/metrics.py
+        """
+        exception = None
+        if error_indication:
+            exception = Exception(str(error_indication))
+        elif error_status:
+            exception = Exception(error_status.prettyPrint())
+        observe_pdus(self.switch, self.__class__.__name__, operation, branch, time.time() - start,
+                     () if exception else var_binds, exception=exception)
+
     def _set_auth_data(self):
         """
         Set the UsmUserdata() or CommunityData() object based on the snmp_profile
@@ -219,6 +263,9 @@ class EasySNMP():
         """
         self.switch = switch    # the Switch() object
         self._snmp_session = False   # EasySNMP session object
+        self._snmp_session_context = ''     # the community or context of the session, see _set_snmp_session()
+        self._snmp_session_release = False  # gives the session back to the pool, see _set_snmp_session()
+        self._prefetched_branches = {}      # EasySNMP walks one branch at a time, see _prefetch_branches()
         self.error = Error()
 
     def _get(self, oid, update_oidcache=True, parser=False):
@@ -230,16 +277,20 @@ class EasySNMP():
         """
         self.error.clear()
 
-        # Set a variable using an SNMP SET
+        # Get a variable using an SNMP GET
+        start = time.time()
         try:
             retval = self._snmp_session.get(oids=oid)
         except Exception as e:
+            self._add_pdu_metrics('get', get_branch_name(oid), start, exception=e)
             self.error.status = True
             self.error.description = "Access denied"
             self.error.details = f"SNMP Error: {repr(e)} ({str(type(e))})\n{traceback.format_exc()}"
             return (True, None)
 
         # we cache all values as strings, just like the original returns from get_branch()
+        self._add_pdu_metrics('get', get_branch_name(oid), start, [retval])
+        self._capture_items([retval])
         self._parse_oid_and_cache(f"{retval.oid}.{retval.oid_index}",
                                   str(retval.value), retval.snmp_type, update_oidcache, parser)
         # update the local cache as needed by saving in the session:
@@ -248,13 +299,36 @@ class EasySNMP():
 
         return (False, retval)
 
-    def _get_branch_by_name(self, branch_name, cache_it=True, parser=False, max_repetitions=settings.SNMP_MAX_REPETITIONS):
+    def _get_multiple(self, oids):
+        """
+        Get several specific OID values in a single SNMP request. The values are not parsed or cached.
+        Returns a tuple with (error_status, list of values), in the order of the oids.
+        Values the device does not have are returned as None.
+        """
+        self.error.clear()
+        start = time.time()
+        try:
+            retvals = self._snmp_session.get(oids=oids)
+        except Exception as e:
+            self._add_pdu_metrics('get', get_branches_name(oids), start, exception=e)
+            self.error.status = True
+            self.error.description = "Access denied"
+            self.error.details = f"SNMP Error: {repr(e)} ({str(type(e))})\n{traceback.format_exc()}"
+            return (True, None)
+
+        self._add_pdu_metrics('get', get_branches_name(oids), start, retvals)
+        self._capture_items(retvals)
+        return (False, [None if 'NOSUCH' in retval.snmp_type else str(retval.value) for retval in retvals])
+
+    def _get_branch_by_name(self, branch_name, cache_it=True, parser=False, max_repetitions=0, com_or_ctx=None):
         """
         Bulk-walk a branch of the snmp mib, fill the data in the oid store.
         This finishes when we leave this branch.
         branch_name = SNMP name
         cache_it = True - we will save data in http session oid_cache
         parser - if given, will be a function to call to parse the MIB data.
+        max_repetitions - if not given, the value learned for this switch and branch, see _get_max_repetitions()
+        com_or_ctx - if given, the community or context to read the branch in, see _set_snmp_session().
         Return count of objects returned from query, or -1 if error.
         """
         if branch_name not in snmp_mib_variables.keys():
@@ -262,28 +336,45 @@ class EasySNMP():
             self._add_warning(warning)
             dprint(f"+++> INVALID BRANCH NAME: {branch_name}")
             return -1
+        if not max_repetitions:
+            max_repetitions = self._get_max_repetitions(branch_name)
 
         start_oid = snmp_mib_variables[branch_name]
         # Perform an SNMP walk
         self.error.clear()
         count = 0
+        failed_repetitions = 0
+        if com_or_ctx is None:
+            com_or_ctx = self._snmp_session_context
+        if com_or_ctx != self._snmp_session_context:
+            if not self._set_snmp_session(com_or_ctx):
+                self.error.status = True
+                self.error.description = "Cannot get SNMP session!"
+                self._add_warning(f"Cannot get SNMP session to read branch {branch_name}")
+                return -1
         try:
-            start = time.time()
-            dprint(f"_get_branch_by_name({branch_name}) BulkWalk {start_oid}")
-            items = self._snmp_session.bulkwalk(oids=start_oid, non_repeaters=0, max_repetitions=max_repetitions)
-            stop = time.time()
+            try:
+                dprint(f"_get_branch_by_name({branch_name}) BulkWalk {start_oid}")
+                (items, duration) = self._bulkwalk(self._snmp_session, branch_name, max_repetitions)
+            except Exception as e:
+                # 'tooBig' or partial replies are caused by replies that are too large for the device,
+                # so try once more with smaller replies.
+                retry_repetitions = self._get_backoff_max_repetitions(branch_name, max_repetitions, e)
+                if not retry_repetitions:
+                    raise
+                dprint(f"_get_branch_by_name({branch_name}) failed, retry with max_repetitions={retry_repetitions}")
+                observe_retry(self.switch, self.__class__.__name__, 'walk', branch_name)
+                failed_repetitions = max_repetitions
+                max_repetitions = retry_repetitions
+                (items, duration) = self._bulkwalk(self._snmp_session, branch_name, max_repetitions)
+            self._capture_items(items, com_or_ctx)
             # Each returned item can be used normally as its related type (str or int)
             # but also has several extended attributes with SNMP-specific information
             for item in items:
                 count = count + 1
                 # for octetstring, use this:  https://github.com/kamakazikamikaze/easysnmp/issues/91
-                dprint("\n\n====> SNMP READ: {oid}.{oid_index} {snmp_type} = {var_type}: {value}".format(
-                    oid=item.oid,
-                    oid_index=item.oid_index,
-                    snmp_type=item.snmp_type,
-                    value=item.value,
-                    var_type=str(type(item.value)),
-                ))
+                if trace.enabled:
+                    dprint(f"\n\n====> SNMP READ: {item.oid}.{item.oid_index} {item.snmp_type} = {type(item.value)}: {item.value}")
                 oid_found = '{oid}.{oid_index}'.format(
                     oid=item.oid,
                     oid_index=item.oid_index)
@@ -298,11 +389,159 @@ class EasySNMP():
             return -1
 
         # add to timing data, for admin use!
-        self._add_mib_timing(branch_name, count, stop - start)
-        self.switch.snmp_bulk_read_count += 1
+        self._add_mib_timing(branch_name, count, duration)
+        self._tune_max_repetitions(branch_name, max_repetitions, count, duration, failed_repetitions)
+        self._count('snmp_bulk_read_count')
         dprint(f"_get_branch_by_name returns {count}")
         return count
 
+    def _prefetch_branches(self, branch_names, com_or_ctx=None):
+        """
+        Start bulk-walks of the given branches in parallel, with at most settings.SNMP_MAX_PARALLEL_WALKS
+        walks in progress. Nothing is parsed here! A later _get_branch_by_name() call uses the walk result
+        instead of walking the branch itself, so the data is parsed in the order of those calls.
+        branch_names = list of SNMP names. A tuple of names is a table walk, see _get_table_by_names()
+        com_or_ctx - if given, walk in this community or context instead of the one of the current session.
+        Returns the number of walks started, 0 if parallel walks are disabled.
+        EasySNMP (net-snmp) is not safe to use from several threads, so the walks are always done
+        one at a time, when the branch is read. See AsyncioSNMP._prefetch_branches() for parallel walks.
+        """
+        return 0
+
+    def _bulkwalk(self, session, branch_name, max_repetitions):
+        """
+        Bulk-walk a branch with the given EasySNMP session, and count it in the snmp metrics.
+        EasySNMP does not tell how many GetBulk requests the walk took, so this assumes full replies.
+        Returns a tuple of (items, duration). Errors are raised as exceptions.
+        """
+        start = time.time()
+        try:
+            items = session.bulkwalk(oids=snmp_mib_variables[branch_name], non_repeaters=0, max_repetitions=max_repetitions)
+        except Exception as e:
+            self._add_pdu_metrics('walk', branch_name, start, exception=e)
+            raise
+        duration = time.time() - start
+        observe_pdus(self.switch, self.__class__.__name__, 'walk', branch_name, duration, items,
+                     pdus=len(items) // max_repetitions + 1)
+        return (items, duration)
+
+    def _get_table_by_names(self, branch_names, cache_it=True, parser=False, max_repetitions=0):
+        """
+        Bulk-walk several columns of a table at the same time, i.e. each GetBulk request asks
+        for the next rows of all columns that are not finished. This needs about as many requests
+        as walking a single column. The columns can be from different tables with the same index,
+        e.g. ifTable and ifXTable, and do not need to have the same number of rows.
+        The data is parsed one column at a time, in the order given, so parsers see the data
+        in the same order as when the columns are walked one by one with _get_branch_by_name().
+        branch_names = list of SNMP names of the columns
+        cache_it, parser - see _get_branch_by_name()
+        max_repetitions - if not given, the value learned for this switch and table, see _get_max_repetitions()
+        Returns a dict with the count of objects per column name, or -1 if error.
+        """
+        for branch_name in branch_names:
+            if branch_name not in snmp_mib_variables.keys():
+                warning = f"ERROR: invalid branch name '{branch_name}'"
+                self._add_warning(warning)
+                dprint(f"+++> INVALID BRANCH NAME: {branch_name}")
+                return -1
+        table_name = ','.join(branch_names)
+        if not max_repetitions:
+            max_repetitions = self._get_max_repetitions(table_name)
+
+        self.error.clear()
+        counts = {}
+        failed_repetitions = 0
+        try:
+            try:
+                dprint(f"_get_table_by_names({table_name}) GetBulk")
+                (columns, duration) = self._walk_table(self._snmp_session, branch_names, max_repetitions)
+            except Exception as e:
+                # same as _get_branch_by_name(), retry once with smaller replies.
+                retry_repetitions = self._get_backoff_max_repetitions(table_name, max_repetitions, e)
+                if not retry_repetitions:
+                    raise
+                dprint(f"_get_table_by_names({table_name}) failed, retry with max_repetitions={retry_repetitions}")
+                observe_retry(self.switch, self.__class__.__name__, 'getbulk', table_name)
+                failed_repetitions = max_repetitions
+                max_repetitions = retry_repetitions
+                (columns, duration) = self._walk_table(self._snmp_session, branch_names, max_repetitions)
+            for branch_name in branch_names:
+                counts[branch_name] = 0
+                self._capture_items(columns[branch_name])
+                for item in columns[branch_name]:
+                    counts[branch_name] += 1
+                    self._parse_oid_and_cache(f"{item.oid}.{item.oid_index}", item.value, item.snmp_type, cache_it, parser)
+
+        except Exception as e:
+            self.error.status = True
+            self.error.description = "A timeout or network error occured!"
+            self.error.details = f"SNMP Error: branches {table_name}, {repr(e)} ({str(type(e))})\n{traceback.format_exc()}"
+            self._add_warning(self.error.details)
+            dprint(f"   _get_table_by_names({table_name}): Exception: {e.__class__.__name__}\n{self.error.details}\n")
+            return -1
+
+        # add to timing data, for admin use! The columns share the time, by count.
+        total = sum(counts.values())
+        for branch_name in branch_names:
+            if total:
+                self._add_mib_timing(branch_name, counts[branch_name], duration * counts[branch_name] / total)
+            else:
+                self._add_mib_timing(branch_name, 0, duration / len(branch_names))
+        self._tune_max_repetitions(table_name, max_repetitions, max(counts.values()), duration, failed_repetitions)
+        self._count('snmp_bulk_read_count')
+        dprint(f"_get_table_by_names returns {counts}")
+        return counts
+
+    def _walk_table(self, session, branch_names, max_repetitions):
+        """
+        Walk table columns in lockstep. Each GetBulk request contains the next OID of each column
+        that is not finished. The reply has 'max_repetitions' rows of those OIDs, in request order.
+        A column is finished when a returned OID is no longer in that column.
+        Returns a tuple of (dict with list of returned variables per column name, duration).
+        Errors are raised as exceptions.
+        """
+        start = time.time()
+        table_name = ','.join(branch_names)
+        columns = {}
+        next_oids = {}      # the OID to continue from, for each column that is not finished
+        for branch_name in branch_names:
+            columns[branch_name] = []
+            next_oids[branch_name] = snmp_mib_variables[branch_name]
+        while next_oids:
+            names = list(next_oids.keys())
+            pdu_start = time.time()
+            try:
+                items = session.get_bulk(oids=[next_oids[name] for name in names], non_repeaters=0, max_repetitions=max_repetitions)
+            except Exception as e:
+                self._add_pdu_metrics('getbulk', table_name, pdu_start, exception=e)
+                raise
+            self._add_pdu_metrics('getbulk', table_name, pdu_start, items)
+            if not items:
+                break
+            finished = set()
+            last_oids = dict(next_oids)
+            for (position, item) in enumerate(items):
+                name = names[position % len(names)]
+                if name in finished:
+                    continue
+                oid = f"{item.oid}.{item.oid_index}" if item.oid_index else item.oid
+                if item.snmp_type == 'ENDOFMIBVIEW' or not oid.startswith(f"{snmp_mib_variables[name]}."):
+                    finished.add(name)
+                    continue
+                columns[name].append(item)
+                next_oids[name] = oid
+            for name in names:
+                # also stop if a column does not move forward
+                if name in finished or next_oids[name] == last_oids[name]:
+                    del next_oids[name]
+        return (columns, time.time() - start)
+
+    def _stop_prefetch(self):
+        """
+        Discard the parallel walks that were not used. Nothing to do, see _prefetch_branches()
+        """
+        return
+
     def _set(self, oid, value, snmp_type, update_oidcache=True, parser=False):
         """
         Set a single OID value. Note that 'value' has to be properly typed!
@@ -312,23 +551,26 @@ class EasySNMP():
         """
         # Set a variable using an SNMP SET
         self.error.clear()
+        start = time.time()
         try:
             self._snmp_session.set(oid=oid, value=value, snmp_type=snmp_type)
 
         except Exception as e:
+            self._add_pdu_metrics('set', get_branch_name(oid), start, exception=e)
             self.error.status = True
             self.error.description = "Access denied"
             self.error.details = f"SNMP Error: oid {oid}, {repr(e)} ({str(type(e))})\n{traceback.format_exc()}"
             return -1
 
+        self._add_pdu_metrics('set', get_branch_name(oid), start, [(oid, value)])
+        self._switch_changed(update_oidcache)
         # update the local cache:
         if update_oidcache:
             # we cache all values as strings, just like the original returns from get_branch()
             self._parse_oid_and_cache(str(oid), str(value), snmp_type, True, parser)
             self._set_http_session_cache()
 
-        self.switch.snmp_write_count += 1
-        self.switch.save()
+        self._count('snmp_write_count')
         return 1
 
     def _set_multiple(self, oid_values, update_oidcache=True, parser=False):
@@ -341,22 +583,55 @@ class EasySNMP():
         """
         # here we go:
         self.error.clear()
+        branch = get_branches_name(oid for (oid, value, snmp_type) in oid_values)
+        start = time.time()
         try:
             self._snmp_session.set_multiple(oid_values=oid_values)
 
         except Exception as e:
+            self._add_pdu_metrics('set', branch, start, exception=e)
             self.error.status = True
             self.error.description = "Access denied"
             self.error.details = f"SNMP Error: {repr(e)} ({str(type(e))})\n{traceback.format_exc()}"
             return -1
 
+        self._add_pdu_metrics('set', branch, start, oid_values)
+        self._switch_changed(update_oidcache)
+        # update the local cache:
+        if update_oidcache:
+            for (oid, value, snmp_type) in oid_values:
+                self._parse_oid_and_cache(str(oid), str(value), snmp_type, True, parser)
+            self._set_http_session_cache()
+
+        self._count('snmp_write_count')
         return 1
 
     def _set_snmp_session(self, com_or_ctx=''):
         """
-        Get a EasySnmp Session() object for this snmp connection
+        Set the EasySnmp Session() object for this snmp connection
+        com_or_ctx - the community to override the snmp profile settings if v2,
+                      or the snmp v3 context to use.
+        The session is borrowed from the process session pool, and given back when we set another
+        session, or when this object is deleted.
+        Returns True on success, False if we cannot get a session.
+        """
+        if self._snmp_session_release:
+            self._snmp_session_release()
+            self._snmp_session_release = False
+        key = get_session_key(self.switch, com_or_ctx)
+        self._snmp_session = snmp_session_pool.get(key, lambda: self._get_snmp_session(com_or_ctx))
+        if self._snmp_session:
+            self._snmp_session_context = com_or_ctx
+            self._snmp_session_release = weakref.finalize(self, snmp_session_pool.put, key, self._snmp_session)
+            return True
+        return False
+
+    def _get_snmp_session(self, com_or_ctx=''):
+        """
+        Get a new EasySnmp Session() object for this snmp connection
         com_or_ctx - the community to override the snmp profile settings if v2,
                       or the snmp v3 context to use.
+        Returns the Session(), or False if not possible.
         """
         snmp_profile = self.switch.snmp_profile
         if snmp_profile:
@@ -367,141 +642,240 @@ class EasySNMP():
                 else:
                     # use profile setting
                     community = snmp_profile.community
-                self._snmp_session = easysnmp.Session(hostname=self.switch.primary_ip4,
-                                                      version=snmp_profile.version,
-                                                      community=community,
-                                                      remote_port=snmp_profile.udp_port,
-                                                      use_numeric=True,
-                                                      use_sprint_value=False,
-                                                      timeout=settings.SNMP_TIMEOUT,
-                                                      retries=settings.SNMP_RETRIES,)
-                return True
+                return easysnmp.Session(hostname=self.switch.primary_ip4,
+                                        version=snmp_profile.version,
+                                        community=community,
+                                        remote_port=snmp_profile.udp_port,
+                                        use_numeric=True,
+                                        use_sprint_value=False,
+                                        timeout=settings.SNMP_TIMEOUT,
+                                        retries=settings.SNMP_RETRIES,)
 
             # everything else is version 3
             if snmp_profile.version == SNMP_VERSION_3:
                 # NoAuthNoPriv
                 if snmp_profile.sec_level == SNMP_V3_SECURITY_NOAUTH_NOPRIV:
-                    self._snmp_session = easysnmp.Session(hostname=self.switch.primary_ip4,
-                                                          version=snmp_profile.version,
-                                                          remote_port=snmp_profile.udp_port,
-                                                          use_numeric=True,
-                                                          use_sprint_value=False,
-                                                          security_level=u"no_auth_or_privacy",
-                                                          security_username=snmp_profile.username,
-                                                          context=str(com_or_ctx),)
-                    return True
+                    return easysnmp.Session(hostname=self.switch.primary_ip4,
+                                            version=snmp_profile.version,
+                                            remote_port=snmp_profile.udp_port,
+                                            use_numeric=True,
+                                            use_sprint_value=False,
+                                            security_level=u"no_auth_or_privacy",
+                                            security_username=snmp_profile.username,
+                                            context=str(com_or_ctx),)
 
                 # AuthNoPriv
                 elif snmp_profile.sec_level == SNMP_V3_SECURITY_AUTH_NOPRIV:
                     if snmp_profile.auth_protocol == SNMP_V3_AUTH_MD5:
-                        self._snmp_session = easysnmp.Session(hostname=self.switch.primary_ip4,
-                                                              version=snmp_profile.version,
-                                                              remote_port=snmp_profile.udp_port,
-                                                              use_numeric=True,
-                                                              use_sprint_value=False,
-                                                              security_level=u"auth_without_privacy",
-                                                              security_username=snmp_profile.username,
-                                                              auth_protocol=u"MD5",
-                                                              auth_password=snmp_profile.passphrase,
-                                                              context=str(com_or_ctx),)
-                        return True
+                        return easysnmp.Session(hostname=self.switch.primary_ip4,
+                                                version=snmp_profile.version,
+                                                remote_port=snmp_profile.udp_port,
+                                                use_numeric=True,
+                                                use_sprint_value=False,
+                                                security_level=u"auth_without_privacy",
+                                                security_username=snmp_profile.username,
+                                                auth_protocol=u"MD5",
+                                                auth_password=snmp_profile.passphrase,
+                                                context=str(com_or_ctx),)
 
                     elif snmp_profile.auth_protocol == SNMP_V3_AUTH_SHA:
-                        self._snmp_session = easysnmp.Session(hostname=self.switch.primary_ip4,
-                                                              version=snmp_profile.version,
-                                                              remote_port=snmp_profile.udp_port,
-                                                              use_numeric=True,
-                                                              use_sprint_value=False,
-                                                              security_level=u"auth_without_privacy",
-                                                              security_username=snmp_profile.username,
-                                                              auth_protocol=u"SHA",
-                                                              auth_password=snmp_profile.passphrase,
-                                                              context=str(com_or_ctx),)
-                        return True
+                        return easysnmp.Session(hostname=self.switch.primary_ip4,
+                                                version=snmp_profile.version,
+                                                remote_port=snmp_profile.udp_port,
+                                                use_numeric=True,
+                                                use_sprint_value=False,
+                                                security_level=u"auth_without_privacy",
+                                                security_username=snmp_profile.username,
+                                                auth_protocol=u"SHA",
+                                                auth_password=snmp_profile.passphrase,
+                                                context=str(com_or_ctx),)
 
                 # AuthPriv
                 elif snmp_profile.sec_level == SNMP_V3_SECURITY_AUTH_PRIV:
                     if snmp_profile.auth_protocol == SNMP_V3_AUTH_MD5:
                         if snmp_profile.priv_protocol == SNMP_V3_PRIV_DES:
-                            self._snmp_session = easysnmp.Session(hostname=self.switch.primary_ip4,
-                                                                  version=snmp_profile.version,
-                                                                  remote_port=snmp_profile.udp_port,
-                                                                  use_numeric=True,
-                                                                  use_sprint_value=False,
-                                                                  security_level=u"auth_with_privacy",
-                                                                  security_username=snmp_profile.username,
-                                                                  auth_protocol=u"MD5",
-                                                                  auth_password=snmp_profile.passphrase,
-                                                                  privacy_protocol=u"DES",
-                                                                  privacy_password=snmp_profile.priv_passphrase,
-                                                                  context=str(com_or_ctx),)
-                            return True
+                            return easysnmp.Session(hostname=self.switch.primary_ip4,
+                                                    version=snmp_profile.version,
+                                                    remote_port=snmp_profile.udp_port,
+                                                    use_numeric=True,
+                                                    use_sprint_value=False,
+                                                    security_level=u"auth_with_privacy",
+                                                    security_username=snmp_profile.username,
+                                                    auth_protocol=u"MD5",
+                                                    auth_password=snmp_profile.passphrase,
+                                                    privacy_protocol=u"DES",
+                                                    privacy_password=snmp_profile.priv_passphrase,
+                                                    context=str(com_or_ctx),)
 
                         if snmp_profile.priv_protocol == SNMP_V3_PRIV_AES:
-                            self._snmp_session = easysnmp.Session(hostname=self.switch.primary_ip4,
-                                                                  version=snmp_profile.version,
-                                                                  remote_port=snmp_profile.udp_port,
-                                                                  use_numeric=True,
-                                                                  use_sprint_value=False,
-                                                                  security_level=u"auth_with_privacy",
-                                                                  security_username=snmp_profile.username,
-                                                                  auth_protocol=u"MD5",
-                                                                  auth_password=snmp_profile.passphrase,
-                                                                  privacy_protocol=u"AES",
-                                                                  privacy_password=snmp_profile.priv_passphrase,
-                                                                  context=str(com_or_ctx),)
-                            return True
+                            return easysnmp.Session(hostname=self.switch.primary_ip4,
+                                                    version=snmp_profile.version,
+                                                    remote_port=snmp_profile.udp_port,
+                                                    use_numeric=True,
+                                                    use_sprint_value=False,
+                                                    security_level=u"auth_with_privacy",
+                                                    security_username=snmp_profile.username,
+                                                    auth_protocol=u"MD5",
+                                                    auth_password=snmp_profile.passphrase,
+                                                    privacy_protocol=u"AES",
+                                                    privacy_password=snmp_profile.priv_passphrase,
+                                                    context=str(com_or_ctx),)
 
                     if snmp_profile.auth_protocol == SNMP_V3_AUTH_SHA:
                         if snmp_profile.priv_protocol == SNMP_V3_PRIV_DES:
-                            self._snmp_session = Session(hostname=self.switch.primary_ip4,
-                                                         version=snmp_profile.version,
-                                                         remote_port=snmp_profile.udp_port,
-                                                         use_numeric=True,
-                                                         use_sprint_value=False,
-                                                         security_level=u"auth_with_privacy",
-                                                         security_username=snmp_profile.username,
-                                                         auth_protocol=u"SHA",
-                                                         auth_password=snmp_profile.passphrase,
-                                                         privacy_protocol=u"DES",
-                                                         privacy_password=snmp_profile.priv_passphrase,
-                                                         context=str(com_or_ctx),)
-                            return True
+                            return easysnmp.Session(hostname=self.switch.primary_ip4,
+                                                    version=snmp_profile.version,
+                                                    remote_port=snmp_profile.udp_port,
+                                                    use_numeric=True,
+                                                    use_sprint_value=False,
+                                                    security_level=u"auth_with_privacy",
+                                                    security_username=snmp_profile.username,
+                                                    auth_protocol=u"SHA",
+                                                    auth_password=snmp_profile.passphrase,
+                                                    privacy_protocol=u"DES",
+                                                    privacy_password=snmp_profile.priv_passphrase,
+                                                    context=str(com_or_ctx),)
 
                         if snmp_profile.priv_protocol == SNMP_V3_PRIV_AES:
-                            self._snmp_session = easysnmp.Session(hostname=self.switch.primary_ip4,
-                                                                  version=snmp_profile.version,
-                                                                  remote_port=snmp_profile.udp_port,
-                                                                  use_numeric=True,
-                                                                  use_sprint_value=False,
-                                                                  security_level=u"auth_with_privacy",
-                                                                  security_username=snmp_profile.username,
-                                                                  auth_protocol=u"SHA",
-                                                                  auth_password=snmp_profile.passphrase,
-                                                                  privacy_protocol=u"AES",
-                                                                  privacy_password=snmp_profile.priv_passphrase,
-                                                                  context=str(com_or_ctx),)
-                            return True
+                            return easysnmp.Session(hostname=self.switch.primary_ip4,
+                                                    version=snmp_profile.version,
+                                                    remote_port=snmp_profile.udp_port,
+                                                    use_numeric=True,
+                                                    use_sprint_value=False,
+                                                    security_level=u"auth_with_privacy",
+                                                    security_username=snmp_profile.username,
+                                                    auth_protocol=u"SHA",
+                                                    auth_password=snmp_profile.passphrase,
+                                                    privacy_protocol=u"AES",
+                                                    privacy_password=snmp_profile.priv_passphrase,
+                                                    context=str(com_or_ctx),)
                 # else:
                 #    dprint("  Unknown auth-priv")
 
         # snmp profile not set, or we cannot get session
-        self._snmp_session = False
         return False
 
 
-class SnmpConnector(EasySNMP):
+# the class that implements the basic snmp interface, see settings.SNMP_TRANSPORT
+if settings.SNMP_TRANSPORT == 'asyncio':
+    SnmpTransport = AsyncioSNMP
+elif settings.SNMP_TRANSPORT == 'replay':
+    SnmpTransport = ReplaySNMP
+else:
+    SnmpTransport = EasySNMP
+
+
+class SnmpConnector(SnmpTransport):
     """
     This is the base class where it all happens! We inherit from a specific class that implements
     the basic snmp interface. This allows for quick switching between easysnmp, pysnmp, netsnmp-python, etc.
+    See EasySNMP() above, AsyncioSNMP() in switches/connect/async_snmp.py and ReplaySNMP() in switches/connect/replay.py
 
     This class implements "Generic" standards-based snmp information.
     Below are several classes that implement vendor-specific parts of this generic class.
     """
+    # The interface columns read in _get_interface_data(), with _get_table_by_names()
+    interface_table_columns = ('ifIndex', 'ifType', 'ifAdminStatus', 'ifOperStatus', 'ifName', 'ifAlias', 'ifHighSpeed')
+
+    # The MIB branches we parse in _parse_oid(), as (snmp_mib_variables name, parser method name).
+    # Vendor sub-classes add their own branches with an 'oid_handlers' list in the same format.
+    # See OidDispatcher() in switches/connect/dispatch.py
+    oid_handlers = [
+        ('system', '_parse_system'),
+        ('ifIndex', '_parse_if_index'),
+        ('ifDescr', '_parse_if_descr'),
+        ('ifType', '_parse_if_type'),
+        ('ifMtu', '_parse_if_mtu'),
+        ('ifSpeed', '_parse_if_speed'),
+        ('ifPhysAddress', '_parse_if_phys_address'),
+        ('ifAdminStatus', '_parse_if_admin_status'),
+        ('ifOperStatus', '_parse_if_oper_status'),
+        ('ifName', '_parse_if_name'),
+        ('ifAlias', '_parse_if_alias'),
+        ('ifHighSpeed', '_parse_if_high_speed'),
+        ('dot1qNumVlans', '_parse_dot1q_num_vlans'),
+        ('dot1qGvrpStatus', '_parse_dot1q_gvrp_status'),
+        ('ieee8021QBridgeMvrpEnabledStatus', '_parse_mvrp_enabled_status'),
+        ('dot1qPortGvrpStatus', '_parse_dot1q_port_gvrp_status'),
+        ('dot1qVlanCurrentEgressPorts', '_parse_dot1q_vlan_current_egress_ports'),
+        ('dot1qVlanCurrentUntaggedPorts', '_parse_dot1q_vlan_current_untagged_ports'),
+        ('dot1qVlanStatus', '_parse_dot1q_vlan_status'),
+        ('dot1qVlanStaticName', '_parse_dot1q_vlan_static_name'),
+        ('dot1qVlanStaticEgressPorts', '_parse_dot1q_vlan_static_egress_ports'),
+        ('dot1qVlanStaticRowStatus', '_parse_dot1q_vlan_static_row_status'),
+        ('dot1qPvid', '_parse_dot1q_pvid'),
+        ('dot1dBasePortIfIndex', '_parse_dot1d_base_port_if_index'),
+        ('ipAdEntIfIndex', '_parse_ip_ad_ent_if_index'),
+        ('ipAdEntNetMask', '_parse_ip_ad_ent_net_mask'),
+        ('entPhysicalClass', '_parse_ent_physical_class'),
+        ('entPhysicalSerialNum', '_parse_ent_physical_serial_num'),
+        ('entPhysicalSoftwareRev', '_parse_ent_physical_software_rev'),
+        ('entPhysicalModelName', '_parse_ent_physical_model_name'),
+        ('syslogMsgTableMaxSize', '_parse_syslog_msg_table_max_size'),
+        ('pethMainPsePower', '_parse_peth_main_pse_power'),
+        ('pethMainPseOperStatus', '_parse_peth_main_pse_oper_status'),
+        ('pethMainPseConsumptionPower', '_parse_peth_main_pse_consumption_power'),
+        ('pethMainPseUsageThreshold', '_parse_peth_main_pse_usage_threshold'),
+        ('pethPsePortAdminEnable', '_parse_peth_pse_port_admin_enable'),
+        ('pethPsePortDetectionStatus', '_parse_peth_pse_port_detection_status'),
+        ('dot3adAggActorAdminKey', '_parse_dot3ad_agg_actor_admin_key'),
+        ('dot3adAggPortActorAdminKey', '_parse_dot3ad_agg_port_actor_admin_key'),
+    ]
+
+    # The branches that get_switch_basic_info() always walks, and that can be walked in parallel,
+    # in the order they are used. See _prefetch_branches() and settings.SNMP_MAX_PARALLEL_WALKS.
+    # Branches that are only walked depending on other data are prefetched where that is known.
+    basic_info_branches = [
+        'system',
+        interface_table_columns,
+        'ipAddrTable',
+        'dot3adAggActorAdminKey',
+        'dot3adAggPortActorAdminKey',
+        'pethMainPseEntry',
+    ]
+
+    # Values that change when the switch configuration changes, read with sysUpTime in a single request
+    # when cached data is used, see _refresh_oid_cache(). Each entry is (oid, what changed), where
+    # a change in 'interfaces' means the switch is read again, and a change in 'vlans' means
+    # the 'vlan_branches' are read again.
+    change_counters = [
+        (ifTableLastChange, 'interfaces'),
+        (dot1qVlanNumDeletes, 'vlans'),
+        (f"{dot1qNumVlans}.0", 'vlans'),
+    ]
+
+    # The branches read by _get_vlan_data(), read again when the vlans on the switch changed.
+    vlan_branches = [
+        'dot1qBase',
+        'dot1dBasePortIfIndex',
+        'dot1qVlanStaticRowStatus',
+        'dot1qVlanStaticName',
+        'dot1qVlanStatus',
+        'dot1qPvid',
+        'dot1qVlanCurrentEgressPorts',
+        'dot1qPortGvrpStatus',
+        'ieee8021QBridgeMvrpEnabledStatus',
+    ]
+
+    # The branches with interface state, read again when cached data is older than a view allows.
+    refresh_branches = [
+        interface_table_columns,
+        'pethPsePortDetectionStatus',
+    ]
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        Build the OID dispatcher for each vendor sub-class, when that class is imported.
+        It contains the parent class handlers, plus the ones in the 'oid_handlers' of the sub-class.
+        """
+        super().__init_subclass__(**kwargs)
+        cls.oid_dispatcher = OidDispatcher(cls, cls.oid_dispatcher)
+
     def __init__(self, request=False, group=False, switch=False):
         """
         Initialize the object
         """
+        trace.refresh()     # skip the formatting of debug output in the parsers if it is not logged
         super().__init__(switch)
 
         self.name = "Standard SNMP"  # what type of class is running!
@@ -512,9 +886,12 @@ class SnmpConnector(EasySNMP):
         self.error = Error()
         self.error.status = False   # we don't actually have an error yet :-)
         self.oid_cache = {}         # OIDs already read are stored here
+        self._oid_cache_runs = False    # the runs of a loaded cache snapshot, until parsed
         self.system = System()      # the global system aka switch info
         self.interfaces = {}        # Interface() objects representing the ports on this switch, key is ifIndex
         self.poe_port_entries = {}  # PoePort() port power entries, used to store until we can map to interface
+        self._if_name_index = False         # ifIndex by interface name, see _get_if_index_by_name()
+        self._if_name_suffix_index = False  # ifIndex by every ending of the interface names, see _get_if_index_by_name_end()
 
         self.vlan_id_by_index = {}  # list of vlan indexes and their vlan ID's. Note on many switches these two are the same!
         self.vlans = {}             # Vlan() objects on this switch, key is vlan id (not index!)
@@ -525,10 +902,22 @@ class SnmpConnector(EasySNMP):
         self.stack_port_to_if_index = {}    # maps (Cisco) stacking port to ifIndex values
         self.ip4_to_if_index = {}   # the IPv4 addresses as keys, with stored value ifIndex; needed to map netmask to interface
         self.eth_addr_count = 0     # number of known mac addresses
+        self.eth_table = EthernetTable()    # the known ethernet addresses on all interfaces, see _add_ethernet_address()
         self.neighbor_count = 0     # number of lldp neighbors
         self.warnings = []          # list of warning strings that may be shown to users
         self.mib_timing = {}        # dictionary to track how many vars and how long various MIBs take to read
         self._add_mib_timing('Total', 0, 0)     # initialize the 'total' count to 0 entries, 0 seconds!
+        self.bulk_tuning = {}       # learned GetBulk max_repetitions per branch, see _tune_max_repetitions()
+        self._switch_updates = {}   # counter increments and new capabilities, see _count() and _save_switch_counters()
+        if switch:
+            # write what is left when this object goes away, i.e. at the end of the request
+            weakref.finalize(self, save_switch_counters, switch.id, self._switch_updates)
+        self._captures = False      # the replies to write to the capture files, see _capture_items()
+        if switch and settings.SNMP_CAPTURE_DIR and settings.SNMP_TRANSPORT != 'replay':
+            self._captures = {}
+            weakref.finalize(self, save_capture, switch, self._captures)
+        self.change_set = False     # list of SnmpChange() objects not sent yet, see begin_changes()
+        self._load_bulk_tuning()
 
         # features that may or may noit be implemented:
         self.vlan_change_implemented = True
@@ -546,24 +935,54 @@ class SnmpConnector(EasySNMP):
         self.basic_info_read_time = 0    # when the last 'basic' snmp read occured
         self.basic_info_duration = 0     # time in seconds for initial basic info gathering
         self.detailed_info_duration = 0  # time in seconds for each detailed info gathering
+        self.cache_time = 0              # when the oid cache was last known to match the switch
+        self.boot_time = 0               # when the switch booted, from sysUpTime, to detect reboots
+        self.change_counter_values = {}  # the 'change_counters' values when the data was read, by oid
 
-        self.cached_oid_data = False    # if True, we read switch data from the session cache
+        self.cached_oid_data = False    # if True, we read switch data from the session or switch cache
 
         self.hwinfo_needed = True   # True if we still need to read the Entity tables
 
         if not self._set_snmp_session():
             raise Exception("Cannot get SNMP session, did you configure a profile?")
 
-    def load_caches(self):
+    def load_caches(self, max_age=None):
         """
         Load various caches to improve performance.
-        For now, just http session cache.
-        In future, possibly add redis caching...
+        First the http session of this user, then the switch cache shared by all users.
+        Data from before the last change to the switch is ignored.
+        max_age is the oldest data (in seconds) the caller accepts, None means any age.
         """
         # now check to see if this switch snmp oid data is cached:
-        self._get_http_session_cache()
+        if self._get_http_session_cache(max_age):
+            return True
+        self._get_switch_cache(max_age)
         return True
 
+    def _cache_is_fresh(self, read_time, cache_time, max_age=None):
+        """
+        Check if cached switch data, read from the switch at read_time, and known to
+        match the switch at cache_time, can still be used.
+        """
+        if max_age is not None and time.time() - read_time > max_age and not settings.SNMP_INCREMENTAL_REFRESH:
+            dprint("Cached switch data is older than max_age")
+            return False
+        written = get_switch_cache_written(self.switch.id)
+        if written and cache_time < written:
+            dprint("Switch was changed after data was cached")
+            return False
+        return True
+
+    def _switch_changed(self, cache_updated=False):
+        """
+        Called after we changed the switch. Cached data from before now is no longer used
+        by other users or tasks. If we updated our oid cache with the change,
+        our own cached data is still current.
+        """
+        set_switch_cache_written(self.switch.id)
+        if cache_updated:
+            self.cache_time = time.time()
+
     def _add_mib_timing(self, mib, count, time):
         """
         Function to track MIB responses on switch
@@ -574,15 +993,134 @@ class SnmpConnector(EasySNMP):
         total_time += time
         self.mib_timing['Total'] = (total_count, total_time)
 
-    def _set_http_session_cache(self):
+    def _add_pdu_metrics(self, operation, branch, start, items=(), exception=None):
+        """
+        Count a request to the switch that started at 'start', in the snmp metrics.
+        See switches/connect/metrics.py
+        """
+        observe_pdus(self.switch, self.__class__.__name__, operation, branch, time.time() - start, items, exception=exception)
+
+    def _capture_items(self, items, com_or_ctx=None):
+        """
+        Add the variables returned by the switch to the capture, if SNMP_CAPTURE_DIR is set.
+        com_or_ctx - the community or context they were read in, if not the one of the current session.
+        See switches/connect/replay.py
+        """
+        if self._captures is False:
+            return
+        if com_or_ctx is None:
+            com_or_ctx = self._snmp_session_context
+        records = self._captures.setdefault(get_capture_context(self.switch, com_or_ctx), {})
+        for item in items:
+            if 'NOSUCH' in item.snmp_type or item.snmp_type == 'ENDOFMIBVIEW':
+                continue
+            oid = f"{item.oid}.{item.oid_index}" if item.oid_index else item.oid
+            records[oid] = (item.snmp_type, item.value)
+
+    def _save_capture(self):
+        """
+        Write the replies captured so far to the capture files, see _capture_items().
+        """
+        if self._captures:
+            save_capture(self.switch, self._captures)
+
+    def _load_bulk_tuning(self):
+        """
+        Load the learned GetBulk max_repetitions values from the Switch() object.
+        These are stored as JSON, with MIB branch name as key, and [value, limit, limit time] as data.
+        A limit of 0 means settings.SNMP_MAX_REPETITIONS_LIMIT
+        """
+        self.bulk_tuning = {}
+        if self.switch.snmp_bulk_tuning:
+            try:
+                self.bulk_tuning = json.loads(self.switch.snmp_bulk_tuning)
+            except ValueError:
+                dprint("Invalid snmp_bulk_tuning data, ignored!")
+
+    def _get_max_repetitions(self, branch_name):
+        """
+        Return the GetBulk max_repetitions value to use for this branch.
+        """
+        if settings.SNMP_ADAPTIVE_MAX_REPETITIONS and branch_name in self.bulk_tuning.keys():
+            return self.bulk_tuning[branch_name][0]
+        return settings.SNMP_MAX_REPETITIONS
+
+    def _get_backoff_max_repetitions(self, branch_name, max_repetitions, exception):
+        """
+        A walk of this branch failed with the given max_repetitions and exception.
+        Return a smaller value to retry the walk with, or 0 if we should not retry.
+        Only errors about the reply size are retried, a timeout or other error is not
+        made better by smaller replies.
+        """
+        if not settings.SNMP_ADAPTIVE_MAX_REPETITIONS or max_repetitions < 2:
+            return 0
+        error = str(exception).lower()
+        if not any(text in error for text in snmp_reply_size_errors):
+            return 0
+        return int(max_repetitions / 2)
+
+    def _tune_max_repetitions(self, branch_name, max_repetitions, count, duration, failed_repetitions=0):
         """
-        Store the snmp switch data in the http session, if exists
+        Learn the max_repetitions value for this branch from a successful walk,
+        from the same count and duration we add to the MIB timing data.
+        If the walk needed several requests, and the replies came quickly, we double the value.
+        If replies are getting close to the timeout, we halve it.
+        If the walk only worked after a retry with a smaller value (failed_repetitions is set),
+        we keep the smaller value, and do not go back to the value that failed until that limit
+        is older than settings.SNMP_MAX_REPETITIONS_LIMIT_AGE. Then larger values are tried again.
         """
+        if not settings.SNMP_ADAPTIVE_MAX_REPETITIONS:
+            return
+        # older data has no limit time, so that limit expires now
+        (value, limit, limit_time) = (self.bulk_tuning.get(branch_name, [settings.SNMP_MAX_REPETITIONS, 0]) + [0])[:3]
+        expired = False
+        if failed_repetitions:
+            new_value = max_repetitions
+            limit = failed_repetitions - 1
+            limit_time = int(time.time())
+        else:
+            if limit and time.time() - limit_time > settings.SNMP_MAX_REPETITIONS_LIMIT_AGE:
+                dprint(f"_tune_max_repetitions({branch_name}) limit {limit} expired")
+                limit = 0
+                limit_time = 0
+                expired = True
+            max_limit = limit if limit else settings.SNMP_MAX_REPETITIONS_LIMIT
+            requests = int(count / max_repetitions) + 1
+            request_time = duration / requests
+            new_value = max_repetitions
+            if request_time > settings.SNMP_TIMEOUT / 2:
+                new_value = max(1, int(max_repetitions / 2))
+            elif count >= 2 * max_repetitions and request_time < settings.SNMP_TIMEOUT / 10:
+                new_value = max(max_repetitions, min(2 * max_repetitions, max_limit))
+        if new_value == value and not failed_repetitions and not expired:
+            return
+        dprint(f"_tune_max_repetitions({branch_name}) = {new_value} (limit {limit})")
+        self.bulk_tuning[branch_name] = [new_value, limit, limit_time]
+        self.switch.snmp_bulk_tuning = json.dumps(self.bulk_tuning)
+        self._switch_updates['snmp_bulk_tuning'] = self.switch.snmp_bulk_tuning
+        if failed_repetitions:
+            # save now, the current request may not get to saving the switch
+            self.switch.save(update_fields=['snmp_bulk_tuning'])
+
+    def _set_http_session_cache(self, switch_cache=True):
+        """
+        Store the snmp switch data in the http session, if exists,
+        and in the switch cache shared by all users, unless switch_cache=False
+        """
+        snapshot = False
+        if switch_cache and settings.SWITCH_CACHE_TIMEOUT:
+            snapshot = self._get_oid_cache_snapshot()
+            self._set_switch_cache(snapshot)
         if self.request:
+            if not snapshot:
+                snapshot = self._get_oid_cache_snapshot()
             self.request.session['switch_id'] = self.switch.id
-            self.request.session['oid_cache'] = self.oid_cache
+            self.request.session['oid_cache'] = snapshot
             self.request.session['basic_info_read_time'] = self.basic_info_read_time
             self.request.session['basic_info_duration'] = self.basic_info_duration
+            self.request.session['cache_time'] = self.cache_time
+            self.request.session['boot_time'] = self.boot_time
+            self.request.session['change_counters'] = self.change_counter_values
             self.request.session['hwinfo_needed'] = self.hwinfo_needed
             self.request.session['mib_timing'] = self.mib_timing
 
@@ -593,7 +1131,7 @@ class SnmpConnector(EasySNMP):
             # only happens if running in CLI or tasks
             # dprint("_set_http_session_cache() called but NO http.request found!")
 
-    def _get_http_session_cache(self):
+    def _get_http_session_cache(self, max_age=None):
         """
         Read the snmp switch data from the http session,
         return True is found, False otherwize.
@@ -602,22 +1140,32 @@ class SnmpConnector(EasySNMP):
             switch_id = self.request.session['switch_id']
             if switch_id == self.switch.id:
                 # Session for same switch - read it
+                self.save_needed = self.get_save_needed()
+                if 'oid_cache' in self.request.session.keys() and \
+                   not self._cache_is_fresh(self.request.session.get('basic_info_read_time', 0),
+                                            self.request.session.get('cache_time', 0), max_age):
+                    # too old for this view, or someone changed the switch. Read it again.
+                    clear_session_oid_cache(self.request)
+                    return False
                 if 'hwinfo_needed' in self.request.session.keys():
                     self.hwinfo_needed = self.request.session['hwinfo_needed']
                 if 'mib_timing' in self.request.session.keys():
                     self.mib_timing = self.request.session['mib_timing']
-                self.save_needed = self.get_save_needed()
                 if 'oid_cache' in self.request.session.keys():
-                    self.oid_cache = self.request.session['oid_cache']
-                    # need to update the sysUptime value first, before reading the cache:
-                    self._get_sys_uptime()
-                    # now parse the cache:
-                    self._parse_oid_cache()
-                    self.cached_oid_data = True
                     if 'basic_info_read_time' in self.request.session.keys():
                         self.basic_info_read_time = self.request.session['basic_info_read_time']
                     if 'basic_info_duration' in self.request.session.keys():
                         self.basic_info_duration = self.request.session['basic_info_duration']
+                    if 'cache_time' in self.request.session.keys():
+                        self.cache_time = self.request.session['cache_time']
+                    if 'boot_time' in self.request.session.keys():
+                        self.boot_time = self.request.session['boot_time']
+                    if 'change_counters' in self.request.session.keys():
+                        self.change_counter_values = self.request.session['change_counters']
+                    if self._load_oid_cache(self.request.session['oid_cache'], max_age) < 0:
+                        # the switch changed too much, read it again.
+                        clear_session_oid_cache(self.request)
+                        return False
                     return True
                 else:
                     # this should "never" happen!
@@ -631,6 +1179,184 @@ class SnmpConnector(EasySNMP):
 
         return False
 
+    def _set_switch_cache(self, snapshot=False):
+        """
+        Store the snmp switch data in the switch cache shared by all users and tasks.
+        The data expires settings.SWITCH_CACHE_TIMEOUT seconds after it was read from the switch.
+        snapshot: the oid cache snapshot, if already created.
+        """
+        if not settings.SWITCH_CACHE_TIMEOUT or not self.basic_info_read_time:
+            return
+        timeout = int(self.basic_info_read_time + settings.SWITCH_CACHE_TIMEOUT - time.time())
+        if timeout > 0:
+            set_switch_cache(self.switch.id, {
+                'oid_cache': snapshot if snapshot else self._get_oid_cache_snapshot(),
+                'basic_info_read_time': self.basic_info_read_time,
+                'basic_info_duration': self.basic_info_duration,
+                'cache_time': self.cache_time,
+                'boot_time': self.boot_time,
+                'change_counters': self.change_counter_values,
+                'hwinfo_needed': self.hwinfo_needed,
+                'mib_timing': self.mib_timing,
+            }, timeout)
+
+    def _get_switch_cache(self, max_age=None):
+        """
+        Read the snmp switch data from the switch cache shared by all users and tasks,
+        return True if found, False otherwise.
+        """
+        data = get_switch_cache(self.switch.id)
+        if not data or not self._cache_is_fresh(data['basic_info_read_time'], data['cache_time'], max_age):
+            return False
+        dprint("Switch data found in switch cache")
+        self.basic_info_read_time = data['basic_info_read_time']
+        self.basic_info_duration = data['basic_info_duration']
+        self.cache_time = data['cache_time']
+        self.boot_time = data.get('boot_time', 0)
+        self.change_counter_values = data.get('change_counters', {})
+        self.hwinfo_needed = data['hwinfo_needed']
+        self.mib_timing = data['mib_timing']
+        retval = self._load_oid_cache(data['oid_cache'], max_age)
+        if retval < 0:
+            return False
+        if retval == 0:
+            # keep a copy in the session of this user
+            self._set_http_session_cache(switch_cache=False)
+        return True
+
+    def _load_oid_cache(self, snapshot, max_age=None):
+        """
+        Load and parse cached oid data. With settings.SNMP_INCREMENTAL_REFRESH, the switch is checked
+        for changes first, and changed parts are read again, see _refresh_oid_cache().
+        Returns -1 if the switch needs to be read again, 1 if the cached data was updated and stored,
+        or 0 if the cached data is used as is.
+        """
+        self._set_oid_cache_snapshot(snapshot)
+        if settings.SNMP_INCREMENTAL_REFRESH:
+            too_old = max_age is not None and time.time() - self.basic_info_read_time > max_age
+            retval = self._refresh_oid_cache(too_old)
+            if retval < 0:
+                self.oid_cache = {}
+                self._oid_cache_runs = False
+                self.hwinfo_needed = True
+                return retval
+        else:
+            retval = 0
+            # need to update the sysUptime value first, before reading the cache:
+            self._get_sys_uptime()
+        # now parse the cache:
+        self._parse_oid_cache()
+        self.cached_oid_data = True
+        if retval > 0:
+            self._set_http_session_cache()
+        return retval
+
+    def _get_change_counters(self):
+        """
+        Read sysUpTime and the values in 'change_counters', in a single request.
+        Returns a tuple of (error_status, sysUpTime value, list of counter values)
+        """
+        (error_status, values) = self._get_multiple([sysUpTime] + [oid for (oid, changed) in self.change_counters])
+        if error_status:
+            return (True, None, None)
+        return (False, values[0], values[1:])
+
+    def _store_change_counters(self, uptime, counters):
+        """
+        Keep sysUpTime in the oid cache, and the change counter values in 'change_counter_values',
+        to compare with the next time. The counters are not put in the oid cache, as they would then be
+        parsed with the cached data, e.g. dot1qNumVlans is not the vlan count on all switches.
+        """
+        if uptime is not None:
+            self.oid_cache[sysUpTime] = uptime
+            self.boot_time = time.time() - int(uptime) / 100
+        self.change_counter_values = {oid: value for ((oid, changed), value) in zip(self.change_counters, counters)}
+
+    def _refresh_oid_cache(self, refresh_state=False):
+        """
+        Check the switch for changes since the loaded cache snapshot was read, with a single request
+        for sysUpTime and the 'change_counters'. If the switch rebooted, or interfaces were added or removed,
+        the cache cannot be used. If vlans were added or removed, the 'vlan_branches' are read again.
+        If refresh_state is True, the interface state in 'refresh_branches' is read again as well.
+        If the switch cannot be checked, the cached data is only used if refresh_state is False.
+        Returns -1 if the switch needs to be read again, 1 if the cache was updated, 0 if unchanged.
+        """
+        (error_status, uptime, counters) = self._get_change_counters()
+        if error_status:
+            if refresh_state:
+                self._add_warning("Cannot check the switch for changes, and the cached data is too old. Reading the switch again.")
+                return -1
+            self._add_warning("Cannot check the switch for changes, showing cached data!")
+            return 0
+        if uptime is not None and self.boot_time:
+            # allow for some drift between our clock and the switch ticks:
+            if time.time() - int(uptime) / 100 > self.boot_time + 60:
+                dprint("Switch rebooted since data was cached")
+                return -1
+        changed = [changed for ((oid, changed), value) in zip(self.change_counters, counters)
+                   if value != self.change_counter_values.get(oid)]
+        if 'interfaces' in changed:
+            dprint("Interfaces changed since data was cached")
+            return -1
+        branch_names = []
+        if 'vlans' in changed:
+            dprint("Vlans changed since data was cached")
+            branch_names += self.vlan_branches
+        if refresh_state:
+            branch_names += self.refresh_branches
+        retval = 0
+        if branch_names:
+            if self._refresh_runs(branch_names) < 0:
+                return -1
+            if refresh_state:
+                self.basic_info_read_time = time.time()
+            retval = 1
+        self._store_change_counters(uptime, counters)
+        return retval
+
+    def _refresh_runs(self, branch_names):
+        """
+        Walk the given branches (names, or tuples of table column names) again, without parsing,
+        and replace their data in the loaded cache snapshot runs, in the same place. So the
+        data is parsed in the same order as when the switch was read the first time.
+        Returns -1 on error, 1 on success.
+        """
+        walked = {}
+
+        def collect(oid, value):
+            walked[oid] = value
+            return False    # do not cache, we put the data in the snapshot runs
+
+        self._prefetch_branches(branch_names)
+        for branch_name in branch_names:
+            walked.clear()
+            if isinstance(branch_name, tuple):
+                retval = self._get_table_by_names(branch_name, False, collect)
+                column_names = branch_name
+            else:
+                retval = self._get_branch_by_name(branch_name, False, collect)
+                column_names = (branch_name, )
+            if retval == -1:
+                self._stop_prefetch()
+                return -1
+            new_runs = oid_cache_to_snapshot(walked, self.oid_dispatcher)['runs']
+            branches = [snmp_mib_variables[name] for name in column_names]
+            position = -1
+            runs = []
+            for run in self._oid_cache_runs:
+                if run[0] and any(run[0] == branch or run[0].startswith(f"{branch}.") for branch in branches):
+                    if position < 0:
+                        position = len(runs)
+                else:
+                    runs.append(run)
+            if position < 0:
+                position = len(runs)
+            runs[position:position] = new_runs
+            self._oid_cache_runs = runs
+        self._stop_prefetch()
+        self.oid_cache = runs_to_oid_cache(self._oid_cache_runs)
+        return 1
+
     def set_save_needed(self, value=True):
         """
         Set a flag that this switch needs the config saved
@@ -663,12 +1389,41 @@ class SnmpConnector(EasySNMP):
         else:
             return False
 
+    def _get_oid_cache_snapshot(self):
+        """
+        Return the oid cache in the compact snapshot format, to store in the session or switch cache.
+        See switches/connect/snapshot.py
+        """
+        return oid_cache_to_snapshot(self.oid_cache, self.oid_dispatcher, settings.SWITCH_CACHE_COMPRESS)
+
+    def _set_oid_cache_snapshot(self, snapshot):
+        """
+        Load the oid cache from a snapshot, or from an old style oid dictionary.
+        The snapshot runs are kept for _parse_oid_cache()
+        """
+        self._oid_cache_runs = snapshot_to_runs(snapshot)
+        self.oid_cache = runs_to_oid_cache(self._oid_cache_runs)
+
     def _parse_oid_cache(self):
         """
         Parse all stored cached OID data and re-create Interface() data
-        """
-        for oid, val in self.oid_cache.items():
-            self._parse_oid(str(oid), val)
+        If loaded from a snapshot, each run of OIDs in a MIB branch goes straight to the parser
+        for that branch, without looking up the branch of every OID.
+        """
+        if self._oid_cache_runs:
+            for (branch, oid_ends, values) in self._oid_cache_runs:
+                handler = self.oid_dispatcher.handlers.get(branch, False) if branch else False
+                if handler:
+                    for (oid_end, val) in zip(oid_ends, values):
+                        handler(self, str(oid_end), val)
+                else:
+                    prefix = f"{branch}." if branch else ''
+                    for (oid_end, val) in zip(oid_ends, values):
+                        self._parse_oid(f"{prefix}{oid_end}", val)
+            self._oid_cache_runs = False
+        else:
+            for oid, val in self.oid_cache.items():
+                self._parse_oid(str(oid), val)
         # any other (vendor) post-processing
         self._parse_oid_cache_post_processing()
         # we parse the system info separately
@@ -676,6 +1431,7 @@ class SnmpConnector(EasySNMP):
         # check if we can manage vlans on this device:
         self.vlan_change_implemented = self.can_change_interface_vlan()
         # and also map the PoE port data to the interfaces
+        self._clear_interface_name_index()
         self._map_poe_port_entries_to_interface()
         # set the permissions to the interfaces:
         self._set_interfaces_permissions()
@@ -694,11 +1450,8 @@ class SnmpConnector(EasySNMP):
         Also map from SNMP data type to Python data type we can handle
         EasySNMP returns everything as a Python str() object!
         """
-        dprint("\n_parse_oid_and_cache()")
-        dprint(f"HANDLING OID: {str(oid)}")
-        dprint(f" value type = {str(type(value))}")
-        dprint(f"  snmp_type = {snmp_type}")
-        dprint(f"     length = {len(value)}")
+        if trace.enabled:
+            dprint(f"\n_parse_oid_and_cache()\nHANDLING OID: {oid}\n value type = {type(value)}\n  snmp_type = {snmp_type}\n     length = {len(value)}")
         # change some types, and pass
         # pysnmp types:
         if ('DisplayString' in snmp_type):
@@ -742,556 +1495,547 @@ class SnmpConnector(EasySNMP):
         Parse a single OID with data returned from a switch through some "get" or "getbulk" function
         Will return True if we have parse this, and False if not.
         This will be used upstream to cache or not cache this OID.
-        THIS NEEDS WORK TO IMPROVE PERFORMANCE !!!
+        The MIB branch is found with a single lookup in the class OidDispatcher(),
+        which calls the _parse_xxx() method registered in 'oid_handlers' for that branch.
         Returns True if we parse the OID and we should cache it!
         """
-        dprint(f"Base _parse_oid() {str(oid)}")
-        # SYS MIB is read, we only cache it
-        oid_end = oid_in_branch(system, oid)
-        if oid_end:
-            # SYSTEM MIB entry, caching only
-            return True
+        trace("Base _parse_oid() {}", oid)
+        (handler, oid_end) = self.oid_dispatcher.lookup(oid)
+        if handler:
+            return handler(self, oid_end, val)
+        # we did not parse this. This can happen with Bulk Walks...
+        return False
 
-        oid_end = oid_in_branch(ifIndex, oid)
-        if oid_end:
-            # ifIndex branch is special, the "val" is the index, not the oid ending!
-            # create new interface object and store
-            self.interfaces[int(val)] = Interface(int(val))
-            return True
+    #
+    # The parsers below are called from _parse_oid(), for the MIB branch they are registered for in
+    # 'oid_handlers'. They are called with the OID ending after the branch, and the value.
+    # They return True if the OID was parsed and needs to be cached.
+    #
+    def _parse_system(self, oid_end, val):
+        """
+        SYSTEM MIB entry, caching only
+        """
+        return True
 
-        # this is the old ifDescr, superceded by the IF-MIB name
-        if_index = int(oid_in_branch(ifDescr, oid))
-        if if_index:
-            if if_index in self.interfaces.keys():
-                # self.interfaces[if_index].ifDescr = str(val)
-                # set new 'name'. Latter will later be overwritten with ifName bulkwalk
-                self.interfaces[if_index].name = str(val)
-            return True
+    def _parse_if_index(self, oid_end, val):
+        """
+        ifIndex branch is special, the "val" is the index, not the oid ending!
+        """
+        # create new interface object and store
+        self.interfaces[int(val)] = Interface(int(val))
+        return True
 
-        if_index = int(oid_in_branch(ifType, oid))
-        if if_index:
-            val = int(val)
-            if if_index in self.interfaces.keys():
-                self.interfaces[if_index].type = val
-                if val != IF_TYPE_ETHERNET:
-                    # non-Ethernet interfaces are NOT manageable, no matter who
-                    self.interfaces[if_index].manageable = False
-                    self.interfaces[if_index].unmanage_reason = "Access denied: not an Ethernet interface!"
-            return True
+    def _parse_if_descr(self, oid_end, val):
+        """
+        this is the old ifDescr, superceded by the IF-MIB name
+        """
+        if_index = int(oid_end)
+        if if_index in self.interfaces.keys():
+            # self.interfaces[if_index].ifDescr = str(val)
+            # set new 'name'. Latter will later be overwritten with ifName bulkwalk
+            self.interfaces[if_index].name = str(val)
+        return True
 
-        if_index = int(oid_in_branch(ifMtu, oid))
-        if if_index:
-            val = int(val)
-            if if_index in self.interfaces.keys():
-                self.interfaces[if_index].mtu = val
-            return True
+    def _parse_if_type(self, oid_end, val):
+        if_index = int(oid_end)
+        val = int(val)
+        if if_index in self.interfaces.keys():
+            self.interfaces[if_index].type = val
+            if val != IF_TYPE_ETHERNET:
+                # non-Ethernet interfaces are NOT manageable, no matter who
+                self.interfaces[if_index].manageable = False
+                self.interfaces[if_index].unmanage_reason = "Access denied: not an Ethernet interface!"
+        return True
 
-        # the old speed, but really we want HCSpeed from IF-MIB, see below
-        if_index = int(oid_in_branch(ifSpeed, oid))
-        if if_index:
-            # save this in 1Mbps, as per IF-MIB hcspeed
-            if if_index in self.interfaces.keys():
-                self.interfaces[if_index].hc_speed = int(val) / 1000000
-            return True
+    def _parse_if_mtu(self, oid_end, val):
+        if_index = int(oid_end)
+        val = int(val)
+        if if_index in self.interfaces.keys():
+            self.interfaces[if_index].mtu = val
+        return True
 
-        # do we care about this one?
-        if_index = int(oid_in_branch(ifPhysAddress, oid))
-        if if_index:
-            if if_index in self.interfaces.keys():
-                self.interfaces[if_index].phys_addr = val
-            return True
+    def _parse_if_speed(self, oid_end, val):
+        """
+        the old speed, but really we want HCSpeed from IF-MIB, see _parse_if_high_speed()
+        """
+        if_index = int(oid_end)
+        # save this in 1Mbps, as per IF-MIB hcspeed
+        if if_index in self.interfaces.keys():
+            self.interfaces[if_index].hc_speed = int(val) / 1000000
+        return True
 
-        if_index = int(oid_in_branch(ifAdminStatus, oid))
-        if if_index:
-            if if_index in self.interfaces.keys():
-                self.interfaces[if_index].admin_status = int(val)
-            return True
+    def _parse_if_phys_address(self, oid_end, val):
+        # do we care about this one?
+        if_index = int(oid_end)
+        if if_index in self.interfaces.keys():
+            self.interfaces[if_index].phys_addr = val
+        return True
 
-        if_index = int(oid_in_branch(ifOperStatus, oid))
-        if if_index:
-            if if_index in self.interfaces.keys():
-                self.interfaces[if_index].oper_status = int(val)
-            return True
+    def _parse_if_admin_status(self, oid_end, val):
+        if_index = int(oid_end)
+        if if_index in self.interfaces.keys():
+            self.interfaces[if_index].admin_status = int(val)
+        return True
 
-        """
-        if_index = int(oid_in_branch(IF_LAST_CHANGE, oid))
-        if if_index:
-            if if_index in self.interfaces.keys():
-                self.interfaces[if_index].last_change = int(val)
-            return True
-        """
+    def _parse_if_oper_status(self, oid_end, val):
+        if_index = int(oid_end)
+        if if_index in self.interfaces.keys():
+            self.interfaces[if_index].oper_status = int(val)
+        return True
 
-        if_index = int(oid_in_branch(ifName, oid))
-        if if_index:
-            if if_index in self.interfaces.keys():
-                self.interfaces[if_index].name = str(val)
-            return True
+    """
+    def _parse_if_last_change(self, oid_end, val):
+        if_index = int(oid_end)
+        if if_index in self.interfaces.keys():
+            self.interfaces[if_index].last_change = int(val)
+        return True
+    """
 
-        if_index = int(oid_in_branch(ifAlias, oid))
-        if if_index:
-            if if_index in self.interfaces.keys():
-                self.interfaces[if_index].alias = str(val)
-            return True
+    def _parse_if_name(self, oid_end, val):
+        if_index = int(oid_end)
+        if if_index in self.interfaces.keys():
+            self.interfaces[if_index].name = str(val)
+        return True
 
-        # ifMIB high speed counter:
-        if_index = int(oid_in_branch(ifHighSpeed, oid))
-        if if_index:
-            if not self.switch.snmp_capabilities & CAPABILITIES_IF_MIB:
-                self.switch.snmp_capabilities |= CAPABILITIES_IF_MIB
-                self.switch.save()
-            if if_index in self.interfaces.keys():
-                self.interfaces[if_index].hc_speed = int(val)
-            return True
+    def _parse_if_alias(self, oid_end, val):
+        if_index = int(oid_end)
+        if if_index in self.interfaces.keys():
+            self.interfaces[if_index].alias = str(val)
+        return True
 
+    def _parse_if_high_speed(self, oid_end, val):
         """
-        if_index = int(oid_in_branch(ifConnectorPresent, oid))
-        if if_index:
-            val = int(val)
-            if if_index in self.interfaces.keys():
-                if val == SNMP_TRUE:
-                    self.interfaces[if_index].has_connector = True
-                else:
-                    self.interfaces[if_index].has_connector = False
-                    self.interfaces[if_index].manageable = False
-            return True
+        ifMIB high speed counter
         """
+        if_index = int(oid_end)
+        self._add_capability(CAPABILITIES_IF_MIB)
+        if if_index in self.interfaces.keys():
+            self.interfaces[if_index].hc_speed = int(val)
+        return True
 
-        # TO ADD:
-        # ifStackHigherLayer = '.1.3.6.1.2.1.31.1.2.1.1'
-        # ifStackLowerLayer =  '.1.3.6.1.2.1.31.1.2.1.2'
-        # ifStackStatus =      '.1.3.6.1.2.1.31.1.2.1.3'
-
-        #
-        # 802.1Q / VLAN related
-        #
+    """
+    def _parse_if_connector_present(self, oid_end, val):
+        if_index = int(oid_end)
+        val = int(val)
+        if if_index in self.interfaces.keys():
+            if val == SNMP_TRUE:
+                self.interfaces[if_index].has_connector = True
+            else:
+                self.interfaces[if_index].has_connector = False
+                self.interfaces[if_index].manageable = False
+        return True
+    """
 
-        # these are part of "dot1qBase":
-        sub_oid = oid_in_branch(dot1qNumVlans, oid)
-        if sub_oid:
-            self.system.vlan_count = int(val)
-            return True
+    # TO ADD:
+    # ifStackHigherLayer = '.1.3.6.1.2.1.31.1.2.1.1'
+    # ifStackLowerLayer =  '.1.3.6.1.2.1.31.1.2.1.2'
+    # ifStackStatus =      '.1.3.6.1.2.1.31.1.2.1.3'
 
-        sub_oid = oid_in_branch(dot1qGvrpStatus, oid)
-        if sub_oid:
-            if int(val) == GVRP_ENABLED:
-                self.system.gvrp_enabled = True
-            return True
+    #
+    # 802.1Q / VLAN related
+    #
 
-        sub_oid = oid_in_branch(ieee8021QBridgeMvrpEnabledStatus, oid)
-        if sub_oid:
-            if int(val) == GVRP_ENABLED:
-                self.system.gvrp_enabled = True
-            return True
+    # these are part of "dot1qBase":
+    def _parse_dot1q_num_vlans(self, oid_end, val):
+        self.system.vlan_count = int(val)
+        return True
 
-        # the per-switchport GVRP setting:
-        port_id = int(oid_in_branch(dot1qPortGvrpStatus, oid))
-        if port_id:
-            if_index = self._get_if_index_from_port_id(port_id)
-            if if_index in self.interfaces.keys() and int(val) == GVRP_ENABLED:
-                self.interfaces[if_index].gvrp_enabled = True
-            return True
+    def _parse_dot1q_gvrp_status(self, oid_end, val):
+        if int(val) == GVRP_ENABLED:
+            self.system.gvrp_enabled = True
+        return True
 
-        # List of all egress ports of a VLAN (tagged + untagged) as a hexstring
-        # dot1qVlanCurrentEgressPorts
-        sub_oid = oid_in_branch(dot1qVlanCurrentEgressPorts, oid)
-        if sub_oid:
-            (time_val, v) = sub_oid.split('.')
-            vlan_id = int(v)
-            if vlan_id not in self.vlans.keys():
-                # not likely, we should know vlan by now, but just in case!
-                self.vlans[vlan_id] = Vlan(vlan_id)
-            self.vlans[vlan_id].current_egress_portlist.from_unicode(val)
-            offset = 0
-            for byte in val:
-                byte = ord(byte)
-                # which bits are set? A hack but it works!
-                # note that the bits are actually in system order,
-                # ie. bit 1 is first bit in stream, i.e. HIGH order bit!
-                if(byte & 128):
-                    port_id = (offset * 8) + 1
-                    self._add_vlan_to_interface(port_id, vlan_id)
-                if(byte & 64):
-                    port_id = (offset * 8) + 2
-                    self._add_vlan_to_interface(port_id, vlan_id)
-                if(byte & 32):
-                    port_id = (offset * 8) + 3
-                    self._add_vlan_to_interface(port_id, vlan_id)
-                if(byte & 16):
-                    port_id = (offset * 8) + 4
-                    self._add_vlan_to_interface(port_id, vlan_id)
-                if(byte & 8):
-                    port_id = (offset * 8) + 5
-                    self._add_vlan_to_interface(port_id, vlan_id)
-                if(byte & 4):
-                    port_id = (offset * 8) + 6
-                    self._add_vlan_to_interface(port_id, vlan_id)
-                if(byte & 2):
-                    port_id = (offset * 8) + 7
-                    self._add_vlan_to_interface(port_id, vlan_id)
-                if(byte & 1):
-                    port_id = (offset * 8) + 8
-                    self._add_vlan_to_interface(port_id, vlan_id)
-                offset += 1
-            return True
+    def _parse_mvrp_enabled_status(self, oid_end, val):
+        if int(val) == GVRP_ENABLED:
+            self.system.gvrp_enabled = True
+        return True
 
-        # this is the bitmap of current untagged ports in vlans (see also above dot1qVlanStaticEgressPorts)
-        sub_oid = oid_in_branch(dot1qVlanCurrentUntaggedPorts, oid)
-        if sub_oid:
-            (dummy, v) = sub_oid.split('.')
-            vlan_id = int(v)
-            if vlan_id not in self.vlans.keys():
-                # not likely, but just in case:
-                self.vlans[vlan_id] = Vlan(vlan_id)
-            # store bitmap for later use
-            self.vlans[vlan_id].untagged_ports_bitmap = val
-            return True
+    def _parse_dot1q_port_gvrp_status(self, oid_end, val):
+        """
+        the per-switchport GVRP setting
+        """
+        port_id = int(oid_end)
+        if_index = self._get_if_index_from_port_id(port_id)
+        if if_index in self.interfaces.keys() and int(val) == GVRP_ENABLED:
+            self.interfaces[if_index].gvrp_enabled = True
+        return True
 
-        # see if this is static or dynamic vlan
-        sub_oid = oid_in_branch(dot1qVlanStatus, oid)
-        if sub_oid:
-            (dummy, v) = sub_oid.split('.')
-            vlan_id = int(v)
-            status = int(val)
-            if vlan_id in self.vlans.keys():
-                self.vlans[vlan_id].status = status
-            else:
-                # unlikely to happen, we should know vlan by now!
-                self.vlans[vlan_id] = Vlan(vlan_id)
-                self.vlans[vlan_id].status = int(val)
-            return True
+    def _parse_dot1q_vlan_current_egress_ports(self, oid_end, val):
+        """
+        List of all egress ports of a VLAN (tagged + untagged) as a hexstring
+        dot1qVlanCurrentEgressPorts
+        """
+        (time_val, v) = oid_end.split('.')
+        vlan_id = int(v)
+        if vlan_id not in self.vlans.keys():
+            # not likely, we should know vlan by now, but just in case!
+            self.vlans[vlan_id] = Vlan(vlan_id)
+        portlist = self.vlans[vlan_id].current_egress_portlist
+        portlist.from_unicode(val)
+        # note that the bits are actually in system order,
+        # ie. bit 1 is first bit in stream, i.e. HIGH order bit!
+        for port_id in portlist.ports():
+            self._add_vlan_to_interface(port_id, vlan_id)
+        return True
 
-        # The VLAN name
-        vlan_id = int(oid_in_branch(dot1qVlanStaticName, oid))
-        if vlan_id:
-            # not yet sure how to handle this
-            if vlan_id in self.vlans.keys():
-                self.vlans[vlan_id].name = str(val)
-            else:
-                # vlan not found yet, create it
-                self.vlans[vlan_id] = Vlan(vlan_id)
-                self.vlans[vlan_id].name = str(val)
-            return True
+    def _parse_dot1q_vlan_current_untagged_ports(self, oid_end, val):
+        """
+        this is the bitmap of current untagged ports in vlans (see also above dot1qVlanStaticEgressPorts)
+        """
+        (dummy, v) = oid_end.split('.')
+        vlan_id = int(v)
+        if vlan_id not in self.vlans.keys():
+            # not likely, but just in case:
+            self.vlans[vlan_id] = Vlan(vlan_id)
+        # store bitmap for later use
+        self.vlans[vlan_id].untagged_ports_bitmap = val
+        return True
 
-        # List of all static egress ports of a VLAN (tagged + untagged) as a hexstring
-        # dot1qVlanStaticEgressPorts - READ-WRITE variable
-        # we read and store this so we have it ready to WRITE by setting a bit value, when we update the vlan on a port!
-        vlan_id = int(oid_in_branch(dot1qVlanStaticEgressPorts, oid))
-        if vlan_id:
-            if vlan_id not in self.vlans.keys():
-                # not likely, we should know by now, but just in case.
-                self.vlans[vlan_id] = Vlan(vlan_id)
-            # store it!
-            self.vlans[vlan_id].static_egress_portlist.from_unicode(val)
-            return True
+    def _parse_dot1q_vlan_status(self, oid_end, val):
+        """
+        see if this is static or dynamic vlan
+        """
+        (dummy, v) = oid_end.split('.')
+        vlan_id = int(v)
+        status = int(val)
+        if vlan_id in self.vlans.keys():
+            self.vlans[vlan_id].status = status
+        else:
+            # unlikely to happen, we should know vlan by now!
+            self.vlans[vlan_id] = Vlan(vlan_id, status=status)
+        return True
 
+    def _parse_dot1q_vlan_static_name(self, oid_end, val):
         """
-        # this is the bitmap of static untagged ports in vlans (see also above dot1qVlanCurrentEgressPorts)
-        vlan_id = int(oid_in_branch(dot1qVlanStaticUntaggedPorts, oid))
-        if vlan_id:
-            if vlan_id not in self.vlans.keys():
-                # unlikely, we should know by now, but just in case
-                self.vlans[vlan_id] = Vlan(vlan_id)
-            # store for later use:
-            # self.vlans[vlan_id].untagged_ports_bitmap = val
-            return True
+        The VLAN name
         """
+        vlan_id = int(oid_end)
+        # not yet sure how to handle this
+        if vlan_id in self.vlans.keys():
+            self.vlans[vlan_id].name = str(val)
+        else:
+            # vlan not found yet, create it
+            self.vlans[vlan_id] = Vlan(vlan_id, name=str(val))
+        return True
 
-        # List of all available vlans on this switch as by the command "show vlans"
-        vlan_id = int(oid_in_branch(dot1qVlanStaticRowStatus, oid))
-        if vlan_id:
-            if not self.switch.snmp_capabilities & CAPABILITIES_QBRIDGE_MIB:
-                self.switch.snmp_capabilities |= CAPABILITIES_QBRIDGE_MIB
-                self.switch.save()
-            # for now, just add to the dictionary,
-            # we will fill in the initial name below at "VLAN_NAME"
-            if vlan_id in self.vlans.keys():
-                # currently we don't parse the status, so nothing to do here
-                return True
-            # else add entry, should never happen!
+    def _parse_dot1q_vlan_static_egress_ports(self, oid_end, val):
+        """
+        List of all static egress ports of a VLAN (tagged + untagged) as a hexstring
+        dot1qVlanStaticEgressPorts - READ-WRITE variable
+        we read and store this so we have it ready to WRITE by setting a bit value, when we update the vlan on a port!
+        """
+        vlan_id = int(oid_end)
+        if vlan_id not in self.vlans.keys():
+            # not likely, we should know by now, but just in case.
             self.vlans[vlan_id] = Vlan(vlan_id)
-            # assume vlan_id = vlan_index = fdb_index, unless we learn otherwize
-            self.vlan_id_by_index[vlan_id] = vlan_id
-            self.dot1tp_fdb_to_vlan_index[vlan_id] = vlan_id
-            return True
-
-        # The VLAN ID assigned to ***untagged*** frames - dot1qPvid, indexed by dot1dBasePort
-        # ie. lookup ifIndex with _get_if_index_from_port_id(port_id)
-        # IMPORTANT: IF THE INTERFACE IS TAGGED, this value is 1, and typically incorrect!!!
-        port_id = int(oid_in_branch(dot1qPvid, oid))
-        if port_id:
-            if_index = self._get_if_index_from_port_id(port_id)
-            # not yet sure how to handle this
-            untagged_vlan = int(val)
-            if if_index in self.interfaces.keys():
-                if untagged_vlan in self.vlans.keys():
-                    self.interfaces[if_index].untagged_vlan = untagged_vlan
-                else:
-                    # vlan not defined on switch!
-                    self.interfaces[if_index].disabled = True
-                    self.interfaces[if_index].disabled_reason = f"Untagged vlan {untagged_vlan} is NOT defined on switch"
-                    warning = f"Undefined vlan {untagged_vlan} on {self.interfaces[if_index].name}"
-                    self._add_warning(warning)
-                    # log this as well
-                    log = Log(group=self.group,
-                              switch=self.switch,
-                              ip_address=get_remote_ip(self.request),
-                              if_index=if_index,
-                              type=LOG_TYPE_ERROR,
-                              action=LOG_UNDEFINED_VLAN,
-                              description=f"ERROR: {warning}")
-                    if self.request:
-                        log.user = self.request.user
-                    log.save()
-                    # not sure what to do here
-            return True
+        # store it!
+        self.vlans[vlan_id].static_egress_portlist.from_unicode(val)
+        return True
 
-        # The .0 is the timefilter that we set to 0 to (hopefully) deactivate the filter
-        # The set of ports that are transmitting traffic for this VLAN as either tagged or untagged frames.
-        # CURRENT_VLAN_EGRESS_PORTS = QBRIDGENODES['dot1qVlanCurrentEgressPorts']['oid'] + '.0'
-        # NOTE: this is a READ-ONLY variable!
-
-        # Map the Q-BRIDGE port id to the MIB-II if_indexes.
-        # PortID=0 indicates known ethernet, but unknown port, i.e. ignore
-        port_id = int(oid_in_branch(dot1dBasePortIfIndex, oid))
-        if port_id:
-            # map port ID to interface ID
-            if_index = int(val)
-            if if_index in self.interfaces.keys():
-                self.qbridge_port_to_if_index[port_id] = if_index
-                # and map Interface() object back to port ID as well:
-                self.interfaces[if_index].port_id = port_id
-            # we parsed it, return true:
-            return True
+    """
+    def _parse_dot1q_vlan_static_untagged_ports(self, oid_end, val):
+        # this is the bitmap of static untagged ports in vlans (see also above dot1qVlanCurrentEgressPorts)
+        vlan_id = int(oid_end)
+        if vlan_id not in self.vlans.keys():
+            # unlikely, we should know by now, but just in case
+            self.vlans[vlan_id] = Vlan(vlan_id)
+        # store for later use:
+        # self.vlans[vlan_id].untagged_ports_bitmap = val
+        return True
+    """
 
+    def _parse_dot1q_vlan_static_row_status(self, oid_end, val):
         """
-        Handle the device IP addresses, e.g. interface ip, vlan ip, etc.
+        List of all available vlans on this switch as by the command "show vlans"
         """
-        ip = oid_in_branch(ipAdEntIfIndex, oid)
-        if ip:
-            if_index = int(val)
-            if if_index in self.interfaces.keys():
-                self.ip4_to_if_index[ip] = if_index  # for lookup of netmask below
-                self.interfaces[if_index].addresses_ip4[ip] = IP4Address(ip)
+        vlan_id = int(oid_end)
+        self._add_capability(CAPABILITIES_QBRIDGE_MIB)
+        # for now, just add to the dictionary,
+        # we will fill in the initial name below at "VLAN_NAME"
+        if vlan_id in self.vlans.keys():
+            # currently we don't parse the status, so nothing to do here
             return True
+        # else add entry, should never happen!
+        self.vlans[vlan_id] = Vlan(vlan_id)
+        # assume vlan_id = vlan_index = fdb_index, unless we learn otherwize
+        self.vlan_id_by_index[vlan_id] = vlan_id
+        self.dot1tp_fdb_to_vlan_index[vlan_id] = vlan_id
+        return True
 
-        ip = oid_in_branch(ipAdEntNetMask, oid)
-        if ip:
-            # depending on SNMP class, we either have a nice string (EasySNMP)
-            # or a 4-byte binary address (pysnmp)
-            if "pysnmp.proto.rfc1902.IpAddress" in str(type(val)):
-                # ipaddr = IpAddress('')
-                netmask = val.prettyOut(val)
+    def _parse_dot1q_pvid(self, oid_end, val):
+        """
+        The VLAN ID assigned to ***untagged*** frames - dot1qPvid, indexed by dot1dBasePort
+        ie. lookup ifIndex with _get_if_index_from_port_id(port_id)
+        IMPORTANT: IF THE INTERFACE IS TAGGED, this value is 1, and typically incorrect!!!
+        """
+        port_id = int(oid_end)
+        if_index = self._get_if_index_from_port_id(port_id)
+        # not yet sure how to handle this
+        untagged_vlan = int(val)
+        if if_index in self.interfaces.keys():
+            if untagged_vlan in self.vlans.keys():
+                self.interfaces[if_index].untagged_vlan = untagged_vlan
             else:
-                netmask = val
-            # we should have found the IP address already!
-            if ip in self.ip4_to_if_index.keys():
-                if_index = self.ip4_to_if_index[ip]
-                if if_index in self.interfaces.keys():
-                    # have we seen this IP on this interface (we should!)?
-                    if ip in self.interfaces[if_index].addresses_ip4.keys():
-                        ip_addr = self.interfaces[if_index].addresses_ip4[ip]
-                        ip_addr.set_netmask(netmask)
-                        self.interfaces[if_index].addresses_ip4[ip] = ip_addr  # save change!
-            return True
+                # vlan not defined on switch!
+                self.interfaces[if_index].disabled = True
+                self.interfaces[if_index].disabled_reason = f"Untagged vlan {untagged_vlan} is NOT defined on switch"
+                warning = f"Undefined vlan {untagged_vlan} on {self.interfaces[if_index].name}"
+                self._add_warning(warning)
+                # log this as well
+                log = Log(group=self.group,
+                          switch=self.switch,
+                          ip_address=get_remote_ip(self.request),
+                          if_index=if_index,
+                          type=LOG_TYPE_ERROR,
+                          action=LOG_UNDEFINED_VLAN,
+                          description=f"ERROR: {warning}")
+                if self.request:
+                    log.user = self.request.user
+                save_log(log)
+                # not sure what to do here
+        return True
 
+    # The .0 is the timefilter that we set to 0 to (hopefully) deactivate the filter
+    # The set of ports that are transmitting traffic for this VLAN as either tagged or untagged frames.
+    # CURRENT_VLAN_EGRESS_PORTS = QBRIDGENODES['dot1qVlanCurrentEgressPorts']['oid'] + '.0'
+    # NOTE: this is a READ-ONLY variable!
+
+    def _parse_dot1d_base_port_if_index(self, oid_end, val):
         """
-        ENTITY MIB, info about the device, eg stack or single unit, # of units, serials
-        and other interesting pieces
+        Map the Q-BRIDGE port id to the MIB-II if_indexes.
+        PortID=0 indicates known ethernet, but unknown port, i.e. ignore
         """
+        port_id = int(oid_end)
+        # map port ID to interface ID
+        if_index = int(val)
+        if if_index in self.interfaces.keys():
+            self.qbridge_port_to_if_index[port_id] = if_index
+            # and map Interface() object back to port ID as well:
+            self.interfaces[if_index].port_id = port_id
+        # we parsed it, return true:
+        return True
 
-        dev_id = int(oid_in_branch(entPhysicalClass, oid))
-        if dev_id:
-            dev_type = int(val)
-            if(dev_type == ENTITY_CLASS_STACK or dev_type == ENTITY_CLASS_CHASSIS or dev_type == ENTITY_CLASS_MODULE):
-                # save this info!
-                member = StackMember(dev_id, dev_type)
-                self.stack_members[dev_id] = member
-            return True
+    #
+    # Handle the device IP addresses, e.g. interface ip, vlan ip, etc.
+    #
+    def _parse_ip_ad_ent_if_index(self, oid_end, val):
+        ip = oid_end
+        if_index = int(val)
+        if if_index in self.interfaces.keys():
+            self.ip4_to_if_index[ip] = if_index  # for lookup of netmask below
+            self.interfaces[if_index].addresses_ip4[ip] = IP4Address(ip)
+        return True
 
-        dev_id = int(oid_in_branch(entPhysicalSerialNum, oid))
-        if dev_id:
-            serial = str(val)
-            if dev_id in self.stack_members.keys():
-                # save this info!
-                self.stack_members[dev_id].serial = serial
-            return True
+    def _parse_ip_ad_ent_net_mask(self, oid_end, val):
+        ip = oid_end
+        # depending on SNMP class, we either have a nice string (EasySNMP)
+        # or a 4-byte binary address (pysnmp)
+        if "pysnmp.proto.rfc1902.IpAddress" in str(type(val)):
+            # ipaddr = IpAddress('')
+            netmask = val.prettyOut(val)
+        else:
+            netmask = val
+        # we should have found the IP address already!
+        if ip in self.ip4_to_if_index.keys():
+            if_index = self.ip4_to_if_index[ip]
+            if if_index in self.interfaces.keys():
+                # have we seen this IP on this interface (we should!)?
+                if ip in self.interfaces[if_index].addresses_ip4.keys():
+                    ip_addr = self.interfaces[if_index].addresses_ip4[ip]
+                    ip_addr.set_netmask(netmask)
+                    self.interfaces[if_index].addresses_ip4[ip] = ip_addr  # save change!
+        return True
 
-        dev_id = int(oid_in_branch(entPhysicalSoftwareRev, oid))
-        if dev_id:
-            version = str(val)
-            if dev_id in self.stack_members.keys():
-                # save this info!
-                self.stack_members[dev_id].version = version
-            return True
+    #
+    # ENTITY MIB, info about the device, eg stack or single unit, # of units, serials
+    # and other interesting pieces
+    #
+    def _parse_ent_physical_class(self, oid_end, val):
+        dev_id = int(oid_end)
+        dev_type = int(val)
+        if(dev_type == ENTITY_CLASS_STACK or dev_type == ENTITY_CLASS_CHASSIS or dev_type == ENTITY_CLASS_MODULE):
+            # save this info!
+            member = StackMember(dev_id, dev_type)
+            self.stack_members[dev_id] = member
+        return True
 
-        dev_id = int(oid_in_branch(entPhysicalModelName, oid))
-        if dev_id:
-            model = str(val)
-            if dev_id in self.stack_members.keys():
-                # save this info!
-                self.stack_members[dev_id].model = model
-            return True
+    def _parse_ent_physical_serial_num(self, oid_end, val):
+        dev_id = int(oid_end)
+        serial = str(val)
+        if dev_id in self.stack_members.keys():
+            # save this info!
+            self.stack_members[dev_id].serial = serial
+        return True
+
+    def _parse_ent_physical_software_rev(self, oid_end, val):
+        dev_id = int(oid_end)
+        version = str(val)
+        if dev_id in self.stack_members.keys():
+            # save this info!
+            self.stack_members[dev_id].version = version
+        return True
+
+    def _parse_ent_physical_model_name(self, oid_end, val):
+        dev_id = int(oid_end)
+        model = str(val)
+        if dev_id in self.stack_members.keys():
+            # save this info!
+            self.stack_members[dev_id].model = model
+        return True
 
+    def _parse_syslog_msg_table_max_size(self, oid_end, val):
         """
         SYSLOG-MSG-MIB - mostly mean to define notification, but we can read the log size
-        """
-        sub_oid = oid_in_branch(syslogMsgTableMaxSize, oid)
-        if sub_oid:
-            # this is the max number of syslog messages stored.
-            self.syslog_max_msgs = int(val)
-            return True
-        """
         Note: the rest of the SYSLOG_MSG_MIB is meant to define OID's for sending
         SNMP traps with syslog messages, NOT to poll messages from snmp reads !!!
         """
+        # this is the max number of syslog messages stored.
+        self.syslog_max_msgs = int(val)
+        return True
 
-        """
-        PoE related entries:
-        the pethMainPseEntry table entries with device-level PoE info
-        the OID is <base><device-id>.1 = <value>,
-        where <device-id> is stack member number, vendor and device specific!
-        """
-
-        pse_id = int(oid_in_branch(pethMainPsePower, oid))
-        if pse_id:
-            self.system.poe_capable = True
-            self.system.poe_max_power += int(val)
-            # store data about individual PSE unit:
-            if pse_id not in self.system.poe_pse_devices.keys():
-                self.system.poe_pse_devices[pse_id] = PoePSE(pse_id)
+    #
+    # PoE related entries:
+    # the pethMainPseEntry table entries with device-level PoE info
+    # the OID is <base><device-id>.1 = <value>,
+    # where <device-id> is stack member number, vendor and device specific!
+    #
+    def _parse_peth_main_pse_power(self, oid_end, val):
+        pse_id = int(oid_end)
+        self.system.poe_capable = True
+        self.system.poe_max_power += int(val)
+        # store data about individual PSE unit:
+        if pse_id in self.system.poe_pse_devices.keys():
             # update max power
             self.system.poe_pse_devices[pse_id].max_power = int(val)
-            return True
+        else:
+            self.system.poe_pse_devices[pse_id] = PoePSE(pse_id, max_power=int(val))
+        return True
 
-        pse_id = int(oid_in_branch(pethMainPseOperStatus, oid))
-        if pse_id:
-            if not self.switch.snmp_capabilities & CAPABILITIES_POE_MIB:
-                self.switch.snmp_capabilities |= CAPABILITIES_POE_MIB
-                self.switch.save()
-            # not yet sure how to handle this, for now just read
-            self.system.poe_capable = True
-            self.system.poe_enabled = int(val)
-            # store data about individual PSE unit:
-            if pse_id not in self.system.poe_pse_devices.keys():
-                self.system.poe_pse_devices[pse_id] = PoePSE(pse_id)
+    def _parse_peth_main_pse_oper_status(self, oid_end, val):
+        pse_id = int(oid_end)
+        self._add_capability(CAPABILITIES_POE_MIB)
+        # not yet sure how to handle this, for now just read
+        self.system.poe_capable = True
+        self.system.poe_enabled = int(val)
+        # store data about individual PSE unit:
+        if pse_id in self.system.poe_pse_devices.keys():
             # update status
             self.system.poe_pse_devices[pse_id].status = int(val)
-            return True
+        else:
+            self.system.poe_pse_devices[pse_id] = PoePSE(pse_id, status=int(val))
+        return True
 
-        pse_id = int(oid_in_branch(pethMainPseConsumptionPower, oid))
-        if pse_id:
-            self.system.poe_capable = True
-            self.system.poe_power_consumed += int(val)
-            # store data about individual PSE unit:
-            if pse_id not in self.system.poe_pse_devices.keys():
-                self.system.poe_pse_devices[pse_id] = PoePSE(pse_id)
+    def _parse_peth_main_pse_consumption_power(self, oid_end, val):
+        pse_id = int(oid_end)
+        self.system.poe_capable = True
+        self.system.poe_power_consumed += int(val)
+        # store data about individual PSE unit:
+        if pse_id in self.system.poe_pse_devices.keys():
             # update max power
             self.system.poe_pse_devices[pse_id].power_consumed = int(val)
-            return True
+        else:
+            self.system.poe_pse_devices[pse_id] = PoePSE(pse_id, power_consumed=int(val))
+        return True
 
-        pse_id = int(oid_in_branch(pethMainPseUsageThreshold, oid))
-        if pse_id:
-            self.system.poe_capable = True
-            # store data about individual PSE unit:
-            if pse_id not in self.system.poe_pse_devices.keys():
-                self.system.poe_pse_devices[pse_id] = PoePSE(pse_id)
+    def _parse_peth_main_pse_usage_threshold(self, oid_end, val):
+        pse_id = int(oid_end)
+        self.system.poe_capable = True
+        # store data about individual PSE unit:
+        if pse_id in self.system.poe_pse_devices.keys():
             # update max power
             self.system.poe_pse_devices[pse_id].threshold = int(val)
-            return True
-
-        """
-        the pethPsePortEntry tables with port-level PoE info
-        OID is followed by PortEntry index (pe_index). This is typically
-        or module_num.port_num for modules switch chassis, or
-        device_id.port_num for stack members.
-        This gets mapped to an interface later on in
-        self._map_poe_port_entries_to_interface(), which is typically device specific
-        (i.e. implemented in the device-specific classes iin
-        vendor/cisco/snmp.py, vendor/comware/snmp.py, etc.)
-        """
-
-        pe_index = oid_in_branch(pethPsePortAdminEnable, oid)
-        if pe_index:
-            self.poe_port_entries[pe_index] = PoePort(pe_index, int(val))
-            return True
-
-        pe_index = oid_in_branch(pethPsePortDetectionStatus, oid)
-        if pe_index:
-            if pe_index in self.poe_port_entries.keys():
-                self.poe_port_entries[pe_index].detect_status = int(val)
-            return True
+        else:
+            self.system.poe_pse_devices[pse_id] = PoePSE(pse_id, threshold=int(val))
+        return True
 
-        """
-        These are currently not used:
-        pe_index = oid_in_branch(pethPsePortPowerPriority, oid)
-        if pe_index:
-            if pe_index in self.poe_port_entries.keys():
-                self.poe_port_entries[pe_index].priority = int(val)
-            return True
+    #
+    # the pethPsePortEntry tables with port-level PoE info
+    # OID is followed by PortEntry index (pe_index). This is typically
+    # or module_num.port_num for modules switch chassis, or
+    # device_id.port_num for stack members.
+    # This gets mapped to an interface later on in
+    # self._map_poe_port_entries_to_interface(), which is typically device specific
+    # (i.e. implemented in the device-specific classes iin
+    # vendor/cisco/snmp.py, vendor/comware/snmp.py, etc.)
+    #
+    def _parse_peth_pse_port_admin_enable(self, oid_end, val):
+        pe_index = oid_end
+        self.poe_port_entries[pe_index] = PoePort(pe_index, int(val))
+        return True
 
-        pe_index = oid_in_branch(pethPsePortType, oid)
-        if pe_index:
-            if pe_index in self.poe_port_entries.keys():
-                self.poe_port_entries[pe_index].description = str(val)
-            return True
-        """
+    def _parse_peth_pse_port_detection_status(self, oid_end, val):
+        pe_index = oid_end
+        if pe_index in self.poe_port_entries.keys():
+            self.poe_port_entries[pe_index].detect_status = int(val)
+        return True
 
-        #
-        # LACP MIB parsing
-        #
-        """
-        Parse a single OID with data returned from the LACP MIB
-        Will return True if we have parsed this, and False if not.
-        """
+    """
+    These are currently not used:
+    def _parse_peth_pse_port_power_priority(self, oid_end, val):
+        pe_index = oid_end
+        if pe_index in self.poe_port_entries.keys():
+            self.poe_port_entries[pe_index].priority = int(val)
+        return True
 
-        # this gets the aggregator interface admin key or "index"
-        aggr_if_index = int(oid_in_branch(dot3adAggActorAdminKey, oid))
-        if aggr_if_index:
-            # this interface is a aggregator!
-            if aggr_if_index in self.interfaces.keys():
-                self.interfaces[aggr_if_index].lacp_type = LACP_IF_TYPE_AGGREGATOR
-                self.interfaces[aggr_if_index].lacp_admin_key = int(val)
-                # some vendors (certain Cisco switches) set the IF-MIB::ifType to Virtual (53) instead of LAGG (161)
-                # hardcode to LAGG:
-                self.interfaces[aggr_if_index].type = IF_TYPE_LAGG
-            return True
+    def _parse_peth_pse_port_type(self, oid_end, val):
+        pe_index = oid_end
+        if pe_index in self.poe_port_entries.keys():
+            self.poe_port_entries[pe_index].description = str(val)
+        return True
+    """
 
-        # this get the member interfaces admin key ("index"), which maps back to the aggregator interface above!
-        member_if_index = int(oid_in_branch(dot3adAggPortActorAdminKey, oid))
-        if member_if_index:
-            # this interface is an lacp member!
-            if member_if_index in self.interfaces.keys():
-                # can we find an aggregate with this key value ?
-                lacp_key = int(val)
-                for lacp_index, iface in self.interfaces.items():
-                    if iface.lacp_type == LACP_IF_TYPE_AGGREGATOR and iface.lacp_admin_key == lacp_key:
-                        # the current interface is a member of this aggregate iface !
-                        self.interfaces[member_if_index].lacp_type = LACP_IF_TYPE_MEMBER
-                        self.interfaces[member_if_index].lacp_master_index = lacp_index
-                        self.interfaces[member_if_index].lacp_master_name = iface.name
-                        # add our name to the list of the aggregate interface
-                        self.interfaces[lacp_index].lacp_members[member_if_index] = self.interfaces[member_if_index].name
-            return True
+    #
+    # LACP MIB parsing
+    #
+    def _parse_dot3ad_agg_actor_admin_key(self, oid_end, val):
+        """
+        this gets the aggregator interface admin key or "index"
+        """
+        aggr_if_index = int(oid_end)
+        # this interface is a aggregator!
+        if aggr_if_index in self.interfaces.keys():
+            self.interfaces[aggr_if_index].lacp_type = LACP_IF_TYPE_AGGREGATOR
+            self.interfaces[aggr_if_index].lacp_admin_key = int(val)
+            # some vendors (certain Cisco switches) set the IF-MIB::ifType to Virtual (53) instead of LAGG (161)
+            # hardcode to LAGG:
+            self.interfaces[aggr_if_index].type = IF_TYPE_LAGG
+        return True
 
-        """
-        # LACP port membership, may only valid once an interface is "up" and has joined the aggregate
-        member_if_index = int(oid_in_branch(dot3adAggPortAttachedAggID, oid))
-        if member_if_index:
-            lacp_if_index = int(val)
-            if lacp_if_index > 0:
-                dprint(f"Member ifIndex {member_if_index} is part of LACP ifIndex {lacp_if_index})
-                if member_if_index in self.interfaces.keys() and lacp_if_index in self.interfaces.keys():
-                    # from this one read, we can get the aggregate ifIndex for the virtual interface
-                    # (and name, for display convenience)
-                    self.interfaces[member_if_index].lacp_master_index = lacp_if_index
-                    self.interfaces[member_if_index].lacp_master_name = self.interfaces[lacp_if_index].name
-                    # and also the member interface (i.e. the physical interface!)
-                    self.interfaces[lacp_if_index].lacp_members[member_if_index] = self.interfaces[member_if_index].name
-            return True
-        """
+    def _parse_dot3ad_agg_port_actor_admin_key(self, oid_end, val):
+        """
+        this get the member interfaces admin key ("index"), which maps back to the aggregator interface above!
+        """
+        member_if_index = int(oid_end)
+        # this interface is an lacp member!
+        if member_if_index in self.interfaces.keys():
+            # can we find an aggregate with this key value ?
+            lacp_key = int(val)
+            for lacp_index, iface in self.interfaces.items():
+                if iface.lacp_type == LACP_IF_TYPE_AGGREGATOR and iface.lacp_admin_key == lacp_key:
+                    # the current interface is a member of this aggregate iface !
+                    self.interfaces[member_if_index].lacp_type = LACP_IF_TYPE_MEMBER
+                    self.interfaces[member_if_index].lacp_master_index = lacp_index
+                    self.interfaces[member_if_index].lacp_master_name = iface.name
+                    # add our name to the list of the aggregate interface
+                    self.interfaces[lacp_index].lacp_members[member_if_index] = self.interfaces[member_if_index].name
+        return True
 
-        # we did not parse this. This can happen with Bulk Walks...
-        return False
+    """
+    # LACP port membership, may only valid once an interface is "up" and has joined the aggregate
+    def _parse_dot3ad_agg_port_attached_agg_id(self, oid_end, val):
+        member_if_index = int(oid_end)
+        lacp_if_index = int(val)
+        if lacp_if_index > 0:
+            trace("Member ifIndex {} is part of LACP ifIndex {}", member_if_index, lacp_if_index)
+            if member_if_index in self.interfaces.keys() and lacp_if_index in self.interfaces.keys():
+                # from this one read, we can get the aggregate ifIndex for the virtual interface
+                # (and name, for display convenience)
+                self.interfaces[member_if_index].lacp_master_index = lacp_if_index
+                self.interfaces[member_if_index].lacp_master_name = self.interfaces[lacp_if_index].name
+                # and also the member interface (i.e. the physical interface!)
+                self.interfaces[lacp_if_index].lacp_members[member_if_index] = self.interfaces[member_if_index].name
+        return True
+    """
 
     #
     # Original "dot1d Bridge MIB" Known Ethernet MIB parsing
@@ -1305,17 +2049,12 @@ class SnmpConnector(EasySNMP):
         eth_decimals = oid_in_branch(dot1dTpFdbPort, oid)
         if eth_decimals:
             # decimals returned are 6 numbers representing the MAC address!
-            eth_string = decimal_to_hex_string_ethernet(eth_decimals)
             port_id = int(val)
             # PortID=0 indicates known ethernet, but unknown port, i.e. ignore
             if port_id:
-                if_index = self.qbridge_port_to_if_index[int(val)]
+                if_index = self.qbridge_port_to_if_index[port_id]
                 if if_index in self.interfaces.keys():
-                    e = EthernetAddress(eth_decimals)
-                    if self.vlan_id_context > 0:
-                        e.vlan_id = self.vlan_id_context
-                    self.interfaces[if_index].eth[eth_string] = e
-                    self.eth_addr_count += 1
+                    self._add_ethernet_address(if_index, eth_decimals, self.vlan_id_context)
                 # else:
                 #    dprint(f"  if_index = {if_index}: NOT FOUND!")
             return True
@@ -1336,16 +2075,14 @@ class SnmpConnector(EasySNMP):
             # e.g.    458752.120.72.89.101.150.155
             # fdb_index maps back to the vlan id!
             (fdb_index, eth_decimals) = fdb_eth_decimals.split('.', 1)
-            eth_string = decimal_to_hex_string_ethernet(eth_decimals)
             port_id = int(val)
             # PortID=0 indicates known ethernet, but unknown port, i.e. ignore
             if port_id:
-                if_index = self.qbridge_port_to_if_index[int(val)]
+                if_index = self.qbridge_port_to_if_index[port_id]
                 if if_index in self.interfaces.keys():
-                    e = EthernetAddress(eth_decimals)
                     if self.vlan_id_context > 0:
                         # we are explicitly in a vlan context! (vendor specific implementation)
-                        e.vlan_id = self.vlan_id_context
+                        vlan_id = self.vlan_id_context
                     else:
                         # see if we can use Forward DB mapping:
                         # double lookup: from fdb index find vlan index, then from vlan index find vlan id!
@@ -1354,14 +2091,29 @@ class SnmpConnector(EasySNMP):
                         vlan_id = self.vlan_id_by_index.get(vlan_index, 0)
                         dprint(f"Eth found in fdb_index {int(fdb_index)} => vlan_index {vlan_index} => vlan_id {vlan_id}")
                         """
-                        e.vlan_id = self.vlan_id_by_index.get(self.dot1tp_fdb_to_vlan_index.get(int(fdb_index), 0), 0)
-                    self.interfaces[if_index].eth[eth_string] = e
-                    self.eth_addr_count += 1
+                        vlan_id = self.vlan_id_by_index.get(self.dot1tp_fdb_to_vlan_index.get(int(fdb_index), 0), 0)
+                    self._add_ethernet_address(if_index, eth_decimals, vlan_id)
                 # else:
                 #    dprint(f"  if_index = {if_index}: NOT FOUND!")
             return True
         return False
 
+    def _add_ethernet_address(self, if_index, eth_decimals, vlan_id=0):
+        """
+        Add a known ethernet address, in SNMP decimal format, to the switch EthernetTable(),
+        and give the interface its view of the table the first time.
+        Returns the table row, or -1 if the address is invalid.
+        """
+        address = get_ethernet_codec().from_decimal(eth_decimals)
+        if address < 0:
+            return -1
+        row = self.eth_table.add(address, if_index, vlan_id)
+        iface = self.interfaces[if_index]
+        if not iface.eth:
+            iface.eth = self.eth_table.get_interface_rows(if_index)
+        self.eth_addr_count = len(self.eth_table)
+        return row
+
     def _parse_mibs_net_to_media(self, oid, val):
         """
         Parse a single OID with data returned from the (various) Net-To-Media (ie ARP) mibs
@@ -1371,9 +2123,7 @@ class SnmpConnector(EasySNMP):
         # we take some shortcuts here by not using the mappings through ipNetToMediaIfIndex and ipNetToMediaNetAddress
         if_ip_string = oid_in_branch(ipNetToMediaPhysAddress, oid)
         if if_ip_string:
-            if not self.switch.snmp_capabilities & CAPABILITIES_NET2MEDIA_MIB:
-                self.switch.snmp_capabilities |= CAPABILITIES_NET2MEDIA_MIB
-                self.switch.save()
+            self._add_capability(CAPABILITIES_NET2MEDIA_MIB)
             parts = if_ip_string.split('.', 1)  # 1 means one split, two elements!
             if_index = int(parts[0])
             ip = str(parts[1])
@@ -1381,11 +2131,9 @@ class SnmpConnector(EasySNMP):
                 mac_addr = bytes_to_hex_string_ethernet(val)
                 self.interfaces[if_index].arp4[ip] = mac_addr
                 # see if we can add this to a known ethernet address
-                # time consuming, but useful
-                for index, iface in self.interfaces.items():
-                    if mac_addr in iface.eth.keys():
-                        # Found existing MAC addr, adding IP4
-                        iface.eth[mac_addr].address_ip4 = ip
+                for row in self.eth_table.find(get_ethernet_codec().from_octets(val)):
+                    # Found existing MAC addr, adding IP4
+                    self.eth_table.set_ip4(row, ip)
 
             return True
 
@@ -1404,7 +2152,8 @@ class SnmpConnector(EasySNMP):
         Will return True if we have parsed this, and False if not.
         This will be used upstream to cache or not cache this OID.
         """
-        dprint(f"_parse_mibs_lldp() {str(oid)}, len = {len(val)}, type = {str(type(val))}")
+        if trace.enabled:
+            dprint(f"_parse_mibs_lldp() {oid}, len = {len(val)}, type = {type(val)}")
 
         # we are not looking at this at this time, already have it from IF MIB
         # lldp = oid_in_branch(lldpLocPortTable, oid)
@@ -1423,9 +2172,7 @@ class SnmpConnector(EasySNMP):
         # if Q-BRIDGE is NOT implemented, <port-id> = <ifIndex>, ie without the mapping
         lldp_index = oid_in_branch(lldpRemPortId, oid)
         if lldp_index:
-            if not self.switch.snmp_capabilities & CAPABILITIES_LLDP_MIB:
-                self.switch.snmp_capabilities |= CAPABILITIES_LLDP_MIB
-                self.switch.save()
+            self._add_capability(CAPABILITIES_LLDP_MIB)
             (extra_one, port_id, extra_two) = lldp_index.split('.')
             port_id = int(port_id)
             # store the new lldp object, based on the string index.
@@ -1528,16 +2275,16 @@ class SnmpConnector(EasySNMP):
         """
         Function to add a given vlan to the interface identified by the dot1D bridge port id
         """
-        dprint(f"_add_vlan_to_interface() port {port_id} vlan {vlan_id}")
+        trace("_add_vlan_to_interface() port {} vlan {}", port_id, vlan_id)
         # get the interface index first:
         if_index = self._get_if_index_from_port_id(port_id)
         if if_index in self.interfaces.keys():
             if self.interfaces[if_index].untagged_vlan == vlan_id:
-                dprint("   PVID already set!")
+                trace("   PVID already set!")
                 # interface already has this untagged vlan, not adding
                 return True
             else:
-                dprint("   Add as tagged!")
+                trace("   Add as tagged!")
                 self.interfaces[if_index].vlans.append(vlan_id)
                 self.interfaces[if_index].is_tagged = True
             return True
@@ -1624,7 +2371,7 @@ class SnmpConnector(EasySNMP):
             return 1
         if self.switch.snmp_oid != self.system.object_id:
             self.switch.snmp_oid = self.system.object_id
-            self.switch.save()
+            self.switch.save(update_fields=['snmp_oid'])
             log = Log(action=LOG_NEW_OID_FOUND,
                       description="New System ObjectID found",
                       switch=self.switch,
@@ -1633,14 +2380,14 @@ class SnmpConnector(EasySNMP):
                       type=LOG_TYPE_WARNING)
             if self.request:
                 log.user = self.request.user
-            log.save()
+            save_log(log)
 
         # and see if the hostname changed
         if not self.system.name:
             return 1
         if self.switch.snmp_hostname != self.system.name:
             self.switch.snmp_hostname = self.system.name
-            self.switch.save()
+            self.switch.save(update_fields=['snmp_hostname'])
             log = Log(action=LOG_NEW_HOSTNAME_FOUND,
                       description="New System Hostname found",
                       switch=self.switch,
@@ -1649,7 +2396,7 @@ class SnmpConnector(EasySNMP):
                       type=LOG_TYPE_WARNING)
             if self.request:
                 log.user = self.request.user
-            log.save()
+            save_log(log)
 
         return 1
 
@@ -1667,23 +2414,11 @@ class SnmpConnector(EasySNMP):
         This reads information about the modules, software revisions, etc.
         Return a negative value if error occured, or 1 if success
         """
-        # get physical device info
-        retval = self._get_branch_by_name('entPhysicalClass')
-        if retval < 0:
-            self._add_warning("Error getting 'Entity-Class' ('entPhysicalClass')")
-            return retval
-        retval = self._get_branch_by_name('entPhysicalSerialNum')
-        if retval < 0:
-            self._add_warning("Error getting 'Entity-Serial' (entPhysicalSerialNum)")
-            return retval
-        retval = self._get_branch_by_name('entPhysicalSoftwareRev')
-        if retval < 0:
-            self._add_warning("Error getting 'Entity-Software' (entPhysicalSoftwareRev)")
-            return retval
-        retval = self._get_branch_by_name('entPhysicalModelName')
-        if retval < 0:
-            self._add_warning("Error getting 'Entity-Model' (entPhysicalModelName)")
-            return retval
+        # get physical device info: class, serial, software and model
+        counts = self._get_table_by_names(['entPhysicalClass', 'entPhysicalSerialNum', 'entPhysicalSoftwareRev', 'entPhysicalModelName'])
+        if counts == -1:
+            self._add_warning("Error getting 'Entity-Data' (entPhysicalClass, entPhysicalSerialNum, entPhysicalSoftwareRev, entPhysicalModelName)")
+            return -1
 
         return 1
 
@@ -1693,50 +2428,22 @@ class SnmpConnector(EasySNMP):
         but to speed it up, we run individual branches that we need ...
         Returns 1 on succes, -1 on failure
         """
-        # it all starts with the interface indexes
-        retval = self._get_branch_by_name('ifIndex')
-        if retval < 0:
+        # it all starts with the interface indexes, then the types, the status (admin up/down, link up/down),
+        # the interface name from the newer IF-MIB, the interface description (alias), and the speed.
+        # These are all read at the same time.
+        counts = self._get_table_by_names(self.interface_table_columns)
+        if counts == -1:
             self._add_warning(f"Error getting 'Interfaces' ({ifIndex})")
-            return retval
-        # and the types
-        retval = self._get_branch_by_name('ifType')
-        if retval < 0:
-            self._add_warning(f"Error getting 'Interface-Type' ({ifType})")
-            return retval
-
-        # the status of the interface, admin up/down, link up/down
-        retval = self._get_branch_by_name('ifAdminStatus')
-        if retval < 0:
-            self._add_warning(f"Error getting 'Interface-AdminStatus' ({ifAdminStatus})")
-            return retval
-        retval = self._get_branch_by_name('ifOperStatus')
-        if retval < 0:
-            self._add_warning(f"Error getting 'Interface-OperStatus' ({ifOperStatus})")
-            return retval
+            return -1
 
-        # find the interface name, start with the newer IF-MIB
-        retval = self._get_branch_by_name('ifName')
-        if retval < 0:
-            self._add_warning(f"Error getting 'Interface-Names' ({ifName})")
-            return retval
-        if retval == 0:  # newer IF-MIB entries no found, try the old
+        if counts['ifName'] == 0:  # newer IF-MIB entries no found, try the old
             retval = self._get_branch_by_name('ifDescr')
             if retval < 0:
                 self._add_warning(f"Error getting 'Interface-Descriptions' ({ifDescr})")
                 return retval
 
-        # this is the interface description
-        retval = self._get_branch_by_name('ifAlias')
-        if retval < 0:
-            self._add_warning(f"Error getting 'Interface-Alias' ({ifAlias})")
-            return retval
-
         # speed is in new IF-MIB
-        retval = self._get_branch_by_name('ifHighSpeed')
-        if retval < 0:
-            self._add_warning(f"Error getting 'Interface-HiSpeed' ({ifHighSpeed})")
-            return retval
-        if retval == 0:    # new IF-MIB hcspeed entry not found, try old speed
+        if counts['ifHighSpeed'] == 0:    # new IF-MIB hcspeed entry not found, try old speed
             retval = self._get_branch_by_name('ifSpeed')
             if retval < 0:
                 self._add_warning(f"Error getting 'Interface-Speed' ({ifSpeed})")
@@ -1831,6 +2538,13 @@ class SnmpConnector(EasySNMP):
         # get the base 802.1q settings:
         retval = self._get_branch_by_name('dot1qBase')
         if self.system.vlan_count > 0:
+            # we now know what vlan tables to read, start those in parallel if enabled:
+            vlan_branches = ['dot1dBasePortIfIndex', 'dot1qVlanStaticRowStatus', 'dot1qVlanStaticName',
+                             'dot1qVlanStatus', 'dot1qPvid', 'dot1qVlanCurrentEgressPorts']
+            if self.system.gvrp_enabled:
+                vlan_branches.append('dot1qPortGvrpStatus')
+            vlan_branches.append('ieee8021QBridgeMvrpEnabledStatus')
+            self._prefetch_branches(vlan_branches)
             # first get vlan id and names
             self._get_vlans()
             # next, read the interface vlan data
@@ -1867,12 +2581,41 @@ class SnmpConnector(EasySNMP):
         e.g. GigabitEthernet5/12
         """
         for (pe_index, port_entry) in self.poe_port_entries.items():
-            end = port_entry.index.replace('.', '/')
-            count = len(end)
+            if_index = self._get_if_index_by_name_end(port_entry.index.replace('.', '/'))
+            if if_index:
+                self.interfaces[if_index].poe_entry = port_entry
+
+    def _clear_interface_name_index(self):
+        """
+        Clear the interface name indexes, they are built again from self.interfaces when needed.
+        Call this after the interfaces are parsed.
+        """
+        self._if_name_index = False
+        self._if_name_suffix_index = False
+
+    def _get_if_index_by_name(self, name):
+        """
+        Return the ifIndex of the interface with this name, or False if not found.
+        """
+        if self._if_name_index is False:
+            self._if_name_index = {}
             for (if_index, iface) in self.interfaces.items():
-                if iface.name[-count:] == end:
-                    iface.poe_entry = port_entry
-                    break
+                self._if_name_index.setdefault(iface.name, if_index)
+        return self._if_name_index.get(name, False)
+
+    def _get_if_index_by_name_end(self, end):
+        """
+        Return the ifIndex of the first interface with a name that ends in 'end', or False if not found.
+        E.g. "5/12" finds GigabitEthernet5/12. This uses an index of all endings of all interface names,
+        so mapping many ports is a single lookup each, instead of a loop over the interfaces.
+        """
+        if self._if_name_suffix_index is False:
+            self._if_name_suffix_index = {}
+            for (if_index, iface) in self.interfaces.items():
+                name = iface.name
+                for start in range(len(name)):
+                    self._if_name_suffix_index.setdefault(name[start:], if_index)
+        return self._if_name_suffix_index.get(end, False)
 
     def _get_poe_data(self):
         """
@@ -1887,6 +2630,7 @@ class SnmpConnector(EasySNMP):
         if retval > 0:
             # found power supplies, look at port power data
             # this is under pethPsePortEntry, but we only need a few entries:
+            self._prefetch_branches(['pethPsePortAdminEnable', 'pethPsePortDetectionStatus'])
             retval = self._get_branch_by_name('pethPsePortAdminEnable')
             if retval < 0:
                 self._add_warning("Error getting 'PoE-Port-Admin-Status' (pethPsePortAdminEnable)")
@@ -1960,37 +2704,14 @@ class SnmpConnector(EasySNMP):
 
         # go read and parse LLDP data, we do NOT (False) want to cache this data!
         # we have a custom parser, so we do not have to run this through the long and slow default parser!
-        retval = self._get_branch_by_name('lldpRemPortId', False, self._parse_mibs_lldp)
-        if retval < 0:
-            self._add_warning("Error getting 'LLDP-Remote-Ports' (lldpRemPortId)")
-            return retval
-        if retval > 0:  # there are neighbors entries! Go get the details.
-            retval = self._get_branch_by_name('lldpRemPortDesc', False, self._parse_mibs_lldp)
-            if retval < 0:
-                self._add_warning("Error getting 'LLDP-Remote-Port-Description' (lldpRemPortDesc)")
-                return retval
-            retval = self._get_branch_by_name('lldpRemSysName', False, self._parse_mibs_lldp)
-            if retval < 0:
-                self._add_warning("Error getting 'LLDP-Remote-System-Name' (lldpRemSysName)")
-                return retval
-            retval = self._get_branch_by_name('lldpRemSysDesc', False, self._parse_mibs_lldp)
-            if retval < 0:
-                self._add_warning("Error getting 'LLDP-Remote-System-Decription' (lldpRemSysDesc)")
-                return retval
-            # get the enabled remote device capabilities
-            retval = self._get_branch_by_name('lldpRemSysCapEnabled', False, self._parse_mibs_lldp)
-            if retval < 0:
-                self._add_warning("Error getting 'LLDP-Remote-System-Capabilities' (lldpRemSysCapEnabled)")
-                return retval
-            # and info about the remote chassis:
-            retval = self._get_branch_by_name('lldpRemChassisIdSubtype', False, self._parse_mibs_lldp)
-            if retval < 0:
-                self._add_warning("Error getting 'LLDP-Remote-Chassis-Type' (lldpRemChassisIdSubtype)")
-                return retval
-            retval = self._get_branch_by_name('lldpRemChassisId', False, self._parse_mibs_lldp)
-            if retval < 0:
-                self._add_warning("Error getting 'LLDP-Remote-Chassis-Id' (lldpRemChassisId)")
-                return retval
+        # the neighbors, and their details: port, system name and description, capabilities and chassis info.
+        # These are all read at the same time.
+        counts = self._get_table_by_names(['lldpRemPortId', 'lldpRemPortDesc', 'lldpRemSysName', 'lldpRemSysDesc',
+                                           'lldpRemSysCapEnabled', 'lldpRemChassisIdSubtype', 'lldpRemChassisId'],
+                                          False, self._parse_mibs_lldp)
+        if counts == -1:
+            self._add_warning("Error getting 'LLDP-Remote-Data' (lldpRemPortId, lldpRemPortDesc, lldpRemSysName, ...)")
+            return -1
 
         return 1
 
@@ -2222,10 +2943,32 @@ class SnmpConnector(EasySNMP):
         retval = self._get_system_data()
         if retval != -1:
             self.switch.snmp_oid = self.get_cached_oid(sysObjectID)
-            self.switch.save()
+            self.switch.save(update_fields=['snmp_oid'])
             return True
         return False
 
+    def _count(self, name, increment=1):
+        """
+        Add to a counter field of the switch, e.g. 'snmp_write_count'.
+        This is only written to the database by _save_switch_counters().
+        """
+        self._switch_updates[name] = self._switch_updates.get(name, 0) + increment
+
+    def _add_capability(self, capability):
+        """
+        Set a CAPABILITIES_* bit in the switch snmp_capabilities, if not set yet.
+        This is only written to the database by _save_switch_counters().
+        """
+        if not self.switch.snmp_capabilities & capability:
+            self.switch.snmp_capabilities |= capability
+            self._switch_updates['snmp_capabilities'] = self._switch_updates.get('snmp_capabilities', 0) | capability
+
+    def _save_switch_counters(self):
+        """
+        Write the counters and capabilities collected so far to the database, in a single update.
+        """
+        save_switch_counters(self.switch.id, self._switch_updates)
+
     def _add_warning(self, warning):
         """
         Add a warning to the list!
@@ -2240,7 +2983,7 @@ class SnmpConnector(EasySNMP):
                   description=warning)
         if self.request:
             log.user = self.request.user
-        log.save()
+        save_log(log)
         # done!
         return
 
@@ -2290,6 +3033,14 @@ class SnmpConnector(EasySNMP):
         self.error.clear()
         if not self.cached_oid_data:
             self.basic_info_read_time = time.time()
+            self.cache_time = self.basic_info_read_time
+            if settings.SNMP_INCREMENTAL_REFRESH:
+                # remember the change counters, to check the switch for changes when this data is cached
+                (error_status, uptime, counters) = self._get_change_counters()
+                if not error_status:
+                    self._store_change_counters(uptime, counters)
+            # start the independent walks in parallel, if enabled. The steps below parse them in order.
+            self._prefetch_branches(self.basic_info_branches)
             retval = self._get_system_data()
             if retval != -1:
                 retval = self._get_interface_data()
@@ -2302,7 +3053,9 @@ class SnmpConnector(EasySNMP):
                             if retval != -1:
                                 retval = self._get_poe_data()
                                 if retval != -1:
+                                    self._stop_prefetch()
                                     # try to map poe port info to actual interfaces
+                                    self._clear_interface_name_index()
                                     self._map_poe_port_entries_to_interface()
                                     # time it took to read all this.
                                     self.basic_info_duration = int((time.time() - self.basic_info_read_time) + 0.5)
@@ -2311,8 +3064,9 @@ class SnmpConnector(EasySNMP):
                                     self._set_http_session_cache()
                                     # set the permissions to the interfaces:
                                     self._set_interfaces_permissions()
-                                    self.switch.save()  # update counters
+                                    self._save_switch_counters()
                                     return True
+            self._stop_prefetch()
             return False
         else:
             # set the permissions to the interfaces:
@@ -2352,7 +3106,7 @@ class SnmpConnector(EasySNMP):
                 retval = self._get_arp_data()
                 self.detailed_info_duration = int((time.time() - start_time) + 0.5)
                 if retval != -1:
-                    self.switch.save()  # update counters
+                    self._save_switch_counters()
                     return True
         return False
 
@@ -2395,7 +3149,7 @@ class SnmpConnector(EasySNMP):
             return -1
 
         # make sure we cast the proper type here! Ie this needs an Integer()
-        return self._set(f"{ifAdminStatus}.{interface.index}", status, 'i')
+        return self._set_or_queue(f"{ifAdminStatus}.{interface.index}", status, 'i')
 
     def set_interface_poe_status(self, interface=False, status=-1):
         """
@@ -2419,7 +3173,7 @@ class SnmpConnector(EasySNMP):
             return -1
 
         # make sure we cast the proper type here! Ie this needs an Integer()
-        return self._set(f"{pethPsePortAdminEnable}.{interface.poe_entry.index}", status, 'i')
+        return self._set_or_queue(f"{pethPsePortAdminEnable}.{interface.poe_entry.index}", status, 'i')
 
     def set_interface_description(self, interface=False, description=""):
         """
@@ -2431,7 +3185,54 @@ class SnmpConnector(EasySNMP):
             return -1
 
         # make sure we cast the proper type here! I.e. this needs an string
-        return self._set(f"{ifAlias}.{interface.index}", description, 'OCTETSTRING')
+        return self._set_or_queue(f"{ifAlias}.{interface.index}", description, 'OCTETSTRING')
+
+    def begin_changes(self):
+        """
+        Start a change set. Until commit_changes() is called, set_interface_admin_status(),
+        set_interface_poe_status() and set_interface_description() do not send their SET,
+        but add a SnmpChange() to self.change_set, and return 0.
+        Other changes, e.g. vlans, are still sent right away.
+        """
+        self.change_set = []
+
+    def commit_changes(self):
+        """
+        Send the change set to the switch, with at most settings.SNMP_MAX_SET_VARBINDS
+        changes per SET request. If the switch rejects a request, e.g. because it is too big,
+        or one of the values is not accepted, those changes are sent one at a time,
+        so we know the result of each.
+        Returns the list of SnmpChange() objects, with the status and error of each.
+        """
+        changes = self.change_set or []
+        self.change_set = False
+        size = max(1, settings.SNMP_MAX_SET_VARBINDS)
+        for start in range(0, len(changes), size):
+            batch = changes[start:start + size]
+            if len(batch) > 1:
+                retval = self._set_multiple([(change.oid, change.value, change.snmp_type) for change in batch])
+                if retval > 0:
+                    for change in batch:
+                        change.status = 1
+                    continue
+                dprint(f"commit_changes(): SET of {len(batch)} changes failed, sending one at a time")
+            for change in batch:
+                if self._set(change.oid, change.value, change.snmp_type) < 0:
+                    change.status = -1
+                    change.error = self.error.description
+                else:
+                    change.status = 1
+        return changes
+
+    def _set_or_queue(self, oid, value, snmp_type):
+        """
+        Set a single OID value with _set(), or add it to the change set if we have one.
+        Returns the _set() result, or 0 if added to the change set.
+        """
+        if self.change_set is False:
+            return self._set(oid, value, snmp_type)
+        self.change_set.append(SnmpChange(oid, value, snmp_type))
+        return 0
 
     def set_interface_untagged_vlan(self, interface, new_vlan_id):
         """
@@ -2467,7 +3268,7 @@ class SnmpConnector(EasySNMP):
 
             # now send update to switch:
             # use PySNMP to do this work:
-            octet_string = OctetString(hexValue=old_vlan_portlist.to_hex_string())
+            octet_string = old_vlan_portlist.to_octet_string()
             pysnmp = pysnmpHelper(self.switch)
             (error_status, details) = pysnmp.set(f"{dot1qVlanStaticEgressPorts}.{old_vlan_id}", octet_string)
             if error_status:
@@ -2475,6 +3276,8 @@ class SnmpConnector(EasySNMP):
                 self.error.description = "Error in setting port (dot1qVlanStaticEgressPorts)"
                 self.error.details = details
                 return -1
+            # our cached data is current again after the re-reads below:
+            self._switch_changed(cache_updated=True)
 
             # and re-read the dot1qVlanCurrentEgressPorts, all ports
             # tagged/untagged on the old and new vlan
@@ -2496,6 +3299,10 @@ class SnmpConnector(EasySNMP):
 # --- End of SnmpConnector() ---
 
 
+# the base class OID dispatcher, built once at import. Vendor classes build theirs in __init_subclass__()
+SnmpConnector.oid_dispatcher = OidDispatcher(SnmpConnector)
+
+
 def oid_in_branch(mib_branch, oid):
     """
     Check if a given OID is in the branch, if so, return the 'ending' portion after the mib_branch
@@ -2512,6 +3319,28 @@ def oid_in_branch(mib_branch, oid):
     return False
 
 
+def save_switch_counters(switch_id, updates):
+    """
+    Write the collected switch updates in a single atomic UPDATE, and clear them.
+    updates: dictionary with increments of the *_count fields, the CAPABILITIES_* bits
+             to add to snmp_capabilities, and new values of other fields.
+    Other requests can update the same switch at the same time, so counters are added
+    and capability bits are or-ed in the database, instead of saving our values.
+    """
+    if not updates:
+        return
+    fields = {}
+    for (name, value) in updates.items():
+        if name == 'snmp_capabilities':
+            fields[name] = F(name).bitor(value)
+        elif name.endswith('_count'):
+            fields[name] = F(name) + value
+        else:
+            fields[name] = value
+    updates.clear()
+    Switch.objects.filter(pk=switch_id).update(**fields)
+
+
 def _clear_session_save_needed(request):
     """
     Clear the session variable that indicates the switch config needs saving
@@ -2530,6 +3359,50 @@ def clear_session_oid_cache(request):
         request.session.modified = True
 
 
+def get_switch_cache(switch_id):
+    """
+    Return the cached snmp data of a switch, shared by all users and tasks, or None if not cached.
+    """
+    if not settings.SWITCH_CACHE_TIMEOUT:
+        return None
+    return cache.get(f"switch-{switch_id}")
+
+
+def set_switch_cache(switch_id, data, timeout):
+    """
+    Store the snmp data of a switch for all users and tasks, for timeout seconds.
+    """
+    cache.set(f"switch-{switch_id}", data, timeout)
+
+
+def clear_switch_cache(switch_id):
+    """
+    clear the shared snmp data of a switch, because we want to re-read the switch
+    """
+    if settings.SWITCH_CACHE_TIMEOUT:
+        cache.delete(f"switch-{switch_id}")
+
+
+def get_switch_cache_written(switch_id):
+    """
+    Return the time of the last change made to a switch, or None if not known.
+    """
+    if not settings.SWITCH_CACHE_TIMEOUT:
+        return None
+    return cache.get(f"switch-{switch_id}-written")
+
+
+def set_switch_cache_written(switch_id):
+    """
+    Someone changed the switch. Clear the shared snmp data, and remember the time,
+    so snmp data cached in http sessions before now is no longer used either.
+    """
+    if settings.SWITCH_CACHE_TIMEOUT:
+        cache.delete(f"switch-{switch_id}")
+        # keep this as long as any session data can live:
+        cache.set(f"switch-{switch_id}-written", time.time(), max(settings.SESSION_COOKIE_AGE, settings.SWITCH_CACHE_TIMEOUT))
+
+
 def clear_session_cache(request):
     """
     clear all session data storage, because we changed switches
@@ -71,6 +71,11 @@ snmp_mib_variables['ccmHistoryStartupLastChanged'] = ccmHistoryStartupLastChange
 
 
 # VTP MIB:
+# the configuration revision of the first VTP domain. This changes when vlans are changed,
+# but only in VTP server or client mode, not in transparent mode:
+managementDomainConfigRevNumber = '.1.3.6.1.4.1.9.9.46.1.2.1.1.4.1'
+snmp_mib_variables['managementDomainConfigRevNumber'] = managementDomainConfigRevNumber
+
 vtpVlanState = '.1.3.6.1.4.1.9.9.46.1.3.1.1.2.1'
 snmp_mib_variables['vtpVlanState'] = vtpVlanState
 
@@ -88,6 +93,17 @@ snmp_mib_variables['vtpVlanName'] = vtpVlanName
 # VTP trunk ports start at .1.3.6.1.4.1.9.9.46.1.6
 # details about ports start at .1.3.6.1.4.1.9.9.46.1.6.1.1
 
+# the vlans allowed on a trunk port, a bitmap per 1024 vlans. The high order bit of the first byte is
+# vlan 0 in vlanTrunkPortVlansEnabled, vlan 1024 in vlanTrunkPortVlansEnabled2k, etc.
+vlanTrunkPortVlansEnabled = '.1.3.6.1.4.1.9.9.46.1.6.1.1.4'
+snmp_mib_variables['vlanTrunkPortVlansEnabled'] = vlanTrunkPortVlansEnabled
+vlanTrunkPortVlansEnabled2k = '.1.3.6.1.4.1.9.9.46.1.6.1.1.17'
+snmp_mib_variables['vlanTrunkPortVlansEnabled2k'] = vlanTrunkPortVlansEnabled2k
+vlanTrunkPortVlansEnabled3k = '.1.3.6.1.4.1.9.9.46.1.6.1.1.18'
+snmp_mib_variables['vlanTrunkPortVlansEnabled3k'] = vlanTrunkPortVlansEnabled3k
+vlanTrunkPortVlansEnabled4k = '.1.3.6.1.4.1.9.9.46.1.6.1.1.19'
+snmp_mib_variables['vlanTrunkPortVlansEnabled4k'] = vlanTrunkPortVlansEnabled4k
+
 vlanTrunkPortNativeVlan = '.1.3.6.1.4.1.9.9.46.1.6.1.1.5'
 snmp_mib_variables['vlanTrunkPortNativeVlan'] = vlanTrunkPortNativeVlan
 
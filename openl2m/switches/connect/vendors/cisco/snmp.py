@@ -17,6 +17,7 @@ This augments/re-implements some methods found in the base SNMP() class
 with Cisco specific ways of doing things...
 """
 from switches.models import Log
+from switches.log_buffer import save_log
 from switches.constants import *
 from switches.connect.classes import *
 from switches.connect.snmp import SnmpConnector, oid_in_branch
@@ -38,46 +39,79 @@ class SnmpConnectorCisco(SnmpConnector):
         self.name = "Cisco SnmpConnector"  # what type of class is running!
         self.vendor_name = "Cisco"
 
-    def _parse_oid(self, oid, val):
-        """
-        Parse a single OID with data returned from a switch through some "get" function
-        THIS NEEDS WORK TO IMPROVE PERFORMANCE !!!
-        Returns True if we parse the OID and we should cache it!
-        """
-        dprint(f"CISCO Parsing OID {oid}")
-
-        if_index = int(oid_in_branch(vmVoiceVlanId, oid))
-        if if_index:
-            voiceVlanId = int(val)
-            if if_index in self.interfaces.keys() and voiceVlanId in self.vlans.keys():
-                self.interfaces[if_index].voice_vlan = voiceVlanId
-            return True
+    # the Cisco specific MIB branches we parse in _parse_oid(), see SnmpConnector.oid_handlers
+    oid_handlers = [
+        ('vmVoiceVlanId', '_parse_vm_voice_vlan_id'),
+        ('portIfIndex', '_parse_port_if_index'),
+        ('vtpVlanState', '_parse_vtp_vlan_state'),
+        ('vtpVlanType', '_parse_vtp_vlan_type'),
+        ('vtpVlanName', '_parse_vtp_vlan_name'),
+        ('vlanTrunkPortDynamicState', '_parse_vlan_trunk_port_dynamic_state'),
+        ('vlanTrunkPortNativeVlan', '_parse_vlan_trunk_port_native_vlan'),
+        ('vlanTrunkPortVlansEnabled', '_parse_vlan_trunk_port_vlans_enabled'),
+        ('vlanTrunkPortVlansEnabled2k', '_parse_vlan_trunk_port_vlans_enabled_2k'),
+        ('vlanTrunkPortVlansEnabled3k', '_parse_vlan_trunk_port_vlans_enabled_3k'),
+        ('vlanTrunkPortVlansEnabled4k', '_parse_vlan_trunk_port_vlans_enabled_4k'),
+        ('vmVlan', '_parse_vm_vlan'),
+        ('cpeExtPsePortPwrConsumption', '_parse_cpe_ext_pse_port_pwr_consumption'),
+        ('cpeExtPsePortPwrAvailable', '_parse_cpe_ext_pse_port_pwr_available'),
+        ('cpeExtPsePortMaxPwrDrawn', '_parse_cpe_ext_pse_port_max_pwr_drawn'),
+        ('ccmHistoryRunningLastChanged', '_parse_ccm_history_running_last_changed'),
+        ('ccmHistoryRunningLastSaved', '_parse_ccm_history_running_last_saved'),
+        ('ccmHistoryStartupLastChanged', '_parse_ccm_history_startup_last_changed'),
+        ('cL2L3IfModeOper', '_parse_cl2l3_if_mode_oper'),
+        ('clogHistTableMaxLength', '_parse_clog_hist_table_max_length'),
+        ('clogHistIndex', '_parse_clog_hist_index'),
+        ('clogHistFacility', '_parse_clog_hist_facility'),
+        ('clogHistSeverity', '_parse_clog_hist_severity'),
+        ('clogHistMsgName', '_parse_clog_hist_msg_name'),
+        ('clogHistMsgText', '_parse_clog_hist_msg_text'),
+        ('clogHistTimestamp', '_parse_clog_hist_timestamp'),
+    ]
+
+    # the Cisco specific branches walked by get_switch_basic_info(), see SnmpConnector.basic_info_branches
+    basic_info_branches = SnmpConnector.basic_info_branches + [
+        'cL2L3IfModeOper',
+        'vtpVlanState',
+        'vtpVlanType',
+        'vtpVlanName',
+        'vlanTrunkPortDynamicState',
+        'vlanTrunkPortNativeVlan',
+        'vmVlan',
+        'vmVoiceVlanId',
+        'portIfIndex',
+        'cpeExtPsePortPwrAvailable',
+        'cpeExtPsePortPwrConsumption',
+        'cpeExtPsePortMaxPwrDrawn',
+    ]
+
+    # see SnmpConnector.change_counters and vlan_branches, Cisco vlans are read from the VTP MIB
+    change_counters = SnmpConnector.change_counters + [
+        (managementDomainConfigRevNumber, 'vlans'),
+    ]
+    vlan_branches = [
+        'vtpVlanState',
+        'vtpVlanType',
+        'vtpVlanName',
+        'vlanTrunkPortDynamicState',
+        'vlanTrunkPortNativeVlan',
+        'vmVlan',
+        'vmVoiceVlanId',
+    ]
+
+    def _parse_vm_voice_vlan_id(self, oid_end, val):
+        if_index = int(oid_end)
+        voiceVlanId = int(val)
+        if if_index in self.interfaces.keys() and voiceVlanId in self.vlans.keys():
+            self.interfaces[if_index].voice_vlan = voiceVlanId
+        return True
 
+    def _parse_port_if_index(self, oid_end, val):
         """
         Stack-MIB PortId to ifIndex mapping
         """
-        stack_port_id = oid_in_branch(portIfIndex, oid)
-        if stack_port_id:
-            self.stack_port_to_if_index[stack_port_id] = int(val)
-            return True
-
-        if self._parse_mibs_cisco_vtp(oid, val):
-            return True
-
-        if self._parse_mibs_cisco_poe(oid, val):
-            return True
-
-        if self._parse_mibs_cisco_config(oid, val):
-            return True
-
-        if self._parse_mibs_cisco_if_opermode(oid, val):
-            return True
-
-        if self._parse_mibs_cisco_syslog_msg(oid, val):
-            return True
-
-        # if not Cisco specific, call the generic parser
-        return super()._parse_oid(oid, val)
+        self.stack_port_to_if_index[oid_end] = int(val)
+        return True
 
     def _get_interface_data(self):
         """
@@ -88,7 +122,7 @@ class SnmpConnectorCisco(SnmpConnector):
         super()._get_interface_data()
 
         # now add Comware data, and cache it:
-        if self._get_branch_by_name('cL2L3IfModeOper', True, self._parse_mibs_cisco_if_opermode) < 0:
+        if self._get_branch_by_name('cL2L3IfModeOper') < 0:
             dprint("Cisco cL2L3IfModeOper returned error!")
             return False
 
@@ -101,19 +135,19 @@ class SnmpConnectorCisco(SnmpConnector):
         """
         dprint("_get_vlan_data(Cisco)\n")
         # first, read existing vlan id's
-        retval = self._get_branch_by_name('vtpVlanState', True, self._parse_mibs_cisco_vtp)
+        retval = self._get_branch_by_name('vtpVlanState')
         if retval < 0:
             return retval
         # vlan types are next
-        retval = self._get_branch_by_name('vtpVlanType', True, self._parse_mibs_cisco_vtp)
+        retval = self._get_branch_by_name('vtpVlanType')
         if retval < 0:
             return retval
         # next, read vlan names
-        retval = self._get_branch_by_name('vtpVlanName', True, self._parse_mibs_cisco_vtp)
+        retval = self._get_branch_by_name('vtpVlanName')
         if retval < 0:
             return False
         # find out if a port is configured as trunk or not, read port trunk(802.1q tagged) status
-        retval = self._get_branch_by_name('vlanTrunkPortDynamicState', True, self._parse_mibs_cisco_vtp)
+        retval = self._get_branch_by_name('vlanTrunkPortDynamicState')
         if retval < 0:
             return False
         # now, find out if interfaces are access or trunk (tagged) mode
@@ -122,7 +156,7 @@ class SnmpConnectorCisco(SnmpConnector):
         #    dprint("Cisco PORT TRUNK STATUS data FALSE")
         #    return False
         # and read the native vlan for trunked ports
-        retval = self._get_branch_by_name('vlanTrunkPortNativeVlan', True, self._parse_mibs_cisco_vtp)  # read trunk native vlan membership
+        retval = self._get_branch_by_name('vlanTrunkPortNativeVlan')  # read trunk native vlan membership
         if retval < 0:
             return False
         # finally, if not trunked, read untagged interfaces vlan membership
@@ -140,33 +174,86 @@ class SnmpConnectorCisco(SnmpConnector):
         """
         Read the Bridge-MIB for known ethernet address on the switch.
         On Cisco switches, you have to append the vlan ID after the v1/2c community,
-        eg. public@13 for vlan 13
-        Return 1 on success, -1 on failure
+        eg. public@13 for vlan 13. For v3, the context is "vlan-13".
+        With the asyncio transport, the vlans are walked in parallel as tasks on the event loop
+        (see settings.SNMP_MAX_PARALLEL_WALKS), with EasySNMP one vlan at a time. Either way they are
+        parsed one vlan at a time, in vlan order, as the port to ifIndex map is different per vlan.
+        Return True on success, -1 or False on failure
         """
         dprint("_get_known_ethernet_addresses(Cisco)\n")
-        for vlan_id in self.vlans.keys():
-            # little hack for Cisco devices, to see various vlan-specific tables:
-            self.vlan_id_context = int(vlan_id)
-            com_or_ctx = ''
+        # the vlans allowed on the trunk ports, to skip the vlans that are on no port at all
+        trunk_vlans_known = self._get_trunk_port_vlans() > 0
+        vlan_contexts = {}
+        for vlan_id in sorted(self.vlans.keys()):
+            if not self._vlan_has_ports(vlan_id, trunk_vlans_known):
+                dprint(f"  vlan {vlan_id} has no ports, skipping")
+                continue
             if self.switch.snmp_profile.version == SNMP_VERSION_2C:
                 # for v2, set community string to "Cisco format"
-                com_or_ctx = f"{self.switch.snmp_profile.community}@{vlan_id}"
+                vlan_contexts[vlan_id] = f"{self.switch.snmp_profile.community}@{vlan_id}"
             else:
                 # v3, set context to "Cisco format":
-                com_or_ctx = f"vlan-{vlan_id}"
-            self._set_snmp_session(com_or_ctx)
+                vlan_contexts[vlan_id] = f"vlan-{vlan_id}"
+        # start the walks of all vlans, these run on the event loop while we parse. Nothing is started
+        # with EasySNMP, see EasySNMP._prefetch_branches(), so each vlan is then walked when it is read.
+        for com_or_ctx in vlan_contexts.values():
+            self._prefetch_branches(['dot1dBasePortIfIndex', 'dot1dTpFdbPort'], com_or_ctx)
+        result = True
+        for (vlan_id, com_or_ctx) in vlan_contexts.items():
+            # little hack for Cisco devices, to see various vlan-specific tables:
+            self.vlan_id_context = int(vlan_id)
             # first map Q-Bridge ports to ifIndexes:
-            retval = self._get_branch_by_name('dot1dBasePortIfIndex')
+            retval = self._get_branch_by_name('dot1dBasePortIfIndex', com_or_ctx=com_or_ctx)
             if retval < 0:
-                return retval
+                result = retval
+                break
             # next, read the known ethernet addresses, and add to the Interfaces
-            retval = self._get_branch_by_name('dot1dTpFdbPort', False, self._parse_mibs_dot1d_bridge_eth)
+            retval = self._get_branch_by_name('dot1dTpFdbPort', False, self._parse_mibs_dot1d_bridge_eth, com_or_ctx=com_or_ctx)
             if retval < 0:
-                return False
+                result = False
+                break
+        self._stop_prefetch()
         # reset the snmp session back!
         self.vlan_id_context = 0
-        self._set_snmp_session()
-        return True
+        if self._snmp_session_context:
+            self._set_snmp_session()
+        return result
+
+    def _get_trunk_port_vlans(self):
+        """
+        Read the vlans allowed on the trunk ports, see _parse_vlan_trunk_port_vlans_enabled().
+        Only the bitmaps up to the highest vlan id are read.
+        Returns 1 if the allowed vlans are known, 0 if there are no trunk ports or the switch
+        does not have this data, or -1 on error.
+        """
+        if not any(iface.is_tagged for iface in self.interfaces.values()):
+            return 0
+        branches = ['vlanTrunkPortVlansEnabled', 'vlanTrunkPortVlansEnabled2k',
+                    'vlanTrunkPortVlansEnabled3k', 'vlanTrunkPortVlansEnabled4k']
+        counts = self._get_table_by_names(branches[:max(self.vlans.keys(), default=0) // 1024 + 1])
+        if counts == -1:  # error
+            return -1
+        if counts['vlanTrunkPortVlansEnabled'] > 0:
+            return 1
+        return 0
+
+    def _vlan_has_ports(self, vlan_id, trunk_vlans_known):
+        """
+        Return True if the vlan can have known ethernet addresses, i.e. it is a normal vlan on
+        an access, voice or trunk port. If the allowed vlans of the trunk ports are not known,
+        all vlans are assumed to be on a trunk port, unless the tagged vlans of the port are known.
+        """
+        vlan = self.vlans[vlan_id]
+        if vlan.type != VLAN_TYPE_NORMAL:
+            return False
+        if any(vlan.current_egress_portlist.portlist):
+            return True
+        for iface in self.interfaces.values():
+            if iface.untagged_vlan == vlan_id or iface.voice_vlan == vlan_id or vlan_id in iface.vlans:
+                return True
+            if iface.is_tagged and not iface.vlans and not trunk_vlans_known:
+                return True
+        return False
 
     def _get_poe_data(self):
         """
@@ -203,7 +290,7 @@ class SnmpConnectorCisco(SnmpConnector):
         """
         Read the CISCO-SYSLOG-MSG-MIB
         """
-        retval = self._get_branch_by_name('ciscoSyslogMIBObjects', True, self._parse_mibs_cisco_syslog_msg)
+        retval = self._get_branch_by_name('ciscoSyslogMIBObjects')
         if retval < 0:
             self._add_warning("Error getting Cisco Syslog Messages (ciscoSyslogMIBObjects)")
             return 0    # for now
@@ -220,39 +307,24 @@ class SnmpConnectorCisco(SnmpConnector):
         """
         for (pe_index, port_entry) in self.poe_port_entries.items():
             if len(self.stack_port_to_if_index) > 0:
-                if pe_index in self.stack_port_to_if_index.keys():
-                    if_index = self.stack_port_to_if_index[pe_index]
-                    if if_index in self.interfaces.keys():
-                        self.interfaces[if_index].poe_entry = port_entry
-                        if port_entry.detect_status == POE_PORT_DETECT_FAULT:
-                            warning = f"PoE FAULT status ({port_entry.detect_status} = {poe_status_name[port_entry.detect_status]}) on interface {iface.name}"
-                            self._add_warning(warning)
-                            # log my activity
-                            log = Log(user=self.request.user,
-                                      type=LOG_TYPE_ERROR,
-                                      ip_address=get_remote_ip(self.request),
-                                      action=LOG_PORT_POE_FAULT,
-                                      description=warning)
-                            log.save()
-
+                if_index = self.stack_port_to_if_index.get(pe_index, False)
             else:
                 # map "mod.port" to "mod/port"
-                end = port_entry.index.replace('.', '/')
-                count = len(end)
-                for (if_index, iface) in self.interfaces.items():
-                    if iface.name[-count:] == end:
-                        iface.poe_entry = port_entry
-                        if port_entry.detect_status == POE_PORT_DETECT_FAULT:
-                            warning = f"PoE FAULT status ({port_entry.status_name}) on interface {iface.name}"
-                            self._add_warning(warning)
-                            # log my activity
-                            log = Log(user=self.request.user,
-                                      type=LOG_TYPE_ERROR,
-                                      ip_address=get_remote_ip(request),
-                                      action=LOG_PORT_POE_FAULT,
-                                      description=warning)
-                            log.save()
-                        break
+                if_index = self._get_if_index_by_name_end(port_entry.index.replace('.', '/'))
+            if if_index in self.interfaces.keys():
+                iface = self.interfaces[if_index]
+                iface.poe_entry = port_entry
+                if port_entry.detect_status == POE_PORT_DETECT_FAULT:
+                    warning = f"PoE FAULT status ({port_entry.detect_status} = {poe_status_name[port_entry.detect_status]}) on interface {iface.name}"
+                    self._add_warning(warning)
+                    # log my activity
+                    log = Log(type=LOG_TYPE_ERROR,
+                              ip_address=get_remote_ip(self.request),
+                              action=LOG_PORT_POE_FAULT,
+                              description=warning)
+                    if self.request:
+                        log.user = self.request.user
+                    save_log(log)
 
     def set_interface_untagged_vlan(self, interface, new_vlan_id):
         """
@@ -279,244 +351,258 @@ class SnmpConnectorCisco(SnmpConnector):
         Implement the get_vendor_data() class from the base object
         """
         dprint("_get_vendor_data(Cisco)")
-        self._get_branch_by_name('ccmHistory', True, self._parse_mibs_cisco_config)
+        self._get_branch_by_name('ccmHistory')
 
-    def _parse_mibs_cisco_if_opermode(self, oid, val):
+    def _parse_cl2l3_if_mode_oper(self, oid_end, val):
         """
         Parse Cisco specific Interface Config MIB for operational mode
         """
-        if_index = int(oid_in_branch(cL2L3IfModeOper, oid))
-        if if_index:
-            dprint(f"Cisco Interface Operation mode if_index {if_index} mode {val}")
-            if if_index in self.interfaces.keys():
-                if int(val) == CISCO_ROUTE_MODE:
-                    self.interfaces[if_index].is_routed = True
-            return True
-        return False
+        if_index = int(oid_end)
+        trace("Cisco Interface Operation mode if_index {} mode {}", if_index, val)
+        if if_index in self.interfaces.keys():
+            if int(val) == CISCO_ROUTE_MODE:
+                self.interfaces[if_index].is_routed = True
+        return True
 
-    def _parse_mibs_cisco_poe(self, oid, val):
+    #
+    # Cisco POE Extension MIB database
+    #
+    def _parse_cpe_ext_pse_port_pwr_consumption(self, oid_end, val):
         """
-        Parse Cisco POE Extension MIB database
+        the actual consumed power, shown in 'show power inline <name> detail'
         """
-        # the actual consumed power, shown in 'show power inline <name> detail'
-        pe_index = oid_in_branch(cpeExtPsePortPwrConsumption, oid)
-        if pe_index:
-            if pe_index in self.poe_port_entries.keys():
-                self.poe_port_entries[pe_index].power_consumption_supported = True
-                self.poe_port_entries[pe_index].power_consumed = int(val)
-            return True
-
-        # this is what is shown via 'show power inline interface X' command:
-        pe_index = oid_in_branch(cpeExtPsePortPwrAvailable, oid)
-        if pe_index:
-            if pe_index in self.poe_port_entries.keys():
-                self.poe_port_entries[pe_index].power_consumption_supported = True
-                self.poe_port_entries[pe_index].power_available = int(val)
-            return True
+        pe_index = oid_end
+        if pe_index in self.poe_port_entries.keys():
+            self.poe_port_entries[pe_index].power_consumption_supported = True
+            self.poe_port_entries[pe_index].power_consumed = int(val)
+        return True
 
-        pe_index = oid_in_branch(cpeExtPsePortMaxPwrDrawn, oid)
-        if pe_index:
-            if pe_index in self.poe_port_entries.keys():
-                self.poe_port_entries[pe_index].power_consumption_supported = True
-                self.poe_port_entries[pe_index].max_power_consumed = int(val)
-            return True
+    def _parse_cpe_ext_pse_port_pwr_available(self, oid_end, val):
+        """
+        this is what is shown via 'show power inline interface X' command:
+        """
+        pe_index = oid_end
+        if pe_index in self.poe_port_entries.keys():
+            self.poe_port_entries[pe_index].power_consumption_supported = True
+            self.poe_port_entries[pe_index].power_available = int(val)
+        return True
 
-        return False
+    def _parse_cpe_ext_pse_port_max_pwr_drawn(self, oid_end, val):
+        pe_index = oid_end
+        if pe_index in self.poe_port_entries.keys():
+            self.poe_port_entries[pe_index].power_consumption_supported = True
+            self.poe_port_entries[pe_index].max_power_consumed = int(val)
+        return True
 
-    def _parse_mibs_cisco_vtp(self, oid, val):
+    #
+    # Cisco specific VTP MIB
+    #
+    def _parse_vtp_vlan_state(self, oid_end, val):
         """
-        Parse Cisco specific VTP MIB
+        vlan id
         """
-        # vlan id
-        vlan_id = int(oid_in_branch(vtpVlanState, oid))
-        if vlan_id:
-            if (int(val) == 1):
-                self.vlans[vlan_id] = Vlan(vlan_id)
-            return True
-
-        # vlan type
-        vlan_id = int(oid_in_branch(vtpVlanType, oid))
-        if vlan_id:
-            type = int(val)
-            if vlan_id in self.vlans.keys():
-                if type == CISCO_VLAN_TYPE_NORMAL:
-                    self.vlans[vlan_id].type = VLAN_TYPE_NORMAL
-                else:
-                    self.vlans[vlan_id].type = type
-            return True
+        vlan_id = int(oid_end)
+        if (int(val) == 1):
+            self.vlans[vlan_id] = Vlan(vlan_id)
+        return True
 
-        # vlan name
-        vlan_id = int(oid_in_branch(vtpVlanName, oid))
-        if vlan_id:
-            if vlan_id in self.vlans.keys():
-                self.vlans[vlan_id].name = str(val)
-            return True
+    def _parse_vtp_vlan_type(self, oid_end, val):
+        """
+        vlan type
+        """
+        vlan_id = int(oid_end)
+        type = int(val)
+        if vlan_id in self.vlans.keys():
+            if type == CISCO_VLAN_TYPE_NORMAL:
+                self.vlans[vlan_id].type = VLAN_TYPE_NORMAL
+            else:
+                self.vlans[vlan_id].type = type
+        return True
 
-        # access or trunk mode configured?
-        if_index = int(oid_in_branch(vlanTrunkPortDynamicState, oid))
-        if if_index:
-            if(int(val) == VTP_TRUNK_STATE_ON):
-                # trunk/tagged port
-                if if_index in self.interfaces.keys():
-                    self.interfaces[if_index].is_tagged = True
-            return True
+    def _parse_vtp_vlan_name(self, oid_end, val):
+        """
+        vlan name
+        """
+        vlan_id = int(oid_end)
+        if vlan_id in self.vlans.keys():
+            self.vlans[vlan_id].name = str(val)
+        return True
 
-        # access or trunk mode actual status?
-        # this is the actual status, not what is configured; ie NOT trunk if interface is down!!!
-        # if_index = int(oid_in_branch(vlanTrunkPortDynamicStatus, oid))
-        # if if_index:
-        #    dprint(f"Cisco PORT TRUNK STATUS ifIndex {if_index} = {val}")
-        #    if(int(val) == VTP_PORT_TRUNK_ENABLED):
-        #        # trunk/tagged port
-        #        if if_index in self.interfaces.keys():
-        #            dprint("  TRUNKED!")
-        #            self.interfaces[if_index].is_tagged = True
-        #    return True
-
-        # if trunk, what is the native mode?
-        if_index = int(oid_in_branch(vlanTrunkPortNativeVlan, oid))
-        if if_index:
-            # trunk/tagged port native vlan
+    def _parse_vlan_trunk_port_dynamic_state(self, oid_end, val):
+        """
+        access or trunk mode configured?
+        """
+        if_index = int(oid_end)
+        if(int(val) == VTP_TRUNK_STATE_ON):
+            # trunk/tagged port
             if if_index in self.interfaces.keys():
-                # make sure this is a trunked interface and vlan is valid
-                if self.interfaces[if_index].is_tagged and int(val) in self.vlans.keys():
-                    self.interfaces[if_index].untagged_vlan = int(val)
-                else:
-                    dprint("  TRUNK NATIVE found, but NOT TRUNK PORT")
-            return True
-
-        if_index = int(oid_in_branch(vmVlan, oid))
-        if if_index:
-            untagged_vlan = int(val)
-            if (if_index in self.interfaces.keys()
-                    and not self.interfaces[if_index].is_tagged
-                    and untagged_vlan in self.vlans.keys()):
-                self.interfaces[if_index].untagged_vlan = untagged_vlan
-                self.interfaces[if_index].untagged_vlan_name = self.vlans[untagged_vlan].name
-            else:
-                dprint("   UNTAGGED VLAN for invalid trunk port")
-            return True
+                self.interfaces[if_index].is_tagged = True
+        return True
 
-        return False
+    # access or trunk mode actual status?
+    # this is the actual status, not what is configured; ie NOT trunk if interface is down!!!
+    # def _parse_vlan_trunk_port_dynamic_status(self, oid_end, val):
+    #    if_index = int(oid_end)
+    #    dprint(f"Cisco PORT TRUNK STATUS ifIndex {if_index} = {val}")
+    #    if(int(val) == VTP_PORT_TRUNK_ENABLED):
+    #        # trunk/tagged port
+    #        if if_index in self.interfaces.keys():
+    #            dprint("  TRUNKED!")
+    #            self.interfaces[if_index].is_tagged = True
+    #    return True
 
-    def _parse_mibs_cisco_config(self, oid, val):
+    def _parse_vlan_trunk_port_vlans_enabled(self, oid_end, val):
         """
-        Parse Cisco specific ConfigMan MIBs for running-config info
-        This gets added to the Information tab!
+        The bitmap of vlans 0 - 1023 allowed on a trunk port.
         """
-        sub_oid = oid_in_branch(ccmHistoryRunningLastChanged, oid)
-        if sub_oid:
-            # ticks in 1/100th of a second
-            ago = str(datetime.timedelta(seconds=(int(val) / 100)))
-            self.add_vendor_data("Configuration", "Running Last Modified", ago)
-            return True
+        return self._add_trunk_port_vlans(oid_end, val, 0)
 
-        sub_oid = oid_in_branch(ccmHistoryRunningLastSaved, oid)
-        if sub_oid:
-            # ticks in 1/100th of a second
-            ago = str(datetime.timedelta(seconds=(int(val) / 100)))
-            self.add_vendor_data("Configuration", "Running Last Saved", ago)
-            return True
+    def _parse_vlan_trunk_port_vlans_enabled_2k(self, oid_end, val):
+        return self._add_trunk_port_vlans(oid_end, val, 1024)
 
-        sub_oid = oid_in_branch(ccmHistoryStartupLastChanged, oid)
-        if sub_oid:
-            # ticks in 1/100th of a second
-            ago = str(datetime.timedelta(seconds=(int(val) / 100)))
-            self.add_vendor_data("Configuration", "Startup Last Changed", ago)
-            return True
-        return False
+    def _parse_vlan_trunk_port_vlans_enabled_3k(self, oid_end, val):
+        return self._add_trunk_port_vlans(oid_end, val, 2048)
 
-    def _parse_mibs_cisco_syslog_msg(self, oid, val):
+    def _parse_vlan_trunk_port_vlans_enabled_4k(self, oid_end, val):
+        return self._add_trunk_port_vlans(oid_end, val, 3072)
+
+    def _add_trunk_port_vlans(self, oid_end, val, first_vlan_id):
         """
-        Parse Cisco specific Syslog MIB to read syslog messages stored.
+        Add the vlans in this bitmap to the tagged vlans of the trunk port.
+        The high order bit of the first byte is vlan 'first_vlan_id'.
         """
-        sub_oid = oid_in_branch(clogHistTableMaxLength, oid)
-        if sub_oid:
-            # this is the max number of syslog messages stored.
-            self.syslog_max_msgs = int(val)
-            return True
-
-        sub_oid = oid_in_branch(clogHistIndex, oid)
-        if sub_oid:
-            # this is the index, create a new object.
-            # note that not all implementation return this value, as it is implied in the other entries!
-            index = int(sub_oid)
-            self.syslog_msgs[index] = SyslogMsg(index)
-            return True
+        if_index = int(oid_end)
+        if if_index in self.interfaces.keys() and self.interfaces[if_index].is_tagged:
+            iface = self.interfaces[if_index]
+            bitmap = PortList()
+            bitmap.from_unicode(val)
+            for bit in bitmap.ports():
+                vlan_id = first_vlan_id + bit - 1
+                if vlan_id in self.vlans.keys() and vlan_id != iface.untagged_vlan and vlan_id not in iface.vlans:
+                    iface.vlans.append(vlan_id)
+        return True
 
-        sub_oid = oid_in_branch(clogHistFacility, oid)
-        if sub_oid:
-            # verify we have an object for this index
-            index = int(sub_oid)
-            if index in self.syslog_msgs.keys():
-                self.syslog_msgs[index].facility = val
+    def _parse_vlan_trunk_port_native_vlan(self, oid_end, val):
+        """
+        if trunk, what is the native mode?
+        """
+        if_index = int(oid_end)
+        # trunk/tagged port native vlan
+        if if_index in self.interfaces.keys():
+            # make sure this is a trunked interface and vlan is valid
+            if self.interfaces[if_index].is_tagged and int(val) in self.vlans.keys():
+                self.interfaces[if_index].untagged_vlan = int(val)
             else:
-                msg = SyslogMsg(index)
-                msg.facility = val
-                self.syslog_msgs[index] = msg
-            return True
+                trace("  TRUNK NATIVE found, but NOT TRUNK PORT")
+        return True
 
-        # from this point on we "should" have the object created!
-        sub_oid = oid_in_branch(clogHistSeverity, oid)
-        if sub_oid:
-            # verify we have an object for this index
-            index = int(sub_oid)
-            if index in self.syslog_msgs.keys():
-                self.syslog_msgs[index].severity = int(val)
-            else:
-                # be save, create; "should" never happen
-                msg = SyslogMsg(index)
-                msg.severity = int(val)
-                self.syslog_msgs[index] = msg
-            return True
+    def _parse_vm_vlan(self, oid_end, val):
+        if_index = int(oid_end)
+        untagged_vlan = int(val)
+        if (if_index in self.interfaces.keys()
+                and not self.interfaces[if_index].is_tagged
+                and untagged_vlan in self.vlans.keys()):
+            self.interfaces[if_index].untagged_vlan = untagged_vlan
+            self.interfaces[if_index].untagged_vlan_name = self.vlans[untagged_vlan].name
+        else:
+            trace("   UNTAGGED VLAN for invalid trunk port")
+        return True
 
-        sub_oid = oid_in_branch(clogHistMsgName, oid)
-        if sub_oid:
-            # verify we have an object for this index
-            index = int(sub_oid)
-            if index in self.syslog_msgs.keys():
-                self.syslog_msgs[index].name = val
-            else:
-                # be save, create; "should" never happen
-                msg = SyslogMsg(index)
-                msg.name = val
-                self.syslog_msgs[index] = msg
-            return True
+    #
+    # Cisco specific ConfigMan MIBs for running-config info
+    # This gets added to the Information tab!
+    #
+    def _parse_ccm_history_running_last_changed(self, oid_end, val):
+        # ticks in 1/100th of a second
+        ago = str(datetime.timedelta(seconds=(int(val) / 100)))
+        self.add_vendor_data("Configuration", "Running Last Modified", ago)
+        return True
 
-        sub_oid = oid_in_branch(clogHistMsgText, oid)
-        if sub_oid:
-            # verify we have an object for this index
-            index = int(sub_oid)
-            if index in self.syslog_msgs.keys():
-                self.syslog_msgs[index].message = val
-            else:
-                # be save, create; "should" never happen
-                msg = SyslogMsg(index)
-                msg.message = val
-                self.syslog_msgs[index] = msg
-            return True
+    def _parse_ccm_history_running_last_saved(self, oid_end, val):
+        # ticks in 1/100th of a second
+        ago = str(datetime.timedelta(seconds=(int(val) / 100)))
+        self.add_vendor_data("Configuration", "Running Last Saved", ago)
+        return True
 
-        sub_oid = oid_in_branch(clogHistTimestamp, oid)
-        if sub_oid:
-            # verify we have an object for this index
-            index = int(sub_oid)
-            # val is sysUpTime value when message was generated, ie. timetick!
-            timetick = int(val)
-            if index in self.syslog_msgs.keys():
-                # approximate / calculate the datetime value:
-                # msg timestamp = time when sysUpTime was read minus seconds between sysUptime and msg timetick
-                dprint(f"TIMES ARE: {self.system.time}  {self.system.sys_uptime}  {timetick}")
-                self.syslog_msgs[index].datetime = datetime.datetime.fromtimestamp(self.system.time - int((self.system.sys_uptime - timetick)/100))
-            else:
-                # be save, create; "should" never happen
-                msg = SyslogMsg(index)
-                # approximate / calculate the datetime value:
-                # msg time = time when sysUpTime was read minus seconds between sysUptime and msg timetick
-                msg.datetime = datetime.datetime.fromtimestamp(self.system.time - int((self.system.sys_uptime - timetick)/100))
-                self.syslog_msgs[index] = msg
-            return True
+    def _parse_ccm_history_startup_last_changed(self, oid_end, val):
+        # ticks in 1/100th of a second
+        ago = str(datetime.timedelta(seconds=(int(val) / 100)))
+        self.add_vendor_data("Configuration", "Startup Last Changed", ago)
+        return True
 
-        return False
+    #
+    # Cisco specific Syslog MIB to read syslog messages stored.
+    #
+    def _parse_clog_hist_table_max_length(self, oid_end, val):
+        # this is the max number of syslog messages stored.
+        self.syslog_max_msgs = int(val)
+        return True
+
+    def _parse_clog_hist_index(self, oid_end, val):
+        # this is the index, create a new object.
+        # note that not all implementation return this value, as it is implied in the other entries!
+        index = int(oid_end)
+        self.syslog_msgs[index] = SyslogMsg(index)
+        return True
+
+    def _parse_clog_hist_facility(self, oid_end, val):
+        # verify we have an object for this index
+        index = int(oid_end)
+        if index in self.syslog_msgs.keys():
+            self.syslog_msgs[index].facility = val
+        else:
+            self.syslog_msgs[index] = SyslogMsg(index, facility=val)
+        return True
+
+    # from this point on we "should" have the object created!
+    def _parse_clog_hist_severity(self, oid_end, val):
+        # verify we have an object for this index
+        index = int(oid_end)
+        if index in self.syslog_msgs.keys():
+            self.syslog_msgs[index].severity = int(val)
+        else:
+            # be save, create; "should" never happen
+            self.syslog_msgs[index] = SyslogMsg(index, severity=int(val))
+        return True
+
+    def _parse_clog_hist_msg_name(self, oid_end, val):
+        # verify we have an object for this index
+        index = int(oid_end)
+        if index in self.syslog_msgs.keys():
+            self.syslog_msgs[index].name = val
+        else:
+            # be save, create; "should" never happen
+            self.syslog_msgs[index] = SyslogMsg(index, name=val)
+        return True
+
+    def _parse_clog_hist_msg_text(self, oid_end, val):
+        # verify we have an object for this index
+        index = int(oid_end)
+        if index in self.syslog_msgs.keys():
+            self.syslog_msgs[index].message = val
+        else:
+            # be save, create; "should" never happen
+            self.syslog_msgs[index] = SyslogMsg(index, message=val)
+        return True
+
+    def _parse_clog_hist_timestamp(self, oid_end, val):
+        # verify we have an object for this index
+        index = int(oid_end)
+        # val is sysUpTime value when message was generated, ie. timetick!
+        timetick = int(val)
+        if index in self.syslog_msgs.keys():
+            # approximate / calculate the datetime value:
+            # msg timestamp = time when sysUpTime was read minus seconds between sysUptime and msg timetick
+            trace("TIMES ARE: {}  {}  {}", self.system.time, self.system.sys_uptime, timetick)
+            self.syslog_msgs[index].datetime = datetime.datetime.fromtimestamp(self.system.time - int((self.system.sys_uptime - timetick)/100))
+        else:
+            # be save, create; "should" never happen
+            msg = SyslogMsg(index)
+            # approximate / calculate the datetime value:
+            # msg time = time when sysUpTime was read minus seconds between sysUptime and msg timetick
+            msg.datetime = datetime.datetime.fromtimestamp(self.system.time - int((self.system.sys_uptime - timetick)/100))
+            self.syslog_msgs[index] = msg
+        return True
 
     def can_save_config(self):
         """
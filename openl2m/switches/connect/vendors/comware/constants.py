@@ -26,8 +26,11 @@ hh3cCfgLog = '.1.3.6.1.4.1.25506.2.4.1.1'
 snmp_mib_variables['hh3cCfgLog'] = hh3cCfgLog
 
 hh3cCfgRunModifiedLast = '.1.3.6.1.4.1.25506.2.4.1.1.1'
+snmp_mib_variables['hh3cCfgRunModifiedLast'] = hh3cCfgRunModifiedLast
 hh3cCfgRunSavedLast = '.1.3.6.1.4.1.25506.2.4.1.1.2'
+snmp_mib_variables['hh3cCfgRunSavedLast'] = hh3cCfgRunSavedLast
 hh3cCfgStartModifiedLast = '.1.3.6.1.4.1.25506.2.4.1.1.3'
+snmp_mib_variables['hh3cCfgStartModifiedLast'] = hh3cCfgStartModifiedLast
 
 hh3cCfgOperateType = '.1.3.6.1.4.1.25506.2.4.1.2.4.1.2'
 snmp_mib_variables['hh3cCfgOperateType'] = hh3cCfgOperateType
@@ -21,6 +21,7 @@ import math
 from pysnmp.proto.rfc1902 import ObjectName, OctetString, Gauge32
 
 from switches.models import Log
+from switches.log_buffer import save_log
 from switches.constants import *
 from switches.connect.classes import *
 from switches.connect.snmp import pysnmpHelper, SnmpConnector, oid_in_branch
@@ -46,25 +47,30 @@ class SnmpConnectorComware(SnmpConnector):
         # needed for saving config file:
         self.active_config_rows = 0
 
-    def _parse_oid(self, oid, val):
-        """
-        Parse a single OID with data returned from a switch through some "get" function
-        Returns True if we parse the OID!
-        """
-        dprint(f"Comware _parse_oid() {oid}")
-
-        if self._parse_mibs_comware_poe(oid, val):
-            return True
-        if self._parse_mibs_comware_config(oid, val):
-            return True
-        if self._parse_mibs_comware_vlan(oid, val):
-            return True
-        if self._parse_mibs_comware_if_type(oid, val):
-            return True
-        if self._parse_mibs_comware_if_linkmode(oid, val):
-            return True
-        # call the generic base parser
-        return super()._parse_oid(oid, val)
+    # the Comware specific MIB branches we parse in _parse_oid(), see SnmpConnector.oid_handlers
+    oid_handlers = [
+        ('hh3cPsePortCurrentPower', '_parse_hh3c_pse_port_current_power'),
+        ('hh3cCfgRunModifiedLast', '_parse_hh3c_cfg_run_modified_last'),
+        ('hh3cCfgRunSavedLast', '_parse_hh3c_cfg_run_saved_last'),
+        ('hh3cCfgStartModifiedLast', '_parse_hh3c_cfg_start_modified_last'),
+        ('hh3cdot1qVlanName', '_parse_hh3c_dot1q_vlan_name'),
+        ('hh3cifVLANType', '_parse_hh3c_if_vlan_type'),
+        ('hh3cIfLinkMode', '_parse_hh3c_if_link_mode'),
+    ]
+
+    # the Comware specific branches walked by get_switch_basic_info(), see SnmpConnector.basic_info_branches
+    basic_info_branches = SnmpConnector.basic_info_branches + [
+        'hh3cIfLinkMode',
+        'hh3cdot1qVlanName',
+        'hh3cifVLANType',
+        'hh3cPsePortCurrentPower',
+    ]
+
+    # see SnmpConnector.vlan_branches
+    vlan_branches = SnmpConnector.vlan_branches + [
+        'hh3cdot1qVlanName',
+        'hh3cifVLANType',
+    ]
 
     def _get_interface_data(self):
         """
@@ -75,7 +81,7 @@ class SnmpConnectorComware(SnmpConnector):
         super()._get_interface_data()
 
         # now add Comware data, and cache it:
-        if self._get_branch_by_name('hh3cIfLinkMode', True, self._parse_mibs_comware_if_linkmode) < 0:
+        if self._get_branch_by_name('hh3cIfLinkMode') < 0:
             dprint("Comware hh3cIfLinkMode returned error!")
             return False
 
@@ -104,12 +110,12 @@ class SnmpConnectorComware(SnmpConnector):
         # now read some Comware specific items.
         # some Comware switches do not report vlan names in Q-Bridge mib
         # so read HH3C version
-        if self._get_branch_by_name('hh3cdot1qVlanName', True, self._parse_mibs_comware_vlan) < 0:
+        if self._get_branch_by_name('hh3cdot1qVlanName') < 0:
             dprint("Comware hh3cdot1qVlanName returned error!")
             return False
 
         # read the Comware port type:
-        if self._get_branch_by_name('hh3cifVLANType', True, self._parse_mibs_comware_if_type) < 0:
+        if self._get_branch_by_name('hh3cifVLANType') < 0:
             dprint("Comware hh3cifVLANType returned error!")
             return False
 
@@ -136,7 +142,7 @@ class SnmpConnectorComware(SnmpConnector):
         Does not return anything!
         """
         # dprint("Comware _get_vendor_data()")
-        self._get_branch_by_name('hh3cCfgLog', True, self._parse_mibs_comware_config)
+        self._get_branch_by_name('hh3cCfgLog')
 
     def set_interface_untagged_vlan(self, interface, new_vlan_id):
         """
@@ -170,17 +176,15 @@ class SnmpConnectorComware(SnmpConnector):
                 # now setup the OIDs to send as an atomic set:
                 # first set Low-VLANs (1-2048) on this port:
                 # Comware needs bits in opposite order inside each byte! (go figure)
-                # note that to_hex_string() is same as .__str__ representation,
-                # but we use it for extra clarity!
                 low_vlan_list.reverse_bits_in_bytes()
                 low_oid = (f"{hh3cifVLANTrunkAllowListLow}.{interface.port_id}",
-                           OctetString(hexValue=low_vlan_list.to_hex_string()))
+                           low_vlan_list.to_octet_string())
 
                 # next High-VLANs (2049-4096) on this port:
                 # Comware needs bits in opposite order inside each byte! (go figure)
                 high_vlan_list.reverse_bits_in_bytes()
                 high_oid = (f"{hh3cifVLANTrunkAllowListHigh}.{interface.port_id}",
-                            OctetString(hexValue=high_vlan_list.to_hex_string()))
+                            high_vlan_list.to_octet_string())
 
                 # finally, set untagged vlan:  dot1qPvid
                 pvid_oid = (f"{dot1qPvid}.{interface.port_id}", Gauge32(new_vlan_id))
@@ -245,9 +249,7 @@ class SnmpConnectorComware(SnmpConnector):
                 # Comware needs bits in opposite order inside each byte! (go figure)
                 new_vlan_portlist.reverse_bits_in_bytes()
                 # get the PySNMP helper to do the work with this BitMap:
-                # note that to_hex_string() is same as .__str__ representation,
-                # but we use it for extra clarity!
-                octet_string = OctetString(hexValue=new_vlan_portlist.to_hex_string())
+                octet_string = new_vlan_portlist.to_octet_string()
                 pysnmp = pysnmpHelper(self.switch)
                 (error_status, details) = pysnmp.set(f"{hh3cdot1qVlanPorts}.{new_vlan_id}", octet_string)
                 if error_status:
@@ -260,6 +262,8 @@ class SnmpConnectorComware(SnmpConnector):
             # without the need to re-read SNMP data! We could also just read it here :-)
             # self._parse_oid_and_cache(QBRIDGE_VLAN_IFACE_UNTAGGED_PVID + "." + str(if_index), str(new_vlan_id), 'u')
 
+            # our cached data is current again after the re-read below:
+            self._switch_changed(cache_updated=True)
             # now we need to reread the interface to VLAN mib part
             self._get_port_vlan_membership()
             # and force data to be added to session cache again!
@@ -272,7 +276,7 @@ class SnmpConnectorComware(SnmpConnector):
         """
         vendor-specific override of function to check if this interface can be managed.
         We check for IRF ports here. This is detected via 'hh3cifVLANType' MIB value,
-        in _parse_mibs_comware_if_type()
+        in _parse_hh3c_if_vlan_type()
         Returns True for normal interfaces, but False for IRF ports.
         """
         if iface.type == IF_TYPE_ETHERNET:
@@ -285,30 +289,24 @@ class SnmpConnectorComware(SnmpConnector):
                 return False
         return True
 
-    def _parse_mibs_comware_config(self, oid, val):
-        """
-        Parse Comware specific ConfigMan MIB
-        Mostly entries under 'hh3cCfgLog'
-        """
-        sub_oid = oid_in_branch(hh3cCfgRunModifiedLast, oid)
-        if sub_oid:
-            ago = str(datetime.timedelta(seconds=(int(val) / 100)))
-            self.add_vendor_data("Configuration", "Running Last Modified", ago)
-            return True
-
-        sub_oid = oid_in_branch(hh3cCfgRunSavedLast, oid)
-        if sub_oid:
-            ago = str(datetime.timedelta(seconds=(int(val) / 100)))
-            self.add_vendor_data("Configuration", "Running Last Saved", ago)
-            return True
+    #
+    # Comware specific ConfigMan MIB
+    # Mostly entries under 'hh3cCfgLog'
+    #
+    def _parse_hh3c_cfg_run_modified_last(self, oid_end, val):
+        ago = str(datetime.timedelta(seconds=(int(val) / 100)))
+        self.add_vendor_data("Configuration", "Running Last Modified", ago)
+        return True
 
-        sub_oid = oid_in_branch(hh3cCfgStartModifiedLast, oid)
-        if sub_oid:
-            ago = str(datetime.timedelta(seconds=(int(val) / 100)))
-            self.add_vendor_data("Configuration", "Startup Last Saved", ago)
-            return True
+    def _parse_hh3c_cfg_run_saved_last(self, oid_end, val):
+        ago = str(datetime.timedelta(seconds=(int(val) / 100)))
+        self.add_vendor_data("Configuration", "Running Last Saved", ago)
+        return True
 
-        return False
+    def _parse_hh3c_cfg_start_modified_last(self, oid_end, val):
+        ago = str(datetime.timedelta(seconds=(int(val) / 100)))
+        self.add_vendor_data("Configuration", "Startup Last Saved", ago)
+        return True
 
     """
     the HH3C-POWER-ETH MIB tables with port-level PoE power usage info
@@ -318,59 +316,50 @@ class SnmpConnectorComware(SnmpConnector):
     This gets mapped to an interface later on in
     self._map_poe_port_entries_to_interface(), which is typically device specific
     """
-    def _parse_mibs_comware_poe(self, oid, val):
+    def _parse_hh3c_pse_port_current_power(self, oid_end, val):
         """
         Parse the Comware extended HH3C-POWER-ETH MIB, power usage extension
         """
-        dprint(f"_parse_mibs_comware_poe() {oid}, len = {val}, type = {type(val)}")
-        pe_index = oid_in_branch(hh3cPsePortCurrentPower, oid)
-        if pe_index:
-            if pe_index in self.poe_port_entries.keys():
-                self.poe_port_entries[pe_index].power_consumption_supported = True
-                self.poe_port_entries[pe_index].power_consumed = int(val)
-            return True
-
-        return False
+        trace("_parse_hh3c_pse_port_current_power() {}, len = {}, type = {}", oid_end, val, type(val))
+        pe_index = oid_end
+        if pe_index in self.poe_port_entries.keys():
+            self.poe_port_entries[pe_index].power_consumption_supported = True
+            self.poe_port_entries[pe_index].power_consumed = int(val)
+        return True
 
-    def _parse_mibs_comware_vlan(self, oid, val):
+    def _parse_hh3c_dot1q_vlan_name(self, oid_end, val):
         """
         Parse Comware specific VLAN MIB
         """
-        vlan_id = int(oid_in_branch(hh3cdot1qVlanName, oid))
-        if vlan_id > 0:
-            if vlan_id in self.vlans.keys():
-                # some Comware switches only report "VLAN xxxx", skip that!
-                if not val.startswith('VLAN '):
-                    self.vlans[vlan_id].name = val
-            return True
-        return False
+        vlan_id = int(oid_end)
+        if vlan_id in self.vlans.keys():
+            # some Comware switches only report "VLAN xxxx", skip that!
+            if not val.startswith('VLAN '):
+                self.vlans[vlan_id].name = val
+        return True
 
-    def _parse_mibs_comware_if_type(self, oid, val):
+    def _parse_hh3c_if_vlan_type(self, oid_end, val):
         """
         Parse Comware specific Interface Type MIB
         """
-        if_index = int(oid_in_branch(hh3cifVLANType, oid))
-        if if_index:
-            # dprint(f"Comware if_index{if_index} if_type {val}"
-            if if_index in self.interfaces.keys():
-                self.interfaces[if_index].if_vlan_mode = int(val)
-                if int(val) == HH3C_IF_MODE_TRUNK:
-                    self.interfaces[if_index].is_tagged = True
-            return True
-        return False
+        if_index = int(oid_end)
+        # dprint(f"Comware if_index{if_index} if_type {val}"
+        if if_index in self.interfaces.keys():
+            self.interfaces[if_index].if_vlan_mode = int(val)
+            if int(val) == HH3C_IF_MODE_TRUNK:
+                self.interfaces[if_index].is_tagged = True
+        return True
 
-    def _parse_mibs_comware_if_linkmode(self, oid, val):
+    def _parse_hh3c_if_link_mode(self, oid_end, val):
         """
         Parse Comware specific Interface Extension MIB for link mode, PoE info
         """
-        if_index = int(oid_in_branch(hh3cIfLinkMode, oid))
-        if if_index:
-            dprint(f"Comware LinkMode if_index {if_index} link_mode {val}")
-            if if_index in self.interfaces.keys():
-                if int(val) == HH3C_ROUTE_MODE:
-                    self.interfaces[if_index].is_routed = True
-            return True
-        return False
+        if_index = int(oid_end)
+        trace("Comware LinkMode if_index {} link_mode {}", if_index, val)
+        if if_index in self.interfaces.keys():
+            if int(val) == HH3C_ROUTE_MODE:
+                self.interfaces[if_index].is_routed = True
+        return True
 
     def _parse_mibs_comware_configfile(self, oid, val):
         """
@@ -390,7 +379,7 @@ class SnmpConnectorComware(SnmpConnector):
         """
         super()._get_poe_data()
         # now get HP specific info from HP-IFC-POE-MIB first
-        retval = self._get_branch_by_name('hh3cPsePortCurrentPower', True, self._parse_mibs_comware_poe)
+        retval = self._get_branch_by_name('hh3cPsePortCurrentPower')
         if retval < 0:
             self._add_warning("Error getting 'PoE-Port-Current-Power' (hh3cPsePortCurrentPower)")
         return 1
@@ -411,24 +400,23 @@ class SnmpConnectorComware(SnmpConnector):
             # generate the interface ending, for above 7.12 ==> 2/0/12
             # interface appears to be port - ((member-1)*65)
             portnum = int(int(port) - ((member - 1) * 65))
-            end = f"{member}/0/{portnum}"
-            count = len(end)
-            for (if_index, iface) in self.interfaces.items():
-                if iface.name[-count:] == end:
-                    iface.poe_entry = port_entry
-                    if port_entry.detect_status > POE_PORT_DETECT_DELIVERING:
-                        warning = f"PoE FAULT status ({port_entry.detect_status} = " \
-                                  "{poe_status_name[port_entry.detect_status]}) " \
-                                  "on interface {iface.name}"
-                        self._add_warning(warning)
-                        # log my activity
-                        log = Log(user=self.request.user,
-                                  type=LOG_TYPE_ERROR,
-                                  ip_address=get_remote_ip(self.request),
-                                  action=LOG_PORT_POE_FAULT,
-                                  description=warning)
-                        log.save()
-                    break
+            if_index = self._get_if_index_by_name_end(f"{member}/0/{portnum}")
+            if if_index:
+                iface = self.interfaces[if_index]
+                iface.poe_entry = port_entry
+                if port_entry.detect_status > POE_PORT_DETECT_DELIVERING:
+                    warning = f"PoE FAULT status ({port_entry.detect_status} = " \
+                              f"{poe_status_name[port_entry.detect_status]}) " \
+                              f"on interface {iface.name}"
+                    self._add_warning(warning)
+                    # log my activity
+                    log = Log(type=LOG_TYPE_ERROR,
+                              ip_address=get_remote_ip(self.request),
+                              action=LOG_PORT_POE_FAULT,
+                              description=warning)
+                    if self.request:
+                        log.user = self.request.user
+                    save_log(log)
 
     def can_save_config(self):
         """
@@ -462,7 +450,7 @@ class SnmpConnectorComware(SnmpConnector):
         retval = self._set_multiple([
             (f"{hh3cCfgOperateType}.{row_place}", HH3C_running2Startup, 'i'),
             (f"{hh3cCfgOperateRowStatus}.{row_place}", HH3C_createAndGo, 'i')
-        ])
+        ], False)
         if retval < 0:
             self._add_warning("Error saving via SNMP (hh3cCfgOperateRowStatus)")
             return -1
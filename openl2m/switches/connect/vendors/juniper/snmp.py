@@ -17,6 +17,7 @@ This re-implements some methods found in the base SNMP() class
 with Juniper specific ways of doing things...
 """
 from switches.models import Log
+from switches.log_buffer import save_log
 from switches.constants import *
 from switches.connect.classes import *
 from switches.connect.snmp import SnmpConnector, oid_in_branch
@@ -42,19 +43,24 @@ class SnmpConnectorJuniper(SnmpConnector):
         # force READ-ONLY for now! We have not implemented changing settings.
         self.switch.read_only = True
 
-    def _parse_oid(self, oid, val):
-        """
-        Parse a single OID with data returned from a switch through some "get" function
-        THIS NEEDS WORK TO IMPROVE PERFORMANCE !!!
-        Returns True if we parse the OID and we should cache it!
-        """
-        dprint(f"Juniper Parsing OID {oid}")
-
-        if self._parse_mibs_juniper_l2ald_vlans(oid, val):
-            return True
-
-        # if not Juniper specific, call the generic parser
-        return super()._parse_oid(oid, val)
+    # the Juniper specific MIB branches we parse in _parse_oid(), see SnmpConnector.oid_handlers
+    oid_handlers = [
+        ('jnxL2aldVlanTag', '_parse_jnx_l2ald_vlan_tag'),
+        ('jnxL2aldVlanName', '_parse_jnx_l2ald_vlan_name'),
+        ('jnxL2aldVlanType', '_parse_jnx_l2ald_vlan_type'),
+        ('jnxL2aldVlanFdbId', '_parse_jnx_l2ald_vlan_fdb_id'),
+    ]
+
+    # the Juniper specific branches walked by get_switch_basic_info(), see SnmpConnector.basic_info_branches
+    vlan_table_columns = ('jnxL2aldVlanTag', 'jnxL2aldVlanName', 'jnxL2aldVlanType', 'jnxL2aldVlanFdbId')
+    basic_info_branches = SnmpConnector.basic_info_branches + [
+        vlan_table_columns,
+    ]
+
+    # see SnmpConnector.vlan_branches
+    vlan_branches = SnmpConnector.vlan_branches + [
+        vlan_table_columns,
+    ]
 
     def _map_poe_port_entries_to_interface(self):
         """
@@ -70,24 +76,24 @@ class SnmpConnectorJuniper(SnmpConnector):
             module = int(module) - 1    # 0-based!
             port = int(port) - 1        # 0-based!
             # find the matching interface:
-            for (if_index, iface) in self.interfaces.items():
-                if_name = f"ge-{module}/0/{port}"
-                if iface.name == if_name:
-                    dprint(f"   PoE Port Map FOUND {iface.name}")
-                    iface.poe_entry = port_entry
-                    if port_entry.detect_status > POE_PORT_DETECT_DELIVERING:
-                        warning = f"PoE FAULT status ({port_entry.detect_status} = " \
-                                  "{poe_status_name[port_entry.detect_status]}) " \
-                                  "on interface {iface.name}"
-                        self._add_warning(warning)
-                        # log my activity
-                        log = Log(user=self.request.user,
-                                  type=LOG_TYPE_ERROR,
-                                  ip_address=get_remote_ip(self.request),
-                                  action=LOG_PORT_POE_FAULT,
-                                  description=warning)
-                        log.save()
-                    break
+            if_index = self._get_if_index_by_name(f"ge-{module}/0/{port}")
+            if if_index:
+                iface = self.interfaces[if_index]
+                trace("   PoE Port Map FOUND {}", iface.name)
+                iface.poe_entry = port_entry
+                if port_entry.detect_status > POE_PORT_DETECT_DELIVERING:
+                    warning = f"PoE FAULT status ({port_entry.detect_status} = " \
+                              f"{poe_status_name[port_entry.detect_status]}) " \
+                              f"on interface {iface.name}"
+                    self._add_warning(warning)
+                    # log my activity
+                    log = Log(type=LOG_TYPE_ERROR,
+                              ip_address=get_remote_ip(self.request),
+                              action=LOG_PORT_POE_FAULT,
+                              description=warning)
+                    if self.request:
+                        log.user = self.request.user
+                    save_log(log)
 
     def _get_vlan_data(self):
         """
@@ -99,87 +105,83 @@ class SnmpConnectorJuniper(SnmpConnector):
         # first, call the standard snmp vlan reader
         super()._get_vlan_data()
 
-        # try the Juniper L2 entries. FIrst the "tag" or index to vlan_id mapping:
-        retval = self._get_branch_by_name('jnxL2aldVlanTag', True, self._parse_mibs_juniper_l2ald_vlans)
-        if retval < 0:  # error
-            return retval
-        if retval > 0:  # we found something, read the rest
-            retval = self._get_branch_by_name('jnxL2aldVlanName', True, self._parse_mibs_juniper_l2ald_vlans)
-            if retval < 0:  # error
-                return retval
-            retval = self._get_branch_by_name('jnxL2aldVlanType', True, self._parse_mibs_juniper_l2ald_vlans)
-            if retval < 0:  # error
-                return retval
-            retval = self._get_branch_by_name('jnxL2aldVlanFdbId', True, self._parse_mibs_juniper_l2ald_vlans)
-            if retval < 0:  # error
-                return retval
+        # try the Juniper L2 entries. First the "tag" or index to vlan_id mapping,
+        # then name, type and fdb id, all read at the same time:
+        counts = self._get_table_by_names(self.vlan_table_columns)
+        if counts == -1:  # error
+            return -1
+        if counts['jnxL2aldVlanTag'] > 0:  # we found something
             return 1
         return 0
 
-    def _parse_mibs_juniper_l2ald_vlans(self, oid, val):
+    #
+    # JNX EX specific VLAN Mibs
+    #
+    """
+    # internal vlan tag - frequently NOT returned
+    def _parse_jnx_l2ald_vlan_id(self, oid_end, val):
+        vlan_index = int(oid_end)
+        if (int(val) == 1):
+            self.vlan_id_by_index[vlan_index] = Vlan(none, vlan_index)
+        return True
+    """
+
+    def _parse_jnx_l2ald_vlan_tag(self, oid_end, val):
         """
-        Parse JNX EX specific VLAN Mibs
-        Returns True if parses, False if not.
+        a new vlan tag or index that maps to an actual vlan id on the wire!
         """
-        dprint("_parse_mibs_juniper_l2ald_vlans()\n")
+        vlan_index = int(oid_end)
+        trace("jnxL2aldVlanTag {} = {}", vlan_index, val)
+        self.vlan_id_by_index[vlan_index] = int(val)
+        return True
 
+    def _parse_jnx_l2ald_vlan_name(self, oid_end, val):
+        """
+        vlan name, indexed by internal vlan index, NOT vlan id!
+        """
+        vlan_index = int(oid_end)
+        trace("jnxL2aldVlanName {} = {}", vlan_index, val)
+        try:
+            self.vlans[self.vlan_id_by_index[vlan_index]].name = val
+        except KeyError:
+            # should not happen!
+            self._add_warning(f"Invalid vlan index {vlan_index} (jnxL2aldVlanName)")
+        return True
+
+    def _parse_jnx_l2ald_vlan_type(self, oid_end, val):
+        """
+        vlan type, static or dynamic
+        """
+        vlan_index = int(oid_end)
+        trace("jnxL2aldVlanType {} = {}", vlan_index, val)
+        val = int(val)
+        if val == JNX_VLAN_TYPE_STATIC:
+            status = VLAN_STATUS_PERMANENT
+        elif val == JNX_VLAN_TYPE_DYNAMIC:
+            status = VLAN_STATUS_DYNAMIC
+        else:   # should not happen!
+            status = VLAN_STATUS_OTHER
+        try:
+            self.vlans[self.vlan_id_by_index[vlan_index]].status = status
+        except KeyError:
+            # should not happen!
+            self._add_warning(f"Invalid vlan index {vlan_index} (jnxL2aldVlanType)")
+        return True
+
+    def _parse_jnx_l2ald_vlan_fdb_id(self, oid_end, val):
         """
-        # internal vlan tag - frequently NOT returned
-        vlan_index = int(oid_in_branch(jnxL2aldVlanID, oid))
-        if vlan_index:
-            if (int(val) == 1):
-                self.vlan_id_by_index[vlan_index] = Vlan(none, vlan_index)
-            return True
+        the filtering database, this maps 'vlan index' (sub-oid) to 'filter db index' (return value)
         """
-        # a new vlan tag or index that maps to an actual vlan id on the wire!
-        vlan_index = int(oid_in_branch(jnxL2aldVlanTag, oid))
-        if vlan_index:
-            dprint(f"jnxL2aldVlanTag {vlan_index} = {val}")
-            self.vlan_id_by_index[vlan_index] = int(val)
-            return True
-
-        # vlan name, indexed by internal vlan index, NOT vlan id!
-        vlan_index = int(oid_in_branch(jnxL2aldVlanName, oid))
-        if vlan_index:
-            dprint(f"jnxL2aldVlanName {vlan_index} = {val}")
-            try:
-                self.vlans[self.vlan_id_by_index[vlan_index]].name = val
-            except KeyError:
-                # should not happen!
-                self._add_warning(f"Invalid vlan index {vlan_index} (jnxL2aldVlanName)")
-            return True
-
-        # vlan type, static or dynamic
-        vlan_index = int(oid_in_branch(jnxL2aldVlanType, oid))
-        if vlan_index:
-            dprint(f"jnxL2aldVlanType {vlan_index} = {val}")
-            val = int(val)
-            if val == JNX_VLAN_TYPE_STATIC:
-                status = VLAN_STATUS_PERMANENT
-            elif val == JNX_VLAN_TYPE_DYNAMIC:
-                status = VLAN_STATUS_DYNAMIC
-            else:   # should not happen!
-                status = VLAN_STATUS_OTHER
-            try:
-                self.vlans[self.vlan_id_by_index[vlan_index]].status = status
-            except KeyError:
-                # should not happen!
-                self._add_warning(f"Invalid vlan index {vlan_index} (jnxL2aldVlanType)")
-            return True
-
-        # the filtering database, this maps 'vlan index' (sub-oid) to 'filter db index' (return value)
-        vlan_index = int(oid_in_branch(jnxL2aldVlanFdbId, oid))
-        if vlan_index:
-            fdb_index = int(val)
-            try:
-                self.vlans[self.vlan_id_by_index[vlan_index]].fdb_index = fdb_index
-                self.dot1tp_fdb_to_vlan_index[fdb_index] = vlan_index
-                dprint(f"FDB entry:  {fdb_index}  =>  {vlan_index}")
-            except KeyError:
-                # should not happen!
-                self._add_warning(f"Invalid vlan index {vlan_index} (jnxL2aldVlanFdbId)")
-            return True
-        return False
+        vlan_index = int(oid_end)
+        fdb_index = int(val)
+        try:
+            self.vlans[self.vlan_id_by_index[vlan_index]].fdb_index = fdb_index
+            self.dot1tp_fdb_to_vlan_index[fdb_index] = vlan_index
+            trace("FDB entry:  {}  =>  {}", fdb_index, vlan_index)
+        except KeyError:
+            # should not happen!
+            self._add_warning(f"Invalid vlan index {vlan_index} (jnxL2aldVlanFdbId)")
+        return True
 
     def set_interface_admin_status(self, interface=False, status=-1):
         self.error = Error(status=True,
@@ -17,6 +17,7 @@ This re-implements some methods found in the base SNMP() class
 with Procurve specific ways of doing things...
 """
 from switches.models import Log
+from switches.log_buffer import save_log
 from switches.constants import *
 from switches.connect.classes import *
 from switches.connect.snmp import SnmpConnector, oid_in_branch
@@ -40,17 +41,18 @@ class SnmpConnectorProcurve(SnmpConnector):
         self.name = "HP-Aruba/Procurve SnmpConnector"  # what type of class is running!
         self.vendor_name = 'HP/Procurve'
 
-    def _parse_oid(self, oid, val):
-        """
-        Parse a single OID with data returned from a switch through some "get" function
-        Returns True if we parse the OID!
-        """
-        if self._parse_mibs_hp_poe(oid, val):
-            return True
-        if self._parse_mibs_hp_if_linkmode(oid, val):
-            return True
-        # call the generic base parser
-        return super()._parse_oid(oid, val)
+    # the HP specific MIB branches we parse in _parse_oid(), see SnmpConnector.oid_handlers
+    oid_handlers = [
+        ('hpicfPoePethPsePortPower', '_parse_hpicf_poe_peth_pse_port_power'),
+        ('hpEntPowerCurrentPowerUsage', '_parse_hp_ent_power_current_power_usage'),
+        ('hpnicfIfLinkMode', '_parse_hpnicf_if_link_mode'),
+    ]
+
+    # the HP specific branches walked by get_switch_basic_info(), see SnmpConnector.basic_info_branches
+    basic_info_branches = SnmpConnector.basic_info_branches + [
+        'hpnicfIfLinkMode',
+        'hpicfPoePethPsePortPower',
+    ]
 
     def _get_interface_data(self):
         """
@@ -61,7 +63,7 @@ class SnmpConnectorProcurve(SnmpConnector):
         super()._get_interface_data()
 
         # now add HP data, and cache it:
-        if self._get_branch_by_name('hpnicfIfLinkMode', True, self._parse_mibs_hp_if_linkmode) < 0:
+        if self._get_branch_by_name('hpnicfIfLinkMode') < 0:
             dprint("Comware hpnicfIfLinkMode returned error!")
             return False
 
@@ -82,39 +84,33 @@ class SnmpConnectorProcurve(SnmpConnector):
     This gets mapped to an interface later on in
     self._map_poe_port_entries_to_interface()
     """
-    def _parse_mibs_hp_poe(self, oid, val):
+    def _parse_hpicf_poe_peth_pse_port_power(self, oid_end, val):
         """
         Parse HP specific Power Extention MIBs
         """
-        dprint("_parse_mibs_hp_poe()")
-        pe_index = oid_in_branch(hpicfPoePethPsePortPower, oid)
-        if pe_index:
-            if pe_index in self.poe_port_entries.keys():
-                self.poe_port_entries[pe_index].power_consumption_supported = True
-                self.poe_port_entries[pe_index].power_consumed = int(val)
-            return True
-
-        pe_index = oid_in_branch(hpEntPowerCurrentPowerUsage, oid)
-        if pe_index:
-            if pe_index in self.poe_port_entries.keys():
-                self.poe_port_entries[pe_index].power_consumption_supported = True
-                self.poe_port_entries[pe_index].power_consumed = int(val)
-            return True
+        pe_index = oid_end
+        if pe_index in self.poe_port_entries.keys():
+            self.poe_port_entries[pe_index].power_consumption_supported = True
+            self.poe_port_entries[pe_index].power_consumed = int(val)
+        return True
 
-        return False
+    def _parse_hp_ent_power_current_power_usage(self, oid_end, val):
+        pe_index = oid_end
+        if pe_index in self.poe_port_entries.keys():
+            self.poe_port_entries[pe_index].power_consumption_supported = True
+            self.poe_port_entries[pe_index].power_consumed = int(val)
+        return True
 
-    def _parse_mibs_hp_if_linkmode(self, oid, val):
+    def _parse_hpnicf_if_link_mode(self, oid_end, val):
         """
         Parse HP specific Interface Extension MIB for link mode, PoE info
         """
-        if_index = int(oid_in_branch(hpnicfIfLinkMode, oid))
-        if if_index:
-            dprint(f"HP LinkMode if_index {if_index} link_mode {val}")
-            if if_index in self.interfaces.keys():
-                if int(val) == HP_ROUTE_MODE:
-                    self.interfaces[if_index].is_routed = True
-            return True
-        return False
+        if_index = int(oid_end)
+        trace("HP LinkMode if_index {} link_mode {}", if_index, val)
+        if if_index in self.interfaces.keys():
+            if int(val) == HP_ROUTE_MODE:
+                self.interfaces[if_index].is_routed = True
+        return True
 
     def _parse_mibs_procurve_config(self, oid, val):
         """
@@ -144,12 +140,12 @@ class SnmpConnectorProcurve(SnmpConnector):
         # get standard data first, this loads PoE status, etc.
         super()._get_poe_data()
         # now get HP specific info about power usage from HP-IFC-POE-MIB first
-        retval = self._get_branch_by_name('hpicfPoePethPsePortPower', True, self._parse_mibs_hp_poe)
+        retval = self._get_branch_by_name('hpicfPoePethPsePortPower')
         if retval < 0:
             self._add_warning("Error getting 'PoE-Port-Actual-Power' (hpicfPoePethPsePortActualPower)")
         if retval == 0:
             # maybe this device supports HP-ENTITY-POWER-MIB
-            retval = self._get_branch_by_name('hpEntPowerCurrentPowerUsage', True, self._parse_mibs_hp_poe)
+            retval = self._get_branch_by_name('hpEntPowerCurrentPowerUsage')
 
         return 1
 
@@ -165,22 +161,23 @@ class SnmpConnectorProcurve(SnmpConnector):
         for (pe_index, port_entry) in self.poe_port_entries.items():
             # we take the ending part of "5.12" as the index
             (module, port) = port_entry.index.split('.')
-            for (if_index, iface) in self.interfaces.items():
-                if iface.name == port:
-                    dprint(f"   PoE Port Map FOUND {iface.name}")
-                    iface.poe_entry = port_entry
-                    if port_entry.detect_status > POE_PORT_DETECT_DELIVERING:
-                        warning = f"PoE FAULT status ({port_entry.detect_status} = " \
-                                  "{poe_status_name[port_entry.status_name]}) on interface {iface.name}"
-                        self._add_warning(warning)
-                        # log my activity
-                        log = Log(user=self.request.user,
-                                  type=LOG_TYPE_ERROR,
-                                  ip_address=get_remote_ip(self.request),
-                                  action=LOG_PORT_POE_FAULT,
-                                  description=warning)
-                        log.save()
-                    break
+            if_index = self._get_if_index_by_name(port)
+            if if_index:
+                iface = self.interfaces[if_index]
+                trace("   PoE Port Map FOUND {}", iface.name)
+                iface.poe_entry = port_entry
+                if port_entry.detect_status > POE_PORT_DETECT_DELIVERING:
+                    warning = f"PoE FAULT status ({port_entry.detect_status} = " \
+                              f"{poe_status_name[port_entry.detect_status]}) on interface {iface.name}"
+                    self._add_warning(warning)
+                    # log my activity
+                    log = Log(type=LOG_TYPE_ERROR,
+                              ip_address=get_remote_ip(self.request),
+                              action=LOG_PORT_POE_FAULT,
+                              description=warning)
+                    if self.request:
+                        log.user = self.request.user
+                    save_log(log)
 
 
 """
@@ -0,0 +1,165 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Buffered writing of activity Log() entries.
+Inside a request (see LogBufferMiddleware) or a task (see buffered_logs()), save_log() only adds
+the entry to a buffer of the current thread. The buffer is written at the end, with a single
+bulk_create(), or handed to the sink set in LOG_SINK ('celery' or 'spool'), so writing the activity
+log does not add database round trips in the middle of snmp work.
+Outside of a buffer, save_log() simply saves the entry.
+"""
+import contextlib
+import json
+import os
+import threading
+import traceback
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+from switches.models import Log
+from switches.utils import dprint
+
+# the Log() fields that are written, see log_to_dict()
+LOG_FIELDS = ('timestamp', 'user_id', 'group_id', 'switch_id', 'if_index', 'ip_address', 'type', 'action', 'description')
+
+_thread_data = threading.local()
+_spool_lock = threading.Lock()
+
+
+def save_log(log):
+    """
+    Save a Log() entry, or add it to the log buffer of this thread if there is one.
+    An entry can be saved again after changes, it is only written once, with the last values.
+    """
+    logs = getattr(_thread_data, 'logs', None)
+    if logs is None or log.pk:
+        log.save()
+        return
+    if not any(entry is log for entry in logs):
+        logs.append(log)
+        if len(logs) >= settings.LOG_BUFFER_SIZE:
+            flush_logs()
+
+
+def flush_logs():
+    """
+    Write the buffered Log() entries of this thread now, e.g. before the recent logs are read.
+    """
+    logs = getattr(_thread_data, 'logs', None)
+    if not logs:
+        return
+    _thread_data.logs = []
+    write_logs(logs)
+
+
+@contextlib.contextmanager
+def buffered_logs():
+    """
+    Buffer the Log() entries saved with save_log() in the enclosed code, and write them at the end.
+    If there is a buffer already, that one is used.
+    """
+    if getattr(_thread_data, 'logs', None) is not None:
+        yield
+        return
+    _thread_data.logs = []
+    try:
+        yield
+    finally:
+        flush_logs()
+        _thread_data.logs = None
+
+
+def write_logs(logs):
+    """
+    Write a list of Log() entries to the configured LOG_SINK. Errors are not passed on,
+    the activity log should not break the request.
+    """
+    for log in logs:
+        log.set_default_description()
+    try:
+        if settings.LOG_SINK == 'celery' and settings.TASKS_ENABLED:
+            # import here, the tasks import the connection classes, which import this module.
+            from switches.tasks import write_logs_task
+            write_logs_task.delay([log_to_dict(log) for log in logs])
+            return
+        if settings.LOG_SINK == 'spool':
+            write_log_spool(logs)
+            return
+    except Exception:
+        dprint(f"write_logs(): {settings.LOG_SINK} failed, writing {len(logs)} entries to the database:\n{traceback.format_exc()}")
+    try:
+        Log.objects.bulk_create(logs)
+    except Exception:
+        dprint(f"write_logs(): failed to write {len(logs)} entries:\n{traceback.format_exc()}")
+
+
+def log_to_dict(log):
+    """
+    Return the Log() entry as a dictionary that can be stored as JSON.
+    """
+    entry = {name: getattr(log, name) for name in LOG_FIELDS}
+    if entry['timestamp']:
+        entry['timestamp'] = entry['timestamp'].isoformat()
+    return entry
+
+
+def dict_to_log(entry):
+    """
+    Return a new Log() entry from a dictionary created by log_to_dict().
+    """
+    log = Log(**{name: entry.get(name, None) for name in LOG_FIELDS if name != 'timestamp'})
+    if entry.get('timestamp', None):
+        log.timestamp = parse_datetime(entry['timestamp'])
+    log.set_default_description()
+    return log
+
+
+def write_log_spool(logs):
+    """
+    Add the Log() entries to the spool file, as one JSON line per entry.
+    """
+    lines = "".join(json.dumps(log_to_dict(log)) + "\n" for log in logs)
+    with _spool_lock:
+        with open(settings.LOG_SPOOL_FILE, 'a') as spool:
+            spool.write(lines)
+
+
+def load_log_spool(batch_size=500):
+    """
+    Move the entries in the spool file to the database. Returns the number of entries written.
+    The file is renamed first, so processes can keep adding entries to a new spool file.
+    """
+    if not os.path.exists(settings.LOG_SPOOL_FILE):
+        return 0
+    loading = f"{settings.LOG_SPOOL_FILE}.loading"
+    if not os.path.exists(loading):
+        os.rename(settings.LOG_SPOOL_FILE, loading)
+    count = 0
+    logs = []
+    with open(loading) as spool:
+        for line in spool:
+            line = line.strip()
+            if not line:
+                continue
+            logs.append(dict_to_log(json.loads(line)))
+            if len(logs) >= batch_size:
+                Log.objects.bulk_create(logs)
+                count += len(logs)
+                logs = []
+    if logs:
+        Log.objects.bulk_create(logs)
+        count += len(logs)
+    os.remove(loading)
+    return count
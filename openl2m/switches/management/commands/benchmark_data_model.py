@@ -0,0 +1,147 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Micro-benchmark of the memory use and construction time of the data model classes
+# (Interface(), Vlan(), etc.) with __slots__, compared to the same classes with a per-object __dict__.
+# A synthetic switch is built, no switch or SNMP access is needed.
+# Run as:
+#    python3 manage.py benchmark_data_model --interfaces 500 --vlans 4000
+import time
+import tracemalloc
+import types
+
+from django.core.management.base import BaseCommand
+
+from switches.connect.classes import *
+
+
+def without_slots(cls, namespace):
+    """
+    Return a copy of a data model class with a per-object __dict__, i.e. without __slots__.
+    The methods are copied to use 'namespace' as globals, so that e.g. Vlan() creates
+    the PortList() objects of that namespace.
+    """
+    slots = cls.__dict__.get('__slots__', ())
+    attributes = {}
+    for (name, value) in cls.__dict__.items():
+        if name in slots or name in ('__slots__', '__dict__', '__weakref__'):
+            continue
+        if isinstance(value, types.FunctionType):
+            value = types.FunctionType(value.__code__, namespace, value.__name__, value.__defaults__, value.__closure__)
+        attributes[name] = value
+    return type(cls.__name__, (), attributes)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the memory use and construction time of the data model classes, with and without __slots__'
+
+    model_classes = (Interface, Vlan, PortList, IP4Address, NeighborDevice, PoePort, PoePSE, StackMember, SyslogMsg)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interfaces',
+            type=int,
+            default=500,
+            help='the number of interfaces of the synthetic switch'
+        )
+
+        parser.add_argument(
+            '--vlans',
+            type=int,
+            default=4000,
+            help='the number of vlans of the synthetic switch'
+        )
+
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='the number of runs, the best time is reported'
+        )
+
+    def handle(self, *args, **options):
+        slotted = {cls.__name__: cls for cls in self.model_classes}
+        namespace = dict(Interface.__init__.__globals__)
+        unslotted = {cls.__name__: without_slots(cls, namespace) for cls in self.model_classes}
+        namespace.update(unslotted)
+
+        self.stdout.write(f"Synthetic switch: {options['interfaces']} interfaces, {options['vlans']} vlans")
+        results = {}
+        for (title, classes) in (('__dict__', unslotted), ('__slots__', slotted)):
+            memory = self._measure_memory(classes, options['interfaces'], options['vlans'])
+            duration = self._best_of(options['repeat'], self._build_switch, classes, options['interfaces'], options['vlans'])
+            results[title] = (memory, duration)
+            self.stdout.write(f"  {title}: {memory / 1024:,.0f} KB, build time {duration * 1000:.1f} ms")
+        (dict_memory, dict_duration) = results['__dict__']
+        (slots_memory, slots_duration) = results['__slots__']
+        self.stdout.write(f"  memory: {100 * (dict_memory - slots_memory) / dict_memory:.0f}% less, "
+                          f"build time: {dict_duration / slots_duration:.2f}x faster")
+
+    def _measure_memory(self, classes, interface_count, vlan_count):
+        """
+        Return the bytes allocated for the objects of a synthetic switch.
+        """
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        switch = self._build_switch(classes, interface_count, vlan_count)
+        used = tracemalloc.get_traced_memory()[0] - start
+        tracemalloc.stop()
+        del switch
+        return used
+
+    def _best_of(self, repeat, function, *args):
+        best = 0
+        for count in range(repeat):
+            start = time.perf_counter()
+            function(*args)
+            duration = time.perf_counter() - start
+            if not best or duration < best:
+                best = duration
+        return best
+
+    def _build_switch(self, classes, interface_count, vlan_count):
+        """
+        Create the objects the way the parsers do, with data similar to a real switch.
+        """
+        portlist_bytes = bytes((interface_count + 7) // 8)
+        vlans = {}
+        for vlan_id in range(1, vlan_count + 1):
+            vlan = classes['Vlan'](vlan_id, vlan_id, name=f"vlan-{vlan_id}", status=VLAN_STATUS_PERMANENT)
+            vlan.current_egress_portlist.from_byte_count(len(portlist_bytes))
+            vlan.static_egress_portlist.from_bytes(portlist_bytes)
+            vlans[vlan_id] = vlan
+        interfaces = {}
+        for if_index in range(1, interface_count + 1):
+            iface = classes['Interface'](if_index, name=f"GigabitEthernet1/0/{if_index}", type=IF_TYPE_ETHERNET,
+                                         alias=f"port {if_index}")
+            iface.oper_status = IF_OPER_STATUS_UP
+            iface.admin_status = IF_ADMIN_STATUS_UP
+            iface.hc_speed = 1000
+            iface.mtu = 1500
+            iface.port_id = if_index
+            iface.untagged_vlan = if_index % vlan_count + 1
+            iface.poe_entry = classes['PoePort'](f"1.{if_index}", POE_PORT_ADMIN_ENABLED)
+            if if_index % 10 == 0:
+                neighbor = classes['NeighborDevice'](f"0.{if_index}.1", if_index)
+                neighbor.sys_name = f"switch-{if_index}"
+                iface.lldp[neighbor.index] = neighbor
+            if if_index % 50 == 0:
+                ip = f"10.0.{if_index // 256}.{if_index % 256}"
+                iface.addresses_ip4[ip] = classes['IP4Address'](ip, '255.255.255.0')
+            interfaces[if_index] = iface
+        pse = {1: classes['PoePSE'](1, max_power=740, status=POE_PSE_STATUS_ON)}
+        stack = {1: classes['StackMember'](1, ENTITY_CLASS_CHASSIS, serial='FOC1234X0AB', model='C9300-48P')}
+        syslog = {index: classes['SyslogMsg'](index, facility='SYS', severity=5, message='Configured from console')
+                  for index in range(1, 101)}
+        return (vlans, interfaces, pse, stack, syslog)
@@ -0,0 +1,122 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Micro-benchmark of the OID to parser lookup, comparing the OidDispatcher() with the
+# original linear chain of oid_in_branch() tests. No switch or SNMP access is needed.
+# Run as:
+#    python3 manage.py benchmark_oid_dispatch --vendor cisco --rows 1000
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def get_vendor_classes():
+    """
+    Return the connector classes by vendor name. This is imported when the command runs,
+    as importing the connectors when the command is loaded gives a circular import.
+    """
+    from switches.connect.snmp import SnmpConnector
+    from switches.connect.vendors.cisco.snmp import SnmpConnectorCisco
+    from switches.connect.vendors.comware.snmp import SnmpConnectorComware
+    from switches.connect.vendors.juniper.snmp import SnmpConnectorJuniper
+    from switches.connect.vendors.procurve.snmp import SnmpConnectorProcurve
+    return {
+        'base': SnmpConnector,
+        'cisco': SnmpConnectorCisco,
+        'comware': SnmpConnectorComware,
+        'juniper': SnmpConnectorJuniper,
+        'procurve': SnmpConnectorProcurve,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the OID dispatcher against the linear oid_in_branch() parse chain'
+
+    vendors = ('base', 'cisco', 'comware', 'juniper', 'procurve')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--vendor',
+            type=str,
+            default='cisco',
+            help=f"the connector class to test, one of {', '.join(self.vendors)}"
+        )
+
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=500,
+            help='the number of table rows (OIDs) per MIB branch'
+        )
+
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='the number of runs, the best time is reported'
+        )
+
+    def handle(self, *args, **options):
+        vendor = options['vendor']
+        if vendor not in self.vendors:
+            raise CommandError(f"Unknown vendor '{vendor}'")
+        vendor_classes = get_vendor_classes()
+        dispatcher = vendor_classes[vendor].oid_dispatcher
+        base_branches = vendor_classes['base'].oid_dispatcher.branch_names.keys()
+
+        # the old parse chain tested vendor branches first, then called the base class chain
+        branches = [branch for (branch, mib_name, method) in dispatcher.get_branches() if branch not in base_branches]
+        branches += [branch for branch in base_branches]
+
+        # synthetic walk data, one column after the other, as returned by bulkwalks
+        oids = []
+        for branch in branches:
+            for row in range(1, options['rows'] + 1):
+                oids.append(f"{branch}.{row}")
+        shuffled = list(oids)
+        random.shuffle(shuffled)
+
+        self.stdout.write(f"{vendor_classes[vendor].__name__}: {len(branches)} branches, {len(oids)} OIDs")
+        for (title, data) in (('walk order', oids), ('random order', shuffled)):
+            chain_time = self._best_of(options['repeat'], self._run_chain, branches, data)
+            dispatch_time = self._best_of(options['repeat'], self._run_dispatcher, dispatcher, data)
+            self.stdout.write(f"  {title}:")
+            self.stdout.write(f"    oid_in_branch() chain: {chain_time:.4f} sec, {len(data) / chain_time:,.0f} OIDs/sec")
+            self.stdout.write(f"    OidDispatcher.lookup(): {dispatch_time:.4f} sec, {len(data) / dispatch_time:,.0f} OIDs/sec")
+            self.stdout.write(f"    speedup: {chain_time / dispatch_time:.1f}x")
+
+    def _best_of(self, repeat, function, *args):
+        best = 0
+        for count in range(repeat):
+            start = time.perf_counter()
+            function(*args)
+            duration = time.perf_counter() - start
+            if not best or duration < best:
+                best = duration
+        return best
+
+    def _run_chain(self, branches, oids):
+        """
+        Find the branch the way the original _parse_oid() did, testing every branch in order.
+        """
+        from switches.connect.snmp import oid_in_branch
+        for oid in oids:
+            for branch in branches:
+                if oid_in_branch(branch, oid):
+                    break
+
+    def _run_dispatcher(self, dispatcher, oids):
+        for oid in oids:
+            dispatcher.lookup(oid)
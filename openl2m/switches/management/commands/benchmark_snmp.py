@@ -0,0 +1,559 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+
+# End-to-end benchmark of the connector classes, against a simulated snmp agent on loopback.
+# This generates synthetic switch data (ports, vlans, ethernet addresses, lldp neighbors),
+# starts the snmpsim command responder with it, and measures the switch reads, a bulk edit and a prewarm read without a request:
+# wall time, snmp requests (see switches/connect/metrics.py) and optionally peak memory.
+# The database objects needed are created in a transaction that is rolled back at the end.
+# Requires snmpsim (see requirements.txt). Run as:
+#    python3 manage.py benchmark_snmp --vendor cisco --ports 48 --vlans 20 --fdb 1000 --lldp 10
+# The vendor flavours set the system OID of the vendor, so the vendor connector class is used,
+# and add the vendor tables that class reads, with the interface names and PoE index it expects:
+# Cisco the VTP and vlan membership tables, and the per-vlan bridge tables (community public@<vlan>),
+# Comware the HH3C link mode, vlan, PoE and configuration tables, Procurve the HP link mode, PoE and
+# configuration tables, and Juniper the L2ALD vlan table, with the ethernet addresses by filtering database id.
+import json
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from pysnmp.hlapi.asyncio import *
+
+from switches.constants import *
+from switches.models import Switch, SwitchGroup, SnmpProfile
+from switches.connect.async_snmp import get_snmp_engine, get_thread_event_loop
+from switches.connect.constants import *
+from switches.connect.metrics import snmp_metrics
+from switches.connect.vendors.cisco.constants import *
+from switches.connect.vendors.comware.constants import *
+from switches.connect.vendors.juniper.constants import *
+from switches.connect.vendors.procurve.constants import *
+
+COMMUNITY = 'public'
+
+# vendor name: (system OID, interface name of a port number, PoE PSE index)
+# The names and PSE index are what _map_poe_port_entries_to_interface() of the vendor class expects.
+VENDORS = {
+    'base': ('.1.3.6.1.4.1.8072.3.2.10', 'GigabitEthernet1/0/{port}', 1),
+    'cisco': ('.1.3.6.1.4.1.9.1.1208', 'GigabitEthernet1/0/{port}', 1),
+    'comware': ('.1.3.6.1.4.1.25506.11.1.82', 'GigabitEthernet1/0/{port}', 4),    # PSE 1 + 3 x member
+    'juniper': ('.1.3.6.1.4.1.2636.1.1.1.2.82', 'ge-0/0/{port_0}', 1),     # ports are 0-based
+    'procurve': ('.1.3.6.1.4.1.11.2.3.7.11.160', '{port}', 1),
+}
+
+# the Juniper internal vlan index and filtering database id are the vlan id plus these
+JUNIPER_VLAN_INDEX = 1000
+JUNIPER_FDB_ID = 2000
+
+
+def get_connector_class(vendor):
+    """
+    Return the connector class of the vendor flavour. This is imported when the command runs,
+    as importing the connectors when the command is loaded gives a circular import.
+    """
+    from switches.connect.snmp import SnmpConnector
+    from switches.connect.vendors.cisco.snmp import SnmpConnectorCisco
+    from switches.connect.vendors.comware.snmp import SnmpConnectorComware
+    from switches.connect.vendors.juniper.snmp import SnmpConnectorJuniper
+    from switches.connect.vendors.procurve.snmp import SnmpConnectorProcurve
+    return {
+        'base': SnmpConnector,
+        'cisco': SnmpConnectorCisco,
+        'comware': SnmpConnectorComware,
+        'juniper': SnmpConnectorJuniper,
+        'procurve': SnmpConnectorProcurve,
+    }[vendor]
+
+
+# snmprec type tags
+TAG_INTEGER = '2'
+TAG_STRING = '4'
+TAG_HEX_STRING = '4x'
+TAG_OID = '6'
+TAG_IPADDRESS = '64'
+TAG_COUNTER = '65'
+TAG_GAUGE = '66'
+TAG_TIMETICKS = '67'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the switch reads and bulk edits against a simulated snmp agent'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendor', type=str, default='base',
+                            help=f"the device flavour, one of {', '.join(VENDORS.keys())}, or 'all'")
+        parser.add_argument('--ports', type=int, default=48, help='the number of ethernet ports')
+        parser.add_argument('--vlans', type=int, default=10, help='the number of vlans')
+        parser.add_argument('--fdb', type=int, default=500, help='the number of known ethernet addresses')
+        parser.add_argument('--lldp', type=int, default=5, help='the number of lldp neighbors')
+        parser.add_argument('--rounds', type=int, default=3, help='the number of times each step is measured')
+        parser.add_argument('--udp-port', type=int, default=11161, help='the loopback port of the simulated agent')
+        parser.add_argument('--responder', type=str, default='',
+                            help='the snmpsim command responder program, default is to search the path')
+        parser.add_argument('--memory', action='store_true',
+                            help='also measure peak memory with tracemalloc. This makes the steps slower!')
+        parser.add_argument('--json', type=str, default='', help='also write the results to this file, as JSON')
+
+    def handle(self, *args, **options):
+        if options['vendor'] == 'all':
+            vendors = list(VENDORS.keys())
+        elif options['vendor'] in VENDORS.keys():
+            vendors = [options['vendor']]
+        else:
+            raise CommandError(f"Unknown vendor '{options['vendor']}'")
+        responder = options['responder'] or shutil.which('snmpsim-command-responder') or shutil.which('snmpsimd.py')
+        if not responder:
+            raise CommandError("snmpsim command responder not found, install snmpsim or use --responder")
+
+        # always count the requests, and do not use data cached by other runs
+        settings.SNMP_METRICS = True
+        settings.SWITCH_CACHE_TIMEOUT = 0
+
+        results = []
+        for vendor in vendors:
+            data_dir = tempfile.mkdtemp(prefix='openl2m-benchmark-')
+            try:
+                self._write_data(data_dir, vendor, options)
+                agent = self._start_agent(responder, data_dir, options['udp_port'])
+                try:
+                    results += self._run_vendor(vendor, options)
+                finally:
+                    agent.terminate()
+                    agent.wait()
+            finally:
+                shutil.rmtree(data_dir, ignore_errors=True)
+
+        self.stdout.write(f"{'vendor':10} {'step':14} {'avg ms':>9} {'min ms':>9} {'requests':>9} {'varbinds':>9} {'peak KiB':>9}")
+        for result in results:
+            peak = f"{result['peak_kib']:9.0f}" if options['memory'] else f"{'-':>9}"
+            self.stdout.write(f"{result['vendor']:10} {result['step']:14} {result['avg_ms']:9.1f} {result['min_ms']:9.1f} "
+                              f"{result['requests']:9.0f} {result['varbinds']:9.0f} {peak}")
+        if options['json']:
+            with open(options['json'], 'w') as output:
+                json.dump({'options': {name: options[name] for name in ('ports', 'vlans', 'fdb', 'lldp', 'rounds')},
+                           'results': results}, output, indent=2)
+
+    def _start_agent(self, responder, data_dir, udp_port):
+        """
+        Start the snmpsim command responder, and wait until it answers with the data in data_dir.
+        Fails if the port is in use, so we never measure another agent.
+        """
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as port_check:
+            try:
+                port_check.bind(('127.0.0.1', udp_port))
+            except OSError as e:
+                raise CommandError(f"UDP port {udp_port} is in use ({e.strerror}), use --udp-port")
+        cache_dir = os.path.join(data_dir, 'cache')
+        os.mkdir(cache_dir)
+        command = [responder, f"--data-dir={data_dir}", f"--cache-dir={cache_dir}",
+                   f"--agent-udpv4-endpoint=127.0.0.1:{udp_port}"]
+        if os.geteuid() == 0:
+            # snmpsim does not run as root
+            command += ['--process-user=nobody', '--process-group=nogroup']
+            os.chmod(data_dir, 0o755)
+            os.chmod(cache_dir, 0o777)
+        agent = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for attempt in range(50):
+            if agent.poll() is not None:
+                raise CommandError(f"{responder} exited with status {agent.returncode}")
+            answer = get_thread_event_loop().run_until_complete(self._get_agent_run_id(udp_port))
+            if answer == _get_run_id(data_dir):
+                return agent
+            if answer is not None:
+                agent.terminate()
+                agent.wait()
+                raise CommandError(f"Another agent answers on 127.0.0.1:{udp_port}, with '{answer}'")
+            time.sleep(0.2)
+        agent.terminate()
+        agent.wait()
+        raise CommandError(f"The simulated agent does not answer on 127.0.0.1:{udp_port}")
+
+    async def _get_agent_run_id(self, udp_port):
+        """
+        Return the sysContact of the agent, which is the run id in our data, see _get_run_id().
+        Returns None if there is no answer.
+        """
+        target = await UdpTransportTarget.create(('127.0.0.1', udp_port), timeout=0.2, retries=0)
+        (error_indication, error_status, error_index, var_binds) = await get_cmd(
+            get_snmp_engine(), CommunityData(COMMUNITY), target, ContextData(),
+            ObjectType(ObjectIdentity(sysContact)), lookupMib=False)
+        if error_indication:
+            return None
+        if error_status:
+            return error_status.prettyPrint()
+        return str(var_binds[0][1])
+
+    def _run_vendor(self, vendor, options):
+        """
+        Measure the steps for one vendor flavour. Returns a list of result dictionaries.
+        """
+        connector_class = get_connector_class(vendor)
+        system_oid = VENDORS[vendor][0]
+        steps = (
+            ('basic_info', lambda conn: conn.get_switch_basic_info()),
+            ('client_data', lambda conn: conn.get_switch_client_data()),
+            ('hw_details', lambda conn: conn.get_switch_hardware_details()),
+            ('bulk_edit', self._bulk_edit),
+            ('prewarm', self._prewarm),
+        )
+        measured = {name: [] for (name, step) in steps}
+        with transaction.atomic():
+            # without a web request, the connector uses the permissions of the user with pk=1
+            User.objects.get_or_create(pk=1, defaults={'username': 'openl2m-benchmark', 'is_superuser': True})
+            profile = SnmpProfile.objects.create(name=f"benchmark-{vendor}", version=SNMP_VERSION_2C,
+                                                 community=COMMUNITY, udp_port=options['udp_port'])
+            switch = Switch.objects.create(name=f"benchmark-{vendor}", primary_ip4='127.0.0.1',
+                                           snmp_profile=profile, snmp_oid=system_oid)
+            group = SwitchGroup.objects.create(name=f"benchmark-{vendor}")
+            for round in range(options['rounds']):
+                # a new object every round, so nothing is cached, like the first view of a switch
+                conn = connector_class(False, group, switch)
+                for (name, step) in steps:
+                    measured[name].append(self._measure(switch, conn, name, step, options['memory']))
+                del conn
+            transaction.set_rollback(True)
+
+        results = []
+        for (name, step) in steps:
+            runs = measured[name]
+            results.append({
+                'vendor': vendor,
+                'step': name,
+                'avg_ms': sum(run[0] for run in runs) / len(runs) * 1000,
+                'min_ms': min(run[0] for run in runs) * 1000,
+                'requests': sum(run[1] for run in runs) / len(runs),
+                'varbinds': sum(run[2] for run in runs) / len(runs),
+                'peak_kib': max(run[3] for run in runs) / 1024,
+            })
+        return results
+
+    def _measure(self, switch, conn, name, step, memory):
+        """
+        Run one step. Returns a tuple of (seconds, snmp requests, varbinds, peak memory in bytes).
+        """
+        (requests, varbinds) = self._count_requests(switch)
+        if memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        if not step(conn):
+            self.stderr.write(f"  {name}: {conn.error.description}")
+        duration = time.perf_counter() - start
+        peak = 0
+        if memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        (end_requests, end_varbinds) = self._count_requests(switch)
+        return (duration, end_requests - requests, end_varbinds - varbinds, peak)
+
+    def _count_requests(self, switch):
+        """
+        Return the total (requests, varbinds) of the switch in the snmp metrics of this process.
+        """
+        rows = [row for row in snmp_metrics.get_rows() if row['switch'] == switch.name]
+        return (sum(row['pdus'] for row in rows), sum(row['varbinds'] for row in rows))
+
+    def _bulk_edit(self, conn):
+        """
+        Enable all interfaces, enable PoE and set the description, as a bulk edit does.
+        """
+        conn.begin_changes()
+        for interface in conn.interfaces.values():
+            conn.set_interface_admin_status(interface, IF_ADMIN_STATUS_UP)
+            if interface.poe_entry:
+                conn.set_interface_poe_status(interface, POE_PORT_ADMIN_ENABLED)
+            conn.set_interface_description(interface, f"benchmark {interface.index}")
+        changes = conn.commit_changes()
+        return all(change.status > 0 for change in changes)
+
+    def _prewarm(self, conn):
+        """
+        Read the switch as prewarm_switch_task() does, with a new object and no web request.
+        This runs the PoE fault logging without a request, see _poe_records().
+        Errors are raised here, the task only logs them.
+        """
+        from switches.connect.connect import get_connection_object
+        return get_connection_object(None, conn.group, conn.switch, 0).get_switch_basic_info()
+
+    def _write_data(self, data_dir, vendor, options):
+        """
+        Write the snmpsim data files: <community>.snmprec, and for Cisco <community>@<vlan>.snmprec
+        """
+        (system_oid, name_format, pse) = VENDORS[vendor]
+        ports = options['ports']
+        vlans = list(range(1, options['vlans'] + 1))
+        pvids = {port: vlans[(port - 1) % len(vlans)] for port in range(1, ports + 1)}
+        fdb = [(pvids[(entry % ports) + 1], (entry % ports) + 1, _mac(0x100000 + entry)) for entry in range(options['fdb'])]
+        # the Q-Bridge ethernet address table is indexed by filtering database id, which is the vlan id,
+        # except on Juniper, where the L2ALD vlan table maps it to the vlan.
+        fdb_ids = {vlan: (JUNIPER_FDB_ID + vlan if vendor == 'juniper' else vlan) for vlan in vlans}
+        records = []
+        records += _system_records(system_oid, ports, _get_run_id(data_dir))
+        records += _interface_records(ports, name_format)
+        records += _vlan_records(ports, vlans, pvids)
+        records += _fdb_records(fdb, fdb_ids)
+        records += _lldp_records(ports, options['lldp'])
+        records += _poe_records(ports, pse)
+        if vendor == 'comware':
+            records += _comware_records(ports, vlans, pse)
+        elif vendor == 'procurve':
+            records += _procurve_records(ports, pse)
+        elif vendor == 'juniper':
+            records += _juniper_records(vlans, fdb_ids)
+        elif vendor == 'cisco':
+            records += _cisco_records(ports, vlans, pvids)
+            for vlan in vlans:
+                vlan_ports = [port for port in range(1, ports + 1) if pvids[port] == vlan]
+                vlan_records = [(f"{dot1dBasePortIfIndex}.{port}", TAG_INTEGER, port) for port in vlan_ports]
+                vlan_records += [(f"{dot1dTpFdbPort}.{_mac_oid(mac)}", TAG_INTEGER, port)
+                                 for (fdb_vlan, port, mac) in fdb if fdb_vlan == vlan]
+                _write_snmprec(os.path.join(data_dir, f"{COMMUNITY}@{vlan}.snmprec"), vlan_records)
+        _write_snmprec(os.path.join(data_dir, f"{COMMUNITY}.snmprec"), records)
+
+
+def _write_snmprec(path, records):
+    """
+    Write (oid, tag, value) records as a snmpsim data file. These need to be in OID order.
+    """
+    records.sort(key=lambda record: [int(part) for part in record[0].strip('.').split('.')])
+    with open(path, 'w') as output:
+        for (oid, tag, value) in records:
+            output.write(f"{oid.strip('.')}|{tag}|{value}\n")
+
+
+def _writable(tag):
+    """
+    The tag of a value that accepts SET requests, see the snmpsim 'writecache' variation module.
+    """
+    return f"{tag}:writecache"
+
+
+def _mac(number):
+    return bytes([0x00, 0x11, 0x22, (number >> 16) & 0xff, (number >> 8) & 0xff, number & 0xff])
+
+
+def _mac_oid(mac):
+    return '.'.join(str(byte) for byte in mac)
+
+
+def _portlist(ports, members):
+    """
+    Return a PortList bitmap of the member ports, as hex.
+    """
+    bitmap = bytearray((ports + 7) // 8)
+    for port in members:
+        bitmap[(port - 1) // 8] |= 0x80 >> ((port - 1) % 8)
+    return bitmap.hex()
+
+
+def _get_run_id(data_dir):
+    """
+    The id of a benchmark run, stored as the sysContact of the simulated agent.
+    This is the name of the temporary data directory, so it is unique.
+    """
+    return os.path.basename(data_dir)
+
+
+def _system_records(system_oid, ports, run_id):
+    return [
+        (sysDescr, TAG_STRING, 'OpenL2M benchmark switch'),
+        (sysObjectID, TAG_OID, system_oid.strip('.')),
+        (sysUpTime, TAG_TIMETICKS, 123456789),
+        (sysContact, TAG_STRING, run_id),
+        (sysName, TAG_STRING, 'benchmark-switch'),
+        (sysLocation, TAG_STRING, 'loopback'),
+        ('.1.3.6.1.2.1.1.7.0', TAG_INTEGER, 6),
+        (ifNumber, TAG_INTEGER, ports),
+        (ifTableLastChange, TAG_TIMETICKS, 1000),
+        (f"{dot1dBaseNumPorts}.0", TAG_INTEGER, ports),
+        (f"{ipAdEntIfIndex}.10.0.0.1", TAG_INTEGER, 1),
+        (f"{ipAdEntNetMask}.10.0.0.1", TAG_IPADDRESS, '255.255.255.0'),
+        (f"{entPhysicalClass}.1", TAG_INTEGER, 3),
+        (f"{entPhysicalSerialNum}.1", TAG_STRING, 'BENCH0001'),
+        (f"{entPhysicalSoftwareRev}.1", TAG_STRING, '1.0'),
+        (f"{entPhysicalModelName}.1", TAG_STRING, 'Benchmark-48'),
+    ]
+
+
+def _interface_records(ports, name_format):
+    records = []
+    for port in range(1, ports + 1):
+        name = name_format.format(port=port, port_0=port - 1)
+        records += [
+            (f"{ifIndex}.{port}", TAG_INTEGER, port),
+            (f"{ifDescr}.{port}", TAG_STRING, name),
+            (f"{ifType}.{port}", TAG_INTEGER, 6),
+            (f"{ifMtu}.{port}", TAG_INTEGER, 1500),
+            (f"{ifSpeed}.{port}", TAG_GAUGE, 1000000000),
+            (f"{ifPhysAddress}.{port}", TAG_HEX_STRING, _mac(port).hex()),
+            (f"{ifAdminStatus}.{port}", _writable(TAG_INTEGER), 'value=1'),
+            (f"{ifOperStatus}.{port}", TAG_INTEGER, 1 if port % 3 else 2),
+            (f"{ifName}.{port}", TAG_STRING, name),
+            (f"{ifHighSpeed}.{port}", TAG_GAUGE, 1000),
+            (f"{ifConnectorPresent}.{port}", TAG_INTEGER, 1),
+            (f"{ifAlias}.{port}", _writable(TAG_STRING), f"value=port {port}"),
+            (f"{dot1dBasePortIfIndex}.{port}", TAG_INTEGER, port),
+        ]
+    return records
+
+
+def _vlan_records(ports, vlans, pvids):
+    records = [
+        (f"{dot1qVlanVersionNumber}.0", TAG_INTEGER, 1),
+        (f"{dot1qMaxVlanId}.0", TAG_INTEGER, 4094),
+        (f"{dot1qMaxSupportedVlans}.0", TAG_GAUGE, 4094),
+        (f"{dot1qNumVlans}.0", TAG_GAUGE, len(vlans)),
+        (f"{dot1qGvrpStatus}.0", TAG_INTEGER, 2),
+        (dot1qVlanNumDeletes, TAG_COUNTER, 0),
+    ]
+    for vlan in vlans:
+        members = [port for port in range(1, ports + 1) if pvids[port] == vlan]
+        records += [
+            (f"{dot1qVlanCurrentEgressPorts}.0.{vlan}", TAG_HEX_STRING, _portlist(ports, members)),
+            (f"{dot1qVlanCurrentUntaggedPorts}.0.{vlan}", TAG_HEX_STRING, _portlist(ports, members)),
+            (f"{dot1qVlanStatus}.0.{vlan}", TAG_INTEGER, 2),
+            (f"{dot1qVlanStaticName}.{vlan}", TAG_STRING, f"vlan{vlan}"),
+            (f"{dot1qVlanStaticEgressPorts}.{vlan}", TAG_HEX_STRING, _portlist(ports, members)),
+            (f"{dot1qVlanStaticUntaggedPorts}.{vlan}", TAG_HEX_STRING, _portlist(ports, members)),
+            (f"{dot1qVlanStaticRowStatus}.{vlan}", TAG_INTEGER, 1),
+        ]
+    for port in range(1, ports + 1):
+        records.append((f"{dot1qPvid}.{port}", TAG_GAUGE, pvids[port]))
+    return records
+
+
+def _fdb_records(fdb, fdb_ids):
+    records = []
+    for (number, (vlan, port, mac)) in enumerate(fdb):
+        records += [
+            (f"{dot1qTpFdbPort}.{fdb_ids[vlan]}.{_mac_oid(mac)}", TAG_INTEGER, port),
+            (f"{dot1qTpFdbStatus}.{fdb_ids[vlan]}.{_mac_oid(mac)}", TAG_INTEGER, 3),
+            (f"{ipNetToMediaPhysAddress}.1000.10.{(number >> 16) & 0xff}.{(number >> 8) & 0xff}.{number & 0xff}",
+             TAG_HEX_STRING, mac.hex()),
+        ]
+    return records
+
+
+def _lldp_records(ports, neighbors):
+    records = []
+    for neighbor in range(1, neighbors + 1):
+        port = (neighbor - 1) % ports + 1
+        index = f"0.{port}.{neighbor}"
+        records += [
+            (f"{lldpRemChassisIdSubtype}.{index}", TAG_INTEGER, 4),
+            (f"{lldpRemChassisId}.{index}", TAG_HEX_STRING, _mac(0x200000 + neighbor).hex()),
+            (f"{lldpRemPortId}.{index}", TAG_STRING, f"Gi0/{neighbor}"),
+            (f"{lldpRemPortDesc}.{index}", TAG_STRING, f"uplink {neighbor}"),
+            (f"{lldpRemSysName}.{index}", TAG_STRING, f"neighbor-{neighbor}"),
+            (f"{lldpRemSysDesc}.{index}", TAG_STRING, 'Benchmark neighbor'),
+            (f"{lldpRemSysCapSupported}.{index}", TAG_HEX_STRING, '2800'),
+            (f"{lldpRemSysCapEnabled}.{index}", TAG_HEX_STRING, '2800'),
+        ]
+    return records
+
+
+def _poe_records(ports, pse):
+    records = [
+        (f"{pethMainPsePower}.{pse}", TAG_GAUGE, 740),
+        (f"{pethMainPseOperStatus}.{pse}", TAG_INTEGER, 1),
+        (f"{pethMainPseConsumptionPower}.{pse}", TAG_GAUGE, 120),
+        (f"{pethMainPseUsageThreshold}.{pse}", TAG_INTEGER, 80),
+    ]
+    for port in range(1, ports + 1):
+        records += [
+            (f"{pethPsePortAdminEnable}.{pse}.{port}", _writable(TAG_INTEGER), 'value=1'),
+            (f"{pethPsePortDetectionStatus}.{pse}.{port}", TAG_INTEGER, _poe_detect_status(port)),
+            (f"{pethPsePortPowerPriority}.{pse}.{port}", TAG_INTEGER, 3),
+            (f"{pethPsePortType}.{pse}.{port}", TAG_STRING, ''),
+        ]
+    return records
+
+
+def _poe_detect_status(port):
+    """
+    Every 8th port has a PoE fault, which the connectors log, the odd ports deliver power.
+    """
+    if port % 8 == 0:
+        return POE_PORT_DETECT_FAULT
+    if port % 2:
+        return POE_PORT_DETECT_DELIVERING
+    return POE_PORT_DETECT_SEARCHING
+
+
+def _cisco_records(ports, vlans, pvids):
+    records = []
+    for vlan in vlans:
+        records += [
+            (f"{vtpVlanState}.{vlan}", TAG_INTEGER, 1),
+            (f"{vtpVlanType}.{vlan}", TAG_INTEGER, 1),
+            (f"{vtpVlanName}.{vlan}", TAG_STRING, f"vlan{vlan}"),
+        ]
+    for port in range(1, ports + 1):
+        records += [
+            (f"{vlanTrunkPortDynamicState}.{port}", TAG_INTEGER, 2),
+            (f"{vlanTrunkPortNativeVlan}.{port}", TAG_INTEGER, 1),
+            (f"{vmVlan}.{port}", _writable(TAG_INTEGER), f"value={pvids[port]}"),
+        ]
+    return records
+
+
+def _comware_records(ports, vlans, pse):
+    records = [
+        (f"{hh3cCfgRunModifiedLast}.0", TAG_TIMETICKS, 120000),
+        (f"{hh3cCfgRunSavedLast}.0", TAG_TIMETICKS, 110000),
+        (f"{hh3cCfgStartModifiedLast}.0", TAG_TIMETICKS, 110000),
+    ]
+    for vlan in vlans:
+        records.append((f"{hh3cdot1qVlanName}.{vlan}", TAG_STRING, f"vlan{vlan}"))
+    for port in range(1, ports + 1):
+        records += [
+            (f"{hh3cIfLinkMode}.{port}", TAG_INTEGER, HH3C_BRIDGE_MODE),
+            (f"{hh3cifVLANType}.{port}", TAG_INTEGER, HH3C_IF_MODE_ACCESS),
+            (f"{hh3cPsePortCurrentPower}.{pse}.{port}", TAG_INTEGER, 4000 if port % 2 else 0),
+        ]
+    return records
+
+
+def _procurve_records(ports, pse):
+    records = [
+        (f"{hpnicfCfgRunModifiedLast}.0", TAG_TIMETICKS, 120000),
+        (f"{hpnicfCfgRunSavedLast}.0", TAG_TIMETICKS, 110000),
+    ]
+    for port in range(1, ports + 1):
+        records += [
+            (f"{hpnicfIfLinkMode}.{port}", TAG_INTEGER, HP_BRIDGE_MODE),
+            (f"{hpicfPoePethPsePortPower}.{pse}.{port}", TAG_GAUGE, 4000 if port % 2 else 0),
+        ]
+    return records
+
+
+def _juniper_records(vlans, fdb_ids):
+    records = []
+    for vlan in vlans:
+        index = JUNIPER_VLAN_INDEX + vlan
+        records += [
+            (f"{jnxL2aldVlanName}.{index}", TAG_STRING, f"vlan{vlan}"),
+            (f"{jnxL2aldVlanTag}.{index}", TAG_INTEGER, vlan),
+            (f"{jnxL2aldVlanType}.{index}", TAG_INTEGER, JNX_VLAN_TYPE_STATIC),
+            (f"{jnxL2aldVlanFdbId}.{index}", TAG_GAUGE, fdb_ids[vlan]),
+        ]
+    return records
@@ -0,0 +1,62 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Read a switch and write all snmp replies to its capture files, to use with SNMP_TRANSPORT = 'replay'.
+# See switches/connect/replay.py. Nothing is changed on the switch.
+# Run as:
+#    python3 manage.py capture_switch --switch <name> [--dir /path/to/captures]
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from switches.models import Switch
+from switches.connect.replay import get_capture_file
+
+
+class Command(BaseCommand):
+    help = 'Capture the snmp data of a switch, to replay it later'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--switch', type=str, required=True, help='the name of the switch')
+        parser.add_argument('--dir', type=str, default='', help='the capture directory, default is SNMP_CAPTURE_DIR')
+
+    def handle(self, *args, **options):
+        if options['dir']:
+            settings.SNMP_CAPTURE_DIR = options['dir']
+        if not settings.SNMP_CAPTURE_DIR:
+            raise CommandError("Set SNMP_CAPTURE_DIR in the configuration, or use --dir")
+        if settings.SNMP_TRANSPORT == 'replay':
+            raise CommandError("Cannot capture with SNMP_TRANSPORT = 'replay'")
+        os.makedirs(settings.SNMP_CAPTURE_DIR, exist_ok=True)
+        try:
+            switch = Switch.objects.get(name=options['switch'])
+        except Switch.DoesNotExist:
+            raise CommandError(f"Switch '{options['switch']}' not found")
+        group = switch.switchgroups.first()
+        # imported here, importing the connectors when the command is loaded gives a circular import
+        from switches.connect.connect import get_connection_object
+        # read everything from the switch, not from cached data
+        settings.SWITCH_CACHE_TIMEOUT = 0
+        conn = get_connection_object(None, group, switch)
+        steps = (
+            ('basic info', conn.get_switch_basic_info),
+            ('client data', conn.get_switch_client_data),
+            ('hardware details', conn.get_switch_hardware_details),
+        )
+        for (name, step) in steps:
+            if not step():
+                self.stderr.write(f"Reading {name} failed: {conn.error.description}")
+        conn._save_capture()
+        self.stdout.write(f"Captured {switch.name} in {get_capture_file(switch)}")
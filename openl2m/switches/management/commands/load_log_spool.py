@@ -0,0 +1,29 @@
+#
+# This file is part of Open Layer 2 Management (OpenL2M).
+#
+# OpenL2M is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License version 3 as published by
+# the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.  You should have received a copy of the GNU General Public
+# License along with OpenL2M. If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Move the activity log entries in the spool file to the database, when LOG_SINK = 'spool'.
+# Run as:
+#    python3 manage.py load_log_spool
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from switches.log_buffer import load_log_spool
+
+
+class Command(BaseCommand):
+    help = 'Write the activity log entries from the spool file to the database'
+
+    def handle(self, *args, **options):
+        count = load_log_spool()
+        self.stdout.write(f"Loaded {count} log entries from {settings.LOG_SPOOL_FILE}")
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.8 on 2026-10-17 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('switches', '0014_auto_20200710_1036'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='switch',
+            name='snmp_bulk_tuning',
+            field=models.TextField(blank=True, default='', help_text='The GetBulk max-repetitions learned per MIB branch, as JSON.', verbose_name='SNMP GetBulk tuning data'),
+        ),
+    ]
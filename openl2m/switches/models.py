@@ -16,6 +16,7 @@ import logging.handlers
 from django.db import models
 from django.conf import settings
 from django.urls import reverse
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
@@ -583,6 +584,12 @@ class Switch(models.Model):
         verbose_name='Bitmap of switch snmp capabilities',
         help_text='Bitmap of switch snmp capabilities.',
     )
+    snmp_bulk_tuning = models.TextField(
+        default='',
+        blank=True,
+        verbose_name='SNMP GetBulk tuning data',
+        help_text='The GetBulk max-repetitions learned per MIB branch, as JSON.',
+    )
 
     building = models.ForeignKey(Building, null=True, on_delete=models.CASCADE)
 
@@ -769,7 +776,8 @@ class Log(models.Model):
         super().__init__(*args, **kwargs)
 
     timestamp = models.DateTimeField(
-        auto_now_add=True,  # set on save, do not allow changes in code.
+        default=timezone.now,   # set when created, so buffered entries keep their time, see log_buffer.py
+        editable=False,
         blank=True,
         null=True,
     )
@@ -820,8 +828,10 @@ class Log(models.Model):
         blank=True, null=True,  # we don't require it, see save() where a default will be set
     )
 
-    def save(self, *args, **kwargs):
-        # set default description if none given
+    def set_default_description(self):
+        """
+        Set the default description if none given. bulk_create() does not call save(), so this is separate.
+        """
         if not self.description:
             # see if this is a valid action index:
             try:
@@ -830,6 +840,10 @@ class Log(models.Model):
                 # not found (should not happen!)
                 self.description = "Unknown action!"
 
+    def save(self, *args, **kwargs):
+        # set default description if none given
+        self.set_default_description()
+
         # if requested, also sent to Syslog host
         # if settings.SYSLOG_HOST:
         #    syslog = logging.handlers.SysLogHandler(address=settings.SYSLOG_HOST)
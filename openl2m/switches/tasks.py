@@ -15,10 +15,14 @@
 # Create your Celery scheduled tasks here
 from __future__ import absolute_import, unicode_literals
 
+import datetime
 import json
+import random
+import time
 import traceback
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.mail import send_mail, mail_admins
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -28,6 +32,7 @@ from switches.models import Switch, SwitchGroup, Log, Task
 from switches.constants import *
 from switches.connect.connect import get_connection_object
 from switches.connect.snmp import *
+from switches.log_buffer import save_log, buffered_logs, dict_to_log
 from switches.utils import dprint
 
 
@@ -35,6 +40,135 @@ from switches.utils import dprint
 def bulkedit_task(task_id, user_id, group_id, switch_id,
                   interface_change, poe_choice, new_pvid,
                   new_alias, interfaces, save_config):
+    # write the log entries of the task together, at the end
+    with buffered_logs():
+        return _bulkedit_task(task_id, user_id, group_id, switch_id,
+                              interface_change, poe_choice, new_pvid,
+                              new_alias, interfaces, save_config)
+
+
+@shared_task
+def write_logs_task(entries):
+    """
+    Write activity log entries sent by a web process, when LOG_SINK = 'celery'.
+    entries: list of dictionaries from log_to_dict()
+    """
+    Log.objects.bulk_create([dict_to_log(entry) for entry in entries])
+    return len(entries)
+
+
+def prewarm_enabled():
+    """
+    Return True if switches are read in the background, see prewarm_switches_task()
+    """
+    return bool(settings.TASKS_ENABLED and settings.SWITCH_CACHE_TIMEOUT and
+                (settings.SWITCH_PREWARM_GROUPS or settings.SWITCH_PREWARM_RECENT))
+
+
+def get_prewarm_switches():
+    """
+    Return a dictionary of the active switches to read in the background, as (Switch(), group id) by switch id:
+    the switches in the SWITCH_PREWARM_GROUPS groups, and the switches viewed in the last SWITCH_PREWARM_RECENT seconds.
+    """
+    switches = {}
+    if settings.SWITCH_PREWARM_GROUPS:
+        for group in SwitchGroup.objects.filter(name__in=settings.SWITCH_PREWARM_GROUPS):
+            for switch in group.switches.filter(status=SWITCH_STATUS_ACTIVE, snmp_profile__isnull=False):
+                switches.setdefault(switch.id, (switch, group.id))
+    if settings.SWITCH_PREWARM_RECENT:
+        since = timezone.now() - datetime.timedelta(seconds=settings.SWITCH_PREWARM_RECENT)
+        views = Log.objects.filter(action=LOG_VIEW_SWITCH, timestamp__gte=since, switch__isnull=False, group__isnull=False) \
+                           .values_list('switch_id', 'group_id').distinct()
+        groups = {}
+        for (switch_id, group_id) in views:
+            if switch_id not in switches.keys():
+                groups.setdefault(switch_id, group_id)
+        for switch in Switch.objects.filter(pk__in=groups.keys(), status=SWITCH_STATUS_ACTIVE, snmp_profile__isnull=False):
+            switches[switch.id] = (switch, groups[switch.id])
+    return switches
+
+
+def get_prewarm_interval(switch):
+    """
+    Return the seconds between background reads of this switch, 0 if it is not read.
+    """
+    return int(settings.SWITCH_PREWARM_SCHEDULE.get(switch.name, settings.SWITCH_PREWARM_INTERVAL))
+
+
+@shared_task
+def prewarm_switches_task():
+    """
+    Run by Celery beat every SWITCH_PREWARM_POLL seconds. Starts a prewarm_switch_task() for each switch
+    that is due to be read again, with a random delay of up to SWITCH_PREWARM_JITTER seconds,
+    so the switches are not all read at the same time.
+    Returns the number of switches started.
+    """
+    if not prewarm_enabled():
+        return 0
+    count = 0
+    for (switch_id, (switch, group_id)) in get_prewarm_switches().items():
+        interval = get_prewarm_interval(switch)
+        if interval <= 0:
+            continue
+        # this key expires when the switch is due again, so a switch is started once per interval
+        if not cache.add(f"switch-{switch_id}-prewarm", time.time(), interval):
+            continue
+        prewarm_switch_task.apply_async((switch_id, group_id, interval),
+                                        countdown=random.uniform(0, settings.SWITCH_PREWARM_JITTER))
+        count += 1
+    return count
+
+
+@shared_task
+def prewarm_switch_task(switch_id, group_id, interval):
+    """
+    Read the basic switch data into the switch cache shared by all users, see SnmpConnector._set_switch_cache(),
+    so the first view of the switch does not have to wait for the switch.
+    Skipped if the cached data was read less than 'interval' minus SWITCH_PREWARM_JITTER seconds ago,
+    e.g. by a user viewing the switch.
+    At most SWITCH_PREWARM_MAX_PARALLEL switches are read at the same time, by all workers.
+    Returns True if the switch was read.
+    """
+    data = get_switch_cache(switch_id)
+    # the previous prewarm read may have had a longer random delay than this one,
+    # so data read by that is up to SWITCH_PREWARM_JITTER seconds newer than the interval
+    if data and time.time() - data['basic_info_read_time'] < max(interval - settings.SWITCH_PREWARM_JITTER, 0):
+        dprint(f"prewarm_switch_task({switch_id}): recently read, skipped")
+        return False
+    slot = _get_prewarm_slot(switch_id, interval)
+    if not slot:
+        # too many switches being read, the next poll will try again
+        cache.delete(f"switch-{switch_id}-prewarm")
+        return False
+    try:
+        switch = Switch.objects.get(pk=switch_id)
+        group = SwitchGroup.objects.get(pk=group_id)
+        # max_age=0 to read the switch, or only the changes with SNMP_INCREMENTAL_REFRESH
+        conn = get_connection_object(None, group, switch, 0)
+        return conn.get_switch_basic_info()
+    except Exception as e:
+        dprint(f"prewarm_switch_task({switch_id}) failed: {repr(e)}")
+        return False
+    finally:
+        cache.delete(slot)
+
+
+def _get_prewarm_slot(switch_id, timeout):
+    """
+    Claim one of the SWITCH_PREWARM_MAX_PARALLEL read slots in the shared cache.
+    The slot expires after timeout seconds, in case the worker dies.
+    Returns the cache key of the slot, or None if all slots are in use.
+    """
+    for index in range(settings.SWITCH_PREWARM_MAX_PARALLEL):
+        key = f"switch-prewarm-slot-{index}"
+        if cache.add(key, switch_id, timeout):
+            return key
+    return None
+
+
+def _bulkedit_task(task_id, user_id, group_id, switch_id,
+                   interface_change, poe_choice, new_pvid,
+                   new_alias, interfaces, save_config):
 
     try:
         task = Task.objects.get(pk=int(task_id))
@@ -43,7 +177,7 @@ def bulkedit_task(task_id, user_id, group_id, switch_id,
                   action=LOG_BULK_EDIT_TASK_END_ERROR,
                   type=LOG_TYPE_ERROR,
                   description=f"Bulk-Edit task started with invalid task id {task_id}")
-        log.save()
+        save_log(log)
         return
     try:
         user = User.objects.get(pk=int(user_id))
@@ -52,7 +186,7 @@ def bulkedit_task(task_id, user_id, group_id, switch_id,
                   action=LOG_BULK_EDIT_TASK_END_ERROR,
                   type=LOG_TYPE_ERROR,
                   description=f"Bulk-Edit task(id={task_id}) started with invalid user id ({user_id})")
-        log.save()
+        save_log(log)
         return
     try:
         group = SwitchGroup.objects.get(pk=int(group_id))
@@ -61,7 +195,7 @@ def bulkedit_task(task_id, user_id, group_id, switch_id,
                   action=LOG_BULK_EDIT_TASK_END_ERROR,
                   type=LOG_TYPE_ERROR,
                   description=f"Bulk-Edit task(id={task_id}) started with invalid group id ({group_id})")
-        log.save()
+        save_log(log)
         return
     try:
         switch = Switch.objects.get(pk=int(switch_id))
@@ -70,7 +204,7 @@ def bulkedit_task(task_id, user_id, group_id, switch_id,
                   action=LOG_BULK_EDIT_TASK_END_ERROR,
                   type=LOG_TYPE_ERROR,
                   description=f"Bulk-Edit task(id={task_id}) started with invalid switch id ({switch_id})")
-        log.save()
+        save_log(log)
         return
 
     # log the start of the job
@@ -81,7 +215,7 @@ def bulkedit_task(task_id, user_id, group_id, switch_id,
               action=LOG_BULK_EDIT_TASK_START,
               description=f"Bulk-Edit task(id={task_id}) started",
               ip_address="0.0.0.0")
-    log.save()
+    save_log(log)
 
     task.status = TASK_STATUS_RUNNING
     task.start_count += 1
@@ -110,7 +244,7 @@ def bulkedit_task(task_id, user_id, group_id, switch_id,
                   action=LOG_BULK_EDIT_TASK_END_OK,
                   description=f"Bulk-Edit task(id={task_id}) ended successfully",
                   type=LOG_TYPE_CHANGE)
-        log.save()
+        save_log(log)
         subject = "Task executed successfully!"
     else:
         # log the error
@@ -122,7 +256,7 @@ def bulkedit_task(task_id, user_id, group_id, switch_id,
                   action=LOG_BULK_EDIT_TASK_END_ERROR,
                   description=f"Bulk-Edit task({task_id}) ended with errors",
                   type=LOG_TYPE_ERROR)
-        log.save()
+        save_log(log)
         subject = "Task had errors!"
 
     # now email the results to the user:
@@ -141,7 +275,7 @@ def bulkedit_task(task_id, user_id, group_id, switch_id,
                       type=LOG_TYPE_CHANGE,
                       action=LOG_EMAIL_SENT,
                       description=f"Bulk-Edit task(id={task_id}) results email sent")
-            log.save()
+            save_log(log)
             if settings.TASKS_BCC_ADMINS:
                 try:
                     mail_admins(subject, message, fail_silently=False)
@@ -152,7 +286,7 @@ def bulkedit_task(task_id, user_id, group_id, switch_id,
                               type=LOG_TYPE_ERROR,
                               action=LOG_EMAIL_ERROR,
                               description=f"Error emailing admin results for task(id={task_id}) ({repr(e)})")
-                    log.save()
+                    save_log(log)
         except Exception as e:
             log = Log(user=user,
                       group=group,
@@ -160,7 +294,7 @@ def bulkedit_task(task_id, user_id, group_id, switch_id,
                       type=LOG_TYPE_ERROR,
                       action=LOG_EMAIL_ERROR,
                       description=f"Error emailing Bulk-Edit task(id={task_id}) results ({repr(e)})")
-            log.save()
+            save_log(log)
 
     return 0
 
@@ -184,7 +318,7 @@ def bulkedit_processor(request, user_id, group_id, switch_id,
                   description=f"bulkedit_processor() started with invalid user({user_id}), \
                            group(group_id) or switch(switch_id)",
                   type=LOG_TYPE_ERROR)
-        log.save()
+        save_log(log)
 
         results = {}
         results['success_count'] = 0
@@ -212,6 +346,11 @@ def bulkedit_processor(request, user_id, group_id, switch_id,
     success_count = 0
     error_count = 0
     outputs = []    # description of any errors found
+    # the admin status, PoE and description changes are collected in a change set,
+    # and sent to the switch with a few requests after the loop, see conn.commit_changes()
+    pending = []    # tuples of (SnmpChange(), log, description if OK, description if error)
+    poe_toggles = []    # tuples of (interface, log) for the PoE Down/Up changes
+    conn.begin_changes()
     for (if_index, name) in interfaces.items():
         if_index = int(if_index)
         # OPTIMIZE: options.append(f"Interface index {if_index}</br>")
@@ -255,20 +394,28 @@ def bulkedit_processor(request, user_id, group_id, switch_id,
             if new_state != current_state['admin_state']:
                 # yes, apply the change:
                 retval = conn.set_interface_admin_status(iface, new_state)
-                if retval < 0:
-                    error_count += 1
-                    log.type = LOG_TYPE_ERROR
-                    log.description = f"Interface {iface.name}: Bulk-Edit Admin {new_state_name} ERROR: {conn.error.description}"
+                if retval == 0:
+                    # queued in the change set, logged after the changes are sent
+                    pending.append((conn.change_set[-1], log,
+                                    f"Interface {iface.name}: Bulk-Edit Admin set to {new_state_name}",
+                                    f"Interface {iface.name}: Bulk-Edit Admin {new_state_name} ERROR: "))
                 else:
-                    success_count += 1
-                    log.type = LOG_TYPE_CHANGE
-                    log.description = f"Interface {iface.name}: Bulk-Edit Admin set to {new_state_name}"
+                    if retval < 0:
+                        error_count += 1
+                        log.type = LOG_TYPE_ERROR
+                        log.description = f"Interface {iface.name}: Bulk-Edit Admin {new_state_name} ERROR: {conn.error.description}"
+                    else:
+                        success_count += 1
+                        log.type = LOG_TYPE_CHANGE
+                        log.description = f"Interface {iface.name}: Bulk-Edit Admin set to {new_state_name}"
+                    outputs.append(log.description)
+                    save_log(log)
             else:
                 # already in wanted admin state:
                 log.type = LOG_TYPE_CHANGE
                 log.description = f"Interface {iface.name}: Bulk-Edit ignored - already {new_state_name}"
-            outputs.append(log.description)
-            log.save()
+                outputs.append(log.description)
+                save_log(log)
 
         if poe_choice != BULKEDIT_POE_NONE:
             if not iface.poe_entry:
@@ -284,34 +431,8 @@ def bulkedit_processor(request, user_id, group_id, switch_id,
                     # Down / Up on interfaces with PoE Enabled:
                     if iface.poe_entry.admin_status == POE_PORT_ADMIN_ENABLED:
                         log.action = LOG_CHANGE_INTERFACE_POE_TOGGLE_DOWN_UP
-                        # the PoE index is kept in the iface.poe_entry
-                        # First disable PoE. Make sure we cast the proper type here! Ie this needs an Integer()
-                        # retval = conn._set(f"{pethPsePortAdminEnable}.{iface.poe_entry.index}", POE_PORT_ADMIN_DISABLED, 'i')
-                        # First disable PoE
-                        retval = conn.set_interface_poe_status(iface, POE_PORT_ADMIN_DISABLED)
-                        if retval < 0:
-                            log.description = f"ERROR: Bulk-Edit Toggle-Disable PoE on interface {iface.name} - {conn.error.description}"
-                            log.type = LOG_TYPE_ERROR
-                            outputs.append(log.description)
-                            log.save()
-                        else:
-                            # successful power down, now delay
-                            time.sleep(settings.POE_TOGGLE_DELAY)
-                            # Now enable PoE again...
-                            # retval = conn._set(f"{pethPsePortAdminEnable}.{iface.poe_entry.index}", POE_PORT_ADMIN_ENABLED, 'i')
-                            retval = conn.set_interface_poe_status(iface, POE_PORT_ADMIN_ENABLED)
-                            if retval < 0:
-                                log.description = f"ERROR: Bulk-Edit Toggle-Enable PoE on interface {iface.name} - {conn.error.description}"
-                                log.type = LOG_TYPE_ERROR
-                                outputs.append(log.description)
-                                log.save()
-                            else:
-                                # all went well!
-                                success_count += 1
-                                log.type = LOG_TYPE_CHANGE
-                                log.description = f"Interface {iface.name}: Bulk-Edit PoE Toggle Down/Up OK"
-                                outputs.append(log.description)
-                                log.save()
+                        # this is done for all interfaces at the same time, after the other changes.
+                        poe_toggles.append((iface, log))
                     else:
                         outputs.append(f"Interface {iface.name}: Bulk-Edit PoE Down/Up IGNORED, PoE NOT enabled")
 
@@ -342,16 +463,23 @@ def bulkedit_processor(request, user_id, group_id, switch_id,
                     if new_state != current_state['poe_state']:
                         # yes, go do it:
                         retval = conn.set_interface_poe_status(iface, new_state)
-                        if retval < 0:
+                        if retval == 0:
+                            # queued in the change set
+                            pending.append((conn.change_set[-1], log,
+                                            f"Interface {iface.name}: Bulk-Edit PoE {new_state_name}",
+                                            f"Interface {iface.name}: Bulk-Edit PoE {new_state_name} ERROR: "))
+                        elif retval < 0:
                             error_count += 1
                             log.type = LOG_TYPE_ERROR
                             log.description = f"Interface {iface.name}: Bulk-Edit PoE {new_state_name} ERROR: {conn.error.description}"
+                            outputs.append(log.description)
+                            save_log(log)
                         else:
                             success_count += 1
                             log.type = LOG_TYPE_CHANGE
                             log.description = f"Interface {iface.name}: Bulk-Edit PoE {new_state_name}"
                             outputs.append(log.description)
-                            log.save()
+                            save_log(log)
                     else:
                         # already in wanted power state:
                         outputs.append(f"Interface {iface.name}: Bulk-Edit ignored, PoE already {new_state_name}")
@@ -368,9 +496,9 @@ def bulkedit_processor(request, user_id, group_id, switch_id,
                           action=LOG_CHANGE_INTERFACE_PVID,
                           description=f"Interface {iface.name}: LACP Member, Bulk-Edit Vlan set to {new_pvid} IGNORED!")
                 outputs.append(log.description)
-                log.save()
+                save_log(log)
             else:
-                # make sure we cast the proper type here! Ie this needs an Integer()
+                # vlan changes are not part of the change set, as they can take several steps. They are sent now.
                 current_state['pvid'] = iface.untagged_vlan
                 retval = conn.set_interface_untagged_vlan(iface, new_pvid)
                 log = Log(user=user,
@@ -388,7 +516,7 @@ def bulkedit_processor(request, user_id, group_id, switch_id,
                     log.type = LOG_TYPE_CHANGE
                     log.description = f"Interface {iface.name}: Bulk-Edit Vlan set to {new_pvid}"
                 outputs.append(log.description)
-                log.save()
+                save_log(log)
 
         if new_alias:
             iface_new_alias = new_alias
@@ -414,22 +542,80 @@ def bulkedit_processor(request, user_id, group_id, switch_id,
             # make sure we cast the proper type here! Ie this needs an string
             # retval = conn._set(ifAlias + "." + str(if_index), iface_new_alias, 'OCTETSTRING')
             retval = conn.set_interface_description(iface, iface_new_alias)
-            if retval < 0:
+            if retval == 0:
+                # queued in the change set
+                pending.append((conn.change_set[-1], log,
+                                f"Interface {iface.name}: Bulk-Edit Descr set OK",
+                                f"Interface {iface.name}: Bulk-Edit Descr ERROR: "))
+            elif retval < 0:
                 error_count += 1
                 log.type = LOG_TYPE_ERROR
                 log.description = f"Interface {iface.name}: Bulk-Edit Descr ERROR: {conn.error.description}"
-                log.save()
-                return error_page(request, group, switch, conn.error)
+                outputs.append(log.description)
+                save_log(log)
             else:
                 success_count += 1
                 log.type = LOG_TYPE_CHANGE
                 log.description = f"Interface {iface.name}: Bulk-Edit Descr set OK"
-            outputs.append(log.description)
-            log.save()
+                outputs.append(log.description)
+                save_log(log)
 
         # done with this interface, add pre-change state!
         runtime_undo_info[if_index] = current_state
 
+    # PoE Down/Up: first disable PoE on all interfaces, in the same change set as the other changes.
+    toggle_changes = []
+    for (iface, log) in poe_toggles:
+        retval = conn.set_interface_poe_status(iface, POE_PORT_ADMIN_DISABLED)
+        toggle_changes.append((iface, log, retval, conn.change_set[-1] if retval == 0 else False))
+
+    # send all changes to the switch, and log the result of each:
+    conn.commit_changes()
+    for (change, log, description, error_description) in pending:
+        if change.status > 0:
+            success_count += 1
+            log.type = LOG_TYPE_CHANGE
+            log.description = description
+        else:
+            error_count += 1
+            log.type = LOG_TYPE_ERROR
+            log.description = f"{error_description}{change.error}"
+        outputs.append(log.description)
+        save_log(log)
+
+    if poe_toggles:
+        # now wait once for all interfaces, and enable PoE again.
+        conn.begin_changes()
+        toggle_enables = []
+        for (iface, log, retval, change) in toggle_changes:
+            if retval < 0 or (change and change.status < 0):
+                error_count += 1
+                log.description = f"ERROR: Bulk-Edit Toggle-Disable PoE on interface {iface.name} - " \
+                                  f"{change.error if change else conn.error.description}"
+                log.type = LOG_TYPE_ERROR
+                outputs.append(log.description)
+                save_log(log)
+            else:
+                retval = conn.set_interface_poe_status(iface, POE_PORT_ADMIN_ENABLED)
+                toggle_enables.append((iface, log, retval, conn.change_set[-1] if retval == 0 else False))
+        if toggle_enables:
+            # successful power down, now delay
+            time.sleep(settings.POE_TOGGLE_DELAY)
+        conn.commit_changes()
+        for (iface, log, retval, change) in toggle_enables:
+            if retval < 0 or (change and change.status < 0):
+                error_count += 1
+                log.description = f"ERROR: Bulk-Edit Toggle-Enable PoE on interface {iface.name} - " \
+                                  f"{change.error if change else conn.error.description}"
+                log.type = LOG_TYPE_ERROR
+            else:
+                # all went well!
+                success_count += 1
+                log.type = LOG_TYPE_CHANGE
+                log.description = f"Interface {iface.name}: Bulk-Edit PoE Toggle Down/Up OK"
+            outputs.append(log.description)
+            save_log(log)
+
     # update the task with the pre-change state:
     if task:
         task.runtime_reverse_arguments = json.dumps(runtime_undo_info)
@@ -451,7 +637,7 @@ def bulkedit_processor(request, user_id, group_id, switch_id,
             # save OK!
             log.type = LOG_TYPE_CHANGE
             log.description = "Bulk-Edit Config Saved"
-        log.save()
+        save_log(log)
 
     # log final results
     log = Log(user=user,
@@ -465,7 +651,7 @@ def bulkedit_processor(request, user_id, group_id, switch_id,
         log.description = "Bulk Edits had errors! (see previous entries)"
     else:
         log.description = "Bulk Edits OK!"
-    log.save()
+    save_log(log)
 
     results = {}
     results['success_count'] = success_count
@@ -23,6 +23,7 @@ urlpatterns = [
     path(r'search', views.switch_search, name='switch_search'),
     path(r'activity', views.admin_activity, name='admin_activity'),
     path(r'stats', views.show_stats, name='show_stats'),
+    path(r'metrics', views.snmp_metrics_text, name='snmp_metrics'),
     path(r'tasks', views.tasks, name='tasks'),
     path(r'tasks/details/<int:task_id>/', views.task_details, name='task_details'),
     path(r'tasks/delete/<int:task_id>/', views.task_delete, name='task_delete'),
@@ -24,6 +24,7 @@ from django.conf import settings
 from django.utils.timezone import get_default_timezone
 
 from switches.constants import ETH_FORMAT_COLON, ETH_FORMAT_HYPHEN, ETH_FORMAT_CISCO
+from switches.connect.oui.oui import get_vendor_from_address, get_block_ouis
 
 logger_debug = logging.getLogger("openl2m.debug")
 logger_console = logging.getLogger("openl2m.console")
@@ -40,6 +41,40 @@ def dprint(var):
         logger_console.debug(var)
 
 
+class DebugTrace():
+    """
+    Lazy version of dprint(), for the loops over snmp data. The message is only formatted
+    if debug output goes somewhere, and the check is a single attribute read:
+        trace("SNMP READ: {} = {}", oid, value)
+    or, for larger messages, or values that are expensive to get:
+        if trace.enabled:
+            dprint(f"...")
+    'enabled' follows the logger configuration, see refresh().
+    """
+    def __init__(self):
+        self.enabled = True
+
+    def refresh(self):
+        """
+        Check if dprint() output is logged anywhere. Called when a connection object is created,
+        so changes in the logging configuration are seen.
+        """
+        self.enabled = logger_debug.isEnabledFor(logging.DEBUG) or \
+            bool(settings.DEBUG and logger_console.isEnabledFor(logging.DEBUG))
+        return self.enabled
+
+    def __call__(self, format, *args):
+        """
+        dprint() the format string, with the arguments filled in with str.format(), if enabled.
+        """
+        if self.enabled:
+            dprint(format.format(*args) if args else format)
+
+
+# the debug trace of this process, see DebugTrace()
+trace = DebugTrace()
+
+
 def time_duration(seconds):
     """
     show a nice string with the time duration from the seconds given
@@ -55,29 +90,92 @@ def get_local_timezone_offset():
     return datetime.datetime.now(pytz.timezone(str(get_default_timezone()))).strftime('%z')
 
 
+class EthernetCodec():
+    """
+    Conversion of ethernet addresses to and from 48-bit numbers, and formatting in the display format
+    set in ETH_FORMAT and ETH_FORMAT_UPPERCASE. The format tables are built once, see get_ethernet_codec().
+    The vendor of each OUI is only looked up once.
+    """
+    def __init__(self, eth_format, uppercase):
+        self._hex = [('%02X' if uppercase else '%02x') % byte for byte in range(256)]
+        self._cisco = (eth_format == ETH_FORMAT_CISCO)
+        self._separator = '-' if eth_format == ETH_FORMAT_HYPHEN else ':'
+        self._vendors = {}  # vendor by 24-bit OUI
+
+    def from_decimal(self, decimal):
+        """
+        Return the number of the SNMP decimal ethernet string "11.12.13.78.90.100", e.g. from an OID, or -1 if invalid.
+        """
+        parts = decimal.split('.')
+        if len(parts) != 6:
+            return -1
+        try:
+            return int.from_bytes(bytes(map(int, parts)), 'big')
+        except ValueError:
+            return -1
+
+    def from_octets(self, octets):
+        """
+        Return the number of the SNMP ethernet 6-byte octetstring, or -1 if invalid.
+        The octetstring can be bytes, or a str with one character per byte, as EasySNMP returns it.
+        """
+        if len(octets) != 6:
+            return -1
+        if isinstance(octets, str):
+            try:
+                octets = octets.encode('latin-1')
+            except UnicodeEncodeError:
+                return -1
+        return int.from_bytes(octets, 'big')
+
+    def format(self, address):
+        """
+        Return the 48-bit ethernet address as a string, in the configured format.
+        """
+        h = self._hex
+        b = address.to_bytes(6, 'big')
+        if self._cisco:
+            return f"{h[b[0]]}{h[b[1]]}.{h[b[2]]}{h[b[3]]}.{h[b[4]]}{h[b[5]]}"
+        s = self._separator
+        return f"{h[b[0]]}{s}{h[b[1]]}{s}{h[b[2]]}{s}{h[b[3]]}{s}{h[b[4]]}{s}{h[b[5]]}"
+
+    def vendor(self, address):
+        """
+        Return the vendor of the 48-bit ethernet address.
+        """
+        oui = address >> 24
+        vendor = self._vendors.get(oui, None)
+        if vendor is None:
+            vendor = get_vendor_from_address(address)
+            # OUIs that are split in MA-M or MA-S blocks have more than one vendor
+            if oui not in get_block_ouis():
+                self._vendors[oui] = vendor
+        return vendor
+
+
+_ethernet_codec = None
+
+
+def get_ethernet_codec():
+    """
+    Return the EthernetCodec() for the ethernet format in the settings.
+    """
+    global _ethernet_codec
+    if not _ethernet_codec:
+        _ethernet_codec = EthernetCodec(settings.ETH_FORMAT, settings.ETH_FORMAT_UPPERCASE)
+    return _ethernet_codec
+
+
 def bytes_to_hex_string_ethernet(bytes):
     """
     Convert SNMP ethernet in 6-byte octetstring format to hex string.
     Various final formats are supported, configured in settings
     """
-    if len(bytes) == 6:
-        if settings.ETH_FORMAT_UPPERCASE:
-            format = '%02X'
-        else:
-            format = '%02x'
-
-        if(settings.ETH_FORMAT == ETH_FORMAT_COLON):
-            separator = ':'
-
-        if(settings.ETH_FORMAT == ETH_FORMAT_HYPHEN):
-            separator = '-'
-
-        if(settings.ETH_FORMAT == ETH_FORMAT_CISCO):
-            return "CISCO FORMAT TBD"
-
-        return separator.join(format % ord(b) for b in bytes)
-
-    return ''
+    codec = get_ethernet_codec()
+    address = codec.from_octets(bytes)
+    if address < 0:
+        return ''
+    return codec.format(address)
 
 
 def decimal_to_hex_string_ethernet(decimal):
@@ -85,33 +183,11 @@ def decimal_to_hex_string_ethernet(decimal):
     Convert SNMP decimal ethernet string "11.12.13.78.90.100"
     to hex string. Various final formats are supported, configured in settings
     """
-    format = settings.ETH_FORMAT
-    bytes = decimal.split('.')
-    if len(bytes) == 6:
-        mac = ''
-        for byte in bytes:
-            if settings.ETH_FORMAT_UPPERCASE:
-                h = "%02X" % int(byte)
-            else:
-                h = "%02x" % int(byte)
-
-            if(settings.ETH_FORMAT == ETH_FORMAT_COLON):
-                if not mac:
-                    mac += h
-                else:
-                    mac += ":%s" % h
-
-            if(settings.ETH_FORMAT == ETH_FORMAT_HYPHEN):
-                if not mac:
-                    mac += h
-                else:
-                    mac += "-%s" % h
-
-            if(settings.ETH_FORMAT == ETH_FORMAT_CISCO):
-                return "CISCO FORMAT TBD"
-
-        return mac
-    return False
+    codec = get_ethernet_codec()
+    address = codec.from_decimal(decimal)
+    if address < 0:
+        return False
+    return codec.format(address)
 
 
 def bytes_ethernet_to_oui(bytes):
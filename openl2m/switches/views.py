@@ -40,6 +40,8 @@ from switches.connect.connect import *
 from switches.connect.constants import *
 from switches.connect.snmp import *
 from switches.connect.netmiko.connector import *
+from switches.connect.metrics import snmp_metrics
+from switches.log_buffer import save_log, flush_logs
 from switches.utils import *
 from switches.tasks import bulkedit_task, bulkedit_processor
 from users.utils import *
@@ -93,7 +95,7 @@ def switches(request):
               action=LOG_VIEW_SWITCHGROUPS,
               description="Viewing switch groups",
               type=LOG_TYPE_VIEW)
-    log.save()
+    save_log(log)
 
     # render the template
     return render(request, template_name, {
@@ -122,7 +124,7 @@ def switch_search(request):
               action=LOG_VIEW_SWITCH_SEARCH,
               description=f"Searching for switch '{ search }'",
               type=LOG_TYPE_VIEW)
-    log.save()
+    save_log(log)
 
     results = []
     warning = False
@@ -176,13 +178,15 @@ def switch_hw_info(request, group_id, switch_id):
     return switch_view(request, group_id, switch_id, 'hw_info')
 
 
-def switch_view(request, group_id, switch_id, view, command_id=-1, interface_id=-1):
+def switch_view(request, group_id, switch_id, view, command_id=-1, interface_id=-1, refresh=False):
     """
     This shows the various data about a switch, either from a new SNMP read,
     from cached OID data, or an SSH command.
     This is includes enough to enable/disable interfaces and power,
     and change vlans. Depending on view, there may be more data needed,
     such as ethernet, arp & lldp tables.
+    If refresh is True, cached data is only used after reading the changed parts again,
+    see settings.SNMP_INCREMENTAL_REFRESH
     """
 
     template_name = 'switch.html'
@@ -204,11 +208,12 @@ def switch_view(request, group_id, switch_id, view, command_id=-1, interface_id=
               description=f"Viewing switch ({view})")
 
     try:
-        conn = get_connection_object(request, group, switch)
+        max_age = 0 if refresh else settings.SWITCH_CACHE_MAX_AGE.get(view, None)
+        conn = get_connection_object(request, group, switch, max_age)
     except Exception as e:
         log.type = LOG_TYPE_ERROR
         log.description = f"SNMP ERROR: Viewing switch ({view})"
-        log.save()
+        save_log(log)
         error = Error()
         error.description = "There was a failure communicating with this switch. Please contact your administrator to make sure switch data is correct in the database!"
         error.details = traceback.format_exc()
@@ -218,7 +223,7 @@ def switch_view(request, group_id, switch_id, view, command_id=-1, interface_id=
         # errors
         log.type = LOG_TYPE_ERROR
         log.description = "ERROR in get_basic_switch_info()"
-        log.save()
+        save_log(log)
         return error_page(request, group, switch, conn.error)
 
     dprint("Basic Info OK")
@@ -228,7 +233,7 @@ def switch_view(request, group_id, switch_id, view, command_id=-1, interface_id=
             # errors
             log.type = LOG_TYPE_ERROR
             log.description = "ERROR in get_hardware_details()"
-            log.save()
+            save_log(log)
             # don't render error, since we have already read the basic interface data
             # Note that SNMP errors are already added to warnings!
             # return error_page(request, group, switch, conn.error)
@@ -238,7 +243,7 @@ def switch_view(request, group_id, switch_id, view, command_id=-1, interface_id=
         if not conn.get_switch_client_data():
             log.type = LOG_TYPE_ERROR
             log.description = "ERROR get_switch_client_data()"
-            log.save()
+            save_log(log)
             # don't render error, since we have already read the basic interface data
             # Note that errors are already added to warnings!
             # return error_page(request, group, switch, conn.error)
@@ -285,7 +290,9 @@ def switch_view(request, group_id, switch_id, view, command_id=-1, interface_id=
                 cmd['error_descr'] = nm.error.description
                 cmd['error_details'] = nm.error.details
 
-    log.save()
+    save_log(log)
+    # write the buffered log entries of this request, so they are shown below
+    flush_logs()
 
     # get recent "non-viewing" activity for this switch
     # for now, show most recent 25 activities
@@ -360,7 +367,7 @@ def bulkedit_form_handler(request, group_id, switch_id, is_task):
     except Exception:
         log.type = LOG_TYPE_ERROR
         log.description = f"Getting SNMP data ({view})"
-        log.save()
+        save_log(log)
         error = Error()
         error.description = "Could not get connection. Please contact your administrator to make sure switch data is correct in the database!"
         return error_page(request, group, switch, error)
@@ -395,7 +402,7 @@ def bulkedit_form_handler(request, group_id, switch_id, is_task):
                       type=LOG_TYPE_ERROR,
                       action=LOG_CHANGE_BULK_EDIT,
                       description=f"Description not allowed: {new_alias}")
-            log.save()
+            save_log(log)
             new_alias = ''
             errors.append(f"The description is not allowed: {new_alias}")
 
@@ -410,7 +417,7 @@ def bulkedit_form_handler(request, group_id, switch_id, is_task):
                       type=LOG_TYPE_ERROR,
                       action=LOG_CHANGE_BULK_EDIT,
                       description=f"New vlan '{new_pvid}' is not allowed!")
-            log.save()
+            save_log(log)
             new_pvid = -1   # force no change!
             errors.append(f"New vlan '{new_pvid}' is not allowed!")
 
@@ -473,7 +480,7 @@ def bulkedit_form_handler(request, group_id, switch_id, is_task):
                   type=LOG_TYPE_CHANGE,
                   action=LOG_BULK_EDIT_TASK_SUBMIT,
                   description=f"Bulk Edit Task Submitted ({task_description}) to run at {eta}")
-        log.save()
+        save_log(log)
 
         # arguments for the task:
         args = {}
@@ -565,7 +572,7 @@ def interface_admin_change(request, group_id, switch_id, interface_id, new_state
     except Exception:
         log.type = LOG_TYPE_ERROR
         log.description = f"Getting SNMP data ({views})"
-        log.save()
+        save_log(log)
         error = Error()
         error.description = "Could not get connection. Please contact your administrator to make sure switch data is correct in the database!"
         return error_page(request, group, switch, error)
@@ -574,7 +581,7 @@ def interface_admin_change(request, group_id, switch_id, interface_id, new_state
     if not interface:
         log.type = LOG_TYPE_ERROR
         log.description = f"Admin-Change: Error getting interface data for if_index {interface_id}"
-        log.save()
+        save_log(log)
         error = Error()
         error.description = "Could not get interface data. Please contact your administrator!"
         return error_page(request, group, switch, error)
@@ -595,13 +602,13 @@ def interface_admin_change(request, group_id, switch_id, interface_id, new_state
     if retval < 0:
         log.description = f"ERROR: {conn.error.description}"
         log.type = LOG_TYPE_ERROR
-        log.save()
+        save_log(log)
         return error_page(request, group, switch, conn.error)
 
     # indicate we need to save config!
     conn.set_save_needed(True)
 
-    log.save()
+    save_log(log)
 
     description = f"Interface {interface.name} is now {state}"
     return success_page(request, group, switch, description)
@@ -631,7 +638,7 @@ def interface_alias_change(request, group_id, switch_id, interface_id):
     except Exception:
         log.type = LOG_TYPE_ERROR
         log.description = f"Getting SNMP data ({view})"
-        log.save()
+        save_log(log)
         error = Error()
         error.description = "Could not get connection. Please contact your administrator to make sure switch data is correct in the database!"
         return error_page(request, group, switch, error)
@@ -640,7 +647,7 @@ def interface_alias_change(request, group_id, switch_id, interface_id):
     if not interface:
         log.type = LOG_TYPE_ERROR
         log.description = f"Alias-Change: Error getting interface data for if_index {interface_id}"
-        log.save()
+        save_log(log)
         error = Error()
         error.description = "Could not get interface data. Please contact your administrator!"
         return error_page(request, group, switch, error)
@@ -659,7 +666,7 @@ def interface_alias_change(request, group_id, switch_id, interface_id):
     if not interface.can_edit_alias:
         log.description = f"Interface {interface.name} description edit not allowed"
         log.type = LOG_TYPE_ERROR
-        log.save()
+        save_log(log)
         error = Error()
         error.description = "You are not allowed to change the interface description"
         return error_page(request, group, switch, error)
@@ -670,7 +677,7 @@ def interface_alias_change(request, group_id, switch_id, interface_id):
         if match:
             log.type = LOG_TYPE_ERROR
             log.description = "New description matches admin deny setting!"
-            log.save()
+            save_log(log)
             error = Error()
             error.description = f"The description '{new_alias}' is not allowed!"
             return error_page(request, group, switch, error)
@@ -693,13 +700,13 @@ def interface_alias_change(request, group_id, switch_id, interface_id):
     if retval < 0:
         log.description = f"ERROR: {conn.error.description}"
         log.type = LOG_TYPE_ERROR
-        log.save()
+        save_log(log)
         return error_page(request, group, switch, conn.error)
 
     # indicate we need to save config!
     conn.set_save_needed(True)
 
-    log.save()
+    save_log(log)
 
     description = f"Interface {interface.name} description changed"
     return success_page(request, group, switch, description)
@@ -730,7 +737,7 @@ def interface_pvid_change(request, group_id, switch_id, interface_id):
     except Exception:
         log.type = LOG_TYPE_ERROR
         log.description = f"Getting SNMP data ({view})"
-        log.save()
+        save_log(log)
         error = Error()
         error.description = "Could not get connection. Please contact your administrator to make sure switch data is correct in the database!"
         return error_page(request, group, switch, error)
@@ -739,7 +746,7 @@ def interface_pvid_change(request, group_id, switch_id, interface_id):
     if not interface:
         log.type = LOG_TYPE_ERROR
         log.description = f"Pvid-Change: Error getting interface data for if_index {interface_id}"
-        log.save()
+        save_log(log)
         error = Error()
         error.description = "Could not get interface data. Please contact your administrator!"
         return error_page(request, group, switch, error)
@@ -759,7 +766,7 @@ def interface_pvid_change(request, group_id, switch_id, interface_id):
     conn._set_allowed_vlans()
     if not int(new_pvid) in conn.allowed_vlans.keys():
         log.action = LOG_CHANGE_INTERFACE_PVID + LOG_DENIED
-        log.save()
+        save_log(log)
         error = Error()
         error.status = True
         error.description = f"New vlan {new_pvid} is not valid on this switch"
@@ -770,14 +777,14 @@ def interface_pvid_change(request, group_id, switch_id, interface_id):
     if retval < 0:
         log.description = f"ERROR: {conn.error.description}"
         log.type = LOG_TYPE_ERROR
-        log.save()
+        save_log(log)
         return error_page(request, group, switch, conn.error)
 
     # indicate we need to save config!
     conn.set_save_needed(True)
 
     # all OK, save log
-    log.save()
+    save_log(log)
 
     description = f"Interface {interface.name} changed to vlan {new_pvid}"
     return success_page(request, group, switch, description)
@@ -812,7 +819,7 @@ def interface_poe_change(request, group_id, switch_id, interface_id, new_state):
     except Exception:
         log.type = LOG_TYPE_ERROR
         log.description = f"Getting SNMP data ({view})"
-        log.save()
+        save_log(log)
         error = Error()
         error.description = "Could not get connection. Please contact your administrator to make sure switch data is correct in the database!"
         return error_page(request, group, switch, error)
@@ -821,7 +828,7 @@ def interface_poe_change(request, group_id, switch_id, interface_id, new_state):
     if not interface:
         log.type = LOG_TYPE_ERROR
         log.description = f"PoE-Change: Error getting interface data for if_index {interface_id}"
-        log.save()
+        save_log(log)
         error = Error()
         error.description = "Could not get interface data. Please contact your administrator!"
         return error_page(request, group, switch, error)
@@ -843,7 +850,7 @@ def interface_poe_change(request, group_id, switch_id, interface_id, new_state):
         error = Error()
         error.status = True
         error.description = log.descr
-        log.save()
+        save_log(log)
         return error_page(request, group, switch, error)
 
     # do the work:
@@ -851,13 +858,13 @@ def interface_poe_change(request, group_id, switch_id, interface_id, new_state):
     if retval < 0:
         log.description = f"ERROR: {conn.error.description}"
         log.type = LOG_TYPE_ERROR
-        log.save()
+        save_log(log)
         return error_page(request, group, switch, conn.error)
 
     # indicate we need to save config!
     conn.set_save_needed(True)
 
-    log.save()
+    save_log(log)
 
     description = f"Interface {interface.name} PoE is now {state}"
     return success_page(request, group, switch, description)
@@ -891,7 +898,7 @@ def interface_poe_down_up(request, group_id, switch_id, interface_id):
     except Exception:
         log.type = LOG_TYPE_ERROR
         log.description = f"Getting SNMP data ({view})"
-        log.save()
+        save_log(log)
         error = Error()
         error.description = "Could not get connection. Please contact your administrator to make sure switch data is correct in the database!"
         return error_page(request, group, switch, error)
@@ -900,7 +907,7 @@ def interface_poe_down_up(request, group_id, switch_id, interface_id):
     if not interface:
         log.type = LOG_TYPE_ERROR
         log.description = f"PoE-Down-Up: Error getting interface data for if_index {interface_id}"
-        log.save()
+        save_log(log)
         error = Error()
         error.description = "Could not get interface data. Please contact your administrator!"
         return error_page(request, group, switch, error)
@@ -916,7 +923,7 @@ def interface_poe_down_up(request, group_id, switch_id, interface_id):
         error = Error()
         error.status = True
         error.description = log.descr
-        log.save()
+        save_log(log)
         return error_page(request, group, switch, error)
 
     # the PoE information (index) is kept in the interface.poe_entry
@@ -927,7 +934,7 @@ def interface_poe_down_up(request, group_id, switch_id, interface_id):
         error = Error()
         error.status = True
         error.description = log.descr
-        log.save()
+        save_log(log)
         return error_page(request, group, switch, error)
 
     # disable PoE:
@@ -935,7 +942,7 @@ def interface_poe_down_up(request, group_id, switch_id, interface_id):
     if retval < 0:
         log.description = f"ERROR: Toggle-Disable PoE on {interface.name} - {conn.error.description}"
         log.type = LOG_TYPE_ERROR
-        log.save()
+        save_log(log)
         return error_page(request, group, switch, conn.error)
 
     # delay to let the device cold-boot properly
@@ -946,11 +953,11 @@ def interface_poe_down_up(request, group_id, switch_id, interface_id):
     if retval < 0:
         log.description = f"ERROR: Toggle-Enable PoE on {interface.name} - {conn.error.description}"
         log.type = LOG_TYPE_ERROR
-        log.save()
+        save_log(log)
         return error_page(request, group, switch, conn.error)
 
     # no state change, so no save needed!
-    log.save()
+    save_log(log)
 
     description = f"Interface {interface.name} PoE was toggled!"
     return success_page(request, group, switch, description)
@@ -982,7 +989,7 @@ def switch_save_config(request, group_id, switch_id, view):
     except Exception:
         log.type = LOG_TYPE_ERROR
         log.description = f"Getting SNMP data ({view})"
-        log.save()
+        save_log(log)
         error = Error()
         error.description = "Could not get connection. Please contact your administrator to make sure switch data is correct in the database!"
         return error_page(request, group, switch, error)
@@ -993,7 +1000,7 @@ def switch_save_config(request, group_id, switch_id, view):
         if retval < 0:
             # an error happened!
             log.type = LOG_TYPE_ERROR
-            log.save()
+            save_log(log)
             return error_page(request, group, switch, conn.error)
 
         # clear save flag
@@ -1002,13 +1009,13 @@ def switch_save_config(request, group_id, switch_id, view):
     else:
         log.type = LOG_TYPE_ERROR
         log.description = "Can not save config"
-        log.save()
+        save_log(log)
         error = Error()
         error.description = "This switch model cannot save or does not need to save the config"
         return error_page(request, group, switch, error)
 
     # all OK
-    log.save()
+    save_log(log)
 
     description = f"Config was saved for {switch.name}"
     return success_page(request, group, switch, description)
@@ -1053,9 +1060,14 @@ def switch_reload(request, group_id, switch_id, view):
               description="Reloading SNMP (basic)",
               action=LOG_RELOAD_SWITCH,
               type=LOG_TYPE_VIEW)
-    log.save()
+    save_log(log)
+
+    if settings.SNMP_INCREMENTAL_REFRESH:
+        # only read what changed, and the interface state
+        return switch_view(request, group_id, switch_id, view, refresh=True)
 
     clear_session_oid_cache(request)
+    clear_switch_cache(switch.id)
 
     return switch_view(request, group_id, switch_id, view)
 
@@ -1093,7 +1105,7 @@ def switch_activity(request, group_id, switch_id):
               type=LOG_TYPE_VIEW,
               action=LOG_VIEW_ALL_LOGS,
               description=f"Viewing Switch Activity Logs (page {page_number})")
-    log.save()
+    save_log(log)
 
     # get the url to this switch:
     switch_url = reverse('switches:switch_basics', kwargs={'group_id': group.id, 'switch_id': switch.id})
@@ -1124,7 +1136,7 @@ def show_stats(request):
               type=LOG_TYPE_VIEW,
               action=LOG_VIEW_ADMIN_STATS,
               description="Viewing Site Statistics")
-    log.save()
+    save_log(log)
 
     environment = {}    # OS environment information
     environment['Python'] = f"{sys.version_info[0]}.{sys.version_info[1]}.{sys.version_info[2]}"
@@ -1193,15 +1205,43 @@ def show_stats(request):
 
     user_list = get_current_users()
 
+    # the snmp requests that took the most time, in this process
+    metrics = snmp_metrics.get_rows(limit=25)
+
     # render the template
     return render(request, template_name, {
         'db_items': db_items,
         'usage': usage,
         'environment': environment,
         'user_list': user_list,
+        'snmp_metrics': metrics,
     })
 
 
+def get_metrics_client_ip(request):
+    """
+    Return the address of the client, to check against METRICS_ALLOWED_IPS.
+    This is the address of the connection, and not from the X-Forwarded-For header, as anyone can set that.
+    Only if the connection is from a proxy in METRICS_TRUSTED_PROXIES, the X-Real-IP header set by
+    that proxy is used, see the nginx configuration in the installation docs.
+    """
+    remote_ip = request.META.get('REMOTE_ADDR', '')
+    if remote_ip in settings.METRICS_TRUSTED_PROXIES:
+        return request.META.get('HTTP_X_REAL_IP', '')
+    return remote_ip
+
+
+def snmp_metrics_text(request):
+    """
+    Return the snmp request metrics of this process, in the Prometheus text format.
+    This is allowed for staff users, and for the addresses in METRICS_ALLOWED_IPS.
+    """
+    if get_metrics_client_ip(request) not in settings.METRICS_ALLOWED_IPS:
+        if not request.user.is_authenticated or not (request.user.is_superuser or request.user.is_staff):
+            return HttpResponse("Access denied\n", status=403, content_type='text/plain')
+    return HttpResponse(snmp_metrics.prometheus_text(), content_type='text/plain; version=0.0.4')
+
+
 #
 # "Administrative" views
 #
@@ -1223,7 +1263,7 @@ def admin_activity(request):
                   type=LOG_TYPE_ERROR,
                   action=LOG_VIEW_ALL_LOGS,
                   description="Not Allowed to View All Logs")
-        log.save()
+        save_log(log)
         error = Error()
         error.status = True
         error.description = "You do not have access to this page!"
@@ -1260,7 +1300,7 @@ def admin_activity(request):
         logs = Log.objects.all().order_by('-timestamp')
         log.description = f"Viewing all logs (page {page_number})"
         title = 'All Activities'
-    log.save()
+    save_log(log)
 
     # setup pagination of the resulting activity logs
     paginator = Paginator(logs, settings.PAGINATE_COUNT)    # Show set number of contacts per page.
@@ -1311,7 +1351,7 @@ def tasks(request):
               type=LOG_TYPE_VIEW,
               action=LOG_VIEW_TASKS,
               description=f"Viewing tasks (page {page_number})")
-    log.save()
+    save_log(log)
 
     paginator = Paginator(tasks, settings.PAGINATE_COUNT)    # Show set number of contacts per page.
     tasks_page = paginator.get_page(page_number)
@@ -1339,7 +1379,7 @@ def task_details(request, task_id):
                   type=LOG_TYPE_ERROR,
                   action=LOG_VIEW_TASK_DETAILS,
                   description=f"You do not have permission to view task {task_id} details!")
-        log.save()
+        save_log(log)
         error = Error()
         error.description = log.description
         return error_page(request, False, False, error)
@@ -1350,7 +1390,7 @@ def task_details(request, task_id):
               type=LOG_TYPE_VIEW,
               action=LOG_VIEW_TASK_DETAILS,
               description=f"Viewing task {task_id} details")
-    log.save()
+    save_log(log)
 
     task_process_running = is_celery_running()
 
@@ -1374,7 +1414,7 @@ def task_delete(request, task_id):
                   action=LOG_TASK_DELETE,
                   type=LOG_TYPE_ERROR,
                   description=f"You do not have permission to delete task {task_id} !")
-        log.save()
+        save_log(log)
         error = Error()
         error.description = log.description
         return error_page(request, False, False, error)
@@ -1390,12 +1430,12 @@ def task_delete(request, task_id):
     if task_revoke(task, False):
         log.type = LOG_TYPE_CHANGE
         log.description = f"Task {task_id} deleted"
-        log.save()
+        save_log(log)
         return success_page(request, False, False, f"Task {task_id} has been deleted!")
     else:
         log.description = f"Error deleting task {task_id} !"
         log.type = LOG_TYPE_ERROR
-        log.save()
+        save_log(log)
         error = Error()
         error.description = log.description
         return error_page(request, False, False, error)
@@ -1413,7 +1453,7 @@ def task_terminate(request, task_id):
                   action=LOG_TASK_TERMINATE,
                   type=LOG_TYPE_ERROR,
                   description=f"You do not have permission to terminate task {task_id}. Please contact an administrator!")
-        log.save()
+        save_log(log)
         error = Error()
         error.description = log.description
         return error_page(request, False, False, error)
@@ -1431,12 +1471,12 @@ def task_terminate(request, task_id):
     if task_revoke(task, True):
         log.type = LOG_TYPE_CHANGE
         log.description = f"Task {task_id} terminated"
-        log.save()
+        save_log(log)
         return success_page(request, False, False, f"Task {task_id} has been terminated (killed)!")
     else:
         log.type = LOG_TYPE_ERROR
         log.description = f"Error terminating task {task_id}"
-        log.save()
+        save_log(log)
         error = Error()
         error.description = log.description
         return error_page(request, False, False, error)